@@ -52,6 +52,8 @@ main(int argc, char *argv[])
   int sm_length=0;
   double fwhm=0.0;
 
+  int nthreads=0;
+
   if ((argc <= 2) || (opt = get_online_option("help", argc, argv))) {
     fprintf(stdout,
             "ST-ECF European Coordinating Facility\n"
@@ -104,6 +106,8 @@ main(int argc, char *argv[])
             "                                 filename\n"
             "           -in_AF=[string]     - Overwrites the default input aperture\n"
             "                                 filename\n"
+            "           -nthreads=[integer] - The number of threads for the background\n"
+            "                                 computation (default: all cores)\n"
             "\n"
             "Example:   aXe_BE slim_grismb.fits -np=10 -interp=3 \n"
             "\n", RELEASE);
@@ -239,6 +243,12 @@ main(int argc, char *argv[])
   else
     fwhm=0.0;
 
+  // check for the parameter "nthreads"
+  if ((opt = get_online_option("nthreads", argc, argv)))
+    nthreads = atoi(opt);
+  else
+    nthreads=0;
+
 
   fprintf(stdout,
           "aXe_BE: Main configuration file name:         %s\n",
@@ -283,6 +293,9 @@ main(int argc, char *argv[])
      fprintf(stdout,
           "aXe_BE: Gaussian FWHM in smoothing:           %f\n", fwhm);
     }
+  if (nthreads > 0)
+    fprintf(stdout,
+          "aXe_BE: Number of threads:                    %d\n", nthreads);
   if (makemask)
     fprintf(stdout, "aXe_BE: Producing mask file.\n");
   if (nor_flag)
@@ -322,7 +335,8 @@ main(int argc, char *argv[])
         {
           //backg = compute_fullimg_background2(obs, oblist, np, interp);
           backg = compute_fullimg_background(obs, oblist, np, interp, niter_med,
-                                             niter_fit, kappa, nor_flag, sm_length, fwhm);
+                                             niter_fit, kappa, nor_flag, sm_length, fwhm,
+                                             nthreads);
         }
       else
         {
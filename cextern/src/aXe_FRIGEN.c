@@ -34,9 +34,18 @@ main(int argc, char *argv[])
   //interpolator *filter_through;
   gsl_matrix   *fringe_image;
 
+  int nthreads=0;
+
   if ((argc < 3) || (opt = get_online_option("help", argc, argv))) {
     fprintf(stdout,
 	    "aXe_FRIGEN Version %s:\n"
+	    "\n"
+	    "Usage:\n"
+	    "      aXe_FRIGEN [fringe config filename] [fringe image filename] [options]\n"
+	    "\n"
+	    "Options:\n"
+	    "           -nthreads=[integer] - The number of threads for the fringe\n"
+	    "                                 computation (default: all cores)\n"
 	    "\n", RELEASE);
     exit(1);
   }
@@ -50,6 +59,12 @@ main(int argc, char *argv[])
   strcpy(fimage_file, argv[2]);
   build_path(AXE_OUTPUT_PATH, fimage_file, fimage_file_path);
 
+  // check for the parameter "nthreads"
+  if ((opt = get_online_option("nthreads", argc, argv)))
+    nthreads = atoi(opt);
+  else
+    nthreads=0;
+
   /* report on the input and output that will be used */
   fprintf(stdout,
 	  "aXe_FRIGEN: Input fringe configuration file:   %s\n",
@@ -57,6 +72,9 @@ main(int argc, char *argv[])
   fprintf(stdout,
 	  "aXe_FRIGEN: Output fringe image name:          %s\n",
 	  fimage_file_path);
+  if (nthreads > 0)
+    fprintf(stdout,
+	    "aXe_FRIGEN: Number of threads:                 %d\n", nthreads);
 
   // load the fringe configuration file
   fconf = load_fringe_conf(fconf_file_path);
@@ -73,7 +91,7 @@ main(int argc, char *argv[])
 
 
   // comute the fringe amplitude
-  fringe_image = compute_fringe_amplitude(fconf);
+  fringe_image = compute_fringe_amplitude(fconf, nthreads);
 
   // save the matrix to a fits-image
   gsl_to_FITSimage (fringe_image, fimage_file_path, 1, NULL);
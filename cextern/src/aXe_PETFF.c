@@ -60,6 +60,8 @@ main (int argc, char *argv[])
   int aperID, beamID, objindex;
 
   poly_cube_flatfield *FF_poly_cube;
+  poly_cube_ffcache *FF_cache=NULL;
+  int ffgrid=0;
 
   double exptime;
 
@@ -83,6 +85,8 @@ main (int argc, char *argv[])
 	       "Options:\n"
 	       "             -FFNAME=[string]   - overwrite the default input flat-field cube name\n"
 	       "             -bck               - apply FF to the background Pixel Extraction Table (BPET)\n"
+	       "             -FFGRID=[integer]  - interpolate the FF from a cached grid with this number\n"
+	       "                                  of wavelengths instead of evaluating every pixel\n"
 	       "\n",RELEASE);
       exit (1);
     }
@@ -133,12 +137,18 @@ main (int argc, char *argv[])
       strcpy(FF_file_path,opt);
     }
 
+  if ((opt = get_online_option ("FFGRID", argc, argv)))
+    ffgrid = atoi(opt);
+
   fprintf (stdout, "aXe_PETFF: Input Aperture file name:            %s\n",
 	   aper_file_path);
   fprintf (stdout, "aXe_PETFF: Input PET file name:                 %s\n",
 	   PET_file_path);
   fprintf (stdout, "aXe_PETFF: Input Flat-field cube file name:     %s\n",
 	   FF_file_path);
+  if (ffgrid > 0)
+    fprintf (stdout, "aXe_PETFF: Wavelength grid for the FF cache:    %i\n",
+	     ffgrid);
 
   //
   // try to get the descriptor 'exptime' from the 'sci'-extension
@@ -175,6 +185,8 @@ main (int argc, char *argv[])
       fprintf (stdout, "aXe_PETFF: Loading the FF cube...");fflush(stdout);
       FF_poly_cube = load_flat_poly_cube(FF_file_path);
       fprintf (stdout, "Done.\n");
+      if (ffgrid > 0)
+	FF_cache = alloc_poly_cube_ffcache(ffgrid, FFCACHE_MAX_BYTES);
       while (1)
 	{
 	  /* Get the PET for this object */
@@ -186,21 +198,7 @@ main (int argc, char *argv[])
 
 	  /* Compute FF information for each pixel */
 	  /* Divide count and error by it */
-	  {
-	    int j = 0;
-	    double ff;
-	    while (PET[j].p_x != -1)
-	      {
-		ff = poly_cube_flatfield_lambda (PET[j].lambda, PET[j].p_x, PET[j].p_y,
-						 FF_poly_cube);
-		if (ff!=0)
-		  {
-		    PET[j].count /= ff;
-		    PET[j].error /= ff;
-		  }
-		j++;
-	      }
-	  }
+	  apply_poly_cube_flatfield(PET, FF_poly_cube, FF_cache);
 
 	  /* update PET table with the new FF info */
 	  {
@@ -218,6 +216,7 @@ main (int argc, char *argv[])
 	}
       /* Free the FF cube */
       free_flat_poly_cube(FF_poly_cube);
+      free_poly_cube_ffcache(FF_cache);
     }
   if (oblist!=NULL) free_oblist (oblist);
 
@@ -18,6 +18,8 @@
 #define gsl_matrix_set          gsl_matrix_float_set
 #define gsl_matrix_set_all      gsl_matrix_float_set_all
 #define gsl_matrix_alloc        gsl_matrix_float_alloc
+#define gsl_matrix_calloc       gsl_matrix_float_calloc
+#define gsl_matrix_memcpy       gsl_matrix_float_memcpy
 #define gsl_matrix_free         gsl_matrix_float_free
 #define gsl_matrix_fprintf      gsl_matrix_float_fprintf
 #define gsl_matrix_add_constant gsl_matrix_float_add_constant
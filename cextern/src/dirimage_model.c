@@ -128,6 +128,8 @@ make_dirimage(object **oblist, dirobject **dirlist, const px_point npixels,
 
   d_point dpixel;
 
+  gauss_emodel emodel;
+
    // allocate memory for the image matrix
   dirimage_matrix = gsl_matrix_alloc(npixels.x, npixels.y);
   gsl_matrix_set_all(dirimage_matrix,0.0);
@@ -162,6 +164,9 @@ make_dirimage(object **oblist, dirobject **dirlist, const px_point npixels,
       actbeam.refpoint.x -= actdir->xy_off[actbeam.ID].x;
       actbeam.refpoint.y -= actdir->xy_off[actbeam.ID].y;
 
+      // set up the gaussian emission model
+      init_gauss_emodel(actbeam, actdir->drzscale, &emodel);
+
       // go over each pixel in the direct object area
       for (nx=actdir->ix_min; nx<=actdir->ix_max; nx++)
 	{
@@ -191,7 +196,7 @@ make_dirimage(object **oblist, dirobject **dirlist, const px_point npixels,
 		// do a subsampling over the pixel
 		// to get a more appropriate value for the
 		// emission val
-		sval = get_sub_emodel_value(dpixel, actbeam, actdir->drzscale);
+		sval = get_gauss_emodel_value(&emodel, dpixel);
 
 	      // compute and set the new pixel values
 	      value = gsl_matrix_get(dirimage_matrix, nx, ny) + sval*cps;
@@ -505,6 +505,57 @@ get_global_disp(char *filename, const int for_grism, int beamID)
   return gdisp;
 }
 
+/**
+ * Generate and returns a dispersion structure that is computed
+ * at the given pixel p from an already parsed dispersion solution.
+ * The coefficients are evaluated in single precision, exactly as
+ * in get_dispstruct_at_pos(), but without reading the configuration
+ * file again.
+ *
+ * @param gdisp    the parsed dispersion solution of the beam
+ * @param p        a d_point object containing the position to compute
+ *                 the dispersion coefficients at.
+ *
+ * @return res     a dispersion structure computed at detector pixel p.
+ */
+dispstruct *
+get_dispstruct_from_gdisp(const global_disp *gdisp, d_point p)
+{
+  dispstruct *res;
+  gsl_vector *v;
+  float n, c, value;
+  int order, i, j, k;
+
+  res = malloc (sizeof (dispstruct));
+
+  res->pol = gsl_vector_alloc (gdisp->n_order + 1);
+  for (order = 0; order < gdisp->n_order + 1; order++)
+    {
+      v = gdisp->all_coeffs[order];
+      n = 0.5 * (-1.0 + sqrt (1 + 8 * v->size));
+
+      i = 0;
+      value = 0;
+      for (j = 0; j < n; j++)
+        {
+          for (k = 0; k < (j + 1); k++)
+            {
+              c = gsl_vector_get (v, i);
+              value = value + c * pow (p.x, (j - k)) * pow (p.y, k);
+              i++;
+            }
+        }
+      gsl_vector_set (res->pol, order, value);
+    }
+
+  res->ID = gdisp->ID;
+  res->cpoint.x = p.x;
+  res->cpoint.y = p.y;
+  sprintf (res->file, "%s", gdisp->file);
+  res->for_grism = gdisp->for_grism;
+  return res;
+}
+
 gsl_vector *
 get_calvector_from_gdisp(const global_disp *gdisp, const d_point p)
 {
@@ -84,6 +84,9 @@ get_prange (char *filename, int beamID);
 extern global_disp *
 get_global_disp(char *filename, const int for_grism, int beamID);
 
+extern dispstruct *
+get_dispstruct_from_gdisp(const global_disp *gdisp, d_point p);
+
 extern gsl_vector *
 get_calvector_from_gdisp(const global_disp *gdisp, const d_point p);
 
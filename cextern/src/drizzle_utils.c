@@ -304,29 +304,139 @@ objectobs **
 malloc_objectobs(){
   objectobs **allobjects;
 
-  allobjects = (objectobs **) malloc (NMAXOBJ*sizeof(objectobs *));
+  allobjects = (objectobs **) calloc (NMAXOBJ, sizeof(objectobs *));
 
   return allobjects;
 }
 
 void
 free_objectobs(objectobs **allobjects){
-  //  int i, nobjs=0;
-  //  while (allobjects[nobjs])
-  //    nobjs++;
-  //  for (i=0; i<nobjs; i++){
-  //      free(allobjects[i]);
-  //      //    allobjects[i] = NULL;
-  //  }
+  int i;
+
+  // the array is zeroed on allocation,
+  // the objects are stored consecutively
+  for (i=0; i < NMAXOBJ && allobjects[i]; i++)
+    free(allobjects[i]);
   free(allobjects);
 }
 
+/**
+ * Function: alloc_objectobs_index
+ * Allocates an empty hash index for the objects in an
+ * objectobs array. The index maps the object ID to
+ * the position in the array, such that objects are
+ * found in constant time.
+ *
+ * Parameters:
+ * @param nmax - the maximum number of objects
+ *
+ * Returns:
+ * @return index - the empty index
+ */
+objectobs_index *
+alloc_objectobs_index(const int nmax)
+{
+  objectobs_index *index;
+  int i;
+
+  index = (objectobs_index *) malloc (sizeof(objectobs_index));
+
+  // keep the load factor below one half
+  index->size = 1;
+  while (index->size < 2 * nmax)
+    index->size *= 2;
+
+  index->slots = (int *) malloc (index->size * sizeof(int));
+  for (i=0; i < index->size; i++)
+    index->slots[i] = -1;
+
+  return index;
+}
+
+/**
+ * Function: free_objectobs_index
+ * Releases the memory of an objectobs index.
+ *
+ * Parameters:
+ * @param index - the index
+ */
+void
+free_objectobs_index(objectobs_index *index)
+{
+  free(index->slots);
+  free(index);
+}
+
+/**
+ * Function: objectobs_slot
+ * Returns the slot of an object ID in the index. This is
+ * either the slot holding the object or the empty slot
+ * where it would be inserted (open addressing with
+ * linear probing).
+ *
+ * Parameters:
+ * @param index      - the index
+ * @param allobjects - the objectobs array
+ * @param ID         - the object ID
+ *
+ * Returns:
+ * @return slot - the slot of the object
+ */
+static int
+objectobs_slot(const objectobs_index *index, objectobs **allobjects,
+               const int ID)
+{
+  int slot;
+
+  slot = (int)(((unsigned int)ID * 2654435761u) & (unsigned int)(index->size - 1));
+  while (index->slots[slot] > -1 && allobjects[index->slots[slot]]->OBJID != ID)
+    slot = (slot + 1) & (index->size - 1);
+
+  return slot;
+}
+
+/**
+ * Function: find_objectobs
+ * Finds an object in the objectobs array.
+ *
+ * Parameters:
+ * @param index      - the index of the array
+ * @param allobjects - the objectobs array
+ * @param ID         - the object ID
+ *
+ * Returns:
+ * @return pos - the position in the array, -1 if not found
+ */
 int
-add_observation(char * filename, char *  conf_file, objectobs ** allobjects, int nobjects,
-                object ** oblist, int list_size, px_point pixmax, int sci_numext)
+find_objectobs(const objectobs_index *index, objectobs **allobjects,
+               const int ID)
 {
+  return index->slots[objectobs_slot(index, allobjects, ID)];
+}
 
-  int i, j, dec;
+/**
+ * Function: insert_objectobs
+ * Enters an object of the objectobs array into the index.
+ *
+ * Parameters:
+ * @param index      - the index of the array
+ * @param allobjects - the objectobs array
+ * @param pos        - the position of the object in the array
+ */
+void
+insert_objectobs(objectobs_index *index, objectobs **allobjects,
+                 const int pos)
+{
+  index->slots[objectobs_slot(index, allobjects, allobjects[pos]->OBJID)] = pos;
+}
+
+int
+add_observation(char * filename, const global_disp *gdisp, objectobs ** allobjects,
+                objectobs_index *index, int nobjects, const int expindex, object ** oblist,
+                int list_size, px_point pixmax, int sci_numext)
+{
+
+  int i, pos;
   int beamID = 0;
   int get_scale=0;
   int tlength;
@@ -347,7 +457,6 @@ add_observation(char * filename, char *  conf_file, objectobs ** allobjects, int
   }
   for (i=0; i < list_size; i++){
     if (oblist[i]->beams[beamID].ignore == 0){
-      dec = 0;
 
       if (get_scale)
         cdscale = drzscale * get_crossdisp_scale(oblist[i]->beams[beamID].spec_trace,
@@ -355,7 +464,7 @@ add_observation(char * filename, char *  conf_file, objectobs ** allobjects, int
       else
         cdscale=1.0;
 
-      disp = get_dispstruct_at_pos(conf_file, 1, beamID,oblist[i]->beams[beamID].refpoint);
+      disp = get_drz_dispstruct(gdisp, beamID, oblist[i]->beams[beamID].refpoint);
       wl_calib = create_calib_from_gsl_vector(1, disp->pol);
       l1 =  wl_calib->func (0.0,  wl_calib->order,  wl_calib->coeffs);
       l2 =  wl_calib->func (1.0,  wl_calib->order,  wl_calib->coeffs);
@@ -364,14 +473,21 @@ add_observation(char * filename, char *  conf_file, objectobs ** allobjects, int
       // compute the tracelength
       tlength = get_beam_trace_length(oblist[i]->beams[beamID]);
 
-      for (j=0; j < nobjects; j++){
-        if (allobjects[j]->OBJID == oblist[i]->ID){
-          add_obs_to_allobj(allobjects[j], oblist[i], pixmax, cdscale, spreso, tlength);
-          dec = 1;
-        }
+      // add the observation to a known
+      // object or register a new object
+      pos = find_objectobs(index, allobjects, oblist[i]->ID);
+      if (pos > -1) {
+        add_obs_to_allobj(allobjects[pos], oblist[i], pixmax, cdscale, spreso, tlength,
+                          expindex);
       }
-      if (dec == 0) {
-        nobjects = add_obj_to_allobj(allobjects, nobjects, oblist[i], pixmax, cdscale, spreso, tlength);
+      else {
+        if (nobjects >= NMAXOBJ)
+          aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
+                       "add_observation: More than %i objects in all observations!\n",
+                       NMAXOBJ);
+        nobjects = add_obj_to_allobj(allobjects, nobjects, oblist[i], pixmax, cdscale, spreso, tlength,
+                                     expindex);
+        insert_objectobs(index, allobjects, nobjects-1);
       }
       free_dispstruct(disp);
       free_calib(wl_calib);
@@ -382,7 +498,8 @@ add_observation(char * filename, char *  conf_file, objectobs ** allobjects, int
 }
 
 void
-add_obs_to_allobj(objectobs *actobject, object * actobs, px_point pixmax, double cdscale, double spreso, int tlength)
+add_obs_to_allobj(objectobs *actobject, object * actobs, px_point pixmax, double cdscale, double spreso, int tlength,
+                  const int expindex)
 {
 
   int xmin, xmax, ymin, ymax;
@@ -428,6 +545,7 @@ add_obs_to_allobj(objectobs *actobject, object * actobs, px_point pixmax, double
   actobject->width[actobject->nobs]    = bbox.x;
   actobject->height[actobject->nobs]   = bbox.y;
   actobject->tlength[actobject->nobs]  = tlength;
+  actobject->expindex[actobject->nobs] = expindex;
   actobject->objwidth[actobject->nobs] = actobs->beams[0].width;
   actobject->orient[actobject->nobs]   = actobs->beams[0].orient;
   actobject->cdscale[actobject->nobs]   = cdscale;
@@ -444,7 +562,8 @@ add_obs_to_allobj(objectobs *actobject, object * actobs, px_point pixmax, double
 
 int
 add_obj_to_allobj(objectobs **allobjects, int nobjects, object * actobs,
-                   px_point pixmax, double cdscale, double spreso, int tlength)
+                   px_point pixmax, double cdscale, double spreso, int tlength,
+                   const int expindex)
 {
   int xmin, xmax, ymin, ymax;
   //double m, b;
@@ -478,7 +597,6 @@ add_obj_to_allobj(objectobs **allobjects, int nobjects, object * actobs,
 
   allobjects[nobjects]->OBJID = actobs->ID;
   allobjects[nobjects]->nobs = 1;
-  allobjects[nobjects]->pointer = 0;
 
 
   gsl_vector_int_set(xvec, 0, actobs->beams[0].corners[0].x);
@@ -501,6 +619,7 @@ add_obj_to_allobj(objectobs **allobjects, int nobjects, object * actobs,
   allobjects[nobjects]->width[0]   = bbox.x;
   allobjects[nobjects]->height[0]  = bbox.y;
   allobjects[nobjects]->tlength[0] = tlength;
+  allobjects[nobjects]->expindex[0] = expindex;
   allobjects[nobjects]->objwidth[0] = actobs->beams[0].width;
   allobjects[nobjects]->orient[0]   = actobs->beams[0].orient;
   allobjects[nobjects]->cdscale[0]  = cdscale;
@@ -537,7 +656,8 @@ void print_objectobs2(objectobs allobjects[], int nobjects){
     }
   }
 }
-int make_refpoints( char * conf_file, char * filename, px_point pixmax, objectobs **allobjects, int nobjects)
+int make_refpoints( char * conf_file, const global_disp *gdisp, char * filename, px_point pixmax,
+                    objectobs **allobjects, int nobjects)
 {
   int i, j;
   int nobs;
@@ -615,11 +735,13 @@ int make_refpoints( char * conf_file, char * filename, px_point pixmax, objectob
      * it. Store also the mean wavelength dispersion to correct the length
      */
     if (conf->drz_resol < 1.0e-16){
-      disp = get_dispstruct_at_pos(conf_file, 1, beamID, allobjects[i]->mean_refpoint);
+      disp = get_drz_dispstruct(gdisp, beamID, allobjects[i]->mean_refpoint);
       wl_calib = create_calib_from_gsl_vector(1, disp->pol);
       l1 =  wl_calib->func (0.0,  wl_calib->order,  wl_calib->coeffs);
       l2 =  wl_calib->func (1.0,  wl_calib->order,  wl_calib->coeffs);
       allobjects[i]->sprefreso = fabs(l2-l1);
+      free_dispstruct(disp);
+      free_calib(wl_calib);
     }
     else{
        allobjects[i]->sprefreso = conf->drz_resol;
@@ -640,18 +762,46 @@ int make_refpoints( char * conf_file, char * filename, px_point pixmax, objectob
   return 0;
 }
 
+/**
+ * Function: get_mean_refpoint
+ * Returns the common geometry of an object in all
+ * observations and the values of its observation in
+ * an exposure. Since only the exposure index selects
+ * the observation, the exposures can be processed in
+ * any order.
+ *
+ * Parameters:
+ * @param allobjects - the objects in all observations
+ * @param index      - the index of the objects
+ * @param ID         - the object ID
+ * @param expindex   - the index of the exposure
+ *
+ * Returns:
+ * @return mpoint - the mean reference point
+ */
 d_point
-get_mean_refpoint(objectobs **allobjects, int nobjects, int ID,int * boxwidth,
+get_mean_refpoint(objectobs **allobjects, const objectobs_index *index, int ID,
+                  const int expindex, int * boxwidth,
                   int * boxheight, double * relx, double * rely,
                   double * objwidth, double *orient, double * cdref,
                   double *cdscale, double *cdmeanscale, double *sprefreso, double *spreso,
                   double *spmeanreso, int *tlength)
 {
-  int i, dec=0;
+  int i, iobs;
   d_point mpoint;
 
-  for (i=0; i < nobjects; i++){
-    if (allobjects[i]->OBJID == ID){
+  mpoint.x = 0.0;
+  mpoint.y = 0.0;
+
+  i = find_objectobs(index, allobjects, ID);
+  if (i > -1){
+      // the first observation in the exposure,
+      // which follows the observations in the
+      // previous exposures
+      iobs = 0;
+      while (iobs < allobjects[i]->nobs-1 && allobjects[i]->expindex[iobs] < expindex)
+        iobs++;
+
       mpoint.x = allobjects[i]->mean_refpoint.x;
       mpoint.y = allobjects[i]->mean_refpoint.y;
       *boxwidth  = allobjects[i]->max_width;
@@ -662,17 +812,38 @@ get_mean_refpoint(objectobs **allobjects, int nobjects, int ID,int * boxwidth,
       *cdmeanscale     = allobjects[i]->cdmeanscale;
       *spmeanreso= allobjects[i]->spmeanreso;
       *sprefreso = allobjects[i]->sprefreso;
-      *orient    = allobjects[i]->orient[allobjects[i]->pointer];
-      *cdscale   = allobjects[i]->cdscale[allobjects[i]->pointer];
-      *spreso    = allobjects[i]->spreso[allobjects[i]->pointer];
-      *relx      = allobjects[i]->relrefpt[allobjects[i]->pointer].x;
-      *rely      = allobjects[i]->relrefpt[allobjects[i]->pointer].y;
-      ++allobjects[i]->pointer;
-      dec=1;
-    }
+      *orient    = allobjects[i]->orient[iobs];
+      *cdscale   = allobjects[i]->cdscale[iobs];
+      *spreso    = allobjects[i]->spreso[iobs];
+      *relx      = allobjects[i]->relrefpt[iobs].x;
+      *rely      = allobjects[i]->relrefpt[iobs].y;
   }
   return mpoint;
 }
+
+/**
+ * Function: get_drz_dispstruct
+ * Computes the dispersion structure of a beam at a position
+ * from the parsed dispersion solution. Beams other than the
+ * one parsed are read from the configuration file.
+ *
+ * Parameters:
+ * @param gdisp  - the parsed dispersion solution
+ * @param beamID - the beam ID
+ * @param p      - the position
+ *
+ * Returns:
+ * @return disp - the dispersion structure
+ */
+dispstruct *
+get_drz_dispstruct(const global_disp *gdisp, const int beamID, d_point p)
+{
+  if (gdisp->ID == beamID)
+    return get_dispstruct_from_gdisp(gdisp, p);
+  else
+    return get_dispstruct_at_pos((char *)gdisp->file, gdisp->for_grism, beamID, p);
+}
+
 px_point
 recalc_bbox(int xmin, int xmax, int ymin, int ymax, px_point pixmax)
 {
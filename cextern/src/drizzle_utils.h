@@ -22,7 +22,6 @@ typedef struct
   int nobs;
   int max_width;
   int max_height;
-  int pointer;
   int max_tlength;
   double owidthmax;
   double cdrefscale;
@@ -33,6 +32,7 @@ typedef struct
   int width[NMAXOBS];
   int height[NMAXOBS];
   int tlength[NMAXOBS];
+  int expindex[NMAXOBS];        /* Index of the exposure of the observation */
   double objwidth[NMAXOBS];
   double orient[NMAXOBS];
   double cdscale[NMAXOBS];
@@ -42,6 +42,13 @@ typedef struct
 }
 objectobs;
 
+typedef struct
+{
+  int size;     /* number of slots, a power of two */
+  int *slots;   /* position of the objects in the objectobs array, -1 if empty */
+}
+objectobs_index;
+
 gsl_matrix *get_drizzle_coeffs(dispstruct * disp, trace_func * trace,
                                int boxwidth, int boxheight, int trlength,
                                double relx, double rely, aperture_conf *conf,
@@ -49,16 +56,22 @@ gsl_matrix *get_drizzle_coeffs(dispstruct * disp, trace_func * trace,
                                double cdcorr, double spref,double spmeanreso);
 gsl_matrix *get_coeffs_back(trace_func * trace);
 double get_rotation_angle(double dxdy);
-int add_observation(char * filename, char * conf_file,
-                    objectobs **allobjects, int nobjects, object ** oblist,
+int add_observation(char * filename, const global_disp *gdisp,
+                    objectobs **allobjects, objectobs_index *index,
+                    int nobjects, const int expindex, object ** oblist,
                     int list_size, px_point pixmax, int sci_numext);
 void add_obs_to_allobj(objectobs * actobject, object * actobs, px_point pixmax,
-                       double cdscale, double spreso, int tlength);
+                       double cdscale, double spreso, int tlength,
+                       const int expindex);
 int add_obj_to_allobj(objectobs **allobjects, int nobjects, object * actobs,
-                      px_point pixmax, double cdscale, double spreso, int tlength);
-int make_refpoints(char * conf_file, char * filename, px_point pixmax,
+                      px_point pixmax, double cdscale, double spreso, int tlength,
+                      const int expindex);
+int make_refpoints(char * conf_file, const global_disp *gdisp,
+                   char * filename, px_point pixmax,
                    objectobs **allobjects, int nobjects);
-d_point get_mean_refpoint(objectobs **allobjects, int nobjects, int ID,
+d_point get_mean_refpoint(objectobs **allobjects,
+                          const objectobs_index *index, int ID,
+                          const int expindex,
                           int * boxwidth, int * boxheight, double * relx,
                           double * rely, double * objwidth, double * orient,
                           double * cdref, double * cdscale,
@@ -71,6 +84,14 @@ d_point get_refwave_position(dispstruct * disp, trace_func * trace,
 double get_drizzle_width(object *ob, int beamnum,trace_func * trace);
 objectobs **malloc_objectobs(void);
 void free_objectobs(objectobs **allobjects);
+objectobs_index *alloc_objectobs_index(const int nmax);
+void free_objectobs_index(objectobs_index *index);
+int find_objectobs(const objectobs_index *index, objectobs **allobjects,
+                   const int ID);
+void insert_objectobs(objectobs_index *index, objectobs **allobjects,
+                      const int pos);
+dispstruct *get_drz_dispstruct(const global_disp *gdisp, const int beamID,
+                               d_point p);
 void print_objectobs(objectobs **allobjects, int nobjects);
 void print_objectobs2(objectobs allobjects[], int nobjects);
 
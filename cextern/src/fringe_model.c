@@ -13,6 +13,10 @@
 #include "fringe_conf.h"
 #include "fringe_model.h"
 
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
 #define MAX(x,y) (((x)>(y))?(x):(y))
 #define MIN(x,y) (((x)<(y))?(x):(y))
 
@@ -23,32 +27,42 @@
  * structure completely describes the problem, and this function
  * executes the loops for every pixel over the wavelength
  * range spanned by the filter.
+ * All quantities which depend on the wavelength only are computed
+ * once in advance. Then the rows of the image are distributed
+ * over the threads, and in every row only the thickness dependent
+ * terms are evaluated for all pixels at once.
  *
  * Parameters
- * @param fconf - the fringe configuration structure
+ * @param fconf    - the fringe configuration structure
+ * @param nthreads - the number of threads (<1: OpenMP default)
  *
  * Returns:
  * @return fringe_image - the image with the computed fringe amplitudes
  */
 gsl_matrix  *
-compute_fringe_amplitude(fringe_conf *fconf)
+compute_fringe_amplitude(fringe_conf *fconf, const int nthreads)
 {
   gsl_matrix *fringe_image;
   
   gsl_vector **filter_vectors;
 
-  int index=0;
   int ii=0;
   int jj=0;
+  int nrows;
+  int ncols;
 
   double lambda_mean;
-  double pixel_ampl;
-  //double phase_number;
+
+  double *row_buffer;
+  double *pixel_ampl;
 
   optical_property *optprops;
+  fringe_lambda_props *lprops;
 
   // allocate the fringe image
   fringe_image = alloc_fringe_image(fconf->opt_layers);
+  nrows = (int)fringe_image->size1;
+  ncols = (int)fringe_image->size2;
 
   // allocate memory for the optical property structure  
   optprops = alloc_optprops_list(fconf);
@@ -66,37 +80,44 @@ compute_fringe_amplitude(fringe_conf *fconf)
   // initialize some values in the optical property list
   init_optprops_list(fconf, lambda_mean, optprops);
 
-    for (ii=0; ii < (int)fringe_image->size1; ii++)
-      //    for (ii=0; ii < 2; ii++)
-    {
-      fprintf(stderr, "Computing row No.: %i\n", ii);
-            for (jj=0; jj < (int)fringe_image->size2; jj++)
-	      //for (jj=0; jj < 2; jj++)
-	{
-	  // fill the optical thickness of the layers
-	  // into the structure
-	  fill_optprops_thickness(fconf->opt_layers, ii, jj, optprops);
+  // compute all wavelength dependent quantities
+  lprops = alloc_lambda_props(fconf, filter_vectors, optprops);
 
-	  pixel_ampl = 0.0;
-	  for (index=0; index < (int)filter_vectors[0]->size; index++)
-	    {
-	      // fill all information in the optical
-	      // property list
-	      fill_optprops_all(fconf->opt_layers,
-				gsl_vector_get(filter_vectors[0],index),
-				optprops);
-
-	      // compute and add the contribution at a wavelength
-	      pixel_ampl += gsl_vector_get(filter_vectors[1],index)*
-		fringe_contrib_single(optprops, fconf);
-	    }
+#ifdef _OPENMP
+#pragma omp parallel private(ii, jj, row_buffer, pixel_ampl) num_threads(nthreads > 0 ? nthreads : omp_get_max_threads())
+#endif
+  {
+    // allocate the row buffers of the thread
+    row_buffer = (double *)malloc((lprops->num_layers + 3) * ncols
+				  * sizeof(double));
+    pixel_ampl = (double *)malloc(ncols * sizeof(double));
+    if (row_buffer == NULL || pixel_ampl == NULL)
+      aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
+		   "Could not allocate memory for the fringe rows");
 
-	  // finally set the pixel value
-	  // in the output image
+#ifdef _OPENMP
+#pragma omp for schedule(dynamic)
+#endif
+    for (ii=0; ii < nrows; ii++)
+      {
+	// compute the fringe contributions
+	// for all pixels in the row
+	fringe_contrib_row(fconf, lprops, ii, ncols, row_buffer, pixel_ampl);
+
+	// finally set the pixel values
+	// in the output image
+	for (jj=0; jj < ncols; jj++)
 	  gsl_matrix_set(fringe_image, ii, jj,
-			 fconf->fringe_amp * pixel_ampl + 1.0);
-	}
-    }
+			 fconf->fringe_amp * pixel_ampl[jj] + 1.0);
+      }
+
+    // release the row buffers
+    free(row_buffer);
+    free(pixel_ampl);
+  }
+
+  // release the wavelength dependent quantities
+  free_lambda_props(lprops);
 
   // release the memory in the vectors
   gsl_vector_free(filter_vectors[0]);
@@ -111,6 +132,254 @@ compute_fringe_amplitude(fringe_conf *fconf)
 }
 
 
+/**
+ * Function: alloc_lambda_props
+ * The function computes all quantities of the fringe model
+ * which depend on the wavelength but not on the layer
+ * thickness. These are, for every wavelength step and every layer,
+ * the coefficients of the thickness in the attenuation and the phase
+ * shift, the product of the transmissions into the layer and the
+ * signed reflection at the lower boundary of the layer.
+ * Together with the layer thickness they define completely
+ * the terms used in 'fringe_contrib_single()'.
+ *
+ * Parameters:
+ * @param fconf          - the fringe configuration structure
+ * @param filter_vectors - the wavelength steps and filter throughputs
+ * @param optprops       - the initialized optical property list
+ *
+ * Returns:
+ * @return lprops - the wavelength dependent quantities
+ */
+fringe_lambda_props *
+alloc_lambda_props(const fringe_conf *fconf, gsl_vector **filter_vectors,
+		   optical_property *optprops)
+{
+  fringe_lambda_props *lprops;
+
+  gsl_complex refract;
+
+  int num_layers;
+  int index;
+  int ilayer;
+  int pos;
+
+  double lambda;
+  double phase_number;
+
+  // allocate the structure
+  lprops = (fringe_lambda_props *)malloc(sizeof(fringe_lambda_props));
+  if (lprops == NULL)
+    aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
+		 "Could not allocate memory for the wavelength properties");
+
+  num_layers = fconf->opt_layers->num_layers;
+  lprops->num_lambda  = (int)filter_vectors[0]->size;
+  lprops->num_layers  = num_layers;
+  lprops->weight      = (double *)malloc(lprops->num_lambda*sizeof(double));
+  lprops->att_coeff   = (double *)malloc(lprops->num_lambda*num_layers
+					 *sizeof(double));
+  lprops->phase_coeff = (double *)malloc(lprops->num_lambda*num_layers
+					 *sizeof(double));
+  lprops->trans       = (double *)malloc(lprops->num_lambda*num_layers
+					 *sizeof(double));
+  lprops->reflect     = (double *)malloc(lprops->num_lambda*num_layers
+					 *sizeof(double));
+  if (lprops->weight == NULL || lprops->att_coeff == NULL
+      || lprops->phase_coeff == NULL || lprops->trans == NULL
+      || lprops->reflect == NULL)
+    aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
+		 "Could not allocate memory for the wavelength properties");
+
+  // the thickness does not enter
+  // the reflections and transmissions
+  for (ilayer=0; ilayer < num_layers; ilayer++)
+    optprops[ilayer].thickness = 0.0;
+
+  // compute the initial phase at the top of the
+  // first layer
+  lprops->phase_init = fconf->fringe_phase*M_PI/180.0;
+
+  for (index=0; index < lprops->num_lambda; index++)
+    {
+      lambda = gsl_vector_get(filter_vectors[0], index);
+      lprops->weight[index] = gsl_vector_get(filter_vectors[1], index);
+
+      // compute the phase number
+      phase_number = 2.0*M_PI / lambda;
+
+      // fill the reflections and
+      // transmissions at this wavelength
+      fill_optprops_all(fconf->opt_layers, lambda, optprops);
+
+      for (ilayer=0; ilayer < num_layers; ilayer++)
+	{
+	  pos = index*num_layers + ilayer;
+
+	  // the coefficients of the thickness in the
+	  // attenuation and the phase shift for
+	  // traversing the layer twice
+	  refract =
+	    get_complex_refindex(fconf->opt_layers->opt_layer[ilayer], lambda);
+	  lprops->att_coeff[pos]   = 2.0*GSL_IMAG(refract)*phase_number;
+	  lprops->phase_coeff[pos] = 2.0*GSL_REAL(refract)*phase_number;
+
+	  // the transmission into the layer
+	  if (ilayer)
+	    lprops->trans[pos] = optprops[ilayer-1].trans_lower
+	      * optprops[ilayer].trans_upper;
+	  else
+	    lprops->trans[pos] = 1.0*1.0;
+
+	  // the signed reflection at the lower boundary
+	  lprops->reflect[pos] = optprops[ilayer].sign_lower
+	    * optprops[ilayer].reflect_lower;
+	}
+    }
+
+  // return the structure
+  return lprops;
+}
+
+
+/**
+ * Function: free_lambda_props
+ * The function releases the memory of the wavelength
+ * dependent quantities.
+ *
+ * Parameters:
+ * @param lprops - the wavelength dependent quantities
+ */
+void
+free_lambda_props(fringe_lambda_props *lprops)
+{
+  if (lprops == NULL)
+    return;
+
+  free(lprops->weight);
+  free(lprops->att_coeff);
+  free(lprops->phase_coeff);
+  free(lprops->trans);
+  free(lprops->reflect);
+  free(lprops);
+}
+
+
+/**
+ * Function: fringe_contrib_row
+ * The function computes the filter-weighted fringe contributions
+ * of all pixels in an image row, using the same single reflection
+ * model as 'fringe_contrib_single()'. The layer thicknesses of the row
+ * are collected first, then the wavelength steps are processed
+ * one after the other with the inner loops running over the pixels.
+ *
+ * Parameters:
+ * @param fconf      - the fringe configuration structure
+ * @param lprops     - the wavelength dependent quantities
+ * @param ii         - the row index
+ * @param ncols      - the number of pixels in the row
+ * @param row_buffer - work space for (num_layers + 3) * ncols values
+ * @param pixel_ampl - the fringe contributions of the pixels
+ */
+void
+fringe_contrib_row(const fringe_conf *fconf, const fringe_lambda_props *lprops,
+		   const int ii, const int ncols, double *row_buffer,
+		   double *pixel_ampl)
+{
+  const ccd_layer *opt_layer;
+
+  double *thick;
+  double *amp_re;
+  double *amp_im;
+  double *tot_re;
+
+  double init_re;
+  double init_im;
+  double att;
+  double phase;
+  double trans;
+  double reflect;
+  double weight;
+  double factor;
+  double shift_re;
+  double shift_im;
+  double tmp_re;
+
+  int num_layers;
+  int index;
+  int ilayer;
+  int jj;
+  int pos;
+
+  num_layers = lprops->num_layers;
+
+  // distribute the work space
+  thick  = row_buffer;
+  amp_re = row_buffer + num_layers * ncols;
+  amp_im = amp_re + ncols;
+  tot_re = amp_im + ncols;
+
+  // collect the thickness of all layers in the row
+  for (ilayer=0; ilayer < num_layers; ilayer++)
+    {
+      opt_layer = fconf->opt_layers->opt_layer[ilayer];
+      for (jj=0; jj < ncols; jj++)
+	thick[ilayer*ncols + jj] = get_layer_thickness(opt_layer, ii, jj);
+    }
+
+  // the initial phase at the top of the first layer
+  init_re = cos(lprops->phase_init);
+  init_im = sin(lprops->phase_init);
+
+  for (jj=0; jj < ncols; jj++)
+    pixel_ampl[jj] = 0.0;
+
+  for (index=0; index < lprops->num_lambda; index++)
+    {
+      for (jj=0; jj < ncols; jj++)
+	{
+	  amp_re[jj] = init_re;
+	  amp_im[jj] = init_im;
+	  tot_re[jj] = init_re;
+	}
+
+      // go over all layers
+      for (ilayer=0; ilayer < num_layers; ilayer++)
+	{
+	  pos     = index*num_layers + ilayer;
+	  att     = lprops->att_coeff[pos];
+	  phase   = lprops->phase_coeff[pos];
+	  trans   = lprops->trans[pos];
+	  reflect = lprops->reflect[pos];
+
+	  for (jj=0; jj < ncols; jj++)
+	    {
+	      // the attenuated phase shift
+	      // through the layer
+	      factor   = trans*exp(-att*thick[ilayer*ncols + jj]);
+	      shift_re = factor*cos(phase*thick[ilayer*ncols + jj]);
+	      shift_im = factor*sin(phase*thick[ilayer*ncols + jj]);
+
+	      // pile up the amplitude
+	      // to that layer
+	      tmp_re     = amp_re[jj]*shift_re - amp_im[jj]*shift_im;
+	      amp_im[jj] = amp_re[jj]*shift_im + amp_im[jj]*shift_re;
+	      amp_re[jj] = tmp_re;
+
+	      // add the reflected part; only the
+	      // real part of the total is needed
+	      tot_re[jj] += reflect*amp_re[jj];
+	    }
+	}
+
+      // add the weighted contribution at the wavelength
+      weight = lprops->weight[index];
+      for (jj=0; jj < ncols; jj++)
+	pixel_ampl[jj] += weight*(tot_re[jj] - 1.0);
+    }
+}
+
+
 /**
  * Function: alloc_fringe_image
  * The function browses through the the structure for the CCD layers
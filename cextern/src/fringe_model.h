@@ -30,9 +30,38 @@ typedef struct
 }
   optical_property;
 
+/*
+ * Struct: fringe_lambda_props
+ */
+typedef struct
+{
+  int    num_lambda;   // the number of wavelength steps
+  int    num_layers;   // the number of CCD layers
+  double phase_init;   // phase at the first layer
+  double *weight;      // normalized filter throughput per wavelength
+  double *att_coeff;   // thickness coefficient of the attenuation,
+                       // indexed [lambda * num_layers + layer]
+  double *phase_coeff; // thickness coefficient of the phase shift
+  double *trans;       // transmission into the layer
+  double *reflect;     // signed reflection at the lower boundary
+}
+  fringe_lambda_props;
+
 
 extern gsl_matrix  *
-compute_fringe_amplitude(fringe_conf *fconf);
+compute_fringe_amplitude(fringe_conf *fconf, const int nthreads);
+
+extern fringe_lambda_props *
+alloc_lambda_props(const fringe_conf *fconf, gsl_vector **filter_vectors,
+		   optical_property *optprops);
+
+extern void
+free_lambda_props(fringe_lambda_props *lprops);
+
+extern void
+fringe_contrib_row(const fringe_conf *fconf, const fringe_lambda_props *lprops,
+		   const int ii, const int ncols, double *row_buffer,
+		   double *pixel_ampl);
 
 extern gsl_vector **
 evaluate_wavelength_steps(fringe_conf *fconf);
@@ -114,8 +114,10 @@ get_yfract_for_xvalue(const beam *actbeam, double xvalue)
  * Function: get_xvalue_from_tlength
  * The function computes the x-offset position from the reference point
  * for a given tracelength in a given beam.
- * The solution is numerically derived and therefore
- * does work for any reasonable tracefunction.
+ * For low order polynomial traces the cached path length table
+ * is inverted directly, for all other traces the solution
+ * is numerically derived and therefore does work for any
+ * reasonable tracefunction.
  *
  * Parameters:
  * @param actbeam - the beam to compute the x-offset
@@ -135,15 +137,24 @@ get_xvalue_from_tlength(beam *actbeam, double tlength)
 
   // define and initialize the solver
   const gsl_root_fsolver_type *T = gsl_root_fsolver_brent;
-  gsl_root_fsolver            *s = gsl_root_fsolver_alloc (T);
+  gsl_root_fsolver            *s;
 
   gsl_function F;
   tlength_pars *tpars;
+  const pathlength_table *ptable;
 
   // derive the x-interval from the beam boundaries
   x_interv = get_xinterv_from_beam(actbeam);
   //  fprintf(stdout, "xpos: %f, ypos: %f\n", x_interv.x, x_interv.y);
 
+  // invert the path length table, if possible
+  ptable = get_pathlength_table(actbeam->spec_trace, x_interv.x, x_interv.y);
+  if (ptable)
+    return table_to_abscissa(ptable, tlength);
+
+  // allocate the solver
+  s = gsl_root_fsolver_alloc (T);
+
   // allocate and fill the parameters
   tpars = (tlength_pars *) malloc(sizeof(tlength_pars));
   tpars->actbeam = actbeam;
@@ -39,6 +39,8 @@ model_gauss_dirim(dirobject *actdir, beam actbeam, aperture_conf *conf, double p
 
   d_point dpixel;
 
+  gauss_emodel emodel;
+
   dirim_emission *gauss_dirim = NULL;
 
   // check whether something can be done
@@ -65,6 +67,9 @@ model_gauss_dirim(dirobject *actdir, beam actbeam, aperture_conf *conf, double p
   gauss_dirim->xmean = (float)(gauss_dirim->dim_x-1) / 2.0;
   gauss_dirim->ymean = (float)(gauss_dirim->dim_y-1) / 2.0;
 
+  // set up the emission model
+  init_gauss_emodel(actbeam, actdir->drzscale, &emodel);
+
   // go over all pixels in the area
   for (ii=0; ii < gauss_dirim->dim_x; ii++)
     {
@@ -78,7 +83,7 @@ model_gauss_dirim(dirobject *actdir, beam actbeam, aperture_conf *conf, double p
 		  // do a subsampling over the pixel
           // to get a more appropriate value for the
           // emission value
-          sval = get_sub_emodel_value(dpixel, actbeam, actdir->drzscale);
+          sval = get_gauss_emodel_value(&emodel, dpixel);
 
           // set the emission value in the matrix
           gsl_matrix_set(gauss_dirim->modimage, ii, jj, sval);
@@ -1786,6 +1791,10 @@ get_flambda_from_magab(double mag, double lambda)
  * for a given object at a given point in the gaussian emission model.
  * The values are filled into the
  * according vector of the tracedata structure.
+ * For many points of the same beam, it is much faster to set up
+ * the emission model once with 'get_gauss_beam()' and
+ * 'init_gauss_emodel()' and evaluate it with
+ * 'get_gauss_emodel_value()'.
  *
  * Parameters:
  * @param dpixel      - the coordinates of the point
@@ -1803,28 +1812,57 @@ fill_gaussvalues(const d_point dpixel, const beam actbeam,
                  tracedata *acttrace)
 {
   beam new_beam;
+  gauss_emodel emodel;
+
+  // derive the beam with the psf-corrected widths
+  new_beam = get_gauss_beam(actbeam, actdir, lambda_ref, conf, psf_offset,
+                            acttrace);
+
+  // store the emission value
+  init_gauss_emodel(new_beam, actdir->drzscale, &emodel);
+  gsl_vector_set_all(acttrace->gvalue, get_gauss_emodel_value(&emodel, dpixel));
+}
+
+/*
+ * Function: get_gauss_beam
+ * The function derives the beam with the psf-corrected widths
+ * which defines the gaussian emission model of an object.
+ * As all emission values of the tracedata are set to the
+ * value at the last tracedata point, only the widths at
+ * the last wavelength are relevant. The check against the
+ * minimum psf width is done for all wavelengths, and a warning
+ * is given once.
+ * The beam does not depend on the position in the object,
+ * hence it is sufficient to compute it once per object beam.
+ *
+ * Parameters:
+ * @param actbeam     - the beam to derive
+ * @param actdir      - the direct object
+ * @param lambda_ref  - the reference wavelength
+ * @param conf        - the configuration structure
+ * @param psf_offset  - the psf offset
+ * @param acttrace    - the tracedata structure
+ *
+ * Returns:
+ * @return new_beam   - the beam with the psf-corrected widths
+ */
+beam
+get_gauss_beam(const beam actbeam, const dirobject *actdir,
+               const double lambda_ref, const aperture_conf *conf,
+               const double psf_offset, const tracedata *acttrace)
+{
+  beam new_beam;
 
   double dpsf=0.0;
-  //double gval=0.0;
   double lambda=0.0;
-  //double factor=0.0;
-  //double nom=0.0;
-  //double denom=0.0;
 
   int i=0;
   int minpsf_flagg=0;
 
-  // get the acurate emission value with subgridding
-  //gval   = get_sub_emodel_value(dpixel, actbeam, actdir->drzscale);
-  //fprintf(stdout, "gvalue: %e %f %f", gval, actdir->drzscale.x, actdir->drzscale.y);
+  // initialize the new beam with the
+  // values for a constant psf offset
+  new_beam = get_newbeam(actbeam,psf_offset);
 
-  //  0: fastest scenario: fill the vector with
-  //     identical values: 34s
-  //  gsl_vector_set_all(acttrace->gvalue, i, gval);
-
-
-  // 1: iterate over the vector and enter the same
-  //    value: 35s
   if (conf->psfrange && conf->psfcoeffs)
     {
       // go over all tracedata (that means wavelength) points
@@ -1834,64 +1872,29 @@ fill_gaussvalues(const d_point dpixel, const beam actbeam,
           lambda = gsl_vector_get(acttrace->lambda, i)/10.0;
 
           // derive the correction of the psf at the wavelength
-
-          // 3: calculating the psf-offset: 90s
           dpsf   = psf_offset + get_dpsf(lambda_ref, lambda, conf, actbeam);
-          //      dpsf=0.0;
-          //fprintf(stdout, "dpsf: %f", dpsf);
-
 
           // derive a beam with the correct widths at the wavelength
-
-          // 2: creating a new beam with a different size: 50s
           new_beam = get_newbeam(actbeam,dpsf);
 
           // transport the
           if (new_beam.ID)
             minpsf_flagg=1;
-
-          // derive the correction factor for the emission using the correct widths
-          // 4: computing the correction factor for the wavelength: 255s
-          //factor = get_emodel_value(dpixel,new_beam,actdir->drzscale)/get_emodel_value(dpixel,actbeam,actdir->drzscale);
-          //nom = get_emodel_value(dpixel,new_beam,actdir->drzscale);
-          //denom = get_emodel_value(dpixel,actbeam,actdir->drzscale);
-          //if (nom != 0.0 && denom != 0.0)
-          //  factor = nom / denom;
-          //else
-          //  factor = 1.0;
-          //fprintf(stdout, "factor: %f ", factor);
-
-          // store the emission value, taking into account the correction
-          //gsl_vector_set(acttrace->gvalue, i, gval*factor);
-          gsl_vector_set_all(acttrace->gvalue, get_sub_emodel_value(dpixel, new_beam, actdir->drzscale));
-          //fprintf(stdout, "gvalue * factor: %e ", gval*factor);
-          }
+        }
     }
   else
     {
-      // derive a beam with the correct widths at the wavelength
-      new_beam = get_newbeam(actbeam,psf_offset);
+      // check the beam for the constant offset
       if (new_beam.ID)
         minpsf_flagg=1;
-
-      // derive the correction factor for the emission using the correct widths
-      //factor = get_emodel_value(dpixel,new_beam,actdir->drzscale)/get_emodel_value(dpixel,actbeam,actdir->drzscale);
-      //nom = get_emodel_value(dpixel,new_beam,actdir->drzscale);
-      //denom = get_emodel_value(dpixel,actbeam,actdir->drzscale);
-      //if (nom != 0.0 && denom != 0.0)
-      //  factor = nom / denom;
-      //else
-      //  factor = 1.0;
-
-      // store the emission value, taking into account the correction
-      //gsl_vector_set_all(acttrace->gvalue, gval*factor);
-      gsl_vector_set_all(acttrace->gvalue, get_sub_emodel_value(dpixel, new_beam, actdir->drzscale));
-
     }
+
   if (minpsf_flagg)
     aXe_message (aXe_M_WARN4, __FILE__, __LINE__,
                  "\naXe_PETCONT: points in PSF of object %i beam %c smaller than PSF_MIN=%f! Set to PSF_MIN\n", actdir->ID, BEAM(actbeam.ID), MINPSF);
 
+  // return the beam
+  return new_beam;
 }
 
 /*
@@ -2045,39 +2048,100 @@ double
 get_sub_emodel_value(const d_point dpixel, const beam actbeam,
                      const d_point drzscale)
 {
-  d_point dtmp;
+  gauss_emodel emodel;
 
-  double sval   = 0.0;
-  double step   = 0.0;
-  double offset = 0.0;
+  // set up the emission model
+  init_gauss_emodel(actbeam, drzscale, &emodel);
 
-  int irange = 0;
-  int kk=0, ll=0;
+  // return the subsampled value
+  return get_gauss_emodel_value(&emodel, dpixel);
+}
+
+/**
+ * Function: init_gauss_emodel
+ * The function sets up the position independent quantities
+ * of the 2D gauss emission model of a beam, such as the
+ * widths corrected for the geometric distortion, the trigonometric
+ * functions of the orientation and the normalization. This
+ * needs to be done only once for all pixels of a beam.
+ *
+ * Parameters:
+ * @param actbeam  - the beam to set up the model for
+ * @param drzscale - the relative pixelscale at the model position
+ * @param emodel   - the emission model to fill
+ */
+void
+init_gauss_emodel(const beam actbeam, const d_point drzscale,
+                  gauss_emodel *emodel)
+{
+  // apply the correction due to geom. distortion
+  emodel->amod = actbeam.awidth / drzscale.x;
+  emodel->bmod = actbeam.bwidth / drzscale.y;
 
-  // convert the number of steps to a local integer
-  irange = (int)NSUB;
+  // store the reference point
+  emodel->refpoint = actbeam.refpoint;
 
-  // compute the step size
-  step = 1.0/(2.0*(double)NSUB);
+  // compute the trigonometric functions
+  emodel->cosa = cos(actbeam.aorient);
+  emodel->sina = sin(actbeam.aorient);
 
-  // compute the initial offset
-  offset = step/2.0;
+  // compute the normalization
+  emodel->norm = 0.5/(emodel->amod*emodel->bmod*M_PI);
 
-  for (kk=-irange; kk < irange; kk++)
+  // compute the sub-grid
+  emodel->irange = (int)NSUB;
+  emodel->step   = 1.0/(2.0*(double)NSUB);
+  emodel->offset = emodel->step/2.0;
+}
+
+/**
+ * Function: get_gauss_emodel_value
+ * The function evaluates a 2D gauss emission model on the
+ * same sub-grid of positions +-.5pixels in x/y around the requested
+ * position as 'get_sub_emodel_value()' and returns the normalized
+ * sum. The results are identical to 'get_sub_emodel_value()',
+ * but all position independent quantities are taken from the model.
+ *
+ * Parameters:
+ * @param emodel   - the emission model
+ * @param dpixel   - the point to evaluate the emission model
+ *
+ * Returns:
+ * @return sval    - the value of the emission model
+ */
+double
+get_gauss_emodel_value(const gauss_emodel *emodel, const d_point dpixel)
+{
+  double sval = 0.0;
+  double xrel, yrel;
+  double arg;
+
+  int kk=0, ll=0;
+
+  for (kk=-emodel->irange; kk < emodel->irange; kk++)
     {
-      for (ll=-irange; ll < irange; ll++)
+      // determine the actual grid position in x
+      xrel = dpixel.x + (double)kk * emodel->step + emodel->offset
+        - emodel->refpoint.x;
+
+      for (ll=-emodel->irange; ll < emodel->irange; ll++)
         {
-          // determine the actual grid position
-          dtmp.x = dpixel.x + (double)kk * step + offset;
-          dtmp.y = dpixel.y + (double)ll * step + offset;
+          // determine the actual grid position in y
+          yrel = dpixel.y + (double)ll * emodel->step + emodel->offset
+            - emodel->refpoint.y;
+
+          // determine the argument of the exponent
+          arg =
+            SQR(( xrel*emodel->cosa + yrel*emodel->sina) / emodel->amod) +
+            SQR((-xrel*emodel->sina + yrel*emodel->cosa) / emodel->bmod);
 
-          // get the value at the grid position
-          sval = sval + get_emodel_value(dtmp, actbeam, drzscale);
+          // add the value at the grid position
+          sval = sval + emodel->norm*exp(-0.5*arg);
         }
     }
 
   // normalize the result
-  sval = sval *step * step;
+  sval = sval * emodel->step * emodel->step;
 
   // return the result
   return sval;
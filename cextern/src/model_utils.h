@@ -50,6 +50,25 @@ typedef struct dirobject
 }
 dirobject;
 
+/*
+ * Struct: gauss_emodel
+ * The position independent quantities of
+ * the 2D gauss emission model of a beam
+ */
+typedef struct
+{
+  d_point refpoint;     // the reference point of the beam
+  double amod;          // the major width corrected for distortion
+  double bmod;          // the minor width corrected for distortion
+  double cosa;          // cosine of the orientation
+  double sina;          // sine of the orientation
+  double norm;          // the normalization of the gaussian
+  int    irange;        // half the number of sub-grid steps
+  double step;          // the sub-grid step
+  double offset;        // the sub-grid offset
+}
+gauss_emodel;
+
 /*
  * Struct: beamspec
  */
@@ -192,6 +211,11 @@ fill_gaussvalues(const d_point dpixel, const beam actbeam,
 		 const aperture_conf * conf, const double psf_offset,
 		 tracedata *acttrace);
 
+extern beam
+get_gauss_beam(const beam actbeam, const dirobject *actdir,
+               const double lambda_ref, const aperture_conf *conf,
+               const double psf_offset, const tracedata *acttrace);
+
 extern beam
 get_newbeam(const beam actbeam, const double dpsf);
 
@@ -202,6 +226,14 @@ get_dpsf(const double lambda_ref, const double lambda,
 extern double
 get_sub_emodel_value(const d_point dpixel, const beam actbeam,
 		     const d_point drzscale);
+
+extern void
+init_gauss_emodel(const beam actbeam, const d_point drzscale,
+                  gauss_emodel *emodel);
+
+extern double
+get_gauss_emodel_value(const gauss_emodel *emodel, const d_point dpixel);
+
 extern double
 get_emodel_value(const d_point dpixel, const beam actbeam,
 		 const d_point drzscale);
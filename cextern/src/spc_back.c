@@ -17,6 +17,10 @@
 #include <gsl/gsl_fit.h>
 #include <gsl/gsl_multifit.h>
 
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
 #include "fitsio.h"
 #include "aXe_grism.h"
 #include "aXe_utils.h"
@@ -30,6 +34,125 @@
 #define MAX(x,y) (((x)>(y))?(x):(y))
 
 
+/**
+ * Function: grow_back_scratch
+ * Makes sure the column buffers of a scratch
+ * structure can hold at least n values.
+ *
+ * Parameters:
+ * @param scratch - the scratch structure
+ * @param n       - the required length
+ */
+static void
+grow_back_scratch(back_scratch *scratch, const int n)
+{
+  // the fit workspaces are created on first use
+  if (!scratch->fit)
+    scratch->fit = alloc_fit_scratch();
+
+  if (n <= scratch->nalloc)
+    return;
+
+  scratch->ys = (double *) realloc (scratch->ys, n * sizeof (double));
+  scratch->fs = (double *) realloc (scratch->fs, n * sizeof (double));
+  scratch->ws = (double *) realloc (scratch->ws, n * sizeof (double));
+  scratch->yi = (double *) realloc (scratch->yi, n * sizeof (double));
+  scratch->ys_tmp = (double *) realloc (scratch->ys_tmp, n * sizeof (double));
+  scratch->yi_tmp = (double *) realloc (scratch->yi_tmp, n * sizeof (double));
+  scratch->y_diff = (double *) realloc (scratch->y_diff, n * sizeof (double));
+  scratch->iindex = (int *) realloc (scratch->iindex, n * sizeof (int));
+  if (!scratch->ys || !scratch->fs || !scratch->ws || !scratch->yi
+      || !scratch->ys_tmp || !scratch->yi_tmp || !scratch->y_diff
+      || !scratch->iindex)
+    aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
+                 "grow_back_scratch: Out of memory");
+  scratch->nalloc = n;
+}
+
+/**
+ * Function: free_back_scratch
+ * Releases the column buffers and fit workspaces
+ * of a scratch structure.
+ *
+ * Parameters:
+ * @param scratch - the scratch structure
+ */
+static void
+free_back_scratch(back_scratch *scratch)
+{
+  free(scratch->ys);
+  free(scratch->fs);
+  free(scratch->ws);
+  free(scratch->yi);
+  free(scratch->ys_tmp);
+  free(scratch->yi_tmp);
+  free(scratch->y_diff);
+  free(scratch->iindex);
+  free_fit_scratch(scratch->fit);
+  scratch->ys = scratch->fs = scratch->ws = scratch->yi = NULL;
+  scratch->ys_tmp = scratch->yi_tmp = scratch->y_diff = NULL;
+  scratch->iindex = NULL;
+  scratch->fit = NULL;
+  scratch->nalloc = 0;
+}
+
+/**
+ * Function: add_beam_background
+ * Appends a pixel to the pixel list of a beam background,
+ * enlarging the list if necessary.
+ *
+ * Parameters:
+ * @param bbck - the pixel list
+ * @param x    - the pixel column
+ * @param y    - the pixel row
+ * @param bck  - the background value
+ * @param err  - the background error
+ */
+static void
+add_beam_background(beam_background *bbck, const int x, const int y,
+                    const double bck, const double err)
+{
+  int nalloc;
+
+  if (bbck->npix == bbck->nalloc)
+    {
+      nalloc = MAX(2 * bbck->nalloc, 256);
+      bbck->x   = (int *) realloc (bbck->x, nalloc * sizeof (int));
+      bbck->y   = (int *) realloc (bbck->y, nalloc * sizeof (int));
+      bbck->bck = (double *) realloc (bbck->bck, nalloc * sizeof (double));
+      bbck->err = (double *) realloc (bbck->err, nalloc * sizeof (double));
+      if (!bbck->x || !bbck->y || !bbck->bck || !bbck->err)
+        aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
+                     "add_beam_background: Out of memory");
+      bbck->nalloc = nalloc;
+    }
+
+  bbck->x[bbck->npix]   = x;
+  bbck->y[bbck->npix]   = y;
+  bbck->bck[bbck->npix] = bck;
+  bbck->err[bbck->npix] = err;
+  bbck->npix++;
+}
+
+/**
+ * Function: free_beam_background
+ * Releases the arrays of a beam background pixel list.
+ *
+ * Parameters:
+ * @param bbck - the pixel list
+ */
+static void
+free_beam_background(beam_background *bbck)
+{
+  free(bbck->x);
+  free(bbck->y);
+  free(bbck->bck);
+  free(bbck->err);
+  bbck->x = bbck->y = NULL;
+  bbck->bck = bbck->err = NULL;
+  bbck->npix = bbck->nalloc = 0;
+}
+
 
 /**
  * Function: is_pt_in_a_beam
@@ -392,28 +515,71 @@ compute_background (observation *obs, beam actbeam, gsl_matrix *bck_mask,
                     fullimg_background *fib, int npoints,
                     int interporder, const int niter_med,
                     const int niter_fit, const double kappa)
+{
+  back_scratch    scratch = {0, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL};
+  beam_background bbck    = {0, 0, NULL, NULL, NULL, NULL};
+
+  // compute the background of the beam
+  // and transfer it to the image
+  compute_beam_background(obs, &actbeam, bck_mask, npoints, interporder,
+                          niter_med, niter_fit, kappa, &scratch, &bbck);
+  merge_beam_background(&bbck, fib);
+
+  // release memory
+  free_back_scratch(&scratch);
+  free_beam_background(&bbck);
+}
+
+/**
+ * Function: compute_beam_background
+ * The function does the background interpolation of compute_background()
+ * for a single beam, but collects the interpolated values in a pixel
+ * list instead of writing them to the background image. The column
+ * buffers are taken from a scratch structure which is re-used for
+ * all beams of a worker. Kappa-sigma clipped pixels are flagged
+ * in the dq-array of the observation.
+ *
+ * Parameters:
+ * @param  obs         - the object list
+ * @param  actbeam     - the beam to compute the background for
+ * @param  bck_mask    - the background mask
+ * @param  npoints     - the number of interpolation points
+ * @param  interporder - the interpolation order
+ * @param  niter_med   - the number of iterations around the median
+ * @param  niter_fit   - the number of iterations around the fit
+ * @param  kappa       - the kappa value
+ * @param  scratch     - the column buffers
+ * @param  bbck        - the pixel list to fill
+ */
+void
+compute_beam_background (observation *obs, const beam *actbeam,
+                         gsl_matrix *bck_mask, int npoints,
+                         int interporder, const int niter_med,
+                         const int niter_fit, const double kappa,
+                         back_scratch *scratch, beam_background *bbck)
 {
   px_point xborder;
   gsl_vector_int *yvec;
   trace_func *tracefun;
   px_point tpoint;
   double *ys, *fs, *ws, *yi;
-  //double var;
 
   int i, ii;
   int j, n;
   int min_y, max_y;
 
+  // empty the pixel list
+  bbck->npix = 0;
 
   // define the beam and the trace function
-  tracefun = actbeam.spec_trace;
+  tracefun = actbeam->spec_trace;
 
   /* If this beam's ignore flag is set to 1 then do nothing */
-  if (actbeam.ignore == 1)
+  if (actbeam->ignore == 1)
     return;
 
   // determine the start and end point in x
-  xborder = get_xrange(obs, actbeam);
+  xborder = get_xrange(obs, *actbeam);
 
 
   // Loop over all columns
@@ -422,22 +588,14 @@ compute_background (observation *obs, beam actbeam, gsl_matrix *bck_mask,
 
       // determine the pixel closest to the trace
       tpoint.x = i;
-      tpoint.y = (int)floor(tracefun->func((double)i-actbeam.refpoint.x,
+      tpoint.y = (int)floor(tracefun->func((double)i-actbeam->refpoint.x,
                                            tracefun->data)
-                            + actbeam.refpoint.y+0.5);
+                            + actbeam->refpoint.y+0.5);
 
       // determine the interpolation points
       // around the trace
       yvec = get_interp_points(obs, bck_mask, npoints, tpoint);
 
-      //-----------------------------------------------------------------
-      //   some code for FORS2 MXU
-      //      if (actbeam.backwindow.x < 0.0)
-      //        yvec = get_interp_points(obs, bck_mask, npoints, tpoint);
-      //      else
-      //        yvec = get_window_points(obs, bck_mask, actbeam, tpoint);
-
-
       // give a warning and go to the next
       // column if there are no background points
       if (!yvec)
@@ -445,31 +603,24 @@ compute_background (observation *obs, beam actbeam, gsl_matrix *bck_mask,
           aXe_message (aXe_M_WARN4, __FILE__, __LINE__,
                        "No backgound points could be found for beam %C. "
                        "at collumn %d %d",
-                       BEAM(actbeam.ID), i, tpoint.y );
+                       BEAM(actbeam->ID), i, tpoint.y );
           continue;
         }
 
       // extract maximum and minimum 0f the y-values
       min_y = gsl_vector_int_get(yvec, 0);
       max_y = gsl_vector_int_get(yvec, yvec->size-1);
-      //      if (actbeam.backwindow.x == 23.3 && actbeam.backwindow.y == 4.0)
-      //        {
-          //    fprintf(stdout, "%i <--> %i; ", min_y, max_y);
-      //      if (min_y > tpoint.y - actbeam.width
-      //          || max_y < tpoint.y + actbeam.width)
-      //        fprintf(stdout, "%i %f <--> %f %i;  ", min_y, tpoint.y - actbeam.width,
-      //                tpoint.y + actbeam.width, max_y);
-              //        }
 
       // determine the size of the double vectors
-      // to make the background determination
-      // allocater the space and initialize
+      // to make the background determination,
+      // get the space and initialize
       // all values to default
       n = max_y - min_y + 1;
-      ys = (double *) malloc (n * sizeof (double));
-      fs = (double *) malloc (n * sizeof (double));
-      ws = (double *) malloc (n * sizeof (double));
-      yi = (double *) malloc (n * sizeof (double));
+      grow_back_scratch(scratch, n);
+      ys = scratch->ys;
+      fs = scratch->fs;
+      ws = scratch->ws;
+      yi = scratch->yi;
       for (ii = 0; ii < n; ii++)
         {
           ys[ii] = min_y + ii;
@@ -502,42 +653,156 @@ compute_background (observation *obs, beam actbeam, gsl_matrix *bck_mask,
         {
           // iterate on the median
           for (j=0; j < niter_med; j++)
-            kappa_sigma_clipp(ys, fs,ws, n,kappa, obs, tpoint.x);
+            kappa_sigma_clipp(ys, fs,ws, n,kappa, obs, tpoint.x, scratch);
 
           // iterate on the fit
           if (niter_fit > 0)
             comp_kappasigma_interp( ys, fs, ws, n, interporder,
-                                    niter_fit, kappa, obs, tpoint.x);
+                                    niter_fit, kappa, obs, tpoint.x,
+                                    scratch);
         }
 
       // do the final background determination
-      comp_vector_interp( ys, fs, ws, yi, n, interporder, 1);
+      comp_vector_interp( ys, fs, ws, yi, n, interporder, 1, scratch->fit);
 
-      // copy the intepolated values
-      // to the background matrix
+      // append the intepolated values
+      // to the pixel list
       for (j = 0; j < n; j++)
         {
           if ((ys[j] < 0) || (ys[j] >= obs->grism->size2))
             continue;
-          gsl_matrix_set (fib->bck, tpoint.x, (int) floor (ys[j]), fs[j]);
-          gsl_matrix_set (fib->err, tpoint.x, (int) floor (ys[j]), ws[j]);
+          add_beam_background(bbck, tpoint.x, (int) floor (ys[j]),
+                              fs[j], ws[j]);
         }
 
-      // release memory
-      free (ys);
-      ys = NULL;
-      free (fs);
-      fs = NULL;
-      free (yi);
-      yi = NULL;
-      free (ws);
-      ws = NULL;
-
       // release memory
       gsl_vector_int_free(yvec);
     }
 }
 
+/**
+ * Function: merge_beam_background
+ * Transfers the pixel list of a beam background into
+ * the full background image. Pixels which are part of
+ * several beams get the value of the beam merged last.
+ *
+ * Parameters:
+ * @param  bbck - the pixel list
+ * @param  fib  - the background structure
+ */
+void
+merge_beam_background (const beam_background *bbck, fullimg_background *fib)
+{
+  int i;
+
+  for (i = 0; i < bbck->npix; i++)
+    {
+      gsl_matrix_set (fib->bck, bbck->x[i], bbck->y[i], bbck->bck[i]);
+      gsl_matrix_set (fib->err, bbck->x[i], bbck->y[i], bbck->err[i]);
+    }
+}
+
+/**
+ * Function: compute_tiled_background
+ * Computes the background of all beams in an object list
+ * on several threads. The beams are processed in tiles of
+ * BACK_TILE_BEAMS beams; within a tile the beams are distributed
+ * over the threads, each thread working with its own column buffers.
+ * The pixel lists of a tile are then merged into the background
+ * image in the order of the object list, which makes the result
+ * identical to computing the beams one after the other.
+ *
+ * Parameters:
+ * @param  obs         - the observation
+ * @param  oblist      - the object list
+ * @param  bck_mask    - the background mask
+ * @param  fib         - the background structure
+ * @param  npoints     - the number of interpolation points
+ * @param  interporder - the interpolation order
+ * @param  niter_med   - the number of iterations around the median
+ * @param  niter_fit   - the number of iterations around the fit
+ * @param  kappa       - the kappa value
+ * @param  nthreads    - the number of threads (<1: OpenMP default)
+ */
+void
+compute_tiled_background (observation *obs, object **oblist,
+                          gsl_matrix *bck_mask, fullimg_background *fib,
+                          int npoints, int interporder, const int niter_med,
+                          const int niter_fit, const double kappa,
+                          const int nthreads)
+{
+  beam_background *tile;
+  const beam **beams;
+  int *obj_ids;
+  int nbeams=0;
+  int ntile;
+  int first, i, j;
+
+  if (oblist == NULL)
+    return;
+
+  // count the beams
+  for (i=0; oblist[i] != NULL; i++)
+    nbeams += oblist[i]->nbeams;
+
+  // collect all beams which are not ignored
+  beams   = (const beam **) malloc (MAX(nbeams, 1) * sizeof (beam *));
+  obj_ids = (int *) malloc (MAX(nbeams, 1) * sizeof (int));
+  nbeams = 0;
+  for (i=0; oblist[i] != NULL; i++)
+    for (j = 0; j < oblist[i]->nbeams; j++)
+      {
+        if (oblist[i]->beams[j].ignore == 1)
+          continue;
+        beams[nbeams]   = &oblist[i]->beams[j];
+        obj_ids[nbeams] = oblist[i]->ID;
+        nbeams++;
+      }
+
+  // allocate the pixel lists for one tile
+  tile = (beam_background *) calloc (BACK_TILE_BEAMS, sizeof (beam_background));
+
+  for (first = 0; first < nbeams; first += BACK_TILE_BEAMS)
+    {
+      ntile = MIN(BACK_TILE_BEAMS, nbeams - first);
+
+      // compute the beam backgrounds of the tile
+#ifdef _OPENMP
+#pragma omp parallel num_threads(nthreads > 0 ? nthreads : omp_get_max_threads())
+#endif
+      {
+        back_scratch scratch = {0, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL,
+                                NULL};
+        int k;
+
+#ifdef _OPENMP
+#pragma omp for schedule(dynamic, 1)
+#endif
+        for (k = 0; k < ntile; k++)
+          compute_beam_background(obs, beams[first + k], bck_mask, npoints,
+                                  interporder, niter_med, niter_fit, kappa,
+                                  &scratch, &tile[k]);
+
+        free_back_scratch(&scratch);
+      }
+
+      // merge them in the order of the object list
+      for (i = 0; i < ntile; i++)
+        {
+          fprintf(stdout,"Computing background of BEAM %d%c. Done.\n",
+                  obj_ids[first + i], BEAM(beams[first + i]->ID));
+          merge_beam_background(&tile[i], fib);
+        }
+    }
+
+  // release memory
+  for (i = 0; i < BACK_TILE_BEAMS; i++)
+    free_beam_background(&tile[i]);
+  free(tile);
+  free(beams);
+  free(obj_ids);
+}
+
 /**
  * Function: get_xrange
  * The subroutine determines the extend of a beam in x-direction.
@@ -592,21 +857,22 @@ get_xrange(observation *obs, beam actbeam)
  * final background determination.
  *
  * Parameters:
- * @param xs     - array for independent values
- * @param ys     - array for dependent values
- * @param ws     - weight array
- * @param n      - number of pixels
- * @param interp - number indicating the interpolation scheme
- * @param niter  - the number of iterations
- * @param kappa  - the kappa value for rejection
- * @param obs    - the object list
- * @param colnum - the column number
+ * @param xs      - array for independent values
+ * @param ys      - array for dependent values
+ * @param ws      - weight array
+ * @param n       - number of pixels
+ * @param interp  - number indicating the interpolation scheme
+ * @param niter   - the number of iterations
+ * @param kappa   - the kappa value for rejection
+ * @param obs     - the object list
+ * @param colnum  - the column number
+ * @param scratch - the scratch structure with the temporary vectors or NULL
  */
 void
 comp_kappasigma_interp(const double *const xs, double *const ys,
                        double *const ws, const int n,
                        const int interp, const int niter, const double kappa,
-                       observation *obs, int colnum)
+                       observation *obs, int colnum, back_scratch *scratch)
 {
   double *ys_tmp;
   double *yi_tmp;
@@ -616,14 +882,21 @@ comp_kappasigma_interp(const double *const xs, double *const ys,
 
   int *iindex;
 
+  back_scratch local = {0, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL,
+                        NULL};
+
 
   int i, m, j;
 
-  // allocate temporary vectors
-  ys_tmp = (double *) malloc (n * sizeof (double));
-  yi_tmp = (double *) malloc (n * sizeof (double));
-  y_diff = (double *) malloc (n * sizeof (double));
-  iindex = (int *) malloc (n * sizeof (int));
+  // get the temporary vectors,
+  // locally if there is no scratch
+  if (!scratch)
+    scratch = &local;
+  grow_back_scratch(scratch, n);
+  ys_tmp = scratch->ys_tmp;
+  yi_tmp = scratch->yi_tmp;
+  y_diff = scratch->y_diff;
+  iindex = scratch->iindex;
 
   // transfer the dependent value
   // to the tmp vector
@@ -636,7 +909,7 @@ comp_kappasigma_interp(const double *const xs, double *const ys,
     {
 
       // make the background determination
-      comp_vector_interp(xs, ys_tmp, ws, yi_tmp, n, interp, 0);
+      comp_vector_interp(xs, ys_tmp, ws, yi_tmp, n, interp, 0, scratch->fit);
 
       // calculate for all background
       // pixels the differences between
@@ -664,8 +937,12 @@ comp_kappasigma_interp(const double *const xs, double *const ys,
             {
               // set its weight to 0.0
               ws[iindex[i]] = 0.0;
-              // mark the pixel in the dq-array
+              // mark the pixel in the dq-array; the beams of
+              // the tiled background may run on several threads
               if ( xs[iindex[i]] >= 0 &&  xs[iindex[i]] < obs->dq->size2)
+#ifdef _OPENMP
+#pragma omp critical (back_dq)
+#endif
                 gsl_matrix_set(obs->dq, colnum, xs[iindex[i]], DQ_KAPPA_SIGMA);
             }
         }
@@ -675,11 +952,8 @@ comp_kappasigma_interp(const double *const xs, double *const ys,
   for (i=0; i < n; i++)
     ys[i] = ys_tmp[i];
 
-  // free memory
-  free(ys_tmp);
-  free(yi_tmp);
-  free(y_diff);
-  free(iindex);
+  // release a local scratch
+  free_back_scratch(&local);
 }
 
 
@@ -691,31 +965,39 @@ comp_kappasigma_interp(const double *const xs, double *const ys,
  * is "original value <minus> median of the data set".
  *
  * Parameters:
- * @param xs     - array for independent values
- * @param ys     - array for dependent values
- * @param ws     - weight array
- * @param n      - number of pixels
- * @param kappa  - the kappa value for rejection
- * @param obs    - the object list
- * @param colnum - the column number
+ * @param xs      - array for independent values
+ * @param ys      - array for dependent values
+ * @param ws      - weight array
+ * @param n       - number of pixels
+ * @param kappa   - the kappa value for rejection
+ * @param obs     - the object list
+ * @param colnum  - the column number
+ * @param scratch - the scratch structure with the temporary vectors or NULL
  */
 void
 kappa_sigma_clipp(const double *const xs, double *const ys, double *const ws,
                   const int n, const double kappa, observation *obs,
-                  int colnum)
+                  int colnum, back_scratch *scratch)
 {
   double *ys_tmp, *ys_med;
 
   int *iindex;
 
+  back_scratch local = {0, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL,
+                        NULL};
+
   int ii, m=0, npixel=0;
 
   double median=0.0, stdev=0.0;
 
-  // allocate memory for temporay vectors
-  ys_tmp = (double *) malloc (n * sizeof (double));
-  ys_med = (double *) malloc (n * sizeof (double));
-  iindex = (int *) malloc (n * sizeof (int));
+  // get the temporay vectors,
+  // locally if there is no scratch
+  if (!scratch)
+    scratch = &local;
+  grow_back_scratch(scratch, n);
+  ys_tmp = scratch->ys_tmp;
+  ys_med = scratch->y_diff;
+  iindex = scratch->iindex;
 
   // store the background values
   // in the temporary vectors
@@ -746,6 +1028,9 @@ kappa_sigma_clipp(const double *const xs, double *const ys, double *const ws,
           // set the weight of a clipped pixel to 0.0
           ws[iindex[ii]] = 0.0;
           // mark the clipped pixel in the dq-array
+#ifdef _OPENMP
+#pragma omp critical (back_dq)
+#endif
           gsl_matrix_set(obs->dq, colnum, xs[iindex[ii]], DQ_KAPPA_SIGMA);
         }
       else
@@ -755,10 +1040,8 @@ kappa_sigma_clipp(const double *const xs, double *const ys, double *const ws,
 
     }
 
-  // release memory
-  free(ys_med);
-  free(ys_tmp);
-  free(iindex);
+  // release a local scratch
+  free_back_scratch(&local);
 }
 
 /**
@@ -773,11 +1056,12 @@ kappa_sigma_clipp(const double *const xs, double *const ys, double *const ws,
  * @param n      - number of points in xs,ys, and ws (must be greater than m!)
  * @param interp - desired interpolation type
  * @param final  - indicates a final interpolation
+ * @param fit    - the scratch space for polynomial fits or NULL
  */
 void
 comp_vector_interp(const double *const xs, double *const ys,
                    double *const ws, double *const yi, const int n,
-                   const int interp, const int final)
+                   const int interp, const int final, fit_scratch *fit)
 {
   /* Median the background */
   if (interp == -1)
@@ -797,7 +1081,7 @@ comp_vector_interp(const double *const xs, double *const ys,
   /* n(>1) order interpolation of the background */
   else if (interp > 1)
     {
-      comp_vector_polyN (interp + 1, xs, ys, ws, yi, n, final);
+      comp_vector_polyN (interp + 1, xs, ys, ws, yi, n, final, fit);
     }
   else
     {
@@ -940,7 +1224,7 @@ compute_global_background (object **oblist, const int obj_index,
       /* n(>1) order interpolation of the background */
       if (interporder > 1)
         {
-          comp_vector_polyN (interporder + 1, ys,fs, ws, yi, n, 1);
+          comp_vector_polyN (interporder + 1, ys,fs, ws, yi, n, 1, NULL);
       //          fit_vector_poly_N_t (interporder + 1, ys, fs, ws, n);
         }
 
@@ -1009,6 +1293,10 @@ fullimg_background_function (const int x, const int y, PIXEL_T * const val,
  * @param niter_med   - order of the polynomial to fit to the background
  * @param niter_fit   - order of the polynomial to fit to the background
  * @param kappa       - order of the polynomial to fit to the background
+ * @param nor_flag    - start from the grism image instead of zero
+ * @param sm_length   - the smoothing length
+ * @param fwhm        - the FWHM of the Gaussian smoothing
+ * @param nthreads    - number of threads for the beam backgrounds
  *
  * Returns:
  * @return background - an allocated background structure
@@ -1018,7 +1306,8 @@ background *
 compute_fullimg_background (observation *obs, object **oblist,
                             int npoints, int interporder, const int niter_med,
                             const int niter_fit, const double kappa,
-                            int nor_flag, const int sm_length, const double fwhm)
+                            int nor_flag, const int sm_length, const double fwhm,
+                            const int nthreads)
 {
   fullimg_background *fib;
   background *backg;
@@ -1028,23 +1317,18 @@ compute_fullimg_background (observation *obs, object **oblist,
 
   // allocate space for the backgrounds
   fib   = (fullimg_background *)malloc (sizeof (fullimg_background));
-  fib->bck = gsl_matrix_alloc (obs->grism->size1, obs->grism->size2);
-  gsl_matrix_set_all (fib->bck, 0.);
-  fib->err = gsl_matrix_alloc (obs->grism->size1, obs->grism->size2);
-  gsl_matrix_set_all (fib->err, 0.);
-
   if (nor_flag)
     {
-      for (i = 0; i < (int)fib->bck->size1; i++)
-        {
-          for (j = 0; j < (int)fib->bck->size2; j++)
-            {
-              gsl_matrix_set (fib->bck, i, j,
-                              gsl_matrix_get (obs->grism, i, j));
-              gsl_matrix_set (fib->err, i, j,
-                              gsl_matrix_get (obs->pixerrs, i, j));
-            }
-        }
+      // start from the grism image
+      fib->bck = gsl_matrix_alloc (obs->grism->size1, obs->grism->size2);
+      fib->err = gsl_matrix_alloc (obs->grism->size1, obs->grism->size2);
+      gsl_matrix_memcpy (fib->bck, obs->grism);
+      gsl_matrix_memcpy (fib->err, obs->pixerrs);
+    }
+  else
+    {
+      fib->bck = gsl_matrix_calloc (obs->grism->size1, obs->grism->size2);
+      fib->err = gsl_matrix_calloc (obs->grism->size1, obs->grism->size2);
     }
 
   // allocate memory
@@ -1064,36 +1348,9 @@ compute_fullimg_background (observation *obs, object **oblist,
   //      gsl_matrix_set_all (obs->dq, 0.0);
   //    }
 
-  if (oblist != NULL)
-    {
-      // Now compute background for each beam, one after the other
-      // go over the whole object list
-      i=0;
-      while (oblist[i] != NULL) {
-        // go over each beam
-        for (j = 0; j < oblist[i]->nbeams; j++)
-          {
-            // check for beams to be neglected
-            if (oblist[i]->beams[j].ignore == 1)
-              {
-                continue;
-              }
-            else
-              {
-                // start the background interpolation
-                // for a specific beam
-                fprintf(stdout,"Computing background of BEAM %d%c.",
-                        oblist[i]->ID,BEAM(oblist[i]->beams[j].ID));
-                compute_background(obs, oblist[i]->beams[j], bck_mask,
-                                   fib, npoints, interporder, niter_med,
-                                   niter_fit, kappa);
-                fprintf(stdout," Done.\n");
-              }
-          }
-        // increment the counter
-        i++;
-      }
-    }
+  // compute the background for all beams
+  compute_tiled_background(obs, oblist, bck_mask, fib, npoints, interporder,
+                           niter_med, niter_fit, kappa, nthreads);
   // replace all NAN's with values 0.0
   for (i = 0; i < (int)fib->bck->size1; i++)
     {
@@ -1621,6 +1878,10 @@ background_to_FITSimage (char filename[], background * bck, observation *obs)
  * function. The smoothing is done exclusively towards the x-values.
  * The smoothing should help to reduce the noise from the limited number
  * of background pixels.
+ * Each image line in x is copied to a buffer together with a mask of
+ * the interpolated pixels and convolved with the precomputed Gaussian
+ * kernel, normalising by the kernel weight on the interpolated pixels.
+ * The lines are independent and are distributed over the threads.
  *
  * Parameters:
  * @param  bck_mask     - the background mask
@@ -1633,167 +1894,74 @@ gsmooth_background (const gsl_matrix *bck_mask, const int smooth_length,
                     const double fwhm, fullimg_background *fib)
 {
   double efactor;
+  double *kernel;
 
+  int nx = (int)fib->bck->size1;
+  int ny = (int)fib->bck->size2;
   int ix, iy;
 
-  gsl_vector *pixvalues;
-  gsl_vector *weights;
-  gsl_vector *pmask;
-
-  gsl_matrix *new_bck;
-
-  // allocate memory for the vectors
-  pixvalues = gsl_vector_alloc(2 * smooth_length + 1);
-  weights   = gsl_vector_alloc(2 * smooth_length + 1);
-  pmask     = gsl_vector_alloc(2 * smooth_length + 1);
-
-  // allocate the new background
-  // and initialize it
-  new_bck = gsl_matrix_alloc(bck_mask->size1, bck_mask->size2);
-  gsl_matrix_set_all(new_bck, 0.0);
-
   // prepare the Gaussian
   efactor = compute_efactor(fwhm);
 
-  // fill the weights
-  for (ix=0; ix < (int)weights->size; ix++)
-    gsl_vector_set(weights, ix, compute_gvalue((double)ix - (double)smooth_length, efactor));
-
+  // fill the kernel
+  kernel = (double *) malloc ((2 * smooth_length + 1) * sizeof (double));
+  for (ix=0; ix < 2 * smooth_length + 1; ix++)
+    kernel[ix] = compute_gvalue((double)ix - (double)smooth_length, efactor);
 
   // go over all rows
-  for (iy=0; iy < (int)fib->bck->size2; iy++)
-    {
-      // go over all columns
-      for (ix=0; ix < (int)fib->bck->size1; ix++)
-        {
-          // check whether the pixel IS part of a beam
-          if (!(gsl_matrix_get(bck_mask, ix, iy) != 0.0
-                && gsl_matrix_get(fib->bck, ix, iy) !=0.0))
-            {
-              // transfer the old background value
-              gsl_matrix_set(new_bck, ix, iy, gsl_matrix_get(fib->bck, ix, iy));
-            }
-          else
-            {
-              // fill the pixel and mask values
-              fill_pixvalues(bck_mask, smooth_length, fib, ix, iy, pixvalues, pmask);
-
-              // fill in the weighted mean
-              gsl_matrix_set(new_bck, ix, iy, get_weighted_mean(pixvalues, weights, pmask));
-            }
-        }
-    }
-
-  // release the allocated dspace
-  gsl_vector_free(pixvalues);
-  gsl_vector_free(weights);
-  gsl_vector_free(pmask);
-
-  // release the memory of the
-  // old background
-  gsl_matrix_free(fib->bck);
-
-  // transfer the new background
-  // to the background structure
-  fib->bck = new_bck;
-}
-
-/**
- * Function: get_weighted_mean
- * The function computes the weighted mean of values stored in a value vector
- * and a weight vector. As mask vector marks values pixels not to be considered.
- * Using a separate mask vectorhas the advantage the weights can be kept
- * constant and do not have to be re-calculated in repeated runs.
- *
- * Parameters:
- * @param pixvalues - vector with pixel values
- * @param weights   - vector with weights
- * @param pmask     - mask vector
- *
- * Returns:
- * @return sum/www  - the weighted mean
- */
-double
-get_weighted_mean(const gsl_vector *pixvalues, const gsl_vector *weights,
-                  const gsl_vector *pmask)
-{
-  int index;
-
-  // initialize the total
-  // sum and weight
-  double sum=0.0;
-  double www=0.0;
-
-  for (index=0; index < (int)pixvalues->size; index ++)
-    {
-
-      if (gsl_vector_get(pmask, index))
-        {
-          // enhance the total sum
-          sum += gsl_vector_get(pixvalues, index) * gsl_vector_get(weights, index);
-
-          // enhance the total weight
-          www += gsl_vector_get(weights, index);
-        }
-    }
-
-  // return the total sum,
-  // divided by the total weight
-  return sum / www;
-}
-
+#ifdef _OPENMP
+#pragma omp parallel private(ix)
+#endif
+  {
+    double *line = (double *) malloc (nx * sizeof (double));
+    char   *lmask = (char *) malloc (nx * sizeof (char));
+    double sum, www;
+    int k, kmin, kmax;
+
+#ifdef _OPENMP
+#pragma omp for schedule(static)
+#endif
+    for (iy=0; iy < ny; iy++)
+      {
+        // copy the line and mark the
+        // interpolated, non-zero pixels
+        for (ix=0; ix < nx; ix++)
+          {
+            line[ix]  = gsl_matrix_get(fib->bck, ix, iy);
+            lmask[ix] = (gsl_matrix_get(bck_mask, ix, iy) != 0.0
+                         && line[ix] != 0.0);
+          }
 
-/**
- * Function: fill_pixvalues
- * The function provides the essential information for Gaussian smoothing
- * for a single pixel. It fills a vector with the values of all pixels
- * within the smoothing length. Not interpolated pixels are excluded.
- * A mask vector provides the information on which position is filled
- * with pixel values.
- *
- * Parameters:
- * @param  bck_mask     - the background mask
- * @param  smoot_length - number of pixels on either side to use for smoothing
- * @param  fib          - the background structure
- * @param  bck_mask     - the background mask
- * @param  ix           - x-value of central pixel
- * @param  iy           - y-value of central pixel
- * @param  pixvalues    - vector for pixel values
- * @param  pmask        - vector for pixel mask
- */
-void
-fill_pixvalues(const gsl_matrix *bck_mask, const int smooth_length,
-               const fullimg_background *fib, const int ix, const int iy,
-               gsl_vector *pixvalues, gsl_vector *pmask)
-{
-  int iact;
-  int index;
+        // replace the interpolated pixels with the
+        // Gaussian weighted mean of the interpolated
+        // pixels within the smoothing length
+        for (ix=0; ix < nx; ix++)
+          {
+            if (!lmask[ix])
+              continue;
+
+            kmin = MAX(-smooth_length, -ix);
+            kmax = MIN(smooth_length, nx - 1 - ix);
+            sum = 0.0;
+            www = 0.0;
+            for (k = kmin; k <= kmax; k++)
+              {
+                if (lmask[ix + k])
+                  {
+                    sum += line[ix + k] * kernel[k + smooth_length];
+                    www += kernel[k + smooth_length];
+                  }
+              }
+            gsl_matrix_set(fib->bck, ix, iy, sum / www);
+          }
+      }
 
-  // initialize the pixel values
-  // and the mask
-  gsl_vector_set_all(pixvalues, 0.0);
-  gsl_vector_set_all(pmask, 0.0);
+    free(line);
+    free(lmask);
+  }
 
-  // iterate over the x-direction
-  index=0;
-  for (iact=ix-smooth_length; iact<=ix+smooth_length; iact++)
-    {
-      // check if you are within the chip
-      if (iact > -1 && iact < (int)bck_mask->size1)
-        {
-          // check whether the pixel was interpolated
-          // and whether the background is non-zero
-          if (gsl_matrix_get(bck_mask, iact, iy) != 0.0
-               && gsl_matrix_get(fib->bck, iact, iy) != 0.0)
-            {
-              // if yes, get the pixel value and set the mask
-              gsl_vector_set(pixvalues, index, gsl_matrix_get(fib->bck, iact, iy));
-              gsl_vector_set(pmask,     index, 1.0);
-            }
-        }
-      // enhance the vector index
-      index++;
-    }
+  // release the kernel
+  free(kernel);
 }
 
 
@@ -7,6 +7,7 @@
 #define _SPC_BACK_H
 
 #include "spce_is_in.h"
+#include "spce_fitting.h"
 
 #define DQ_KAPPA_SIGMA -1.0
 
@@ -34,6 +35,45 @@ typedef struct
 }
 fullimg_background;
 
+/**
+  The interpolated background of a single beam, stored as a list of
+  pixels. The tiled background engine fills one list per beam in
+  parallel and merges the lists into the full image in beam order.
+*/
+typedef struct
+{
+     int     npix;       /* number of pixels in the list */
+     int     nalloc;     /* allocated length of the arrays */
+     int    *x;          /* pixel column */
+     int    *y;          /* pixel row */
+     double *bck;        /* the background value */
+     double *err;        /* the background error */
+}
+beam_background;
+
+/**
+  Column buffers and fit workspaces which are re-used from column
+  to column and from beam to beam by one worker of the background engine.
+*/
+typedef struct
+{
+     int     nalloc;     /* allocated length of the buffers */
+     double *ys;         /* row numbers */
+     double *fs;         /* pixel values */
+     double *ws;         /* pixel errors */
+     double *yi;         /* interpolated values */
+     double *ys_tmp;     /* kappa-sigma: copy of the pixel values */
+     double *yi_tmp;     /* kappa-sigma: interpolated values */
+     double *y_diff;     /* kappa-sigma: differences to the background */
+     int    *iindex;     /* kappa-sigma: indices of the background pixels */
+     fit_scratch *fit;   /* buffers and workspaces for polynomial fits */
+}
+back_scratch;
+
+// number of beams which are processed
+// in parallel before their results are merged
+#define BACK_TILE_BEAMS 64
+
 extern int
 is_pt_in_a_beam (const px_point * const apoint,
                  const is_in_descriptor * const iids, const int tnbeams);
@@ -58,6 +98,23 @@ compute_background (observation *obs, beam actbeam, gsl_matrix *bck_mask,
                     int interporder, const int niter_med,
                     const int niter_fit, const double kappa);
 
+extern void
+compute_beam_background (observation *obs, const beam *actbeam,
+                         gsl_matrix *bck_mask, int npoints,
+                         int interporder, const int niter_med,
+                         const int niter_fit, const double kappa,
+                         back_scratch *scratch, beam_background *bbck);
+
+extern void
+compute_tiled_background (observation *obs, object **oblist,
+                          gsl_matrix *bck_mask, fullimg_background *fib,
+                          int npoints, int interporder, const int niter_med,
+                          const int niter_fit, const double kappa,
+                          const int nthreads);
+
+extern void
+merge_beam_background (const beam_background *bbck, fullimg_background *fib);
+
 extern void
 compute_global_background (object **oblist, const int obj_index,
                            gsl_matrix *bck_mask, fullimg_background * fib,
@@ -75,7 +132,8 @@ extern background *
 compute_fullimg_background(observation *obs, object **oblist,
                            int npoints, int interporder, const int niter_med,
                            const int niter_fit, const double kappa,
-                           int nor_flag, const int sm_length, const double fwhm);
+                           int nor_flag, const int sm_length, const double fwhm,
+                           const int nthreads);
 
 extern background *
 compute_backsub_mask (observation *obs, object **oblist);
@@ -96,16 +154,16 @@ aperture_mask (observation * const obs, object **oblist);
 extern void
 comp_vector_interp(const double *const xs, double *const ys,
                    double *const ws, double *const yi, const int n,
-                   const int interp, const int final);
+                   const int interp, const int final, fit_scratch *fit);
 
 extern void
 comp_kappasigma_interp(const double *const xs, double *const ys,
                        double *const ws, const int n,
                        const int interp, const int niter, const double kappa,
-                       observation *obs, int colnum);
+                       observation *obs, int colnum, back_scratch *scratch);
 void
 kappa_sigma_clipp(const double *const xs, double *const ys, double *const ws, const int n, const double kappa,
-                  observation *obs, int colnum);
+                  observation *obs, int colnum, back_scratch *scratch);
 
 extern px_point
 get_xrange(observation *obs, beam actbeam);
@@ -114,15 +172,6 @@ extern void
 gsmooth_background (const gsl_matrix *bck_mask, const int smooth_length,
                     const double fwhm, fullimg_background *fib);
 
-extern double
-get_weighted_mean(const gsl_vector *pixvalues, const gsl_vector *weights,
-                  const gsl_vector *pmask);
-
-extern void
-fill_pixvalues(const gsl_matrix *bck_mask, const int smooth_length,
-               const fullimg_background *fib, const int ix, const int iy,
-               gsl_vector *pixvalues, gsl_vector *pmask);
-
 extern double
 compute_gvalue(const double xdiff, const double efactor);
 
@@ -68,14 +68,64 @@ poly_cube_flatfield * load_flat_poly_cube(char *fname)
 
 
 
+/**
+    Normalises a wavelength to the range of a poly_cube_flatfield
+    structure. Uses abs(lambda) for cosmetic reasons; wavelengths outside
+    of wmin<w<wmax are set to the closest boundary.
+
+    @param lambda the wavelength
+    @param poly_cube a pointer to a poly_cube_flatfield structure
+    @returns the normalised wavelength
+*/
+static double
+normalise_cube_lambda (const double lambda, const poly_cube_flatfield *poly_cube)
+{
+  double w; /* nomalized wavelength */
+
+  w = (fabs(lambda) - poly_cube->wmin)/(poly_cube->wmax-poly_cube->wmin);
+
+  if (lambda<poly_cube->wmin)
+    {
+      w = .0;
+    }
+  if (lambda>poly_cube->wmax)
+    {
+      w = 1.0;
+    }
+  return w;
+}
+
+/**
+    Evaluates the flat-field polynomial of a single pixel at a
+    normalised wavelength with the Horner scheme.
+
+    @param w the normalised wavelength
+    @param x the x-coordinate
+    @param y the y-coordinate
+    @param poly_cube a pointer to a poly_cube_flatfield structure
+    @returns the flat-field value
+*/
+static double
+eval_cube_pixel (const double w, const int x, const int y,
+		 const poly_cube_flatfield *poly_cube)
+{
+  int i;
+  double ff=0.0;
+
+  for (i=poly_cube->poly_order-1;i>=0;i--)
+    {
+      ff = ff*w + gsl_matrix_get(poly_cube->coeffs[i],x,y);
+    }
+  return ff;
+}
+
 /**
     Evaluates and return the flatfielding value of pixel coordinates x,y
     and at wavelength lambda, using the field dependent polynomial
     description contained in a poly_cube_flatfield structure. Uses abs(lambda)
     for cosmetic reasons.
-    If the sampled wavelength falls outside of the wmin<w<wmax range, then a warning
-    is issued and no flat-field coefficient is computed, and 1.0 is returned
-	[new version now returns the FF value at the closest known wavelength]
+    If the sampled wavelength falls outside of the wmin<w<wmax range,
+    the FF value at the closest known wavelength is returned.
     @param lambda the wavelength 
 
 */
@@ -83,39 +133,200 @@ double
 poly_cube_flatfield_lambda (const double lambda, const int x, const int y,
 		poly_cube_flatfield *poly_cube)
 {
+  return eval_cube_pixel(normalise_cube_lambda(lambda, poly_cube), x, y,
+			 poly_cube);
+}
+
+/**
+    Allocates a cache for the flat-field values of a poly_cube_flatfield
+    structure. For every cached pixel the flat-field is tabulated on
+    a regular grid in the normalised wavelength and then linearly
+    interpolated. The cache is direct mapped; the number of pixels it
+    holds is set by the memory limit.
+
+    @param nlambda number of grid points in wavelength (>=2)
+    @param max_bytes the maximum memory for the cache
+    @returns a pointer to the cache
+*/
+poly_cube_ffcache *
+alloc_poly_cube_ffcache(const int nlambda, const size_t max_bytes)
+{
+  poly_cube_ffcache *cache;
   int i;
-  double ff=0.0;
-  double w; /* nomalized wavelength */
 
-    
-  /* if ( (lambda>poly_cube->wmax) || (lambda<poly_cube->wmin) )
-     {
-     aXe_message (aXe_M_WARN4, __FILE__, __LINE__, "Sampled wavelengh (%f)"
-     " is outside of FF cube (%f < ww < %f). Returning 1.0\n",lambda,poly_cube->wmin,poly_cube->wmax);
-     w = 1.0;
-     for (i=0;i<poly_cube->poly_order;i++) 
-     {
-     ff = ff + gsl_matrix_get(poly_cube->coeffs[i],x,y)*pow(w,i);
-     }
-     return ff;
-     }*/
-    
-  w = (fabs(lambda) - poly_cube->wmin)/(poly_cube->wmax-poly_cube->wmin);
+  if (nlambda < 2)
+    aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
+		 "The flat-field grid must have at least 2 points, not %i!\n",
+		 nlambda);
+
+  cache = (poly_cube_ffcache *) malloc(sizeof(poly_cube_ffcache));
+  cache->nlambda = nlambda;
+  cache->nslots  = (int)(max_bytes / (nlambda * sizeof(double) + 2 * sizeof(int)));
+  if (cache->nslots < 1)
+    cache->nslots = 1;
+
+  cache->px = (int *) malloc(cache->nslots * sizeof(int));
+  cache->py = (int *) malloc(cache->nslots * sizeof(int));
+  cache->values = (double *) malloc(cache->nslots * nlambda * sizeof(double));
+  if (!cache->px || !cache->py || !cache->values)
+    aXe_message (aXe_M_FATAL, __FILE__, __LINE__, "Out of memory");
+
+  // mark all slots as empty
+  for (i=0;i<cache->nslots;i++)
+    {
+      cache->px[i] = -1;
+      cache->py[i] = -1;
+    }
 
-  if (lambda<poly_cube->wmin)
+  return cache;
+}
+
+/**
+    Releases a flat-field cache.
+
+    @param cache a pointer to the cache
+*/
+void
+free_poly_cube_ffcache(poly_cube_ffcache *cache)
+{
+  if (cache == NULL)
+    return;
+
+  free(cache->px);
+  free(cache->py);
+  free(cache->values);
+  free(cache);
+}
+
+/**
+    Returns the flat-field value of a pixel interpolated from the cache.
+    On a cache miss the slot is (re-)filled with the flat-field values
+    on the wavelength grid of the pixel.
+
+    @param w the normalised wavelength
+    @param x the x-coordinate
+    @param y the y-coordinate
+    @param poly_cube a pointer to a poly_cube_flatfield structure
+    @param cache a pointer to the cache
+    @returns the flat-field value
+*/
+static double
+cached_cube_pixel (const double w, const int x, const int y,
+		   const poly_cube_flatfield *poly_cube,
+		   poly_cube_ffcache *cache)
+{
+  unsigned int slot;
+  double *vals;
+  double t, frac;
+  int i;
+
+  slot = (((unsigned int)x * 73856093u) ^ ((unsigned int)y * 19349663u))
+    % (unsigned int)cache->nslots;
+  vals = cache->values + (size_t)slot * cache->nlambda;
+
+  // fill the slot on a miss
+  if (cache->px[slot] != x || cache->py[slot] != y)
     {
-      w = .0;
-    }        
-  if (lambda>poly_cube->wmax)
+      for (i=0;i<cache->nlambda;i++)
+	vals[i] = eval_cube_pixel((double)i/(double)(cache->nlambda-1),
+				  x, y, poly_cube);
+      cache->px[slot] = x;
+      cache->py[slot] = y;
+    }
+
+  // interpolate linearly in the grid
+  t = w * (double)(cache->nlambda-1);
+  i = (int)t;
+  if (i > cache->nlambda-2)
+    i = cache->nlambda-2;
+  frac = t - (double)i;
+
+  return vals[i] + frac * (vals[i+1] - vals[i]);
+}
+
+/**
+    Evaluates the flat-field values for all pixels of a PET.
+    Without a cache the polynomial is evaluated for the whole
+    pixel set at once, running the Horner scheme over the
+    coefficient planes. With a cache the values are interpolated
+    from the wavelength grid of the pixels.
+
+    @param PET the list of PET pixels
+    @param npix the number of PET pixels
+    @param poly_cube a pointer to a poly_cube_flatfield structure
+    @param cache a pointer to a flat-field cache or NULL
+    @param ff array for the npix flat-field values
+*/
+void
+poly_cube_flatfield_pixels (const ap_pixel *PET, const int npix,
+			    const poly_cube_flatfield *poly_cube,
+			    poly_cube_ffcache *cache, double *ff)
+{
+  double *w;
+  int i, j;
+
+  if (cache != NULL)
     {
-      w = 1.0;
-    }    
-  
-  for (i=0;i<poly_cube->poly_order;i++) 
+      for (j=0;j<npix;j++)
+	ff[j] = cached_cube_pixel(normalise_cube_lambda(PET[j].lambda, poly_cube),
+				  PET[j].p_x, PET[j].p_y, poly_cube, cache);
+      return;
+    }
+
+  // compute the normalised wavelengths
+  w = (double *) malloc(npix * sizeof(double));
+  for (j=0;j<npix;j++)
     {
-      ff = ff + gsl_matrix_get(poly_cube->coeffs[i],x,y)*pow(w,i);
+      w[j]  = normalise_cube_lambda(PET[j].lambda, poly_cube);
+      ff[j] = 0.0;
     }
-  return ff;
+
+  // Horner over the coefficient planes
+  for (i=poly_cube->poly_order-1;i>=0;i--)
+    {
+      for (j=0;j<npix;j++)
+	ff[j] = ff[j]*w[j] + gsl_matrix_get(poly_cube->coeffs[i],
+					    PET[j].p_x, PET[j].p_y);
+    }
+
+  free(w);
+}
+
+/**
+    Divides the count and error values of all pixels in a PET
+    by the flat-field value of the pixel. Pixels with a zero
+    flat-field value are left untouched.
+
+    @param PET the list of PET pixels, terminated by p_x == -1
+    @param poly_cube a pointer to a poly_cube_flatfield structure
+    @param cache a pointer to a flat-field cache or NULL
+*/
+void
+apply_poly_cube_flatfield (ap_pixel *PET, const poly_cube_flatfield *poly_cube,
+			   poly_cube_ffcache *cache)
+{
+  double *ff;
+  int npix=0;
+  int j;
+
+  while (PET[npix].p_x != -1)
+    npix++;
+  if (!npix)
+    return;
+
+  ff = (double *) malloc(npix * sizeof(double));
+  poly_cube_flatfield_pixels(PET, npix, poly_cube, cache, ff);
+
+  for (j=0;j<npix;j++)
+    {
+      if (ff[j]!=0)
+	{
+	  PET[j].count /= ff[j];
+	  PET[j].error /= ff[j];
+	}
+    }
+
+  free(ff);
 }
 
 /**
@@ -28,6 +28,23 @@ typedef struct
 }
 poly_cube_flatfield;
 
+// default memory limit for a flat-field cache
+#define FFCACHE_MAX_BYTES 33554432
+
+/**
+  Cache of flat-field values tabulated on a regular grid
+  in the normalised wavelength for a set of pixels
+*/
+typedef struct
+{
+  int nlambda;         /* number of grid points in wavelength */
+  int nslots;          /* number of pixels held in the cache */
+  int *px;             /* x-coordinates of the cached pixels, -1 if empty */
+  int *py;             /* y-coordinates of the cached pixels, -1 if empty */
+  double *values;      /* the flat-field values, nlambda per pixel */
+}
+poly_cube_ffcache;
+
 /**
   Descriptor of flatfield with a single flatfield image and a
   polynomial flatfield dependence.
@@ -97,5 +114,14 @@ void free_multi_flatfield (flatfield_d * const flat);
 void apply_flatfield (ap_pixel * const ap_p, const flatfield_d * const flat);
 double poly_cube_flatfield_lambda (const double lambda, const int x, const int y,
 				   poly_cube_flatfield *poly_cube);
+poly_cube_ffcache *alloc_poly_cube_ffcache(const int nlambda,
+					   const size_t max_bytes);
+void free_poly_cube_ffcache(poly_cube_ffcache *cache);
+void poly_cube_flatfield_pixels (const ap_pixel *PET, const int npix,
+				 const poly_cube_flatfield *poly_cube,
+				 poly_cube_ffcache *cache, double *ff);
+void apply_poly_cube_flatfield (ap_pixel *PET,
+				const poly_cube_flatfield *poly_cube,
+				poly_cube_ffcache *cache);
 
 #endif
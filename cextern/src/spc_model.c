@@ -303,6 +303,8 @@ make_gauss_spectra2(object **oblist, dirobject **dirlist,
   int nx, ny;
   d_point dpixel;
 
+  gauss_emodel emodel;
+
   // determine the number of objects in the object list
   nobjects = object_list_size(oblist);
 
@@ -357,6 +359,19 @@ make_gauss_spectra2(object **oblist, dirobject **dirlist,
       // give feedback to the screen
       fprintf(stdout, "aXe_PETCONT: modelling object %i beam %c ...", speclist[ii]->objectID, BEAM(speclist[ii]->beamID));
 
+      // set up the gaussian emission model of the beam;
+      // it is the same for all pixels
+      if (!actdir->dirim)
+        {
+          if ((conf->psfcoeffs && conf->psfrange) || psf_offset)
+            // use the psf-corrected widths
+            init_gauss_emodel(get_gauss_beam(actbeam, actdir, lambda_psf, conf,
+                                             psf_offset, acttrace),
+                              actdir->drzscale, &emodel);
+          else
+            init_gauss_emodel(actbeam, actdir->drzscale, &emodel);
+        }
+
       frac_prev=10.0;
       // go over each pixel in the direct object area
       for (nx=actdir->ix_min; nx<=actdir->ix_max; nx++)
@@ -386,22 +401,12 @@ make_gauss_spectra2(object **oblist, dirobject **dirlist,
                 }
               else
                 {
-                  // check whether a wavelength-dependent
-                  // emission profile is given
-                  if ((conf->psfcoeffs && conf->psfrange) || psf_offset)
-                    {
-                      // fill in the wavelength dependend
-                      // emission values
-                      fill_gaussvalues(dpixel, actbeam, actdir, lambda_psf, conf, psf_offset, acttrace);
-                    }
-                  else
-                    {
-                      // do a subsampling over the pixel
-                      // to get a more appropriate value for the
-                      // emission val
-                      sval = get_sub_emodel_value(dpixel, actbeam, actdir->drzscale);
-                      gsl_vector_set_all (acttrace->gvalue, sval);
-                    }
+                  // do a subsampling over the pixel
+                  // to get a more appropriate value for the
+                  // emission val; a wavelength-dependent
+                  // emission profile is in the model
+                  sval = get_gauss_emodel_value(&emodel, dpixel);
+                  gsl_vector_set_all (acttrace->gvalue, sval);
                 }
 
               // insert the spectrum of this direct object pixel in the beam spectrum
@@ -470,6 +475,8 @@ make_gauss_spectra(object **oblist, dirobject **dirlist,
   int nx, ny;
   d_point dpixel;
 
+  gauss_emodel emodel;
+
   // determine the number of objects in the object list
   nobjects = object_list_size(oblist);
 
@@ -567,6 +574,16 @@ make_gauss_spectra(object **oblist, dirobject **dirlist,
 
       fprintf(stdout, "aXe_PETCONT: modelling object %i beam %c ...", speclist[ii]->objectID, BEAM(speclist[ii]->beamID));
 
+      // set up the gaussian emission model of the beam;
+      // it is the same for all pixels
+      if ((conf->psfcoeffs && conf->psfrange) || psf_offset)
+        // use the psf-corrected widths
+        init_gauss_emodel(get_gauss_beam(actbeam, actdir, lambda_psf, conf,
+                                         psf_offset, acttrace),
+                          actdir->drzscale, &emodel);
+      else
+        init_gauss_emodel(actbeam, actdir->drzscale, &emodel);
+
       // go over each pixel in the direct object area
       for (nx=actdir->ix_min; nx<=actdir->ix_max; nx++)
         {
@@ -579,22 +596,12 @@ make_gauss_spectra(object **oblist, dirobject **dirlist,
               dpixel.y = (double)ny;
 
 
-              // check whether a wavelength-dependent
-              // emission profile is given
-              if ((conf->psfcoeffs && conf->psfrange) || psf_offset)
-                {
-                  // fill in the wavelength dependend
-                  // emission values
-                  fill_gaussvalues(dpixel, actbeam, actdir, lambda_psf, conf, psf_offset, acttrace);
-                }
-              else
-                {
-                  // do a subsampling over the pixel
-                  // to get a more appropriate value for the
-                  // emission val
-                  sval = get_sub_emodel_value(dpixel, actbeam, actdir->drzscale);
-                  gsl_vector_set_all (acttrace->gvalue, sval);
-                }
+              // do a subsampling over the pixel
+              // to get a more appropriate value for the
+              // emission val; a wavelength-dependent
+              // emission profile is in the model
+              sval = get_gauss_emodel_value(&emodel, dpixel);
+              gsl_vector_set_all (acttrace->gvalue, sval);
 
               //
               fill_pixel_in_speed(actdir, acttrace, dpixel, resp, speclist[ii], wl_calibration);
@@ -1901,6 +1908,8 @@ make_gauss_dirim(object **oblist, dirobject **dirlist,
   int nx, ny;
   d_point dpixel;
 
+  gauss_emodel emodel;
+
   // determine the number of objects in the object list
   nobjects = object_list_size(oblist);
 
@@ -1923,6 +1932,9 @@ make_gauss_dirim(object **oblist, dirobject **dirlist,
 
       fprintf(stdout, "aXe_PETCONT: modelling object %i ...", oblist[ii]->ID);
 
+      // set up the gaussian emission model
+      init_gauss_emodel(actbeam, actdir->drzscale, &emodel);
+
       // go over each pixel in the direct object area
       for (nx=actdir->ix_min; nx<=actdir->ix_max; nx++)
         {
@@ -1933,7 +1945,7 @@ make_gauss_dirim(object **oblist, dirobject **dirlist,
               dpixel.x = (double)nx;
               dpixel.y = (double)ny;
 
-              sval = get_sub_emodel_value(dpixel, actbeam, actdir->drzscale);
+              sval = get_gauss_emodel_value(&emodel, dpixel);
               flux = get_flux_from_SED(actdir->SED, 890.0);
 
               if (nx > -1 && ny > -1 && nx < npixels.x && ny < npixels.y)
@@ -13,6 +13,15 @@
 #include <string.h>
 #include <math.h>
 
+#ifdef HAVE_CONFIG_H
+#include "config.h"
+#endif
+
+#ifdef HAVE_SYS_MMAN_H
+#include <sys/mman.h>
+#include <sys/stat.h>
+#endif
+
 #include <gsl/gsl_vector.h>
 #include <gsl/gsl_interp.h>
 
@@ -35,6 +44,7 @@
 
 // define SQUARE
 #define SQR(x) ((x)*(x))
+#define MIN(x,y) (((x)<(y))?(x):(y))
 
 /**
  *
@@ -60,19 +70,56 @@ create_SexObject(const colinfo *actinfo, char *line, const gsl_vector * waves,
                  const px_point modinfo_cols, const int magcol, const int fullinfo)
 {
   gsl_vector *v;
-  gsl_vector *mags;
-  gsl_vector *wavs;
   SexObject  *o;
-  int         i=0;
+
   // transform the data in the line to a vector
   lv1ws (line);
   v = string_to_gsl_array (line);
 
+  // create the object
+  o = fill_SexObject(actinfo, v, waves, cnums, backwin_cols, modinfo_cols,
+                     magcol, fullinfo);
+
+  // release the vector
+  gsl_vector_free (v);
+
+  return o;
+}
+
+
+/**
+ *
+ *  Function: fill_SexObject
+ *  Allocates and creates a SExtractor object from
+ *  the vector with the values of a catalog row.
+ *
+ *  Parameters:
+ *  @param  actinfo  - the header structure with the column names
+ *  @param  v        - the values of the catalog row
+ *  @param  waves    - vector with the walelengths of the magnitude columns
+ *  @param  cnums    - vector with the column numbers of the magnitude columns
+ *  @param  magcol   - column number of the magnitude column selected
+ *                     for mag_auto
+ *  @param  fullinfo - deecides whether a column is optional or not
+ *
+ *  Returns:
+ *  @return o        - the new created SexObject
+ */
+SexObject *
+fill_SexObject(const colinfo *actinfo, gsl_vector *v, const gsl_vector * waves,
+               const gsl_vector *  cnums, const px_point backwin_cols,
+               const px_point modinfo_cols, const int magcol, const int fullinfo)
+{
+  gsl_vector *mags;
+  gsl_vector *wavs;
+  SexObject  *o;
+  int         i=0;
+
   // allocate space for the SexObject
   o = (SexObject *) malloc (sizeof (SexObject));
   if (o == NULL)
     aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
-                 "create_SexObject: Could not allocate memory.");
+                 "fill_SexObject: Could not allocate memory.");
 
   // succesively fill the data into the SexObject.
   // for 'fullinfo=1' missing data results in an error.
@@ -303,23 +350,26 @@ catalog_to_wcs (char grismfile[], int hdunum, char infile[], char outfile[],
                 struct WorldCoor *from_wcs, struct WorldCoor *to_wcs,
                 int distortion, int overwrite_wcs, int overwrite_img)
 {
-  FILE *fin, *fout;
+  FILE *fout;
   gsl_vector *v;
   gsl_vector *v_out;
   gsl_vector *waves;
   gsl_vector *cnums;
   gsl_matrix *coeffs=NULL;
   char Buffer[CATBUFFERSIZE];
-  char line[CATBUFFERSIZE], str[CATBUFFERSIZE];
+  char str[CATBUFFERSIZE];
   int i, hasmags=0, magcencol = 0;
   SexObject *o;
+  sex_catalog * cat;
   colinfo * actcatinfo;
   px_point    pixmax;
   px_point    backwin_cols;
   px_point    modinfo_cols;
 
 
-  actcatinfo = get_sex_col_descr (infile);
+  // open the catalog and get the column description
+  cat = open_sex_catalog (infile);
+  actcatinfo = cat->actinfo;
   hasmags = has_magnitudes(actcatinfo);
   if (!hasmags)
     {
@@ -337,11 +387,6 @@ catalog_to_wcs (char grismfile[], int hdunum, char infile[], char outfile[],
   modinfo_cols = has_modelinfo(actcatinfo);
 
 
-  if (!(fin = fopen (infile, "r")))
-    {
-      aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
-                   "Cannot open catalog file %s", infile);
-    }
   if (!(fout = fopen (outfile, "w")))
     {
       aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
@@ -363,19 +408,11 @@ catalog_to_wcs (char grismfile[], int hdunum, char infile[], char outfile[],
 
   pixmax = get_npixels (grismfile, hdunum);
 
-  while (fgets (line, CATBUFFERSIZE, fin))
+  // go over all valid catalog rows
+  while ((v = next_sex_catalog_row (cat)))
     {
-      if (!(line_is_valid (actcatinfo, line)))
-        continue;
-       if (line[0] == ';')
-         continue;
-
-      /* Create a vector containing the information */
-      lv1ws (line);
-      v = string_to_gsl_array (line);
-
       //      o = create_SexObject (sex_col_desc, line);
-      o = create_SexObject (actcatinfo, line, waves, cnums, backwin_cols, modinfo_cols, magcencol,  1);
+      o = fill_SexObject (actcatinfo, v, waves, cnums, backwin_cols, modinfo_cols, magcencol,  1);
 
       if ( (from_wcs!=NULL)&&(to_wcs!=NULL) )
         {
@@ -405,13 +442,16 @@ catalog_to_wcs (char grismfile[], int hdunum, char infile[], char outfile[],
       fputs (Buffer, fout);
 
       gsl_vector_free (v_out);
-      gsl_vector_free (v);
+      free_SexObject (o);
   }
 
   if (coeffs)
     gsl_matrix_free(coeffs);
 
-  fclose (fin);
+  gsl_vector_free (waves);
+  gsl_vector_free (cnums);
+
+  close_sex_catalog (cat);
   fclose (fout);
 }
 
@@ -444,23 +484,26 @@ catalog_to_wcs_nodim (char infile[], char outfile[],
                       struct WorldCoor *grism_wcs, int overwrite_wcs,
                       int overwrite_img)
 {
-  FILE *fin, *fout;
+  FILE *fout;
   gsl_vector *v;
   gsl_vector *v_out;
   gsl_vector *waves;
   gsl_vector *cnums;
   char Buffer[CATBUFFERSIZE];
-  char line[CATBUFFERSIZE], str[CATBUFFERSIZE];
+  char str[CATBUFFERSIZE];
   int i;
   SexObject *o;
   int compute_imcoos=0;
   int th_sky=0;
   int checksum, hasmags=0, magcencol=0;
+  sex_catalog * cat;
   colinfo * actcatinfo;
   px_point    backwin_cols;
   px_point    modinfo_cols;
 
-  actcatinfo = get_sex_col_descr (infile);
+  // open the catalog and get the column description
+  cat = open_sex_catalog (infile);
+  actcatinfo = cat->actinfo;
   hasmags = has_magnitudes(actcatinfo);
   if (!hasmags)
     {
@@ -477,11 +520,6 @@ catalog_to_wcs_nodim (char infile[], char outfile[],
   backwin_cols = has_backwindow(actcatinfo);
   modinfo_cols = has_modelinfo(actcatinfo);
 
-  if (!(fin = fopen (infile, "r")))
-    {
-      aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
-                   "Cannot open catalog file %s", infile);
-    }
   if (!(fout = fopen (outfile, "w")))
     {
       aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
@@ -501,22 +539,10 @@ catalog_to_wcs_nodim (char infile[], char outfile[],
 
   make_GOL_header(fout, actcatinfo, waves, cnums, backwin_cols, modinfo_cols);
 
-  while (fgets (line, CATBUFFERSIZE, fin))
+  // go over all valid catalog rows
+  while ((v = next_sex_catalog_row (cat)))
     {
-
-      /* If line is not a valid catalog entry, just continue */
-      if (!(line_is_valid (actcatinfo, line)))
-        continue;
-
-      /* if line starts with ";", just continue */
-      if (line[0] == ';')
-        continue;
-
-      /* Create a vector containing the information */
-      lv1ws (line);
-      v = string_to_gsl_array (line);
-
-      o = create_SexObject (actcatinfo, line, waves, cnums, backwin_cols, modinfo_cols, magcencol,  0);
+      o = fill_SexObject (actcatinfo, v, waves, cnums, backwin_cols, modinfo_cols, magcencol,  0);
 
 
       if (compute_imcoos)
@@ -535,14 +561,14 @@ catalog_to_wcs_nodim (char infile[], char outfile[],
       fputs (Buffer, fout);
 
       gsl_vector_free (v_out);
-      gsl_vector_free (v);
+      free_SexObject (o);
     }
 
-  fclose (fin);
-  fclose (fout);
-
-  free (actcatinfo);
+  gsl_vector_free (waves);
+  gsl_vector_free (cnums);
 
+  close_sex_catalog (cat);
+  fclose (fout);
 }
 
 /**
@@ -1585,6 +1611,329 @@ fill_object_bbox (observation * const obs, beam * b, const float m_width,
      return 1;
 }
 
+/**
+ * Function: open_sex_catalog
+ * Opens a SExtractor catalog for reading. FITS files are recognized
+ * by their first card and read from the first table extension, with
+ * the column names taken from the TTYPE keywords. ASCII catalogs
+ * are memory mapped where possible. Their header lines are parsed
+ * immediately, such that the column description is available
+ * when the function returns, and the file is read only once.
+ *
+ * Parameters:
+ * @param filename - the name of the catalog
+ *
+ * Returns:
+ * @return cat - the opened catalog
+ */
+sex_catalog *
+open_sex_catalog (char filename[])
+{
+  sex_catalog *cat;
+  char first[10];
+  size_t nread;
+  int is_fits;
+#ifdef HAVE_SYS_MMAN_H
+  struct stat fstatus;
+#endif
+
+  cat = (sex_catalog *) calloc (1, sizeof (sex_catalog));
+  if (cat == NULL)
+    aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
+                 "open_sex_catalog: Could not allocate memory.");
+  cat->actinfo = (colinfo *) malloc (sizeof (colinfo));
+  if (cat->actinfo == NULL)
+    aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
+                 "open_sex_catalog: Could not allocate memory.");
+  cat->actinfo->numcols = 0;
+
+  if (!(cat->input = fopen (filename, "r")))
+    aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
+                 "Could not open Sextractor catalog" "file %s,\n",
+                 filename);
+
+  // check for a FITS file
+  nread = fread (first, sizeof (char), 9, cat->input);
+  first[nread] = '\0';
+  is_fits = !strcmp (first, "SIMPLE  =");
+
+  if (is_fits)
+    {
+      fclose (cat->input);
+      cat->input = NULL;
+      open_sex_fitscat (filename, cat);
+    }
+  else
+    {
+      rewind (cat->input);
+
+#ifdef HAVE_SYS_MMAN_H
+      // try to map the file into memory;
+      // stay with the stream if that fails
+      if (!fstat (fileno (cat->input), &fstatus) && fstatus.st_size > 0)
+        {
+          cat->map = (char *) mmap (NULL, (size_t) fstatus.st_size, PROT_READ,
+                                    MAP_PRIVATE, fileno (cat->input), 0);
+          if (cat->map == MAP_FAILED)
+            {
+              cat->map = NULL;
+            }
+          else
+            {
+              cat->map_size = (size_t) fstatus.st_size;
+              fclose (cat->input);
+              cat->input = NULL;
+            }
+        }
+#endif
+
+      // read the header lines up to the first data line
+      while (next_sex_catalog_line (cat))
+        {
+          if (cat->line[0] != '#')
+            {
+              cat->pending = 1;
+              break;
+            }
+          add_sex_col_descr (cat->actinfo, cat->line);
+        }
+    }
+
+  // the vector for the row values
+  if (cat->actinfo->numcols > 0)
+    cat->row = gsl_vector_alloc (cat->actinfo->numcols);
+
+  return cat;
+}
+
+
+/**
+ * Function: open_sex_fitscat
+ * Opens the first table extension of a FITS file as catalog and
+ * fills the column description from the TTYPE keywords. Rows are
+ * read in chunks of the optimal size for cfitsio.
+ *
+ * Parameters:
+ * @param filename - the name of the FITS file
+ * @param cat      - the catalog structure
+ */
+void
+open_sex_fitscat (char filename[], sex_catalog *cat)
+{
+  char ttype[FLEN_VALUE];
+  char keyname[FLEN_KEYWORD];
+  int f_status=0;
+  int ncols=0;
+  int icol;
+  long optimal=0;
+
+  fits_open_table (&cat->fits, filename, READONLY, &f_status);
+  if (f_status)
+    {
+      ffrprt (stderr, f_status);
+      aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
+                   "open_sex_fitscat: Could not open table in %s",
+                   filename);
+    }
+
+  fits_get_num_rows (cat->fits, &cat->nrows, &f_status);
+  fits_get_num_cols (cat->fits, &ncols, &f_status);
+  fits_get_rowsize (cat->fits, &optimal, &f_status);
+  if (f_status)
+    {
+      ffrprt (stderr, f_status);
+      aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
+                   "open_sex_fitscat: Could not get the size of "
+                   "table %s", filename);
+    }
+  if (ncols > MAXCOLS)
+    aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
+                 "open_sex_fitscat: More than %i catalog columns in %s.",
+                 MAXCOLS, filename);
+
+  // fill the column description
+  for (icol=0; icol < ncols; icol++)
+    {
+      fits_make_keyn ("TTYPE", icol+1, keyname, &f_status);
+      fits_read_key (cat->fits, TSTRING, keyname, ttype, NULL, &f_status);
+      if (f_status)
+        {
+          ffrprt (stderr, f_status);
+          aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
+                       "open_sex_fitscat: Could not read %s in %s",
+                       keyname, filename);
+        }
+      strncpy (cat->actinfo->columns[icol].name, ttype, COLNAMELENGTH-1);
+      cat->actinfo->columns[icol].name[COLNAMELENGTH-1] = '\0';
+      cat->actinfo->columns[icol].number = icol+1;
+    }
+  cat->actinfo->numcols = ncols;
+
+  // allocate the chunk buffer
+  cat->chunk_size = MAX(1, MIN(optimal, cat->nrows));
+  cat->chunk = (double *) malloc (cat->chunk_size * MAX(ncols, 1)
+                                  * sizeof (double));
+  if (cat->chunk == NULL)
+    aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
+                 "open_sex_fitscat: Could not allocate memory.");
+  cat->act_row     = 0;
+  cat->chunk_first = 0;
+  cat->chunk_rows  = 0;
+}
+
+
+/**
+ * Function: next_sex_catalog_line
+ * Reads the next line of an ASCII catalog into the line buffer
+ * of the catalog structure. Lines longer than the buffer are
+ * truncated.
+ *
+ * Parameters:
+ * @param cat - the catalog structure
+ *
+ * Returns:
+ * @return 1/0 - 1 if a line was read, 0 at the end of the file
+ */
+int
+next_sex_catalog_line (sex_catalog *cat)
+{
+  const char *start;
+  const char *end;
+  size_t len;
+
+  // a stream is read with fgets
+  if (cat->map == NULL)
+    return fgets (cat->line, CATBUFFERSIZE, cat->input) != NULL;
+
+  if (cat->map_pos >= cat->map_size)
+    return 0;
+
+  // find the end of the line in the mapped file
+  start = cat->map + cat->map_pos;
+  end = (const char *) memchr (start, '\n', cat->map_size - cat->map_pos);
+  if (end == NULL)
+    end = cat->map + cat->map_size;
+  else
+    end++;
+  cat->map_pos = end - cat->map;
+
+  // copy it to the line buffer
+  len = MIN ((size_t) (end - start), CATBUFFERSIZE - 1);
+  memcpy (cat->line, start, len);
+  cat->line[len] = '\0';
+
+  return 1;
+}
+
+
+/**
+ * Function: next_sex_catalog_row
+ * Delivers the values of the next valid catalog row. Valid rows
+ * have a numeric (or NaN) entry for every column; lines starting
+ * with ';' or '#' are ignored. The returned vector belongs to the
+ * catalog and is overwritten with the next call.
+ *
+ * Parameters:
+ * @param cat - the catalog structure
+ *
+ * Returns:
+ * @return row - the row values, NULL at the end of the catalog
+ */
+gsl_vector *
+next_sex_catalog_row (sex_catalog *cat)
+{
+  int f_status=0;
+  int ncols;
+  int icol;
+  int anynul;
+  long index;
+  double nulval=GSL_NAN;
+
+  ncols = cat->actinfo->numcols;
+  if (cat->row == NULL)
+    return NULL;
+
+  // a FITS table delivers the rows from the chunk buffer
+  if (cat->fits)
+    {
+      if (cat->act_row >= cat->nrows)
+        return NULL;
+
+      // read the next chunk of rows
+      if (cat->act_row >= cat->chunk_first + cat->chunk_rows)
+        {
+          cat->chunk_first = cat->act_row;
+          cat->chunk_rows  = MIN(cat->chunk_size, cat->nrows - cat->act_row);
+          for (icol=0; icol < ncols; icol++)
+            {
+              fits_read_col (cat->fits, TDOUBLE, icol+1, cat->chunk_first+1,
+                             1, cat->chunk_rows, &nulval,
+                             cat->chunk + icol * cat->chunk_size,
+                             &anynul, &f_status);
+              if (f_status)
+                {
+                  ffrprt (stderr, f_status);
+                  aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
+                               "next_sex_catalog_row: Could not read "
+                               "column %s", cat->actinfo->columns[icol].name);
+                }
+            }
+        }
+
+      // transfer the row
+      index = cat->act_row - cat->chunk_first;
+      for (icol=0; icol < ncols; icol++)
+        gsl_vector_set (cat->row, icol,
+                        cat->chunk[icol * cat->chunk_size + index]);
+      cat->act_row++;
+
+      return cat->row;
+    }
+
+  // go to the next valid ASCII line
+  while (cat->pending || next_sex_catalog_line (cat))
+    {
+      cat->pending = 0;
+      if (cat->line[0] == ';' || cat->line[0] == '#')
+        continue;
+      if (parse_catalog_line (cat->line, cat->row->data, ncols) == ncols)
+        return cat->row;
+    }
+  return NULL;
+}
+
+
+/**
+ * Function: close_sex_catalog
+ * Closes a catalog and releases all its memory.
+ *
+ * Parameters:
+ * @param cat - the catalog structure
+ */
+void
+close_sex_catalog (sex_catalog *cat)
+{
+  int f_status=0;
+
+  if (cat == NULL)
+    return;
+
+  if (cat->input)
+    fclose (cat->input);
+#ifdef HAVE_SYS_MMAN_H
+  if (cat->map)
+    munmap (cat->map, cat->map_size);
+#endif
+  if (cat->fits)
+    fits_close_file (cat->fits, &f_status);
+  if (cat->row)
+    gsl_vector_free (cat->row);
+  free (cat->chunk);
+  free (cat->actinfo);
+  free (cat);
+}
+
+
 /**
  * Function: size_of_sextractor_catalog
  * A utility function which parses a Sextractor catalog file,
@@ -1598,33 +1947,14 @@ fill_object_bbox (observation * const obs, beam * b, const float m_width,
 int
 size_of_sextractor_catalog (char filename[])
 {
-  FILE *input;
-  char Buffer[CATBUFFERSIZE];
-  gsl_vector *v;
-  int catsize;
+  sex_catalog *cat;
   int num = 0;
-  colinfo * actcatinfo;
-  actcatinfo = get_sex_col_descr (filename);
-  //  catalog_header = get_sex_col_descr (filename);
-  catsize = actcatinfo->numcols;
-  if (!(input = fopen (filename, "r")))
-    {
-      aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
-                   "Could not open Sextractor catalog" "file %s,\n",
-                   filename);
-    }
 
+  cat = open_sex_catalog (filename);
+  while (next_sex_catalog_row (cat))
+    num++;
+  close_sex_catalog (cat);
 
-  while (fgets (Buffer, CATBUFFERSIZE, input))
-    {
-      if (Buffer[0] == ';')
-        continue;
-      lv1ws (Buffer);
-      v = string_to_gsl_array (Buffer);
-      if (v==NULL) continue;
-      if ((int)v->size == catsize)
-        num++;
-    }
   return num;
 }
 
@@ -1633,6 +1963,8 @@ size_of_sextractor_catalog (char filename[])
  * Function: get_SexObject_from_catalog
  * Parses a Sextractor 2.0 catalog file, and outputs a NULL terminated
  * array of SexObjects pointers. Ignores rows starting with a ;
+ * The catalog is read in a single pass, with the object array
+ * growing as needed.
  *
  * Parameters:
  * @param filename a pointer pointing to a char array containing the
@@ -1644,22 +1976,23 @@ size_of_sextractor_catalog (char filename[])
 SexObject **
 get_SexObject_from_catalog (char filename[], const double lambda_mark)
 {
-  FILE *input;
-  char Buffer[CATBUFFERSIZE];
   gsl_vector *v;
   gsl_vector *waves;
   gsl_vector *cnums;
   size_t hasmags=0;
   size_t nobjs;
-  size_t catsize;
-  int i;
+  size_t i;
   size_t magcencol=0;
-  SexObject **sobjs, *sobj;
+  SexObject **sobjs;
+  sex_catalog *cat;
   colinfo * actcatinfo;
   px_point  backwin_cols;
   px_point  modinfo_cols;
 
-  actcatinfo = get_sex_col_descr (filename);
+  // open the catalog and get the column description
+  cat = open_sex_catalog (filename);
+  actcatinfo = cat->actinfo;
+
   hasmags = has_magnitudes(actcatinfo);
   waves = gsl_vector_alloc (hasmags);
   cnums = gsl_vector_alloc (hasmags);
@@ -1668,18 +2001,8 @@ get_SexObject_from_catalog (char filename[], const double lambda_mark)
   backwin_cols = has_backwindow(actcatinfo);
   modinfo_cols = has_modelinfo(actcatinfo);
 
-
-  //  catsize = count_keys (catalog_header);
-  catsize = actcatinfo->numcols;
-  nobjs = size_of_sextractor_catalog (filename);
-  if (!(input = fopen (filename, "r")))
-       {
-         aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
-                      "Could not open Sextractor catalog" "file %s,\n",
-                      filename);
-       }
-
-  /* Allocate enough room for nobjs+1 SexObject  pointers */
+  /* Allocate room for an initial number of SexObject pointers */
+  nobjs = CATINITSIZE;
   sobjs = (SexObject **) malloc ((nobjs + 1) * sizeof (SexObject *));
   if (!sobjs)
     {
@@ -1687,21 +2010,25 @@ get_SexObject_from_catalog (char filename[], const double lambda_mark)
     }
 
   i = 0;
-  while (fgets (Buffer, CATBUFFERSIZE, input))
+  while ((v = next_sex_catalog_row (cat)))
     {
-      if (Buffer[0] == ';')
-        continue;
-      v = string_to_gsl_array (Buffer);
-      if (v==NULL) continue;
-      if (v->size == catsize)
+      // double the array if necessary
+      if (i == nobjs)
         {
-          // BIG BUG!!!
-          //               sobj = create_SexObject (catalog_header, Buffer);
-          sobj = create_SexObject (actcatinfo, Buffer, waves, cnums, backwin_cols, modinfo_cols, magcencol, 0);
-          sobjs[i++] = sobj;
+          nobjs *= 2;
+          sobjs = (SexObject **) realloc (sobjs, (nobjs + 1) * sizeof (SexObject *));
+          if (!sobjs)
+            aXe_message (aXe_M_FATAL, __FILE__, __LINE__, "Out of memory. Couldn't allocate Sextractor Object");
         }
+      sobjs[i++] = fill_SexObject (actcatinfo, v, waves, cnums, backwin_cols, modinfo_cols, magcencol, 0);
     }
   sobjs[i] = NULL;
+
+  // release the memory
+  gsl_vector_free (waves);
+  gsl_vector_free (cnums);
+  close_sex_catalog (cat);
+
   return sobjs;
 }
 
@@ -2083,13 +2410,28 @@ free_SexObjects (SexObject ** sobjs)
 
   for (i = 0; i < nobjs; i++)
     {
-      if (sobjs[i]->magnitudes){
-        gsl_vector_free (sobjs[i]->lambdas);
-        gsl_vector_free (sobjs[i]->magnitudes);
-      }
-      free (sobjs[i]);
+      free_SexObject (sobjs[i]);
       sobjs[i] = NULL;
     }
   free (sobjs);
   sobjs = NULL;
 }
+
+
+/**
+ * Function: free_SexObject
+ *    Free a single SexObject
+ *
+ * Parameters:
+ *  @param o - the SexObject
+ *
+ */
+void
+free_SexObject (SexObject * o)
+{
+  if (o->magnitudes){
+    gsl_vector_free (o->lambdas);
+    gsl_vector_free (o->magnitudes);
+  }
+  free (o);
+}
@@ -8,6 +8,7 @@
 #include "spc_CD.h"
 
 #define CATBUFFERSIZE 10240
+#define CATINITSIZE   1024
 #define MAX(x,y) (((x)>(y))?(x):(y))
 #define MIN_DIFFANGLE 3.0
 
@@ -48,11 +49,59 @@ typedef struct
 SexObject;
 
 
+/**
+ * Structure: sex_catalog
+ *  A SExtractor catalog opened for reading. The catalog is
+ *  either an ASCII file, which is memory mapped if possible,
+ *  or the first table extension of a FITS file. The rows are
+ *  delivered one by one into a re-used vector.
+ */
+typedef struct
+{
+  colinfo    *actinfo;          /* the column description */
+  gsl_vector *row;              /* the values of the current row */
+  FILE       *input;            /* the ASCII file, if not mapped */
+  char       *map;              /* the mapped ASCII file */
+  size_t      map_size;         /* the size of the mapped file */
+  size_t      map_pos;          /* the actual position in the mapped file */
+  int         pending;          /* a data line is waiting in 'line' */
+  char        line[CATBUFFERSIZE]; /* the actual ASCII line */
+  fitsfile   *fits;             /* the FITS table */
+  long        nrows;            /* the number of rows in the FITS table */
+  long        act_row;          /* the next row in the FITS table */
+  long        chunk_first;      /* the first row in the chunk buffer */
+  long        chunk_rows;       /* the number of rows in the chunk buffer */
+  long        chunk_size;       /* the capacity of the chunk buffer */
+  double     *chunk;            /* column-wise buffer of FITS table rows */
+}
+sex_catalog;
+
+
 extern SexObject *
 create_SexObject(const colinfo *actinfo, char *line, const gsl_vector * waves,
                   const gsl_vector *  cnums, const px_point backwin_cols, const
                  px_point modinfo_cols, const int magcol, const int fullinfo);
 
+extern SexObject *
+fill_SexObject(const colinfo *actinfo, gsl_vector *v, const gsl_vector * waves,
+               const gsl_vector *  cnums, const px_point backwin_cols, const
+               px_point modinfo_cols, const int magcol, const int fullinfo);
+
+extern sex_catalog *
+open_sex_catalog (char filename[]);
+
+extern void
+open_sex_fitscat (char filename[], sex_catalog *cat);
+
+extern int
+next_sex_catalog_line (sex_catalog *cat);
+
+extern gsl_vector *
+next_sex_catalog_row (sex_catalog *cat);
+
+extern void
+close_sex_catalog (sex_catalog *cat);
+
 extern void
 SexObject_fprintf (FILE * output, SexObject * o);
 
@@ -164,4 +213,7 @@ sobs_to_vout(const SexObject *sobs);
 
 extern void
 free_SexObjects (SexObject ** sobjs);
+
+extern void
+free_SexObject (SexObject * o);
 #endif
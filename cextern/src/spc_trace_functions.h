@@ -53,6 +53,9 @@ vector_to_trace_polyN(gsl_vector *v);
 extern double
 polyN_ds(double x, void *pars);
 
+extern double
+polyN_pathlen (const double x, const void *const pars);
+
 extern void
 free_poly2(trace_func * func);
 
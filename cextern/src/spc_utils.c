@@ -248,9 +248,6 @@ get_sex_col_descr (char *filename)
 {
   FILE    *input;
   char     Buffer[MAXCHAR];
-  int      num=0;
-  int      count=0;
-  char    *key;
   colinfo *actinfo;
      
 
@@ -260,12 +257,6 @@ get_sex_col_descr (char *filename)
     aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
                  "get_sex_col_descr: Could not allocate memory.");
 
-  //  allocate memory for the dummy 'key
-  key = (char *) malloc (MAXCHAR * sizeof (char));
-  if (key == NULL)
-    aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
-                 "get_sex_col_descr: Could not allocate memory.");
-
   // open the catalog file
   input = fopen (filename, "r");
   if (!input)
@@ -277,30 +268,56 @@ get_sex_col_descr (char *filename)
   //  go through the catalog file
   //  This is expected one column name in each line
   //  The way source extractor writes headers
+  actinfo->numcols = 0;
   while (NULL != fgets (Buffer, MAXCHAR, input))
     {
       // see whether the current line is part of the header
       if (Buffer[0] == '#')
-        {
-          // read the column number and column name from the header line          
-          sscanf (Buffer, "# %d %21s", &num, key);
-          // store column number and column name in the header structure
-          strcpy(actinfo->columns[count].name, key);
-          actinfo->columns[count++].number = num;
-        }
+        // store column number and column name in the header structure
+        add_sex_col_descr (actinfo, Buffer);
     }
-  // fill in the number of columns
-  actinfo->numcols = count;
 
-  // free memory
-  free (key);
-  key = NULL;
+  // close the file
+  fclose (input);
 
   // return the header structure
   return actinfo;
 }
 
 
+/**
+ * Function: add_sex_col_descr
+ *  The function parses a header line of a SExtractor catalog,
+ *  which has the form "# <number> <name> ...", and appends
+ *  the column name and number to the header structure.
+ *
+ * Parameters:
+ *  @param  actinfo - the header structure
+ *  @param  line    - the header line
+ */
+void
+add_sex_col_descr (colinfo *actinfo, const char line[])
+{
+  char key[MAXCHAR];
+  int  num=0;
+
+  // check for space in the header structure
+  if (actinfo->numcols >= MAXCOLS)
+    aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
+                 "add_sex_col_descr: More than %i catalog columns.",
+                 MAXCOLS);
+
+  // read the column number and column name from the header line
+  key[0] = '\0';
+  sscanf (line, "# %d %21s", &num, key);
+
+  // store column number and column name in the header structure
+  strncpy(actinfo->columns[actinfo->numcols].name, key, COLNAMELENGTH-1);
+  actinfo->columns[actinfo->numcols].name[COLNAMELENGTH-1] = '\0';
+  actinfo->columns[actinfo->numcols++].number = num;
+}
+
+
 /**
  * Function: get_col_value
  * The function identifies the column number for a given column name,
@@ -403,7 +420,11 @@ line_is_valid (const colinfo * actcatinfo, char line[])
   // compare the vector length to the number of columns
   // and return '0' for a non valid line if the numbers differ
   if ((int)v->size != actcatinfo->numcols)
-    return 0;
+    {
+      gsl_vector_free (v);
+      return 0;
+    }
+  gsl_vector_free (v);
 
   // return '1' for a valid line
   return 1;
@@ -827,6 +848,9 @@ check_libraries (void)
 static size_t table[UCHAR_MAX + 1];
 static size_t len;
 static char *findme;
+#ifdef _OPENMP
+#pragma omp threadprivate(table, len, findme)
+#endif
 
 /*
  * Function: init_search
@@ -1038,6 +1062,59 @@ string_to_gsl_array (char *str)
   return v;
 }
 
+/**
+ * Function: parse_catalog_line
+ * Parse the content of a catalog line into an array of doubles.
+ * The entries are identified in the same way as in
+ * 'string_to_gsl_array()': numeric entries are converted, entries
+ * ###, NaN, nan, -NaN and +NaN are set to GSL_NAN and everything
+ * else is skipped. In contrast to 'string_to_gsl_array()'
+ * the line is parsed only once and nothing is allocated.
+ * The line is modified in place.
+ *
+ * Parameters:
+ * @param str     - the line to parse
+ * @param values  - the array for the values
+ * @param maxvals - the size of the array
+ *
+ * Returns:
+ * @return n - the number of entries in the line; values beyond
+ *             'maxvals' are counted but not stored
+ */
+int
+parse_catalog_line (char *str, double *values, const int maxvals)
+{
+  char *ptr, buf[256];
+  int n = 0;
+
+  if (str == NULL)
+    return 0;
+
+  ptr = rmlead (str);
+  lv1ws (ptr);
+
+  while (ptr && *ptr)
+    {
+      ptr = stptok (ptr, buf, sizeof (buf), " ");
+      if (isnum2 (buf))
+        {
+          if (n < maxvals)
+            values[n] = atof (buf);
+          n++;
+        }
+      else if ((!strcmp (buf, "###")) || (!strcmp (buf, "NaN"))
+               || (!strcmp (buf, "-NaN")) || (!strcmp (buf, "+NaN"))
+               || (!strcmp (buf, "nan")))
+        {
+          if (n < maxvals)
+            values[n] = GSL_NAN;
+          n++;
+        }
+    }
+
+  return n;
+}
+
 /**
  * Function: stptok
  * A function to recursively tokenize an input string.
@@ -70,6 +70,9 @@ make_GOL_header(FILE *fout, const colinfo * actcatinfo,
 extern colinfo *
 get_sex_col_descr (char *filename);
 
+extern void
+add_sex_col_descr (colinfo *actinfo, const char line[]);
+
 extern double
 get_col_value (const colinfo * actcatinfo, const char key[],
                gsl_vector * v, int fatal);
@@ -125,6 +128,9 @@ isnum2(char *string);
 extern gsl_vector *
 string_to_gsl_array (char *str);
 
+extern int
+parse_catalog_line (char *str, double *values, const int maxvals);
+
 extern void
 check_libraries (void);
 
@@ -12,6 +12,191 @@
 
 #include "spce_fitting.h"
 
+/**
+ * A multifit workspace together with the design matrix,
+ * the value and the weight vector for a fit with
+ * n data points and m coefficients.
+ */
+typedef struct
+{
+  int n;                                /* number of data points */
+  int m;                                /* number of coefficients */
+  unsigned long used;                   /* last use, for the replacement */
+  gsl_matrix *X;                        /* the design matrix */
+  gsl_vector *y;                        /* the data values */
+  gsl_vector *w;                        /* the weights */
+  gsl_multifit_linear_workspace *work;  /* the GSL workspace */
+}
+fit_workspace;
+
+/**
+ * The scratch space for repeated polynomial fits.
+ */
+struct fit_scratch
+{
+  int nalloc;                           /* length of the buffers */
+  double *tmp;                          /* buffer for the weights */
+  double *xmp;                          /* buffer for the x-values */
+  int order;                            /* number of coefficients in c, cov */
+  gsl_vector *c;                        /* the fitted coefficients */
+  gsl_matrix *cov;                      /* the covariance matrix */
+  gsl_vector *interp;                   /* the additional fit information */
+  unsigned long nused;                  /* counter of workspace requests */
+  fit_workspace cache[FIT_WORK_CACHE];  /* the cached workspaces */
+};
+
+
+/**
+ * Function: alloc_fit_scratch
+ * Allocates an empty scratch space for polynomial fits.
+ * The buffers and GSL workspaces are created on demand
+ * and are re-used in all fits done with the scratch space.
+ * A scratch space must not be shared between threads.
+ *
+ * Returns:
+ * @return scratch - the scratch space
+ */
+fit_scratch *
+alloc_fit_scratch(void)
+{
+  fit_scratch *scratch;
+
+  scratch = (fit_scratch *) calloc (1, sizeof (fit_scratch));
+  if (!scratch)
+    aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
+		 "alloc_fit_scratch: Out of memory");
+  scratch->interp = gsl_vector_alloc(5);
+
+  return scratch;
+}
+
+/**
+ * Function: free_fit_workspace
+ * Releases the GSL objects of a cached workspace.
+ *
+ * Parameters:
+ * @param fw - the cached workspace
+ */
+static void
+free_fit_workspace(fit_workspace *fw)
+{
+  if (!fw->work)
+    return;
+
+  gsl_matrix_free (fw->X);
+  gsl_vector_free (fw->y);
+  gsl_vector_free (fw->w);
+  gsl_multifit_linear_free (fw->work);
+  fw->X = NULL;
+  fw->y = NULL;
+  fw->w = NULL;
+  fw->work = NULL;
+  fw->n = 0;
+  fw->m = 0;
+}
+
+/**
+ * Function: free_fit_scratch
+ * Releases a scratch space and all buffers and
+ * workspaces it holds.
+ *
+ * Parameters:
+ * @param scratch - the scratch space
+ */
+void
+free_fit_scratch(fit_scratch *scratch)
+{
+  int i;
+
+  if (scratch == NULL)
+    return;
+
+  for (i=0; i < FIT_WORK_CACHE; i++)
+    free_fit_workspace(&scratch->cache[i]);
+  if (scratch->c)
+    gsl_vector_free(scratch->c);
+  if (scratch->cov)
+    gsl_matrix_free(scratch->cov);
+  gsl_vector_free(scratch->interp);
+  free(scratch->tmp);
+  free(scratch->xmp);
+  free(scratch);
+}
+
+/**
+ * Function: grow_fit_scratch
+ * Makes sure the buffers of a scratch space
+ * hold at least n elements.
+ *
+ * Parameters:
+ * @param scratch - the scratch space
+ * @param n       - the required length
+ */
+static void
+grow_fit_scratch(fit_scratch *scratch, const int n)
+{
+  if (n <= scratch->nalloc)
+    return;
+
+  scratch->tmp = (double *) realloc (scratch->tmp, n * sizeof (double));
+  scratch->xmp = (double *) realloc (scratch->xmp, n * sizeof (double));
+  if (!scratch->tmp || !scratch->xmp)
+    aXe_message (aXe_M_FATAL, __FILE__, __LINE__,
+		 "grow_fit_scratch: Out of memory");
+  scratch->nalloc = n;
+}
+
+/**
+ * Function: get_fit_workspace
+ * Returns the cached workspace for a fit with n data points
+ * and m coefficients. If there is none, the least recently
+ * used workspace is replaced by a new one.
+ *
+ * Parameters:
+ * @param scratch - the scratch space
+ * @param n       - the number of data points
+ * @param m       - the number of coefficients
+ *
+ * Returns:
+ * @return fw - the workspace
+ */
+static fit_workspace *
+get_fit_workspace(fit_scratch *scratch, const int n, const int m)
+{
+  fit_workspace *fw = &scratch->cache[0];
+  int i;
+
+  scratch->nused++;
+
+  for (i=0; i < FIT_WORK_CACHE; i++)
+    {
+      // return a matching workspace
+      if (scratch->cache[i].work && scratch->cache[i].n == n
+	  && scratch->cache[i].m == m)
+	{
+	  scratch->cache[i].used = scratch->nused;
+	  return &scratch->cache[i];
+	}
+
+      // remember the oldest one
+      if (scratch->cache[i].used < fw->used)
+	fw = &scratch->cache[i];
+    }
+
+  // replace the oldest workspace
+  free_fit_workspace(fw);
+  fw->X    = gsl_matrix_alloc (n, m);
+  fw->y    = gsl_vector_alloc (n);
+  fw->w    = gsl_vector_alloc (n);
+  fw->work = gsl_multifit_linear_alloc (n, m);
+  fw->n    = n;
+  fw->m    = m;
+  fw->used = scratch->nused;
+
+  return fw;
+}
+
+
 
 /**
  * Function: det_vector_polyN
@@ -19,40 +204,55 @@
  * such that an Nth degree polynomial is fitted to the x and y vectors 
  * using the weights w. This function avoids NaN values in ys AND elements
  * with an associated weight that is zero.
+ * The buffers and the GSL workspace are taken from the scratch space;
+ * without a scratch space they are allocated for this fit only.
  *
  * Parameters:
- * @param m   - order of the fit 
- * @param xs  - double vector containing the x values
- * @param ys  - double vector containing the y values
- * @param ws  - double vector containing the weights associated with ys
- * @param n   - number of points in xs,ys, and ws (must be greater than m!)
- * @param c   - the vector with the fitted coefficients
- * @param cov - the covariance matrix
+ * @param m       - order of the fit 
+ * @param xs      - double vector containing the x values
+ * @param ys      - double vector containing the y values
+ * @param ws      - double vector containing the weights associated with ys
+ * @param n       - number of points in xs,ys, and ws (must be greater than m!)
+ * @param c       - the vector with the fitted coefficients
+ * @param cov     - the covariance matrix
+ * @param scratch - the scratch space or NULL
  *
  * Returns:
- * @return interp - vector with additional fitting information
+ * @return interp - vector with additional fitting information; owned
+ *                  by the scratch space if one is given
  */
 gsl_vector *
 det_vector_polyN (int m, const double *const xs, double *const ys,
 		   double *const ws, const int n, gsl_vector *c,
-		   gsl_matrix *cov)
+		   gsl_matrix *cov, fit_scratch *scratch)
 {
   int i, j, nn, ii;
   double chisq;
-  gsl_matrix *X;
-  gsl_vector *y, *w;
+  fit_scratch *local=NULL;
+  fit_workspace *fw;
   
   double *tmp, *xmp;
   double median, xean;
 
   gsl_vector *interp;
 
-  // allocate the return vector
-  interp = gsl_vector_alloc(5);
+  // get the return vector
+  // and the scratch space
+  if (scratch)
+    {
+      interp = scratch->interp;
+    }
+  else
+    {
+      interp = gsl_vector_alloc(5);
+      local = alloc_fit_scratch();
+      scratch = local;
+    }
 
-  // allocate temporary vectors
-  tmp = (double *) malloc (n * sizeof (double));
-  xmp = (double *) malloc (n * sizeof (double));
+  // get the temporary vectors
+  grow_fit_scratch(scratch, n);
+  tmp = scratch->tmp;
+  xmp = scratch->xmp;
 
 
   // fill weights and independent values
@@ -88,12 +288,9 @@ det_vector_polyN (int m, const double *const xs, double *const ys,
       m = nn;
     }
 
-  // allocate more temporary space
-  X = gsl_matrix_alloc (nn, m); 
-  y = gsl_vector_alloc (nn);
-  w = gsl_vector_alloc (nn);
-  //  c = gsl_vector_alloc (m);
-  //  cov = gsl_matrix_alloc (m, m);
+  // get the design matrix, the vectors
+  // and the workspace for the fit
+  fw = get_fit_workspace(scratch, nn, m);
   
   // transfer independent/dependent and weight
   // values from the background pixels to the
@@ -107,29 +304,20 @@ det_vector_polyN (int m, const double *const xs, double *const ys,
 	  // and store them in the matrix
 	  for (j = 0; j < m; j++)
 	    {
-	      gsl_matrix_set (X, ii, j, pow (xs[i] - xean, j));
+	      gsl_matrix_set (fw->X, ii, j, pow (xs[i] - xean, j));
 	    }
-	  gsl_vector_set (y, ii, ys[i]);
-	  gsl_vector_set (w, ii, median);
+	  gsl_vector_set (fw->y, ii, ys[i]);
+	  gsl_vector_set (fw->w, ii, median);
 	  ii++;
 	}
       
     }
 
-  // allocate space and do the fit; release the space
-  gsl_multifit_linear_workspace *work = gsl_multifit_linear_alloc (nn, m);
-  gsl_multifit_wlinear (X, w, y, c, cov, &chisq, work);
-  gsl_multifit_linear_free (work);
+  // do the fit
+  gsl_multifit_wlinear (fw->X, fw->w, fw->y, c, cov, &chisq, fw->work);
 
-
-  // release memory
-  gsl_matrix_free (X); 
-  gsl_vector_free (y);
-  gsl_vector_free (w);
-
-  // free the tmp-arrays
-  free(tmp);
-  free(xmp);
+  // release a local scratch space
+  free_fit_scratch(local);
 
   // fill the mean x-value
   // and the order into the return vector
@@ -166,7 +354,7 @@ fill_polyN_interp(const double *const xs, double *const ys,
 {
   int i, j, m;
   double xf, yf, sq_yf_err, yf_err;
-  double xean;
+  double xean, xpow;
 
   // get the mean x-value and
   // polynomial order from the vector
@@ -189,11 +377,13 @@ fill_polyN_interp(const double *const xs, double *const ys,
       // compute the polynimials
       for (j = 0; j < m; j++)
 	{
+	  xpow = pow (xf, j);
+
 	  // first compute the y-value
-	  yf += gsl_vector_get(coeffs,j)*pow (xf, j);
+	  yf += gsl_vector_get(coeffs,j)*xpow;
 
 	  // compute the associated error
-	  sq_yf_err += gsl_matrix_get(cov,j,j) * pow (xf, j) * pow (xf, j);
+	  sq_yf_err += gsl_matrix_get(cov,j,j) * xpow * xpow;
 	}
 
       // put the intepolated value in the intermediate vector
@@ -295,25 +485,51 @@ comp_vector_linear (const double *xs, double *ys,
  * The function fits a polynomial function to the y-values
  * and fills the evaluated polynomial values in a temporary
  * vector and, if requested, in the original vector as well.
+ * With a scratch space the fit re-uses its buffers and
+ * workspaces.
  *
- * @param xs    - absissa
- * @param ys    - value at xs[]
- * @param ws    - weight in ys[]
- * @param yi    - temprary y-values
- * @param n     - number of points in xs, ys, ws
- * @param final - flagg to store to temp (0) or final (1) vectors
+ * @param xs      - absissa
+ * @param ys      - value at xs[]
+ * @param ws      - weight in ys[]
+ * @param yi      - temprary y-values
+ * @param n       - number of points in xs, ys, ws
+ * @param final   - flagg to store to temp (0) or final (1) vectors
+ * @param scratch - the scratch space or NULL
  */
 void
 comp_vector_polyN (const int m, const double *xs, double *ys,
-		    double *ws, double *yi, const int n, const int final)
+		    double *ws, double *yi, const int n, const int final,
+		    fit_scratch *scratch)
 {
   gsl_vector *interp, *coeffs;
   gsl_matrix *cov;
 
+  if (scratch)
+    {
+      // get coefficients and covariance
+      // matrix from the scratch space
+      if (scratch->order != m)
+	{
+	  if (scratch->c)
+	    gsl_vector_free(scratch->c);
+	  if (scratch->cov)
+	    gsl_matrix_free(scratch->cov);
+	  scratch->c = gsl_vector_alloc(m);
+	  scratch->cov = gsl_matrix_alloc(m,m);
+	  scratch->order = m;
+	}
+
+      interp = det_vector_polyN (m, xs, ys, ws, n, scratch->c, scratch->cov,
+				 scratch);
+      fill_polyN_interp(xs, ys, ws, yi, n, scratch->c, scratch->cov, interp,
+			final);
+      return;
+    }
+
   coeffs = gsl_vector_alloc(m);
   cov = gsl_matrix_alloc(m,m);
 
-  interp = det_vector_polyN (m, xs, ys, ws, n, coeffs, cov);
+  interp = det_vector_polyN (m, xs, ys, ws, n, coeffs, cov, NULL);
   fill_polyN_interp(xs, ys, ws, yi, n, coeffs, cov, interp, final);
 
   gsl_vector_free(interp);
@@ -532,6 +748,9 @@ det_vector_average (const double *xs, double *ys,
 
   // compute the standard deviation
   *std = gsl_stats_sd (tmp, 1, nn);
+
+  // free the tmp-array
+  free(tmp);
 }
 
 /**
@@ -585,6 +804,9 @@ det_vector_median (const double *xs, double *ys,
 
   // compute the standard deviation
   *std = gsl_stats_sd (tmp, 1, nn);
+
+  // free the tmp-array
+  free(tmp);
 }
 
 /**
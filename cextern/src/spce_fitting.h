@@ -10,6 +10,19 @@
 #include <gsl/gsl_multifit.h>
 #include "aXe_errors.h"
 
+// number of GSL multifit workspaces
+// cached in a fit scratch space
+#define FIT_WORK_CACHE 8
+
+// scratch space with buffers and GSL workspaces
+// which are re-used in repeated polynomial fits
+typedef struct fit_scratch fit_scratch;
+
+extern fit_scratch *
+alloc_fit_scratch(void);
+
+extern void
+free_fit_scratch(fit_scratch *scratch);
 
 extern void
 comp_vector_average (const double *xs, double *ys,
@@ -24,7 +37,8 @@ comp_vector_linear (const double *xs, double *ys,
 
 extern void
 comp_vector_polyN (const int m, const double *xs, double *ys,
-		    double *ws, double *yi, const int n, const int final);
+		    double *ws, double *yi, const int n, const int final,
+		    fit_scratch *scratch);
 
 extern void
 fill_const_value(double *ys, double *ws, double *yi, const int n,
@@ -42,9 +56,9 @@ det_vector_linear(const double *xs, double *ys, double *ws,
 		  const int n, const int weight);
 
 extern gsl_vector *
-det_vector_poly_N (int m, const double *const xs, double *const ys,
+det_vector_polyN (int m, const double *const xs, double *const ys,
 		   double *const ws, const int n, gsl_vector *c,
-		   gsl_matrix *cov);
+		   gsl_matrix *cov, fit_scratch *scratch);
 
 extern void
 fill_linear_interp(const double *const xs, double *const ys,
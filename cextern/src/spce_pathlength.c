@@ -16,6 +16,9 @@
 
 #include "spce_pathlength.h"
 
+#define MAX(x,y) (((x)>(y))?(x):(y))
+#define MIN(x,y) (((x)<(y))?(x):(y))
+
 
 /**
   transforms a list of abscissas to a list of path lengths if the path length
@@ -147,6 +150,169 @@ absc_to_pathl_deriv (const trace_func * const func, gsl_vector * const data)
 }
 
 
+/* nodes and weights of the 8-point Gauss-Legendre rule on [-1,1];
+ * only the positive half is listed, the rule is symmetric */
+static const double gl_nodes[4] = {0.1834346424956498, 0.5255324099163290,
+				   0.7966664774136267, 0.9602898564975363};
+static const double gl_weights[4] = {0.3626837833783620, 0.3137066458778873,
+				     0.2223810344533745, 0.1012285362903763};
+
+/* the cache of path length tables and the slot to be replaced next;
+ * every thread keeps its own cache, such that the tables returned
+ * are not replaced by other threads */
+static pathlength_table *pathl_cache[PATHL_CACHE_SIZE];
+static int pathl_cache_next = 0;
+#ifdef _OPENMP
+#pragma omp threadprivate(pathl_cache, pathl_cache_next)
+#endif
+
+
+/* computes sqrt(1+p'(x)^2) for a polynomial with ncoeffs coefficients
+ * using the Horner scheme on the derivative.
+ *
+ * @param coeffs the polynomial coefficients, lowest order first
+ * @param ncoeffs the number of coefficients
+ * @param x the abscissa
+ */
+static double
+poly_ds (const double * const coeffs, const int ncoeffs, const double x)
+{
+  double deriv = 0.0;
+  int i;
+
+  for (i = ncoeffs - 1; i > 0; i--)
+    deriv = deriv * x + i * coeffs[i];
+
+  return sqrt (1.0 + deriv * deriv);
+}
+
+
+/* integrates sqrt(1+p'(x)^2) from x0 to x1 with the fixed 8-point
+ * Gauss-Legendre rule. Intervals longer than PATHL_TABLE_STEP are
+ * split into panels of at most that width.
+ *
+ * @param coeffs the polynomial coefficients, lowest order first
+ * @param ncoeffs the number of coefficients
+ * @param x0 start of the interval
+ * @param x1 end of the interval
+ */
+static double
+gl_pathlength (const double * const coeffs, const int ncoeffs,
+	       const double x0, const double x1)
+{
+  int npanels = (int) ceil (fabs (x1 - x0) / PATHL_TABLE_STEP);
+  double width, half, mid;
+  double sum = 0.0;
+  int i, j;
+
+  if (npanels < 1)
+    return 0.0;
+
+  width = (x1 - x0) / npanels;
+  half  = 0.5 * width;
+  for (i = 0; i < npanels; i++)
+    {
+      mid = x0 + (i + 0.5) * width;
+      for (j = 0; j < 4; j++)
+	sum += gl_weights[j] * (poly_ds (coeffs, ncoeffs, mid - half * gl_nodes[j])
+				+ poly_ds (coeffs, ncoeffs, mid + half * gl_nodes[j]));
+    }
+
+  return sum * half;
+}
+
+
+/* checks whether a trace function is a polynomial which can be
+ * handled with the quadrature tables.
+ *
+ * @param func the spectrum trace function
+ */
+static int
+is_table_trace (const trace_func * const func)
+{
+  if (func->path_len != polyN_pathlen)
+    return 0;
+
+  return ((int) ((double *) func->data)[0] <= PATHL_MAX_COEFFS);
+}
+
+
+/* allocates and fills a path length table for a polynomial
+ * covering the nodes imin to imax.
+ *
+ * @param coeffs the polynomial coefficients, lowest order first
+ * @param ncoeffs the number of coefficients
+ * @param imin index of the first node
+ * @param imax index of the last node
+ */
+static pathlength_table *
+make_pathlength_table (const double * const coeffs, const int ncoeffs,
+		       const int imin, const int imax)
+{
+  pathlength_table *table;
+  int i;
+
+  table = (pathlength_table *) malloc (sizeof (pathlength_table));
+  table->ncoeffs = ncoeffs;
+  for (i = 0; i < ncoeffs; i++)
+    table->coeffs[i] = coeffs[i];
+  table->imin   = imin;
+  table->nnodes = imax - imin + 1;
+  table->cumul  = (double *) malloc (table->nnodes * sizeof (double));
+
+  // the path length is zero at x=0,
+  // accumulate towards both sides
+  table->cumul[-imin] = 0.0;
+  for (i = 1; i <= imax; i++)
+    table->cumul[i - imin] = table->cumul[i - 1 - imin]
+      + gl_pathlength (coeffs, ncoeffs, (i - 1) * PATHL_TABLE_STEP,
+		       i * PATHL_TABLE_STEP);
+  for (i = -1; i >= imin; i--)
+    table->cumul[i - imin] = table->cumul[i + 1 - imin]
+      - gl_pathlength (coeffs, ncoeffs, i * PATHL_TABLE_STEP,
+		       (i + 1) * PATHL_TABLE_STEP);
+
+  return table;
+}
+
+
+/* releases a path length table
+ *
+ * @param table the table
+ */
+static void
+free_pathlength_table (pathlength_table *table)
+{
+  free (table->cumul);
+  free (table);
+}
+
+
+/**
+ * transforms a list of abscissas to a list of path lengths for
+ * low order polynomial traces. All abscissas are evaluated against
+ * one cumulative table, such that only the partial panel between
+ * the nearest node and the abscissa is integrated per pixel.
+ *
+ * @param func the spectrum trace function to use in the transformation
+ * @param data the table of abscissas relative to the reference point
+ */
+static int
+absc_to_pathl_table (const trace_func * const func, gsl_vector * const data)
+{
+  const pathlength_table *table;
+  int i;
+
+  table = get_pathlength_table (func, gsl_vector_min (data),
+				gsl_vector_max (data));
+
+  for (i = 0; i < (int)data->size; i++)
+    gsl_vector_set (data, i, table_to_pathlength (table, gsl_vector_get (data, i)));
+
+  return 0;
+}
+
+
 /**
  * transforms a list of abscissas to a list of path lengths if not even
  * the derivative is known.
@@ -165,10 +331,141 @@ absc_to_pathl_val_only (const trace_func * const func,
 }
 
 
+/**
+ * Returns a cumulative path length table for a polynomial trace
+ * which covers at least the interval [xmin, xmax]. Tables are kept
+ * in a small cache keyed on the trace coefficients, such that
+ * repeated requests for the same beam re-use the table. A cached
+ * table which is too small is replaced by a larger one.
+ *
+ * @param func the spectrum trace function
+ * @param xmin the smallest abscissa to cover
+ * @param xmax the largest abscissa to cover
+ *
+ * @return the table, or NULL if the trace is not a suitable polynomial
+ */
+const pathlength_table *
+get_pathlength_table (const trace_func * const func, const double xmin,
+		      const double xmax)
+{
+  const double *coeffs = (double *) func->data + 1;
+  pathlength_table *table;
+  int ncoeffs;
+  int imin, imax;
+  int i, j;
+
+  if (!is_table_trace (func))
+    return NULL;
+
+  ncoeffs = (int) ((double *) func->data)[0];
+  imin = (int) floor (MIN (xmin, 0.0) / PATHL_TABLE_STEP);
+  imax = (int) ceil (MAX (xmax, 0.0) / PATHL_TABLE_STEP);
+
+  // look for a table of the same polynomial
+  for (i = 0; i < PATHL_CACHE_SIZE; i++)
+    {
+      table = pathl_cache[i];
+      if (!table || table->ncoeffs != ncoeffs)
+	continue;
+      for (j = 0; j < ncoeffs; j++)
+	if (table->coeffs[j] != coeffs[j])
+	  break;
+      if (j < ncoeffs)
+	continue;
+
+      // return the table if it is large enough
+      if (imin >= table->imin && imax < table->imin + table->nnodes)
+	return table;
+
+      // otherwise grow it in place
+      imin = MIN (imin, table->imin);
+      imax = MAX (imax, table->imin + table->nnodes - 1);
+      free_pathlength_table (table);
+      pathl_cache[i] = make_pathlength_table (coeffs, ncoeffs, imin, imax);
+      return pathl_cache[i];
+    }
+
+  // replace the oldest entry
+  if (pathl_cache[pathl_cache_next])
+    free_pathlength_table (pathl_cache[pathl_cache_next]);
+  table = make_pathlength_table (coeffs, ncoeffs, imin, imax);
+  pathl_cache[pathl_cache_next] = table;
+  pathl_cache_next = (pathl_cache_next + 1) % PATHL_CACHE_SIZE;
+
+  return table;
+}
+
+
+/**
+ * Computes the path length at an abscissa from a path length table.
+ * Abscissas outside of the table are integrated from the closest node.
+ *
+ * @param table the path length table
+ * @param x the abscissa relative to the reference point
+ *
+ * @return the path length from x=0 to x
+ */
+double
+table_to_pathlength (const pathlength_table * const table, const double x)
+{
+  int inode;
+
+  inode = (int) floor (x / PATHL_TABLE_STEP) - table->imin;
+  inode = MAX (0, MIN (inode, table->nnodes - 1));
+
+  return table->cumul[inode]
+    + gl_pathlength (table->coeffs, table->ncoeffs,
+		     (inode + table->imin) * PATHL_TABLE_STEP, x);
+}
+
+
+/**
+ * Computes the abscissa for a given path length, the inverse
+ * of table_to_pathlength(). The bracketing panel is located with
+ * a bisection on the table nodes, the abscissa is then refined
+ * with Newton iterations, using that the derivative of the path
+ * length is sqrt(1+p'(x)^2).
+ *
+ * @param table the path length table
+ * @param tlength the path length
+ *
+ * @return the abscissa relative to the reference point
+ */
+double
+table_to_abscissa (const pathlength_table * const table, const double tlength)
+{
+  int lo = 0, hi = table->nnodes - 1, mid;
+  int iter = 0;
+  double x, dx;
+
+  // the path length increases monotonically with x
+  while (hi - lo > 1)
+    {
+      mid = (lo + hi) / 2;
+      if (table->cumul[mid] > tlength)
+	hi = mid;
+      else
+	lo = mid;
+    }
+
+  x = (lo + table->imin) * PATHL_TABLE_STEP;
+  do
+    {
+      dx = (table_to_pathlength (table, x) - tlength)
+	/ poly_ds (table->coeffs, table->ncoeffs, x);
+      x -= dx;
+      iter++;
+    }
+  while (fabs (dx) > 1.0e-8 && iter < PATHL_MAX_ITER);
+
+  return x;
+}
+
+
 /**
  * transforms a list of abscissas to a list of path lengths.  This function
- * decides what of the absc_to_pathl_len, absc_to_pathl_deriv, or
- * absc_to_pathl_val_only to use.
+ * decides what of the absc_to_pathl_table, absc_to_pathl_len,
+ * absc_to_pathl_deriv, or absc_to_pathl_val_only to use.
  *
  * @param func the spectrum trace function to use in the transformation
  * @param data the table of abscissas relative to the reference point
@@ -177,6 +474,10 @@ int
 abscissa_to_pathlength (const trace_func * const func,
 			gsl_vector * const data)
 {
+  if (data->size > 0 && is_table_trace (func))
+    {
+      return absc_to_pathl_table (func, data);
+    }
   if (func->path_len)
     {
       return absc_to_pathl_path_len (func, data);
@@ -13,7 +13,48 @@
 #include <gsl/gsl_spline.h>
 #include "spc_trace_functions.h"
 
+// highest number of polynomial coefficients
+// (order+1) handled by the quadrature tables
+#define PATHL_MAX_COEFFS 5
+
+// width in pixels of a panel in the
+// cumulative path length table
+#define PATHL_TABLE_STEP 10.0
+
+// number of tables kept in the cache
+#define PATHL_CACHE_SIZE 8
+
+// maximum number of Newton iterations
+// in the path length inversion
+#define PATHL_MAX_ITER 50
+
+/*
+ * Structure: pathlength_table
+ * Cumulative path length of a polynomial trace, tabulated
+ * on nodes at integer multiples of PATHL_TABLE_STEP. The
+ * node with index 0 sits at x=0, where the path length is zero.
+ */
+typedef struct
+{
+  int     ncoeffs;                  // number of polynomial coefficients
+  double  coeffs[PATHL_MAX_COEFFS]; // the trace coefficients
+  int     imin;                     // index of the first node
+  int     nnodes;                   // number of nodes
+  double *cumul;                    // path length at the nodes
+}
+pathlength_table;
+
 extern int
 abscissa_to_pathlength (const trace_func * const func, gsl_vector * const data);
 
+extern const pathlength_table *
+get_pathlength_table (const trace_func * const func, const double xmin,
+		      const double xmax);
+
+extern double
+table_to_pathlength (const pathlength_table * const table, const double x);
+
+extern double
+table_to_abscissa (const pathlength_table * const table, const double tlength);
+
 #endif /* !_SPCE_PATHLENGTH_H */
@@ -229,7 +229,7 @@ fit_beamtrace(const aperture_conf  *conf, observation *obs,
   // the array with the trace locations
   // to improve the robustness of the result
   comp_kappasigma_interp(x, y, w, index, 1, N_KAPPASIG_ITER,
-			 N_KAPPASIG_SIG, obs, 0);
+			 N_KAPPASIG_SIG, obs, 0, NULL);
 
   // make a linear fit to the trace positions
   lin_fit = det_vector_linear(x, y, w, index, 0);
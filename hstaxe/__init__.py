@@ -1,21 +1,56 @@
 """
-import the toplevel functions and check the directory setup
+The hstaxe package
+
+Importing the package is cheap and has no side effects: the submodules
+and the tasks are imported on first access, and the aXe directories and
+the log file are set up when the first task is run.
 See LICENSE.txt
 """
-from pkg_resources import get_distribution, DistributionNotFound
+import importlib
+
+# the submodules and the attributes
+# which are imported on first access
+_submodules = ('axeerror', 'axesim', 'axesrc', 'config', 'utils')
+_attributes = {'axetasks': ('.axesrc', 'axetasks'),
+               'set_logging': ('.utils', 'set_logging')}
+
+
+def _get_version():
+    """Return the version of the installed package"""
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:
+        from pkg_resources import get_distribution as _distribution
+        from pkg_resources import DistributionNotFound as PackageNotFoundError
+
+        def version(name):
+            return _distribution(name).version
+
+    try:
+        release = version('hstaxe')
+    except PackageNotFoundError:
+        # package is not installed
+        return 'unknown'
+    return '.'.join(release.split('.')[:4])
 
-from . import config
-from .axesrc import axetasks
-from .utils import set_logging
 
-config.set_defaults()
-config.check_axe_dirs()
+def __getattr__(name):
+    if name in _submodules:
+        return importlib.import_module('.' + name, __name__)
+    if name in _attributes:
+        module, attribute = _attributes[name]
+        value = getattr(importlib.import_module(module, __name__), attribute)
+        globals()[name] = value
+        return value
+    if name == '__version__':
+        globals()['__version__'] = _get_version()
+        return globals()['__version__']
+    if name == '__githash__':
+        return ''
+    raise AttributeError("module {0!r} has no attribute {1!r}"
+                         .format(__name__, name))
 
 
-try:
-    release = get_distribution('hstaxe').version
-    __version__ = '.'.join(release.split('.')[:4])
-except DistributionNotFound:
-    # package is not installed
-    __version__ = 'unknown'
-    __githash__ = ''
+def __dir__():
+    return sorted(set(globals()) | set(_submodules) | set(_attributes) |
+                  {'__version__'})
@@ -5,9 +5,9 @@ from __future__ import (absolute_import, unicode_literals, division,
                         print_function)
 import os
 import shutil
-from .axeerror import aXeSIMError
-from ..axeutils import (getDATA, getOUTSIM, getCONF, get_random_filename,
-                        getSIMDATA, getOUTPUT, axe_setup)
+from ..axeerror import aXeSIMError
+from ..config import (getDATA, getOUTSIM, getCONF, get_random_filename,
+                      getSIMDATA, getOUTPUT, axe_setup)
 
 
 def simdata(incat=None, config=None, output_root=None, silent=True,
@@ -69,7 +69,7 @@ def simdata(incat=None, config=None, output_root=None, silent=True,
     bck_flux_dir: float
         flux in background for direct image
     """
-    from .inputchecks import InputChecker
+    from ..axesrc.inputchecks import InputChecker
 
     # give brief feedback
     print('\nSIMDATA: Starting ...')
@@ -207,7 +207,8 @@ def simdata(incat=None, config=None, output_root=None, silent=True,
 
 def simdirim(incat=None, config=None, tpass_direct=None, dirim_name=None,
              model_spectra=None, model_images=None, nx=None, ny=None,
-             exptime=None, bck_flux=0.0, silent=True):
+             exptime=None, bck_flux=0.0, silent=True, seed=None,
+             poisson=False):
     """
     Main function for the task SIMDIRIM
 
@@ -237,14 +238,19 @@ def simdirim(incat=None, config=None, tpass_direct=None, dirim_name=None,
     @type bck_flux: float
     @param silent: flag for silent run
     @type silen: boolean
+    @param seed: seed for the noise, the same seed gives the same noise
+    @type seed: int
+    @param poisson: flag for Poisson noise in all pixels
+    @type poisson: boolean
     """
     from . import interpolator
     from . import modspeclist
-    from . import axecommands
+    from ..axesrc import axecommands
     from . import realworld
-    from . import configfile
+    from ..axesrc import configfile
     from . import imagemaker
-    from .inputchecks import InputChecker
+    from . import simbatch
+    from ..axesrc.inputchecks import InputChecker
 
     # give brief feedback
     print('\nSIMDIRIM: Starting ...')
@@ -293,16 +299,24 @@ def simdirim(incat=None, config=None, tpass_direct=None, dirim_name=None,
         # background image
         bck_flux = getCONF(bck_flux)
 
-    # load the aXe configuration file
-    conf = configfile.ConfigFile(getCONF(config))
+    # the inputs shared within a batch of simulations
+    batch = simbatch.current_batch()
 
-    # make the simulation configuration
-    # file pointing the correct extensions
-    config_simul = conf.axesim_prep()
+    if batch is None:
+        # load the aXe configuration file
+        conf = configfile.ConfigFile(getCONF(config))
 
-    # delete the object
-    # explicitly
-    del conf
+        # make the simulation configuration
+        # file pointing the correct extensions
+        config_simul = conf.axesim_prep()
+
+        # delete the object
+        # explicitly
+        del conf
+    else:
+        # take the simulation configuration
+        # file prepared for the batch
+        config_simul = batch.get_simul_config(config)
 
     # load the simulation configuration file
     conf_simul = configfile.ConfigFile(getCONF(config_simul))
@@ -329,8 +343,8 @@ def simdirim(incat=None, config=None, tpass_direct=None, dirim_name=None,
     print("SIMDIRIM: Output dispersed image:\t{0:s}\n"
           .format(final_dirima_path))
 
-    # check whether the name ends with '.fits'
-    if ('.fits' in tpass_direct[-5:]):
+    # check whether the name does not end with '.fits'
+    if not tpass_direct.endswith('.fits'):
         # load the ascii list
         new_interp = interpolator.Interpolator(getSIMDATA(tpass_direct))
 
@@ -345,13 +359,18 @@ def simdirim(incat=None, config=None, tpass_direct=None, dirim_name=None,
         # overwrite the old name
         tpass_direct = os.path.basename(new_name)
 
-    # create the dummy image maker
-    i_maker = imagemaker.DummyImages(getCONF(config_simul),
-                                     dirname=dummy_dirima_path,
-                                     nx=nx,
-                                     ny=ny)
-    # nake the dummy images
-    i_maker.makeImages()
+    if batch is None:
+        # create the dummy image maker
+        i_maker = imagemaker.DummyImages(getCONF(config_simul),
+                                         dirname=dummy_dirima_path,
+                                         nx=nx,
+                                         ny=ny)
+        # nake the dummy images
+        i_maker.makeImages()
+    else:
+        # re-use the dummy images of the batch
+        i_maker = batch.get_dummy_images(config_simul, nx, ny,
+                                         dispersed=False)
 
     # load the model object table
     inobjects = modspeclist.ModelObjectTable(getDATA(incat))
@@ -370,10 +389,12 @@ def simdirim(incat=None, config=None, tpass_direct=None, dirim_name=None,
     dirmator.mopup()
 
     # delete the dummy images
-    i_maker.deleteImages()
+    if batch is None:
+        i_maker.deleteImages()
 
     # get the name of the result image, which is the contamination image
-    result_image = getOUTPUT(dirima_name.replace('.fits', '_2.CONT.fits'))
+    result_image = getOUTPUT(os.path.basename(i_maker.dirname)
+                             .replace('.fits', '_2.CONT.fits'))
 
     # convert the 'contamination' image into
     # a full output image with three extensions
@@ -383,7 +404,9 @@ def simdirim(incat=None, config=None, tpass_direct=None, dirim_name=None,
                                  exptime=exptime,
                                  bck_flux=bck_flux,
                                  rdnoise=conf_simul['RDNOISE'],
-                                 instrument=conf_simul['INSTRUMENT'])
+                                 instrument=conf_simul['INSTRUMENT'],
+                                 seed=seed,
+                                 poisson=poisson)
     rworld.make_real()
 
     # move the resulting image to the correct
@@ -398,7 +421,8 @@ def simdirim(incat=None, config=None, tpass_direct=None, dirim_name=None,
 def simdispim(incat=None, config=None, lambda_psf=None, dispim_name=None,
               model_spectra=None, model_images=None, nx=None, ny=None,
               exptime=None, bck_flux=0.0, extraction=True, extrfwhm=3.0,
-              orient=True, slitless_geom=True, adj_sens=True, silent=True):
+              orient=True, slitless_geom=True, adj_sens=True, silent=True,
+              seed=None, poisson=False):
     """
     Main function for the task SIMDISPIM
 
@@ -438,13 +462,18 @@ def simdispim(incat=None, config=None, lambda_psf=None, dispim_name=None,
     @type adj_sens: boolean
     @param silent: flag for silent run
     @type silen: boolean
+    @param seed: seed for the noise, the same seed gives the same noise
+    @type seed: int
+    @param poisson: flag for Poisson noise in all pixels
+    @type poisson: boolean
     """
     from . import imagemaker
     from . import modspeclist
-    from . import axecommands
+    from ..axesrc import axecommands
     from . import realworld
-    from . import configfile
-    from .inputchecks import InputChecker
+    from ..axesrc import configfile
+    from . import simbatch
+    from ..axesrc.inputchecks import InputChecker
 
     # give brief feedback
     print('\nSIMDISPIM: Starting ...')
@@ -501,16 +530,24 @@ def simdispim(incat=None, config=None, lambda_psf=None, dispim_name=None,
         # background image
         bck_flux = getCONF(bck_flux)
 
-    # load the aXe configuration file
-    conf = configfile.ConfigFile(getCONF(config))
+    # the inputs shared within a batch of simulations
+    batch = simbatch.current_batch()
 
-    # make the simulation configuration
-    # file pointing the correct extensions
-    config_simul = conf.axesim_prep()
+    if batch is None:
+        # load the aXe configuration file
+        conf = configfile.ConfigFile(getCONF(config))
 
-    # delete the object
-    # explicitly
-    del conf
+        # make the simulation configuration
+        # file pointing the correct extensions
+        config_simul = conf.axesim_prep()
+
+        # delete the object
+        # explicitly
+        del conf
+    else:
+        # take the simulation configuration
+        # file prepared for the batch
+        config_simul = batch.get_simul_config(config)
 
     # load the simulation configuration file
     conf_simul = configfile.ConfigFile(getCONF(config_simul))
@@ -552,11 +589,16 @@ def simdispim(incat=None, config=None, lambda_psf=None, dispim_name=None,
         print("SIMDISPIM: Output stamp images:\t({})"
               .format(final_grisima_path.replace(".fits", "_2.STP.fits")))
 
-    # create the dummy image maker
-    i_maker = imagemaker.DummyImages(getCONF(config_simul), dummy_grisima_path,
-                                     dummy_dirima_path, nx, ny)
-    # nake the dummy images
-    i_maker.makeImages()
+    if batch is None:
+        # create the dummy image maker
+        i_maker = imagemaker.DummyImages(getCONF(config_simul),
+                                         dummy_grisima_path,
+                                         dummy_dirima_path, nx, ny)
+        # nake the dummy images
+        i_maker.makeImages()
+    else:
+        # re-use the dummy images of the batch
+        i_maker = batch.get_dummy_images(config_simul, nx, ny)
 
     # load the model object table
     inobjects = modspeclist.ModelObjectTable(getDATA(incat))
@@ -570,7 +612,7 @@ def simdispim(incat=None, config=None, lambda_psf=None, dispim_name=None,
     grismator.mopup()
 
     # get the name of the result image, which is the contamination image
-    result_image = getOUTPUT(os.path.basename(dummy_grisima_path
+    result_image = getOUTPUT(os.path.basename(i_maker.griname
                                               ).replace(".fits",
                                                         "_2.CONT.fits"))
 
@@ -582,7 +624,9 @@ def simdispim(incat=None, config=None, lambda_psf=None, dispim_name=None,
                                  exptime=exptime,
                                  bck_flux=bck_flux,
                                  rdnoise=conf_simul["RDNOISE"],
-                                 instrument=conf_simul["INSTRUMENT"])
+                                 instrument=conf_simul["INSTRUMENT"],
+                                 seed=seed,
+                                 poisson=poisson)
     rworld.make_real()
 
     # move the resulting image to the correct
@@ -609,7 +653,8 @@ def simdispim(incat=None, config=None, lambda_psf=None, dispim_name=None,
         extractor.mopup()
 
     # delete the dummy images
-    i_maker.deleteImages()
+    if batch is None:
+        i_maker.deleteImages()
 
     # give brief feedback
     print('SIMDISPIM: Done ...')
@@ -1,10 +1,11 @@
 """
 See LICENSE.txt
 """
-from astropy.io import fits as pyfits
-from . import configfile
-from .axeerror import *
-from .axeutils import *
+import os
+import numpy as np
+from astropy.io import fits
+
+from ..axesrc import configfile
 
 class DummyImages(object):
     """
@@ -46,7 +47,7 @@ class DummyImages(object):
             self.griname  = griname
             self.gridata  = image_data['grism']
             self.WCSimage = griname
-            self.WCSext   = '[SCI]'
+            self.WCSext = 'SCI'
         else:
             self.griname = None
             self.gridata = None
@@ -56,7 +57,7 @@ class DummyImages(object):
         if dirname != None:
             self.dirname  = dirname
             self.WCSimage = dirname
-            self.WCSext   = '[SCI]'
+            self.WCSext = 'SCI'
 
             if image_data['direct'] != None:
                 self.dirdata  = image_data['direct']
@@ -192,63 +193,34 @@ class DummyImages(object):
         @param drzmeta: the list of drizzle metadata
         @type drzmeta: []
         """
-        from pyraf import iraf
-        from iraf import noao, artdata
-
         # delete a previous version
         if os.path.isfile(imgname):
             os.unlink(imgname)
 
-        # open a HDU-list
-        mex_hdu = pyfits.HDUList()
-
-        # create a primary HDU,
-        # append it to the list
-        hdrpr = pyfits.PrimaryHDU()
-        mex_hdu.append(hdrpr)
-
-        # go the the header and put
+        # create a primary HDU with
         # the exposure time
+        mex_hdu = fits.HDUList()
+        hdrpr = fits.PrimaryHDU()
+        mex_hdu.append(hdrpr)
         hdr = mex_hdu[0].header
-        hdr.update('EXPTIME', 1.0, 'dummy exposure time')
+        hdr['EXPTIME'] = (1.0, 'dummy exposure time')
 
-        if drzmeta != None:
+        if drzmeta is not None:
             # update the header
             for item in drzmeta:
-                hdr.update(item[0], item[1], item[2])
-
-
-        # write the image and close it
-        mex_hdu.writeto(imgname)
-        mex_hdu.close()
-
-        # get a random filename
-        tmpfile = get_random_filename('t', '.fits')
-
-        # create a tmp-image with the right dimension
-        iraf.mkpattern(input=tmpfile, output="", pattern="constant",
-                       option="replace", v1=0.0, v2=0.0, size=1,
-                       title="aXeSIM simulation", pixtype="real", ndim=2, ncols=nx,
-                       nlines=ny, n3=1, n4=1, n5=1, n6=1, n7=1, header="")
-
-        # copy the tmp-image to the empty dummy image
-        # as science extension
-        iraf.imcopy(input=tmpfile,
-                    output=(imgname+'[SCI,1,append]'),
-                    verbose='YES', Stdout=1)
+                hdr[item[0]] = (item[1], item[2])
 
-        # open the dummy image, go to the header
-        img = pyfits.open(imgname, 'update')
-        hdr = img[1].header
+        # an empty science extension
+        # with the right dimension
+        sci_hdu = fits.ImageHDU(data=np.zeros((ny, nx), dtype=np.float32),
+                                name='SCI', ver=1)
+        sci_hdu.header['TITLE'] = 'aXeSIM simulation'
 
         # update the header
         for item in metadata:
-            hdr.update(item[0], item[1], item[2])
+            sci_hdu.header[item[0]] = (item[1], item[2])
+        mex_hdu.append(sci_hdu)
 
-        # write to disk and close
-        img.flush()
-        img.close
-
-        # delete the tmp-image
-        if os.path.isfile(tmpfile):
-            os.unlink(tmpfile)
+        # write the image and close it
+        mex_hdu.writeto(imgname)
+        mex_hdu.close()
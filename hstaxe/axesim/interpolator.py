@@ -1,13 +1,13 @@
 """
 See LICENSE.txt
 """
-import copy
 import math
 import logging
 
+import numpy as np
 from astropy.io import fits
-from .. import axe_asciidata
-from ..axeerror import aXeError
+from astropy.table import Table
+from ..axeerror import aXeError, aXeSIMError
 
 from hstaxe.utils import set_logging
 
@@ -42,6 +42,10 @@ class Interpolator:
                 # load the data from the file
                 self._indep_data, self._depen_data = self._load_interp_fromfile(input_file)
 
+            # store the data as arrays
+            self._indep_data = np.asarray(self._indep_data, dtype=float)
+            self._depen_data = np.asarray(self._depen_data, dtype=float)
+
         # check whether two arrays are given
         elif ((indep is not None) and (depen is not None)):
             # set the file name to 'None'
@@ -58,15 +62,12 @@ class Interpolator:
         # store minimum and maximum of
         # independent values
         if len(self) > 0:
-            self.ind_min = self._indep_data[0]
-            self.ind_max = self._indep_data[len(self)-1]
+            self.ind_min = float(self._indep_data[0])
+            self.ind_max = float(self._indep_data[-1])
         else:
             self.ind_min = None
             self.ind_max = None
 
-        # initialize an accelerator
-        self.accelerator = 0
-
     def __getitem__(self, value):
         """The index operator for the class
 
@@ -76,30 +77,28 @@ class Interpolator:
 
         Parameters
         ----------
-        value: float
-            independent value to derive dependent value for
+        value: float or numpy.ndarray
+            independent value(s) to derive dependent value(s) for
 
         Returns
         -------
-        float: the interpolated value at the position of the input
+        float or numpy.ndarray: the interpolated value(s) at the
+            position(s) of the input
         """
-        # check the input against the extremies
-        if ((value < self.ind_min) or (value > self.ind_max)):
+        values = np.asarray(value, dtype=float)
+
+        # check the input against the extremies; np.interp
+        # would return the end values outside the range
+        if not np.all((values >= self.ind_min) & (values <= self.ind_max)):
             error_message = ("\nThe requested value: {0:s} is outside the "
                              "covered range!".format(str(value)))
             raise aXeSIMError(error_message)
 
-        # find the right location within the
-        # independent values
-        index = self._get_indep_index(value)
-
-        # get the fraction covered on the independend interval
-        factor = ((value - self._indep_data[index-1]) /
-                  (self._indep_data[index] - self._indep_data[index-1]))
-
-        # calculate and return the ionterpolated value
-        return (self._depen_data[index-1] + factor *
-                (self._depen_data[index] - self._depen_data[index-1]))
+        # interpolate linearly, all values are in the range
+        result = np.interp(values, self._indep_data, self._depen_data)
+        if result.ndim == 0:
+            return float(result)
+        return result
 
     def __len__(self):
         """The length operator for the class
@@ -124,16 +123,10 @@ class Interpolator:
         -------
         str: the string representation of the interpolator instance
        """
-        # initialize the string
-        bigstr = ""
-
-        # go over all data
-        for index in range(len(self)):
-            # add to the string
-            bigstr += "{0:e} {1:e}\n".format(self._indep_data[index],
-                                             self._depen_data[index])
-        # return the large string
-        return bigstr
+        # add all value pairs
+        return "".join("{0:e} {1:e}\n".format(indep, depen)
+                       for indep, depen in zip(self._indep_data,
+                                               self._depen_data))
 
     def __deepcopy__(self, memo):
         """The deep copy method of the class instance
@@ -148,12 +141,58 @@ class Interpolator:
         Returns: Interpolator
             returns the deep copy of the instance
         """
-        # make deep copies of the ingredients
-        indep = copy.deepcopy(self._indep_data)
-        depen = copy.deepcopy(self._depen_data)
-
         # create and return a new object
-        return Interpolator(indep=indep, depen=depen)
+        # from copies of the ingredients
+        return self._from_arrays(self._indep_data.copy(),
+                                 self._depen_data.copy())
+
+    @classmethod
+    def _from_arrays(cls, indep, depen):
+        """Create an interpolator from checked data arrays
+
+        Parameters
+        ----------
+        indep: numpy.ndarray
+            the rising independent data
+        depen: numpy.ndarray
+            the dependent data
+
+        Returns: the new Interpolator
+        """
+        new_interp = cls.__new__(cls)
+        new_interp.input_file = None
+        new_interp._indep_data = indep
+        new_interp._depen_data = depen
+        if len(indep) > 0:
+            new_interp.ind_min = float(indep[0])
+            new_interp.ind_max = float(indep[-1])
+        else:
+            new_interp.ind_min = None
+            new_interp.ind_max = None
+        return new_interp
+
+    def _common_indep(self, in_object):
+        """Compose the independent data for a product or ratio
+
+        The independent data is the union of the independent data
+        of both interpolators inside the range covered by both.
+
+        Parameters
+        ----------
+        in_object: Interpolator
+            the other interpolator
+
+        Returns: the independent data
+        """
+        # determine the min and max for the product
+        ind_min = max(self.ind_min, in_object.ind_min)
+        ind_max = min(self.ind_max, in_object.ind_max)
+
+        # compose the sorted, unique independent data
+        indep = np.union1d(self._indep_data, in_object._indep_data)
+
+        # clip to the common range
+        return indep[(indep >= ind_min) & (indep <= ind_max)]
 
     def __mul__(self, in_object):
         """Defines multiplicator for the class
@@ -171,46 +210,15 @@ class Interpolator:
 
         Returns: the product of two Interpolator
         """
-
-        # determine the min and max for the product
-        ind_min = max(self.ind_min, in_object.ind_min)
-        ind_max = min(self.ind_max, in_object.ind_max)
-
         # compose the independent data for the mult
-        indep = copy.deepcopy(self._indep_data)
-        indep.extend(in_object._indep_data)
-        indep.sort()
-
-        # initialize the backward index
-        r_index = len(indep)-1
-
-        # go over the new array;
-        # clean the independent vector
-        for index in range(1, len(indep)):
-            # check the boundaries
-            if indep[r_index] > ind_max:
-                del indep[r_index]
-            elif indep[r_index] < ind_min:
-                del indep[r_index]
-            # check for repetition
-            elif indep[r_index] == indep[r_index-1]:
-                del indep[r_index]
-
-            # adjust the index
-            r_index -= 1
-
-        # check the last element independently
-        if indep[0] > ind_max or indep[0] < ind_min:
-            del indep[0]
+        indep = self._common_indep(in_object)
 
         # build up the array with
         # the dependent values
-        depen = []
-        for item in indep:
-            depen.append(self[item]*in_object[item])
+        depen = self[indep] * in_object[indep]
 
         # return a new array
-        return Interpolator(indep=indep, depen=depen)
+        return self._from_arrays(indep, depen)
 
     def __div__(self, in_object):
         """Defines division for the class
@@ -228,54 +236,23 @@ class Interpolator:
 
         Returns: the product of two Interpolators
         """
-        import copy
+        # compose the independent data for the division
+        indep = self._common_indep(in_object)
 
-        # determine the min and max for the product
-        ind_min = max(self.ind_min, in_object.ind_min)
-        ind_max = min(self.ind_max, in_object.ind_max)
+        # check for 0.0
+        divisor = in_object[indep]
+        if np.any(divisor == 0.0):
+            err_msg = 'Value 0.0 in divisor!'
+            raise aXeSIMError(err_msg)
 
-        # compose the independent data for the mult
-        indep = copy.deepcopy(self._indep_data)
-        indep.extend(in_object._indep_data)
-        indep.sort()
-
-        # initialize the backward index
-        r_index = len(indep)-1
-
-        # go over the new array;
-        # clean the independent vector
-        for index in range(1, len(indep)):
-            # check the boundaries
-            if indep[r_index] > ind_max:
-                del indep[r_index]
-            elif indep[r_index] < ind_min:
-                del indep[r_index]
-            # check for repetition
-            elif indep[r_index] == indep[r_index-1]:
-                del indep[r_index]
-
-            # adjust the index
-            r_index -= 1
-
-        # check the last element independently
-        if indep[0] > ind_max or indep[0] < ind_min:
-            del indep[0]
-
-        # build up the array with
-        # the dependent values
-        depen = []
-        for item in indep:
-
-            # check for 0.0
-            if in_object[item] == 0.0:
-                err_msg = 'Value 0.0 in divisor!'
-                raise aXeSIMError(err_msg)
-
-            # make the division
-            depen.append(self[item] / in_object[item])
+        # make the division
+        depen = self[indep] / divisor
 
         # return a new array
-        return Interpolator(indep=indep, depen=depen)
+        return self._from_arrays(indep, depen)
+
+    # the division operator in python 3
+    __truediv__ = __div__
 
     def _load_interp_fromfile(self, input_file):
         """Load the interpolator from an ASCII file
@@ -291,13 +268,11 @@ class Interpolator:
         Returns: the interpolator with the data
         """
         # load the data file
-        indata = axe_asciidata.open(input_file)
-
-        # check the input
-        self._check_input(indata, input_file)
+        indata = Table.read(input_file, format='ascii.no_header')
 
+        # check the input and
         # return the column data
-        return indata[0]._data, indata[1]._data
+        return self._check_input(indata, input_file)
 
     def _load_interp_fromfits(self, fits_file):
         """Load the interpolator from an ASCII file
@@ -312,36 +287,30 @@ class Interpolator:
 
         Returns: the interpolator with the data
         """
-        # open the fits file
-        infits = fits.open(fits_file, mode='readonly')
-
+        # open the fits file and
         # go to the table data
-        tabdata = infits[1].data
-
-        # create a new asciidata structure
-        indata = axe_asciidata.create(2, len(tabdata.field(0)))
-
-        # go over the new table
-        for index in range(indata.nrows):
-            # transfer data from the fits table to the ascii table
-            try:
-                indata[0][index] = float(tabdata.field(0)[index])
-            except ValueError:
-                msg = ("\nColumn 0 of file: {0:s} contains wrong type!"
-                       .format(fits_file))
-                raise aXeSIMError(msg)
-            try:
-                indata[1][index] = float(tabdata.field(1)[index])
-            except ValueError:
-                msg = ("\nColumn 1of file: {0:s} contains wrong type!"
-                       .format(fits_file))
-                raise aXeSIMError(msg)
+        with fits.open(fits_file, mode='readonly') as infits:
+            tabdata = infits[1].data
+
+            # transfer the columns to float arrays
+            columns = []
+            for index in range(2):
+                try:
+                    columns.append(np.array(tabdata.field(index),
+                                            dtype=float))
+                except (ValueError, TypeError):
+                    msg = ("\nColumn {0:d} of file: {1:s} contains wrong type!"
+                           .format(index, fits_file))
+                    raise aXeSIMError(msg)
 
-        # check the input
-        self._check_input(indata, fits_file)
+        # check for rising independent data
+        if np.any(np.diff(columns[0]) <= 0.0):
+            msg = ("\nIndependent column data in file: {0:s}"
+                   " is not monotonically rising!".format(fits_file))
+            raise aXeSIMError(msg)
 
         # return the column data
-        return indata[0]._data, indata[1]._data
+        return columns[0], columns[1]
 
     def _load_interp_fromlist(self, indep_data, depen_data):
         """Creates an interpolator from data lists
@@ -357,84 +326,43 @@ class Interpolator:
         @return: the interpolator with the data
         @rtype: Interpolator
         """
-        # initialize new vectors
-        out_indep = []
-        out_depen = []
-
         # check the length of the lists
         if len(indep_data) != len(depen_data):
             error_message = '\nData length is inhomogeneous!'
             raise aXeSIMError(error_message)
 
-        # go over all rows
-        for index in range(len(indep_data)):
-
-            # check for None-entries
-            if ((indep_data[index] is None) or (depen_data[index] is None)):
-                raise aXeSIMError("Data contains NULL entries!")
-
-            # test conversion to float
-            try:
-                tmp = float(indep_data[index])
-            except ValueError:
-                msg = ("\nValue: {0:s} is not convertible to float!"
-                       .format(str(indep_data[index])))
-                raise aXeSIMError(msg)
-
-            # test conversion to float
-            try:
-                tmp = float(depen_data[index])
-            except ValueError:
-                msg = ("\nValue: {0:s} is not convertible to float!"
-                       .format(str(depen_data[index])))
-                raise aXeSIMError(msg)
-
-            # check for ascending order
-            if index > 0:
-                # check that independent data is rising
-                if indep_data[index] <= indep_data[index-1]:
-                    raise aXeSIMError("\nIndependent column data is not"
-                                      "monotonically rising!")
+        # convert the data to float arrays
+        try:
+            out_indep = np.array(indep_data, dtype=float)
+            out_depen = np.array(depen_data, dtype=float)
+        except (ValueError, TypeError):
+            out_indep = None
+
+        # find the offending value; None
+        # entries are converted to NaN
+        if (out_indep is None or np.isnan(out_indep).any() or
+                np.isnan(out_depen).any()):
+            for value in list(indep_data) + list(depen_data):
+                # check for None-entries
+                if value is None:
+                    raise aXeSIMError("Data contains NULL entries!")
+
+                # test conversion to float
+                try:
+                    float(value)
+                except (ValueError, TypeError):
+                    msg = ("\nValue: {0:s} is not convertible to float!"
+                           .format(str(value)))
+                    raise aXeSIMError(msg)
 
-            # append the values to the arrays
-            out_indep.append(float(indep_data[index]))
-            out_depen.append(float(depen_data[index]))
+        # check that independent data is rising
+        if np.any(np.diff(out_indep) <= 0.0):
+            raise aXeSIMError("\nIndependent column data is not"
+                              "monotonically rising!")
 
         # return the new arrays
         return out_indep, out_depen
 
-    def _get_indep_index(self, value):
-        """Locate the correct index
-
-        The method locates the 'index' for the independent data which
-        has "indep_data[index] <= value indep_data[index+1]".
-        The approximate index postition "self.accelerator" is used as
-        a starting point.
-
-        Parameters
-        ----------
-        value: str
-            the list with dependent data
-
-        Returns: index position for the independent data
-        """
-        # check whether you have to search upwards or downwards
-        if value > self._indep_data[self.accelerator]:
-            # in case that you search upwards, go up
-            # the independent values until you find the right interval
-            self.accelerator += 1
-            while value > self._indep_data[self.accelerator]:
-                self.accelerator += 1
-        else:
-            # in case that you search downwards, go down
-            # the independent values  until you find the right interval
-            #    while(wavelength < resp->spec[nact-1].lambda_mean)
-            while value < self._indep_data[self.accelerator-1]:
-                self.accelerator -= 1
-
-        # return the position
-        return self.accelerator
-
     def _check_input(self, indata, input_file):
         """Check whether the input valid
 
@@ -444,55 +372,43 @@ class Interpolator:
 
         Parameters
         ----------
-        indata: axe_asciidata.AsciiData()
-            the list with dependent data
+        indata: astropy.table.Table
+            the table with the independent and dependent data
         input_file: str
             the input file name
-        """
-        # check the type of first column
-        if isinstance(float, indata[0].get_type()):
-
-            # check whether it is int
-            if isinstance(int, indata[0].get_type()):
-                # go over the column
-                for index in range(indata.nrows):
-                    # convert to float
-                    indata[0][index] = float(indata[0][index])
-            else:
-                msg = ("\nColumn 0 of file: {0:s}} contains wrong "
-                       "type!".format(input_file))
-                raise aXeSIMError(msg)
 
-        # check the type of second column
-        if isinstance(float, indata[1].get_type()):
-
-            # check whether it is int
-            if (isinstance(int, indata[1].get_type())):
-                # go over the column
-                for index in range(indata.nrows):
-                    # convert to float
-                    indata[1][index] = float(indata[1][index])
-            else:
-                msg = ("\nColumn 1 of file: {0:s} contains wrong type!"
-                       .format(input_file))
+        Returns: the independent and dependent data
+        """
+        # check the number of columns
+        if len(indata.columns) < 2:
+            msg = ("\nFile: {0:s} needs two columns!".format(input_file))
+            raise aXeSIMError(msg)
+
+        columns = []
+        for index in range(2):
+            column = indata.columns[index]
+
+            # check the type, int is converted
+            if column.dtype.kind not in 'iuf':
+                msg = ("\nColumn {0:d} of file: {1:s} contains wrong type!"
+                       .format(index, input_file))
                 raise aXeSIMError(msg)
 
-        # go over all rows
-        for index in range(indata.nrows):
-
             # check for None-entries
-            if ((indata[0][index] is None) or (indata[1][index] is None)):
-                msg = ("\nData in file: {0:s} contains NULL"
+            if np.any(getattr(column, 'mask', False)):
+                msg = ("\nData in file: {0:s} contains NULL "
                        "entries!".format(input_file))
                 raise aXeSIMError(msg)
 
-            # check for ascending order
-            if index > 0:
-                # check that independent data is rising
-                if indata[0][index] <= indata[0][index-1]:
-                    msg = ("\nIndependent column data in file: {0:s}"
-                           " is not monotonically rising!".format(input_file))
-                    raise aXeSIMError(msg)
+            columns.append(np.array(column, dtype=float))
+
+        # check that independent data is rising
+        if np.any(np.diff(columns[0]) <= 0.0):
+            msg = ("\nIndependent column data in file: {0:s}"
+                   " is not monotonically rising!".format(input_file))
+            raise aXeSIMError(msg)
+
+        return columns[0], columns[1]
 
     def _get_fits_name(self, fits_name):
         """Determine the proper fits name
@@ -563,24 +479,10 @@ class Interpolator:
         # get the fits name
         out_name = self._get_fits_name(fits_name)
 
-        # create a new table
-        out_tab = axe_asciidata.create(2, len(self))
-
-        # go over all data
-        for index in range(len(self)):
-            # store the data in the table
-            out_tab[0][index] = self._indep_data[index]
-            out_tab[1][index] = self._depen_data[index]
-
-        # rename the columns, if
-        # there are names
-        if colname1 is not None:
-            out_tab[0].rename(colname1)
-        if colname2 is not None:
-            out_tab[1].rename(colname2)
-
         # write the table to fits
-        out_tab.writetofits(out_name)
+        fits.HDUList([fits.PrimaryHDU(),
+                      self.tofits(colname1, colname2)]).writeto(out_name,
+                                                                overwrite=True)
 
         # return the fits name
         return out_name
@@ -603,17 +505,10 @@ class Interpolator:
             the file name
         """
 
-        # create a new table
-        out_tab = axe_asciidata.create(2, len(self))
-
-        # go over all data
-        for index in range(len(self)):
-            # store the data in the table
-            out_tab[0][index] = self._indep_data[index]
-            out_tab[1][index] = self._depen_data[index]
-
-        # write the table to fits
-        out_tab.writeto(filename)
+        # write the data as
+        # a table without header
+        Table([self._indep_data, self._depen_data]).write(
+            filename, format='ascii.no_header', overwrite=True)
 
         # return the fits name
         return filename
@@ -629,24 +524,10 @@ class Interpolator:
         @return: the integral over the interpolator values
         @rtype: float
         """
-        # initialize the
-        # integrated value
-        integral = 0.0
-
-        # go over all data
-        for index in range(1, len(self)-1):
-            # add the increment
-            integral += self._depen_data[index] * (self._indep_data[index+1] -
-                                                   self._indep_data[index-1])
-
-        # dont forget the start and end piece
-        integral += self._depen_data[0] * (self._indep_data[1] -
-                                           self._indep_data[0])
-        integral += self._depen_data[len(self)-1] * (self._indep_data[len(self)-1] - self._indep_data[len(self)-2])
-
-        # return the integral,
-        # correcting the bin extension
-        return integral/2.0
+        # sum up the trapezoids
+        # between the data points
+        return float(np.sum((self._depen_data[1:] + self._depen_data[:-1]) *
+                            np.diff(self._indep_data)) / 2.0)
 
     def toSensitivity(self, A=None):
         """Transfer the bandpass to sensitivity
@@ -666,14 +547,11 @@ class Interpolator:
         if A is None:
             A = math.pi * 120.0 * 120.0
 
-        # go over all data
-        for index in range(len(self)):
-
-            # compute the conversion factor
-            factor = A / (h_erg * c_cm / (1.0E-08 * self._indep_data[index]))
+        # compute the conversion factors
+        factor = A / (h_erg * c_cm / (1.0E-08 * self._indep_data))
 
-            # apply the conversion factor
-            self._depen_data[index] = self._depen_data[index] * factor
+        # apply the conversion factors
+        self._depen_data = self._depen_data * factor
 
     def toThroughput(self, A=None):
         """Transfer the sensitivity to a passband
@@ -694,14 +572,11 @@ class Interpolator:
         if A is None:
             A = math.pi * 120.0 * 120.0
 
-        # go over all data
-        for index in range(len(self)):
+        # compute the conversion factors
+        factor = A / (h_erg * c_cm / (1.0E-08 * self._indep_data))
 
-            # compute the conversion factor
-            factor = A / (h_erg * c_cm / (1.0E-08 * self._indep_data[index]))
-
-            # apply the conversion factor
-            self._depen_data[index] = self._depen_data[index] / factor
+        # apply the conversion factors
+        self._depen_data = self._depen_data / factor
 
     def tonm(self):
         """Transfer the independent column to unit [nm]
@@ -731,23 +606,15 @@ class Interpolator:
         table.hdu()
             the interpolator as fits table extension
         """
-        # create a new ascii table
-        new_table = axe_asciidata.create(2, len(self))
-
-        # go over all data
-        for index in range(len(self)):
-            # transfer the values
-            new_table[0][index] = self._indep_data[index]
-            new_table[1][index] = self._depen_data[index]
-
-        # re-name the table column
-        if colname1 is not None:
-            new_table[0].rename(colname1)
-        if colname2 is not None:
-            new_table[1].rename(colname2)
+        # create the columns, using the
+        # default names if not given
+        columns = [fits.Column(name=colname1 or 'column1', format='D',
+                               array=self._indep_data),
+                   fits.Column(name=colname2 or 'column2', format='D',
+                               array=self._depen_data)]
 
         # return the fits version
-        return new_table.tofits()
+        return fits.BinTableHDU.from_columns(columns)
 
     def mult_indep(self, factor):
         """Multipy the independent column
@@ -761,10 +628,8 @@ class Interpolator:
         @return: None
         @rtype: None
         """
-        # go over all data
-        for index in range(len(self)):
-            # apply the conversion factor
-            self._indep_data[index] = self._indep_data[index] * factor
+        # apply the conversion factor
+        self._indep_data = self._indep_data * factor
 
         # also adjust the min and max
         self.ind_min = self.ind_min * factor
@@ -781,10 +646,8 @@ class Interpolator:
         factor: float
             multiplication factor
         """
-        # go over all data
-        for index in range(len(self)):
-            # apply the conversion factor
-            self._depen_data[index] = self._depen_data[index] * factor
+        # apply the conversion factor
+        self._depen_data = self._depen_data * factor
 
     def pivot(self):
         """Compute the pivot wavelength
@@ -797,18 +660,11 @@ class Interpolator:
         pivot: float
             the pivot wavelength
         """
-        import copy
-        import math
-
-        # create two copies
-        nomin = copy.deepcopy(self)
-        denom = copy.deepcopy(self)
-
-        # go over all points
-        for index in range(len(nomin)):
-            # build the nominator and denominator interpolator
-            nomin._depen_data[index] = nomin._depen_data[index] * nomin._indep_data[index]
-            denom._depen_data[index] = denom._depen_data[index] / denom._indep_data[index]
+        # build the nominator and denominator interpolator
+        nomin = self._from_arrays(self._indep_data,
+                                  self._depen_data * self._indep_data)
+        denom = self._from_arrays(self._indep_data,
+                                  self._depen_data / self._indep_data)
 
         # compute the pivot wavelength
         pivot = math.sqrt(nomin.integrate()/denom.integrate())
@@ -825,17 +681,8 @@ class Interpolator:
         f_lambda is applied!
 
         """
-        # go over all data
-        for index in range(len(self)):
-
-            # extract the f_nu value
-            fnu = self._depen_data[index]
-
-            # extract the wavelength, converted to nm
-            wlength = self._indep_data[index] / 10.0
-
-            # compute the corresponding f_lambda value
-            flambda = 2.99792458e+16*fnu/(wlength*wlength)
+        # extract the wavelength, converted to nm
+        wlength = self._indep_data / 10.0
 
-            # set the f_lambda value
-            self._depen_data[index] = flambda
+        # compute and set the corresponding f_lambda values
+        self._depen_data = 2.99792458e+16*self._depen_data/(wlength*wlength)
@@ -2,14 +2,14 @@
 See LICENSE.txt
 """
 import os
-import sys
 import math
 from astropy.io import fits
-from stwcs.wcsutil import HSTWCS
+from astropy.table import Table
+from astropy.wcs import WCS
 from hstaxe.axeerror import aXeSIMError
-from hstaxe.axesrc.axeiol import InputObjectList
 
-class MagColList(InputObjectList):
+
+class MagColList:
     """Subclass for lists with magnitude columns
 
     This class loads ASCII tables and identifies the magnitude colunmns,
@@ -32,7 +32,10 @@ class MagColList(InputObjectList):
         mag_wavelength: float
             special wavelength
         """
-        super(InputObjectList, self).__init__(filename=filename)
+        self.filename = filename
+
+        # read the SExtractor table
+        self.catalog = Table.read(filename, format='ascii.sextractor')
 
         # initialize the dictionary
         # with indices of required columns
@@ -57,13 +60,53 @@ class MagColList(InputObjectList):
                        .format(self.filename))
             raise aXeSIMError(err_msg)
 
-        # this check should be removed
-        # at some time.....
-        # check that there is at leas one row
-        if (len(self.header) > 0):
-            err_msg = ("\nThe table: {0:s} must not contain header comments!"
-                       .format(self.filename))
-            raise aXeSIMError(err_msg)
+    @property
+    def nrows(self):
+        """The number of rows in the table"""
+        return len(self.catalog)
+
+    @property
+    def ncols(self):
+        """The number of columns in the table"""
+        return len(self.catalog.colnames)
+
+    def __getitem__(self, key):
+        """Return a column, given by index or by name"""
+        if isinstance(key, str):
+            return self.catalog[key]
+        return self.catalog.columns[key]
+
+    def find(self, colname):
+        """Return the index of a column, -1 if it does not exist"""
+        if colname in self.catalog.colnames:
+            return self.catalog.colnames.index(colname)
+        return -1
+
+    def add_column(self, colname, dtype=float):
+        """Add a column filled with zeros, if it does not yet exist"""
+        if self.find(colname) < 0:
+            self.catalog[colname] = [0] * self.nrows
+            self.catalog[colname] = self.catalog[colname].astype(dtype)
+
+    def writeto(self, filename):
+        """Write the table as a SExtractor catalogue
+
+        Parameters
+        ----------
+        filename: str
+            the name of the output file
+        """
+        with open(filename, 'w') as outfile:
+            # the SExtractor header with
+            # the column numbers and names
+            for index, colname in enumerate(self.catalog.colnames):
+                outfile.write("# {0:d} {1:s}\n".format(index+1, colname))
+            for row in self.catalog:
+                outfile.write(" ".join(str(value) for value in row) + "\n")
+
+    def flush(self):
+        """Write the table back to its file"""
+        self.writeto(self.filename)
 
     def _find_required_columns(self, columnList):
         """Search and store the index of a list of required columns
@@ -148,7 +191,7 @@ class MagColList(InputObjectList):
         for index in range(self.ncols):
 
             # get the column name
-            colname = self[index].colname
+            colname = self.catalog.colnames[index]
 
             # try to decode the wavelength
             wave = self._get_wavelength(colname)
@@ -287,6 +330,9 @@ class ModelSpectrumList(MagColList):
         The method sets all values in the column "MODSPEC" to
         the value 0.
         """
+        # make sure the column exists
+        self.add_column("MODSPEC", dtype=int)
+
         # go over all rows
         for index in range(self.nrows):
             # set the entries to 0
@@ -359,22 +405,22 @@ class ModelObjectTable(MagColList):
             the reference image with WCS
         WCSext: str
             the extension to use
-
-
-        ra_dec = iraf.xy2rd(infile=WCSimage, x=self['X_IMAGE'][index],\
-                            y=, hms='NO', Stdout=1)
         """
-
         # check that the image exists
         if not os.path.isfile(WCSimage):
             err_msg = "The WCS image: {0:s} does not exist!".format(WCSimage)
             raise aXeSIMError(err_msg)
 
-        # append the image extesnion
+        # load the WCS from the image extesnion
         if WCSext is not None:
-            WCSimage = fits.getheader(WCSimage, ext=WCSext)
+            wcs = WCS(fits.getheader(WCSimage, extname=WCSext))
         else:
-            WCSimage = fits.getheader(WCSimage)
+            wcs = WCS(fits.getheader(WCSimage))
+
+        # make sure the world columns exist
+        for colname in ['X_WORLD', 'Y_WORLD', 'A_WORLD', 'B_WORLD',
+                        'THETA_WORLD']:
+            self.add_column(colname)
 
         # go over all rows
         for index in range(self.nrows):
@@ -387,8 +433,8 @@ class ModelObjectTable(MagColList):
             self['THETA_WORLD'][index] = self['THETA_IMAGE'][index]
 
             # transform x,y to ra and dec
-            ra, dec = WCSimage.all_world2pix(self['Y_IMAGE'][index],
-                                             self['X_IMAGE'][index])
+            ra, dec = wcs.all_pix2world(self['X_IMAGE'][index],
+                                        self['Y_IMAGE'][index], 1)
 
             # store ra and dec
             self['X_WORLD'][index] = float(ra)
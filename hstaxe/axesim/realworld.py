@@ -5,18 +5,20 @@ from __future__ import (absolute_import, unicode_literals, division,
                         print_function)
 import os
 import sys
-from copy import deepcopy
 import numpy as np
 from astropy.io import fits
 
 from ..axeerror import aXeSIMError
-from ..axeutils import get_random_filename
+
+# pixel values [e] above which the photon
+# noise is drawn from a Gaussian
+GAUSS_LIMIT = 20.0
 
 
 class RealWorld(object):
     """Class to add poisson noise"""
     def __init__(self, image_name, extname='0', exptime=1.0, bck_flux=0.0,
-                 rdnoise=0.0, instrument=None):
+                 rdnoise=0.0, instrument=None, seed=None, poisson=False):
         """Initializes the RealWorld class
 
         The various input for the noise model is passed as
@@ -31,23 +33,37 @@ class RealWorld(object):
             the extension to use
         exptime: float
             he exposure time in seconds
-        bck_flux: float
-            the background flux in electrons
+        bck_flux: float or str
+            the background flux in electrons or
+            the name of a background image
         rdnoise: float
             the readout noise in electrons
+        instrument: str
+            the instrument name for the header
+        seed: int or numpy.random.Generator
+            seed or generator for the noise; the same
+            seed gives the same noise
+        poisson: bool
+            draw the photon noise of all pixels from a Poisson
+            distribution instead of using the Gaussian approximation
+            for the bright pixels
         """
         # check whether the image exists
         if not os.path.isfile(image_name):
             err_msg = ("\nImage: {0:s} does not exist!".format(image_name))
             raise aXeSIMError(err_msg)
 
-        # save the parameters
+        # save the parameters;
+        # a number is an extension index
         self.image_name = image_name
+        if isinstance(extname, str) and extname.isdigit():
+            extname = int(extname)
         self.extname = extname
         self.exptime = exptime
+        self.poisson = poisson
 
-        # determine and store the image dimensions
-        self.dimension = self._get_dimension(self.image_name, self.extname)
+        # the source of the random numbers
+        self.rng = np.random.default_rng(seed)
 
         # store the parameter for
         # the default background;
@@ -61,7 +77,7 @@ class RealWorld(object):
         # the CR-boolean
         # convert 'None' to default
         if (rdnoise is not None):
-            self.rdnoise = rdnoise
+            self.rdnoise = float(rdnoise)
         else:
             self.rdnoise = 0.0
 
@@ -72,88 +88,80 @@ class RealWorld(object):
         else:
             self.instrument = 'aXeSIM'
 
-    def _set_keywords(self):
+    def _set_keywords(self, header):
         """Set header kewords in output image
 
         The method sets header keywords in the zero extension
         header of the output image.
-        """
-
-        # open the fits image
-        inima = fits.open(self.image_name, 'update')
 
+        Parameters
+        ----------
+        header: fits.Header
+            the zero extension header
+        """
         # write the instrument name in the header
-        inima[0].header['INSTRUME'] = (self.instrument, 'instrument name')
+        header['INSTRUME'] = (self.instrument, 'instrument name')
 
         # write the exposure time in the header;
         # 'None' is converted to 1.0
         if (self.exptime is None):
-            inima[0].header['EXPTIME'] = (1.0, 'default exposure time')
+            header['EXPTIME'] = (1.0, 'default exposure time')
         else:
-            inima[0].header['EXPTIME'] = (self.exptime, 'exposure time')
-
-        # close the image
-        inima.close()
+            header['EXPTIME'] = (self.exptime, 'exposure time')
 
-    def _compose_multiext_image(self, sci_ext, err_ext, dq_ext, del_input=1):
+    def _compose_multiext_image(self, in_image, sci_ext, err_ext, dq_ext):
         """
         Compose the multi-extension image from individual layers
 
+        The layers replace the extensions SCI, ERR and DQ of the
+        input image or are appended to it, and the image is
+        written once.
+
         Parameters
         ----------
-        sci_ext: str
-            the science extension image
-        err_ext: str
-            the error extension image
-        dq_ext: str
-            the dq extension image
+        in_image: fits.HDUList
+            the input image, loaded into memory
+        sci_ext: numpy.ndarray
+            the science extension
+        err_ext: numpy.ndarray
+            the error extension
+        dq_ext: numpy.ndarray
+            the dq extension
         """
         # set the various keywords
-        self._set_keywords()
+        self._set_keywords(in_image[0].header)
 
         # put the noisy stuff on the input image,
-        # replacing the original first extension
-        current_image = fits.open(self.image_name, mode='update')
-        current_image['SCI'].data = sci_ext
-        current_image['ERR'].data = err_ext
-        current_image['DQ'].data = dq_ext
-        current_image.close()
-
-        # delete the input images,
-        # if reuqested
-        if del_input:
-            os.unlink(sci_ext)
-            os.unlink(err_ext)
-            os.unlink(dq_ext)
-
-    def _get_dimension(self, image_name, extname):
-        """Get the image dimension
+        # replacing the original extensions
+        for extname, data in (('SCI', sci_ext), ('ERR', err_ext),
+                              ('DQ', dq_ext)):
+            if extname in in_image:
+                in_image[extname].data = data
+            else:
+                in_image.append(fits.ImageHDU(data=data, name=extname))
 
-        Parameters
-        ----------
-        image_name: str
-            the name of the image
-        extname: str
-            the extension name
+        in_image.writeto(self.image_name, overwrite=True)
+
+    def _get_background(self):
+        """Get the background flux
 
         Returns
         -------
-        dimension: (int, int)
-            the image-dimension (yaxis, xaxis)
+        bck_flux: float or numpy.ndarray
+            the background flux, for a background
+            image the array of its first extension
+            with data
         """
-        # open the fits
-        f_img = fits.open(image_name)
+        if not isinstance(self.bck_flux, str):
+            return float(self.bck_flux)
 
-        # extract the image dimension
-        dimension = f_img[extname].data.shape
-
-        # close the image
-        f_img.close()
-
-        # return the dimension
-        return dimension
+        if not os.path.isfile(self.bck_flux):
+            err_msg = ("\nBackground image: {0:s} does not exist!"
+                       .format(self.bck_flux))
+            raise aXeSIMError(err_msg)
+        return fits.getdata(self.bck_flux).astype(np.float64)
 
-    def _make_real_sciimage(self, in_image, bck_flux, exptime):
+    def _make_real_sciimage(self, in_data, bck_flux, exptime):
         """Create the science extension
 
         Starting from a simulated image in [e/s], the module adds
@@ -161,45 +169,33 @@ class RealWorld(object):
 
         Parameters
         ----------
-        in_image: str
+        in_data: numpy.ndarray
             the simulated image
-        bck_flux: float
+        bck_flux: float or numpy.ndarray
             background flux [e/s]
         exptime: float
             the exposure time
 
         Returns
         -------
-        tmpfile1: str
-            The name of the output file
-
+        sci_ext: numpy.ndarray
+            the science image in [e]
         """
-        # get a random filename
-        tmpfile1 = get_random_filename('t', '.fits')
-
         # add background; scale by exptime
-        image = fits.open(in_image)
-        image.data = (image.data + bck_flux) * exptime
-        image.writeto(tmpfile1)
-        image.close()
-
-        # return the image name
-        return tmpfile1
+        sci_ext = np.array(in_data, dtype=np.float64)
+        sci_ext += bck_flux
+        sci_ext *= exptime
+        return sci_ext
 
-    def _add_noise(self, in_image):
+    def _add_noise(self, sci_ext):
         """Add noise to an image
 
         The module adds noise to an image in [e].
 
         Parameters
         ----------
-        in_image: str
-            the input image, assumed to be an MEF fits image with data
-            in self.extname
-
-        Returns
-        -------
-        in_image is updated inplace
+        sci_ext: numpy.ndarray
+            the image in [e], updated in place
 
         Notes
         -----
@@ -220,47 +216,37 @@ class RealWorld(object):
         generated for each pixel and added to the image, or background value
         for  new  images,  after  the  photon noise is computed.
 
-
-        First,  the  gaussian approximation is  used  for  data  values
+        The  gaussian approximation is  used  for  data  values
         greater  than  20  (after applying  the  background  and  gain).
-
         The square root of the data value is used as the gaussian  sigma
         about  the  data  value. For values  less  than  20  a  true
-        poisson  deviate is generated.  The second speed up is to allow
-        storing a number of normalized  gaussian values   given   by   the
-        package  parameter  ranbuf  as  they  are generated.  If more values
-        than this  are  desired  then  a  uniform random  number  is  used
-        to select one of these stored values.  This applies  to  both  the
-        read  noise  and  poisson   noise   gaussian approximation  though
-        not  the  true  poisson evaluation.
-
-        For most purposes this approximation is good and one would need to
-        look  very hard  to  detect  the  nonrandomness  in the noise.
-        However, if one wants to take the extra  computational  time  then
-        by  setting  the ranbuf  parameter  to  zero  each  gaussian  random
-        number  will be generated independently.
-
-
-        This function duplicates the gaussian approximation, depending on
-        runtime tests we could remove that
+        poisson  deviate is generated. With poisson=True all pixels
+        get a true poisson deviate.
+
+        Random numbers are drawn only for the pixels which need them,
+        from the generator of the instance.
         """
-        with fits.open(in_image, mode='update') as image:
-            # background = 0.0
-            # gain = 1.0
-            new_image = deepcopy(image[self.extname].data)
-
-            # select large values and use simple shot noise
-            lv = np.where(new_image >= 20.)
-            new_image[lv] += np.sqrt(new_image[lv])
-
-            # create normal, where readnoise is the sigma and the pixel
-            # value is the mean
-            y, x = new_image.shape
-            noise = self.rdnoise * np.random.randn(y, x)
-            sv = np.where(new_image < 20.)
-            new_image[sv] += noise[sv]
-            image[self.extname].data = new_image
-            image.close()
+        # background = 0.0
+        # gain = 1.0
+        if self.poisson:
+            poisson = sci_ext > 0.0
+        else:
+            # select large values and use a
+            # Gaussian approximation of the shot noise
+            bright = sci_ext >= GAUSS_LIMIT
+            values = sci_ext[bright]
+            values += np.sqrt(values) * self.rng.standard_normal(values.size)
+            sci_ext[bright] = values
+
+            poisson = (sci_ext > 0.0) & (sci_ext < GAUSS_LIMIT)
+
+        # a true poisson deviate for the others
+        sci_ext[poisson] = self.rng.poisson(sci_ext[poisson])
+
+        # the readnoise is the sigma of a
+        # Gaussian with zero mean for all pixels
+        if self.rdnoise:
+            sci_ext += self.rdnoise * self.rng.standard_normal(sci_ext.shape)
 
     def _compute_err_ext(self, sci_ext):
         """Compute the error image for a science image
@@ -271,83 +257,51 @@ class RealWorld(object):
 
         Parameters
         ----------
-        sci_ext: str
-            the input image
+        sci_ext: numpy.ndarray
+            the science image in [e]
 
         Returns
         -------
-        The name of the tempfile that's created
+        err_ext: numpy.ndarray
+            the error image in [e]
         """
-        # get a random filename
-        tmpfile1 = get_random_filename('t', '.fits')
+        # negative pixels have no shot noise
+        err_ext = np.maximum(sci_ext, 0.0)
+        err_ext += self.rdnoise**2
+        np.sqrt(err_ext, out=err_ext)
+        return err_ext
 
-        try:
-            image = fits.open(self.image)
-        except IOError:
-            print("Problem opening image: {0:s}".format(self.image))
-
-        image[sci_ext].data = np.sqrt(image[sci_ext].data + self.rdnoise**2)
-        image.writeto(tmpfile1)
-        image.close()
-
-        return tmpfile1
+    def _make_dq_extension(self, shape):
+        """Creates an empty dq-extension image
 
-    def _scale_image(self, in_image):
-        """Converts from [e] to [e/s]
+        Parameters
+        ----------
+        shape: (int, int)
+            the image dimension (yaxis, xaxis)
 
-        @param in_image: the input image
-        @type in_image: string
+        Returns
+        -------
+        dq_ext: numpy.ndarray
+            the dq image
         """
+        return np.zeros(shape, dtype=np.int16)
 
-        try:
-            image = fits.open(in_image, mode='update')
-        except IOError:
-            print("Problem opening image: {0:s}".format(in_image))
-
-        # divide by exposure time
-        image.data /= self.exptime
-        image.close()
+    def _make_const_image(self, shape, value):
+        """Creates a constant image
 
-    def _make_dq_extension(self):
-        """Creates an empty dq-extension image
+        Parameters
+        ----------
+        shape: (int, int)
+            the image dimension (yaxis, xaxis)
+        value: float
+            the constant value
 
         Returns
         -------
-        Saves the output to a new simple fits image and returns the name
-
-        Notes
-        -----
-        iraf.mkpattern(input=tmpfile1, output="", pattern="constant",
-                       option="replace",nlines=self.dimension[0],
-                       v1=0.0, v2=0.0, size=1, title="", pixtype="integer",
-                       ndim=2, ncols=self.dimension[1],
-                       n3=1, n4=1, n5=1, n6=1, n7=1, header="")
+        image: numpy.ndarray
+            the constant image
         """
-        # get a random filename
-        tmpfile1 = get_random_filename('t', '.fits')
-        image = np.zeros((self.dimension[1], self.dimension[0]), dtype=np.int)
-        hdu = fits.PrimaryHDU(image)
-        hdu.writeto(tmpfile1)
-        return tmpfile1
-
-    def _make_const_image(self, value):
-        """Creates a constant image
-
-        Notes
-        -----
-        iraf.mkpattern(input=tmpfile1, output="", pattern="constant",
-                   option="replace",v1=value, v2=0.0, size=1, title="",
-                   pixtype="real",ndim=2, ncols=self.dimension[1],
-                   nlines=self.dimension[0],n3=1, n4=1, n5=1, n6=1, n7=1,
-                   header="")
-        """
-        # get a random filename
-        tmpfile1 = get_random_filename('t', '.fits')
-        image = float(value) * np.ones((self.dimension[1], self.dimension[0]),
-                                       dtype=np.float64)
-        hdu = fits.PrimaryHDU(image)
-        hdu.writeto(tmpfile1)
-        return tmpfile1
+        return np.full(shape, value, dtype=np.float32)
 
     def make_real(self):
         """Create a 'natural' image
@@ -369,47 +323,56 @@ class RealWorld(object):
 
         The method creates a natural image without noise
         """
-        # get the science image plus background
-        # in electrons
-        imname = "{}[{}]".format(self.image_name, self.extname)
+        with fits.open(self.image_name, memmap=False) as in_image:
+            in_image.readall()
+
+            # get the science image plus background
+            # in electrons
+            sci_ext = self._make_real_sciimage(in_image[self.extname].data,
+                                               self._get_background(), 1.0)
 
-        sci_scaled = self._make_real_sciimage(imname, self.bck_flux, 1.0)
-        # compute the error extension
-        err_scaled = self._make_const_image(self.rdnoise)
+            # compute the error extension
+            err_ext = self._make_const_image(sci_ext.shape, self.rdnoise)
 
-        # make a dq-extension
-        dq_ext = self._make_dq_extension()
+            # make a dq-extension
+            dq_ext = self._make_dq_extension(sci_ext.shape)
 
-        # compose the final multi-extension image
-        self._compose_multiext_image(sci_scaled, err_scaled, dq_ext, 1)
+            # compose the final multi-extension image
+            self._compose_multiext_image(in_image,
+                                         sci_ext.astype(np.float32),
+                                         err_ext, dq_ext)
 
     def make_real_exptime(self):
         """Create a 'natural' image
 
         The method creates a natural image with noise
         """
-        # get the science image plus background
-        # in electrons
-        imname = "{}[{}]".format(self.image_name, self.extname)
-        sci_scaled = self._make_real_sciimage(imname,
-                                              self.bck_flux,
-                                              self.exptime)
-
-        # add readout and poisson errors
-        self._add_noise(sci_scaled)
-
-        # compute the error extension
-        err_scaled = self._compute_err_ext(sci_scaled)
-
-        # check whether the exposure time is non-zero
-        if self.exptime != 0.0:
-            # scale both extensions
-            # by the exposure time
-            self._scale_image(sci_scaled)
-            self._scale_image(err_scaled)
-
-        # make a dq-extension
-        dq_ext = self._make_dq_extension()
-
-        # compose the final multi-extension image
-        self._compose_multiext_image(sci_scaled, err_scaled, dq_ext, 1)
+        with fits.open(self.image_name, memmap=False) as in_image:
+            in_image.readall()
+
+            # get the science image plus background
+            # in electrons
+            sci_ext = self._make_real_sciimage(in_image[self.extname].data,
+                                               self._get_background(),
+                                               self.exptime)
+
+            # add readout and poisson errors
+            self._add_noise(sci_ext)
+
+            # compute the error extension
+            err_ext = self._compute_err_ext(sci_ext)
+
+            # check whether the exposure time is non-zero
+            if self.exptime != 0.0:
+                # scale both extensions
+                # by the exposure time
+                sci_ext /= self.exptime
+                err_ext /= self.exptime
+
+            # make a dq-extension
+            dq_ext = self._make_dq_extension(sci_ext.shape)
+
+            # compose the final multi-extension image
+            self._compose_multiext_image(in_image,
+                                         sci_ext.astype(np.float32),
+                                         err_ext.astype(np.float32), dq_ext)
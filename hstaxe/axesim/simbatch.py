@@ -0,0 +1,625 @@
+"""
+See LICENSE.txt
+
+Batch driver for grids of aXeSIM simulations.
+
+A table of simulation cases, one per row, is run through the tasks
+simdispim and simdirim. The table needs the columns 'task' (simdispim
+or simdirim), 'incat' and 'config'; further columns are passed as the
+parameters of the same name to the tasks, e.g. 'exptime', 'bck_flux',
+'nx', 'ny', 'model_spectra' or 'seed'; an empty value ("") leaves
+the parameter of a case at its default. An optional column 'name' gives
+the output image. The object catalogs and model files are given as
+plain file names in the image directory:
+
+    from hstaxe.axesim import simbatch
+
+    results = simbatch.run_batch('grid.dat', nworkers=8, seed=1)
+
+or from the command line:
+
+    python -m hstaxe.axesim.simbatch grid.dat -n 8 --seed 1 -o grid.json
+
+The cases run in worker processes. Every worker has a scratch directory
+as its image and output directory, to which the object catalog of each
+case is copied and the model spectra and images are linked. The
+simulation configuration files are made once for the batch, the dummy
+images once per worker, configuration and image size. The throughput
+is reported in simulations per hour.
+
+The tasks run the compiled aXe executables, which must be on the PATH;
+a batch is not started without them.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager, redirect_stdout
+
+import numpy as np
+from astropy.table import Table
+
+from ..axeerror import aXeSIMError
+from ..config import getCONF, getDATA, get_random_filename
+
+# make sure there is a logger
+_log = logging.getLogger(__name__)
+
+# the parameters of the tasks which
+# can be given in the case table
+TASK_PARAMS = {'simdispim': ('incat', 'config', 'lambda_psf', 'dispim_name',
+                             'model_spectra', 'model_images', 'nx', 'ny',
+                             'exptime', 'bck_flux', 'extraction', 'extrfwhm',
+                             'orient', 'slitless_geom', 'adj_sens', 'seed',
+                             'poisson'),
+               'simdirim': ('incat', 'config', 'tpass_direct', 'dirim_name',
+                            'model_spectra', 'model_images', 'nx', 'ny',
+                            'exptime', 'bck_flux', 'seed', 'poisson')}
+
+# the parameter with the output
+# image name and its default suffix
+NAME_PARAMS = {'simdispim': ('dispim_name', '_slitless.fits'),
+               'simdirim': ('dirim_name', '_direct.fits')}
+
+# the input files in the image directory which
+# are only read and can be shared by the cases
+LINKED_PARAMS = ('model_spectra', 'model_images')
+
+# the aXe executables run by the tasks; the
+# extraction of simdispim needs further ones
+TASK_EXECUTABLES = {'simdispim': ('aXe_GOL2AF', 'aXe_PETCONT'),
+                    'simdirim': ('aXe_GOL2AF', 'aXe_DIRIMAGE')}
+EXTRACTION_EXECUTABLES = ('aXe_AF2PET', 'aXe_PET2SPC', 'aXe_STAMPS')
+
+# the number of log lines kept for a failed case
+LOG_TAIL = 5
+
+# the stack of active batches
+_batches = []
+
+
+class SimBatch:
+    """The inputs shared by the simulations of a batch"""
+    def __init__(self, simul_configs=None):
+        """
+        Parameters
+        ----------
+        simul_configs: dict
+            simulation configuration files already made, with
+            the signature of the configuration file they
+            were made from
+        """
+        self.simul_configs = dict(simul_configs or {})
+
+        # the dummy images per
+        # configuration and size
+        self.dummy_images = {}
+
+    def get_simul_config(self, config):
+        """Return the simulation configuration file of a configuration.
+
+        The file is made on first use and again only if the
+        modification time or size of the configuration changes.
+
+        Parameters
+        ----------
+        config: str
+            the aXe configuration file
+
+        Returns
+        -------
+        config_simul: str
+            the simulation configuration file
+        """
+        from ..axesrc import configfile
+
+        path = os.path.abspath(getCONF(config))
+        fstat = os.stat(path)
+        signature = (fstat.st_mtime_ns, fstat.st_size)
+
+        known = self.simul_configs.get(path)
+        if (known is not None and known[0] == signature and
+                os.path.isfile(getCONF(known[1]))):
+            return known[1]
+
+        config_simul = configfile.ConfigFile(path).axesim_prep()
+        self.simul_configs[path] = (signature, config_simul)
+        return config_simul
+
+    def get_dummy_images(self, config_simul, nx, ny, dispersed=True):
+        """Return the dummy images for a configuration and size.
+
+        The images are made on first use in the image directory.
+
+        Parameters
+        ----------
+        config_simul: str
+            the simulation configuration file
+        nx: int
+            number of pixels in x
+        ny: int
+            number of pixels in y
+        dispersed: bool
+            make a dispersed image besides the direct image
+
+        Returns
+        -------
+        i_maker: imagemaker.DummyImages
+            the dummy image maker
+        """
+        from . import imagemaker
+
+        key = (config_simul, nx, ny, dispersed)
+        i_maker = self.dummy_images.get(key)
+        if i_maker is not None and all(os.path.isfile(name) for name in
+                                       (i_maker.griname, i_maker.dirname)
+                                       if name is not None):
+            return i_maker
+
+        if dispersed:
+            griname = getDATA(get_random_filename('t', '.fits'))
+        else:
+            griname = None
+        dirname = getDATA(get_random_filename('t', '.fits'))
+
+        i_maker = imagemaker.DummyImages(getCONF(config_simul), griname,
+                                         dirname, nx, ny)
+        i_maker.makeImages()
+        self.dummy_images[key] = i_maker
+        return i_maker
+
+    def delete_images(self):
+        """Delete all dummy images"""
+        for i_maker in self.dummy_images.values():
+            i_maker.deleteImages()
+        self.dummy_images.clear()
+
+
+def current_batch():
+    """Return the active batch or None."""
+    if _batches:
+        return _batches[-1]
+    return None
+
+
+@contextmanager
+def shared_inputs(simul_configs=None):
+    """Share configurations and dummy images between simulations.
+
+    Within the context simdispim and simdirim take the simulation
+    configuration files and dummy images from the batch instead
+    of making their own. The dummy images are deleted at the end.
+
+    Parameters
+    ----------
+    simul_configs: dict
+        simulation configuration files already made
+
+    Returns
+    -------
+    batch: SimBatch
+        the active batch
+    """
+    batch = SimBatch(simul_configs)
+    _batches.append(batch)
+    try:
+        yield batch
+    finally:
+        _batches.remove(batch)
+        batch.delete_images()
+
+
+def _to_python(value):
+    """Convert a table value into a Python value"""
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, bytes):
+        value = value.decode()
+    if isinstance(value, str):
+        value = value.strip()
+
+        # the flags of the tasks
+        if value.lower() in ('true', 'false'):
+            value = value.lower() == 'true'
+    return value
+
+
+def read_cases(filename, seed=None):
+    """Read a table of simulation cases.
+
+    Parameters
+    ----------
+    filename: str
+        the case table, as ASCII table with
+        column names or as FITS table
+    seed: int
+        seed to derive the noise seeds of the cases
+        from, if the table has no 'seed' column
+
+    Returns
+    -------
+    cases: list
+        index, task, output name and task parameters
+        of all cases
+    """
+    if filename.lower().endswith(('.fits', '.fit')):
+        table = Table.read(filename)
+    else:
+        table = Table.read(filename, format='ascii')
+
+    for column in ('task', 'incat', 'config'):
+        if column not in table.colnames:
+            err_msg = ("The case table {0:s} has no column {1:s}!"
+                       .format(filename, column))
+            raise aXeSIMError(err_msg)
+
+    # independent, reproducible
+    # noise seeds for the cases
+    seeds = None
+    if seed is not None and 'seed' not in table.colnames:
+        seeds = [int(child.generate_state(1)[0]) for child in
+                 np.random.SeedSequence(seed).spawn(len(table))]
+
+    cases = []
+    names = set()
+    for index, row in enumerate(table):
+        task = _to_python(row['task']).lower()
+        if task not in TASK_PARAMS:
+            err_msg = ("Case {0:d}: unknown task {1:s}!"
+                       .format(index, task))
+            raise aXeSIMError(err_msg)
+
+        params = {}
+        for colname in table.colnames:
+            if colname in ('task', 'name') or np.ma.is_masked(row[colname]):
+                continue
+            if colname not in TASK_PARAMS[task]:
+                err_msg = ("Case {0:d}: {1:s} has no parameter {2:s}!"
+                           .format(index, task, colname))
+                raise aXeSIMError(err_msg)
+            params[colname] = _to_python(row[colname])
+
+        # the tasks take the input files from the image
+        # directory, whatever the directory of the name
+        for pname in ('incat',) + LINKED_PARAMS:
+            if params.get(pname) and os.path.dirname(params[pname]):
+                err_msg = ("Case {0:d}: the {1:s} {2:s} must be given "
+                           "without a directory, it is taken from the "
+                           "image directory!"
+                           .format(index, pname, params[pname]))
+                raise aXeSIMError(err_msg)
+
+        if seeds is not None:
+            params['seed'] = seeds[index]
+
+        # give every case its own output image
+        name_param, suffix = NAME_PARAMS[task]
+        if 'name' in table.colnames and not np.ma.is_masked(row['name']):
+            params[name_param] = _to_python(row['name'])
+        elif name_param not in params:
+            root = os.path.splitext(os.path.basename(params['incat']))[0]
+            params[name_param] = '{0:s}_{1:05d}{2:s}'.format(root, index,
+                                                             suffix)
+        if params[name_param] in names:
+            err_msg = ("Case {0:d}: the output image {1:s} is used by "
+                       "another case!".format(index, params[name_param]))
+            raise aXeSIMError(err_msg)
+        names.add(params[name_param])
+
+        cases.append({'index': index,
+                      'task': task,
+                      'name': params[name_param],
+                      'params': params})
+    return cases
+
+
+def check_executables(cases):
+    """Check the aXe executables of the cases are installed.
+
+    The simulations run compiled aXe tasks; without them
+    every case would fail, hence no case is started.
+
+    Parameters
+    ----------
+    cases: list
+        the cases from read_cases()
+    """
+    needed = set()
+    for case in cases:
+        needed.update(TASK_EXECUTABLES[case['task']])
+        if (case['task'] == 'simdispim' and
+                case['params'].get('extraction', True)):
+            needed.update(EXTRACTION_EXECUTABLES)
+
+    missing = sorted(name for name in needed if shutil.which(name) is None)
+    if missing:
+        err_msg = ("The aXe executables {0:s} needed by the simulations are "
+                   "not installed!".format(', '.join(missing)))
+        raise aXeSIMError(err_msg)
+
+
+def _set_scratch_paths(workdir):
+    """Use a scratch directory as image and output directory.
+
+    Parameters
+    ----------
+    workdir: str
+        the scratch directory
+
+    Returns
+    -------
+    previous: dict
+        the previous values of the environment variables
+    """
+    paths = {'AXE_IMAGE_PATH': os.path.join(workdir, 'DATA'),
+             'AXE_OUTPUT_PATH': os.path.join(workdir, 'OUTPUT')}
+    previous = {name: os.environ.get(name) for name in paths}
+    for name, path in paths.items():
+        os.makedirs(path, exist_ok=True)
+        os.environ[name] = path
+    return previous
+
+
+@contextmanager
+def _scratch_paths(workdir):
+    """Use a scratch directory within the context"""
+    previous = _set_scratch_paths(workdir)
+    try:
+        yield workdir
+    finally:
+        for name, path in previous.items():
+            if path is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = path
+
+
+def _init_worker(scratch, simul_configs):
+    """Give a worker process its scratch directory and shared inputs"""
+    _set_scratch_paths(os.path.join(scratch, 'w{0:d}'.format(os.getpid())))
+    _batches.append(SimBatch(simul_configs))
+
+
+def _stage_inputs(params, imagedir):
+    """Put the input files of a case into the scratch image directory.
+
+    The object catalog is copied, since the tasks add
+    columns to it, the model files are linked.
+
+    Parameters
+    ----------
+    params: dict
+        the task parameters of the case
+    imagedir: str
+        the image directory with the input files
+    """
+    catalog = params['incat']
+    shutil.copyfile(os.path.join(imagedir, catalog), getDATA(catalog))
+
+    for pname in LINKED_PARAMS:
+        if not params.get(pname):
+            continue
+        model_file = params[pname]
+        if not os.path.lexists(getDATA(model_file)):
+            os.symlink(os.path.join(imagedir, model_file),
+                       getDATA(model_file))
+
+
+def _run_case(case, imagedir):
+    """Run a simulation case in the scratch directory.
+
+    Parameters
+    ----------
+    case: dict
+        the case from read_cases()
+    imagedir: str
+        the image directory with the input files
+
+    Returns
+    -------
+    record: dict
+        index, name, task, status, wall time and, for a
+        failed case, the error and the end of its log
+    """
+    from . import axesimtasks
+
+    record = {'index': case['index'],
+              'name': case['name'],
+              'task': case['task'],
+              'status': 'error',
+              'error': None,
+              'log': None}
+
+    logname = os.path.join(os.environ['AXE_OUTPUT_PATH'],
+                           '{0:s}.log'.format(case['name']))
+    start = time.perf_counter()
+    try:
+        _stage_inputs(case['params'], imagedir)
+        with open(logname, 'w') as log, redirect_stdout(log):
+            retcode = getattr(axesimtasks, case['task'])(**case['params'])
+        if retcode == 0:
+            record['status'] = 'ok'
+        else:
+            record['error'] = 'return value {0}'.format(retcode)
+    except Exception as err:
+        _log.exception("Simulation {0:s} failed!".format(case['name']))
+        record['error'] = str(err)
+    record['wall'] = time.perf_counter() - start
+
+    if record['status'] != 'ok' and os.path.isfile(logname):
+        with open(logname, 'r') as log:
+            record['log'] = log.read().splitlines()[-LOG_TAIL:]
+    return record
+
+
+def summarize(records, wall, nworkers):
+    """Sum up the records of a batch.
+
+    Parameters
+    ----------
+    records: list
+        the records of the cases
+    wall: float
+        the wall time of the batch
+    nworkers: int
+        the number of worker processes
+
+    Returns
+    -------
+    summary: dict
+        numbers of cases, the wall times and the
+        throughput in simulations per hour
+    """
+    walls = [record['wall'] for record in records]
+    done = sum(record['status'] == 'ok' for record in records)
+    return {'cases': len(records),
+            'done': done,
+            'failed': len(records) - done,
+            'nworkers': nworkers,
+            'wall': wall,
+            'case_median': statistics.median(walls) if walls else None,
+            'case_max': max(walls) if walls else None,
+            'sims_per_hour': 3600.0 * done / wall if wall > 0.0 else None}
+
+
+def run_batch(cases, nworkers=None, seed=None, scratch_dir=None,
+              keep_scratch=False):
+    """Run a batch of simulation cases.
+
+    Parameters
+    ----------
+    cases: str or list
+        the case table or the cases from read_cases()
+    nworkers: int
+        number of worker processes; None or 1 runs the cases
+        in the current process, 0 uses all available cores
+    seed: int
+        seed for the noise of the cases, see read_cases()
+    scratch_dir: str
+        directory for the scratch directories, by
+        default the system temporary directory
+    keep_scratch: bool
+        keep the scratch directories
+
+    Returns
+    -------
+    results: dict
+        the summary and the records of all cases
+    """
+    if isinstance(cases, str):
+        cases = read_cases(cases, seed)
+    check_executables(cases)
+
+    if nworkers == 0:
+        nworkers = os.cpu_count()
+    if nworkers is None or nworkers < 2 or len(cases) < 2:
+        nworkers = 1
+    nworkers = min(nworkers, max(len(cases), 1))
+
+    # the input files are taken
+    # from the image directory
+    imagedir = os.path.abspath(getDATA())
+
+    # make the simulation configuration files
+    # before any worker needs them
+    batch = SimBatch()
+    for case in cases:
+        batch.get_simul_config(case['params']['config'])
+
+    scratch = tempfile.mkdtemp(prefix='axesimbatch', dir=scratch_dir)
+    start = time.perf_counter()
+    records = []
+    try:
+        if nworkers == 1:
+            with _scratch_paths(os.path.join(scratch, 'w0')), \
+                    shared_inputs(batch.simul_configs):
+                for case in cases:
+                    records.append(_run_case(case, imagedir))
+        else:
+            with ProcessPoolExecutor(max_workers=nworkers,
+                                     initializer=_init_worker,
+                                     initargs=(scratch,
+                                               batch.simul_configs)) as pool:
+                futures = {pool.submit(_run_case, case, imagedir): case
+                           for case in cases}
+                for future in as_completed(futures):
+                    try:
+                        records.append(future.result())
+                    except Exception as err:
+                        # the worker itself failed
+                        case = futures[future]
+                        records.append({'index': case['index'],
+                                        'name': case['name'],
+                                        'task': case['task'],
+                                        'status': 'error',
+                                        'error': str(err),
+                                        'log': None,
+                                        'wall': 0.0})
+    finally:
+        if not keep_scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+    wall = time.perf_counter() - start
+
+    records.sort(key=lambda record: record['index'])
+    summary = summarize(records, wall, nworkers)
+    _log.info("Simulation batch: {0:d} of {1:d} cases done in {2:.1f} s, "
+              "{3:.1f} simulations per hour"
+              .format(summary['done'], summary['cases'], wall,
+                      summary['sims_per_hour'] or 0.0))
+    return {'summary': summary, 'records': records}
+
+
+def main(argv=None):
+    """Run a batch of simulations from the command line."""
+    parser = argparse.ArgumentParser(
+        description='Run a table of aXeSIM simulations.')
+    parser.add_argument('cases', help='the table of simulation cases')
+    parser.add_argument('-n', '--nworkers', type=int, default=None,
+                        help='number of worker processes, 0 for all cores')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed for the noise of the cases')
+    parser.add_argument('--scratch-dir', default=None,
+                        help='directory for the scratch directories')
+    parser.add_argument('--keep-scratch', action='store_true',
+                        help='keep the scratch directories')
+    parser.add_argument('-o', '--output', default='axesimbatch.json',
+                        help='JSON file for the results')
+    args = parser.parse_args(argv)
+
+    results = run_batch(args.cases, nworkers=args.nworkers, seed=args.seed,
+                        scratch_dir=args.scratch_dir,
+                        keep_scratch=args.keep_scratch)
+    results['meta'] = {'cases': os.path.abspath(args.cases),
+                       'seed': args.seed,
+                       'python': platform.python_version(),
+                       'machine': platform.machine(),
+                       'node': platform.node(),
+                       'cpus': os.cpu_count(),
+                       'date': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+    output = os.path.abspath(args.output)
+    with open(output, 'w') as ofile:
+        json.dump(results, ofile, indent=1)
+
+    # give a short overview
+    summary = results['summary']
+    print('cases: {0:d}  done: {1:d}  failed: {2:d}  workers: {3:d}'
+          .format(summary['cases'], summary['done'], summary['failed'],
+                  summary['nworkers']))
+    print('wall time: {0:.1f} s  simulations per hour: {1:.1f}'
+          .format(summary['wall'], summary['sims_per_hour'] or 0.0))
+    for record in results['records']:
+        if record['status'] != 'ok':
+            print('failed: {0:s} ({1:s})'.format(record['name'],
+                                                 str(record['error'])))
+    print('Results written to {0:s}'.format(output))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,16 @@
 Initialize the package and import the available tasks
 See LICENSE.txt
 """
+from hstaxe.utils import lazy_submodules
 
 # import the axe packate tasks
 from .axetasks import *
+
+# the other modules are imported on first access
+__getattr__ = lazy_submodules(__name__,
+                              ['axecommands', 'axeinputs', 'axeiol',
+                               'axepreptor', 'axesingextr', 'configfile',
+                               'dither', 'dppdumps', 'drizzleobjects',
+                               'fcubeobjs', 'imagemaker', 'inputchecks',
+                               'iolmaking', 'mefobjects', 'nlincoeffs',
+                               'pysex2gol'])
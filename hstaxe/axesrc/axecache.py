@@ -0,0 +1,359 @@
+"""
+See LICENSE.txt
+
+Content addressed cache for the stages of the aXe tasks.
+
+While a stage cache is active, every stage run through ``run_stage()``
+gets a key, which is the hash of the stage name, its parameters, the
+keys of the stages it depends on and the content digests of its input
+files. The files a stage creates or changes in the output directory are
+copied into the store of the cache under their content digest. If a
+stage with the same key is run again, its outputs are restored from the
+store, where necessary, and the stage is skipped:
+
+    from hstaxe.axesrc.axecache import stage_cache
+
+    with stage_cache('axe_cache', max_size=20 * 1024**3):
+        axetasks.axecore('aXe.lis', 'G141.F140W.V4.31.conf', ...)
+
+The store is bounded in size; the least recently used stages are
+evicted first. Without an active cache nothing is cached. A cache
+directory must not be used by several processes at the same time.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+from hstaxe.config import getOUTPUT
+
+from . import axeledger
+
+# make sure there is a logger
+_log = logging.getLogger(__name__)
+
+# change to invalidate all existing entries
+CACHE_VERSION = 1
+
+# the default maximum size of the store
+DEFAULT_MAX_SIZE = 10 * 1024**3
+
+# the size of the blocks read for the digests
+BLOCK_SIZE = 1024**2
+
+# parameters which do not change the outputs
+IGNORED_PARAMS = ('nthreads',)
+
+# the stack of active caches
+_caches = []
+
+
+class StageCache:
+    """The store and index of a stage cache"""
+    def __init__(self, directory, max_size=None, force=False):
+        """
+        Parameters
+        ----------
+        directory: str
+            the directory of the cache
+        max_size: int
+            maximum size of the store in bytes
+        force: bool
+            run all stages, refreshing their entries
+        """
+        self.directory = directory
+        self.max_size = DEFAULT_MAX_SIZE if max_size is None else max_size
+        self.force = force
+
+        self.object_dir = os.path.join(directory, 'objects')
+        self.index_file = os.path.join(directory, 'index.json')
+        os.makedirs(self.object_dir, exist_ok=True)
+
+        # the stage entries and the
+        # digests of the files seen
+        self.entries = {}
+        self.digests = {}
+        if os.path.isfile(self.index_file):
+            with open(self.index_file, 'r') as index:
+                content = json.load(index)
+            if content.get('version') == CACHE_VERSION:
+                self.entries = content['entries']
+                self.digests = content['digests']
+
+        # the numbers of stages skipped and run
+        self.hits = 0
+        self.misses = 0
+
+    def save(self):
+        """Write the index of the cache"""
+        # forget the digests of deleted files
+        self.digests = {path: known for path, known in self.digests.items()
+                        if os.path.isfile(path)}
+
+        tmp_file = self.index_file + '.tmp'
+        with open(tmp_file, 'w') as index:
+            json.dump({'version': CACHE_VERSION,
+                       'entries': self.entries,
+                       'digests': self.digests}, index)
+        os.replace(tmp_file, self.index_file)
+
+    def file_digest(self, filename):
+        """Return the content digest of a file.
+
+        The digests are remembered together with the modification
+        time and size of the file, so that unchanged files are
+        not read again.
+
+        Parameters
+        ----------
+        filename: str
+            name of the file
+
+        Returns
+        -------
+        digest: str
+            the SHA-256 digest, None if the file does not exist
+        """
+        path = os.path.abspath(filename)
+        try:
+            fstat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        known = self.digests.get(path)
+        if known is not None and known[:2] == [fstat.st_mtime_ns,
+                                               fstat.st_size]:
+            return known[2]
+
+        sha = hashlib.sha256()
+        with open(path, 'rb') as infile:
+            for block in iter(lambda: infile.read(BLOCK_SIZE), b''):
+                sha.update(block)
+        digest = sha.hexdigest()
+        self.digests[path] = [fstat.st_mtime_ns, fstat.st_size, digest]
+        return digest
+
+    def stage_key(self, name, parents=(), files=(), params=None):
+        """Compute the key of a stage.
+
+        Parameters
+        ----------
+        name: str
+            the name of the stage
+        parents: list
+            the keys of the stages the stage depends on
+        files: list
+            the input files, other than the products of
+            the parent stages
+        params: dict
+            the parameters of the stage
+
+        Returns
+        -------
+        key: str
+            the key of the stage
+        """
+        params = {pname: value for pname, value in (params or {}).items()
+                  if pname not in IGNORED_PARAMS}
+        content = {'version': CACHE_VERSION,
+                   'stage': name,
+                   'parents': list(parents),
+                   'files': [[os.path.abspath(fname), self.file_digest(fname)]
+                             for fname in files if fname],
+                   'params': {pname: repr(value)
+                              for pname, value in sorted(params.items())}}
+        return hashlib.sha256(json.dumps(content, sort_keys=True)
+                              .encode()).hexdigest()
+
+    def restore(self, key):
+        """Restore the outputs of a stage.
+
+        Parameters
+        ----------
+        key: str
+            the key of the stage
+
+        Returns
+        -------
+        restored: bool
+            True if all outputs are in place
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+
+        # make sure all objects are there
+        for digest in entry['outputs'].values():
+            if not os.path.isfile(os.path.join(self.object_dir, digest)):
+                del self.entries[key]
+                return False
+
+        for path, digest in entry['outputs'].items():
+            if self.file_digest(path) != digest:
+                shutil.copyfile(os.path.join(self.object_dir, digest), path)
+                fstat = os.stat(path)
+                self.digests[path] = [fstat.st_mtime_ns, fstat.st_size,
+                                      digest]
+        entry['used'] = time.time()
+        return True
+
+    def store(self, key, outputs):
+        """Store the outputs of a stage.
+
+        Parameters
+        ----------
+        key: str
+            the key of the stage
+        outputs: list
+            the files the stage created or changed
+        """
+        stored = {}
+        for filename in outputs:
+            path = os.path.abspath(filename)
+            digest = self.file_digest(path)
+            if digest is None:
+                continue
+            object_file = os.path.join(self.object_dir, digest)
+            if not os.path.isfile(object_file):
+                shutil.copyfile(path, object_file + '.tmp')
+                os.replace(object_file + '.tmp', object_file)
+            stored[path] = digest
+
+        self.entries[key] = {'outputs': stored, 'used': time.time()}
+        self._evict()
+        self.save()
+
+    def _evict(self):
+        """Evict the least recently used entries beyond the maximum size"""
+        sizes = {}
+        for entry in self.entries.values():
+            for digest in entry['outputs'].values():
+                if digest not in sizes:
+                    object_file = os.path.join(self.object_dir, digest)
+                    sizes[digest] = (os.path.getsize(object_file)
+                                     if os.path.isfile(object_file) else 0)
+
+        total = sum(sizes.values())
+        for key in sorted(self.entries, key=lambda k: self.entries[k]['used']):
+            if total <= self.max_size:
+                break
+            del self.entries[key]
+            total = sum(sizes[digest] for digest in
+                        {digest for entry in self.entries.values()
+                         for digest in entry['outputs'].values()})
+
+        # delete the objects which are no longer used
+        used = {digest for entry in self.entries.values()
+                for digest in entry['outputs'].values()}
+        for digest in os.listdir(self.object_dir):
+            if digest not in used:
+                os.unlink(os.path.join(self.object_dir, digest))
+
+
+def current_cache():
+    """Return the active stage cache or None."""
+    if _caches:
+        return _caches[-1]
+    return None
+
+
+@contextmanager
+def stage_cache(directory=None, max_size=None, force=False):
+    """Activate a stage cache for the enclosed aXe tasks.
+
+    Parameters
+    ----------
+    directory: str
+        the directory of the cache; None activates no cache
+    max_size: int
+        maximum size of the store in bytes
+    force: bool
+        run all stages, refreshing their entries
+
+    Returns
+    -------
+    cache: StageCache
+        the active cache or None
+    """
+    if directory is None:
+        yield None
+        return
+
+    cache = StageCache(directory, max_size, force)
+    _caches.append(cache)
+    try:
+        yield cache
+    finally:
+        _caches.remove(cache)
+        cache.save()
+        _log.info("Stage cache {0:s}: {1:d} stages skipped, {2:d} run"
+                  .format(directory, cache.hits, cache.misses))
+
+
+def _snapshot(directory):
+    """Modification time and size of all files in a directory"""
+    snapshot = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file():
+                fstat = entry.stat()
+                snapshot[entry.path] = (fstat.st_mtime_ns, fstat.st_size)
+    return snapshot
+
+
+def run_stage(name, task, parents=(), files=(), **params):
+    """Run a stage unless its outputs are in the cache.
+
+    Without an active cache the stage is simply run.
+
+    Parameters
+    ----------
+    name: str
+        the name of the stage
+    task: callable
+        the function running the stage, called with the parameters
+    parents: list
+        the keys of the stages the stage depends on
+    files: list
+        the input files, other than the products of the parent stages
+    params: dict
+        the parameters of the stage
+
+    Returns
+    -------
+    key: str
+        the key of the stage, None without an active cache
+    """
+    cache = current_cache()
+    if cache is None:
+        task(**params)
+        return None
+
+    key = cache.stage_key(name, parents, files, params)
+    if not cache.force and cache.restore(key):
+        _log.info("Stage {0:s}: outputs taken from the cache".format(name))
+        cache.hits += 1
+        return key
+
+    # the outputs are the files created
+    # or changed in the output directory,
+    # except for the cache and ledger files
+    outdir = getOUTPUT()
+    before = _snapshot(outdir)
+    task(**params)
+    after = _snapshot(outdir)
+
+    excluded = [os.path.abspath(cache.directory) + os.sep]
+    ledger = axeledger.current_ledger()
+    if ledger is not None and ledger.filename is not None:
+        excluded.append(os.path.abspath(ledger.filename))
+    outputs = [path for path, signature in after.items()
+               if before.get(path) != signature and
+               not os.path.abspath(path).startswith(tuple(excluded))]
+
+    cache.store(key, outputs)
+    cache.misses += 1
+    return key
@@ -1,6 +1,7 @@
 """
 See LICENSE.txt
 """
+import os
 import sys
 import shutil
 import logging
@@ -9,8 +10,9 @@ from astropy.io import fits
 
 from hstaxe import config as config_util
 
+from hstaxe.axeerror import aXeSIMError
+
 from . import axetasks
-from .axeerror import aXeSIMError
 
 
 # make sure there is a logger
@@ -79,7 +81,7 @@ class DispImator:
         """
 
         # run SEX2GOL
-        _log.info('Running task "sex2gol" ...', end=' ')
+        _log.info('Running task "sex2gol" ...')
         sys.stdout.flush()
         axetasks.sex2gol(grism=self.grismname,
                          config=self.configfile,
@@ -94,12 +96,11 @@ class DispImator:
         axetasks.gol2af(grism=self.grismname,
                         config=self.configfile,
                         orient=1,
-                        slitless_geom=1,
-                        silent=silent)
+                        slitless_geom=1)
         _log.info(' Done')
 
         # run PETCONT
-        _log.info('Running task "petcont" ...', end=' ')
+        _log.info('Running task "petcont" ...')
         sys.stdout.flush()
         axetasks.petcont(grism=self.grismname,
                          config=self.configfile,
@@ -172,7 +173,7 @@ class DirImator:
             for silent mode
         """
         # run SEX2GOL
-        _log.info('Running task "sex2gol"  ...', end=' ')
+        _log.info('Running task "sex2gol"  ...')
         sys.stdout.flush()
         axetasks.sex2gol(grism=self.dirname,
                          config=self.configfile,
@@ -185,8 +186,7 @@ class DirImator:
         _log.info('Running task "gol2af"   ...')
         sys.stdout.flush()
         axetasks.gol2af(grism=self.dirname,
-                        config=self.configfile,
-                        silent=silent)
+                        config=self.configfile)
         _log.info(' Done')
 
         # run DIRIMAGE
@@ -347,9 +347,16 @@ class DummyExtractor:
         # iraf.imexpr(expr=expression, output=tmpfile2,
         #    a=config_util.getDATA(tmpfile1)+'[SCI]', b=self.bck_flux, Stdout=1)
 
-        in_image = fits.open(config_util.getDATA(tmpfile1))
-        in_image['sci'].data -= self.bck_flux
-        in_image.close()
+        # the background is a flux value
+        # or an image in AXE_CONFIG_PATH
+        try:
+            bck_flux = float(self.bck_flux)
+        except ValueError:
+            bck_flux = fits.getdata(config_util.getCONF(self.bck_flux))
+
+        with fits.open(config_util.getDATA(tmpfile1),
+                       mode='update') as in_image:
+            in_image['sci'].data -= bck_flux
 
         # store the name of the background
         # subtracted grism image - this was tmpfile
@@ -402,7 +409,7 @@ class DummyExtractor:
             boolean for silent mode
         """
         # run SEX2GOL
-        _log.info('Running task "sex2gol" ...', end=' ')
+        _log.info('Running task "sex2gol" ...')
         sys.stdout.flush()
         axetasks.sex2gol(grism=self.dispersed_image,
                          config=self.configfile,
@@ -413,23 +420,21 @@ class DummyExtractor:
         _log.info(' Done')
 
         # run GOL2AF
-        _log.info('Running task "gol2af"  ...', end=' ')
+        _log.info('Running task "gol2af"  ...')
         sys.stdout.flush()
         axetasks.gol2af(grism=self.dispersed_image,
                         config=self.configfile,
                         mfwhm=self.extrfwhm,
                         orient=self.orient,
                         slitless_geom=self.slitless_geom,
-                        lambda_mark=self.lambda_mark,
-                        ilent=silent)
+                        lambda_mark=self.lambda_mark)
         _log.info(' Done')
 
         # run AF2PET
-        _log.info('Running task "af2pet"  ...', end=' ')
+        _log.info('Running task "af2pet"  ...')
         sys.stdout.flush()
         axetasks.af2pet(grism=self.dispersed_image,
-                        config=self.configfile,
-                        silent=silent)
+                        config=self.configfile)
         _log.info(' Done')
 
         # -----------------------------------------------
@@ -445,19 +450,17 @@ class DummyExtractor:
         # -----------------------------------------------
 
         # run PET2SPC
-        _log.info('Running task "pet2spc" ...', end=' ')
+        _log.info('Running task "pet2spc" ...')
         sys.stdout.flush()
         axetasks.pet2spc(grism=self.dispersed_image,
                          config=self.configfile,
-                         adj_sens=self.adj_sens,
-                         silent=silent)
+                         adj_sens=self.adj_sens)
         _log.info(' Done')
 
         # run STAMPS
-        _log.info('Running task "stamps"  ...', end=' ')
+        _log.info('Running task "stamps"  ...')
         sys.stdout.flush()
         axetasks.stamps(grism=self.dispersed_image,
                         config=self.configfile,
-                        sampling='rectified',
-                        silent=silent)
+                        sampling='rectified')
         _log.info(' Done')
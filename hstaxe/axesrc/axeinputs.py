@@ -5,7 +5,6 @@ import os
 import numpy as np
 from copy import deepcopy
 
-from astropy.io import fits
 from astropy.table import Table, Column
 from astropy.io.registry import IORegistryError
 
@@ -229,12 +228,20 @@ class aXeInput:
 
     def _check_subarray(self):
         """ check for and reject subarray images """
+        # read the headers of all images at once
+        images = [config_util.getDATA(row['grisim'])
+                  for row in self._inimlist]
+        if 'dirim' in self._inimlist.colnames:
+            images.extend(config_util.getDATA(row['dirim'])
+                          for row in self._inimlist)
+        config_util.read_headers(images)
+
         # go over all rows in the list
         for row in self._inimlist:
 
             # check the existence of the Input Image List
             image = config_util.getDATA(row['grisim'])
-            subarray = fits.getval(image, "SUBARRAY", ext=0)
+            subarray = config_util.get_headers(image).primary["SUBARRAY"]
             if subarray:
                 err_msg = ("Grism image: {0:s} is a subarray"
                            " which is not supported".format(image))
@@ -242,7 +249,7 @@ class aXeInput:
 
             if 'dirim' in self._inimlist.colnames:
                 image = config_util.getDATA(row['dirim'])
-                subarray = fits.getval(image, "SUBARRAY", ext=0)
+                subarray = config_util.get_headers(image).primary["SUBARRAY"]
                 if subarray:
                     err_msg = ("Direct image: {0:s} is a subarray"
                                " which is not supported".format(image))
@@ -0,0 +1,324 @@
+"""
+See LICENSE.txt
+
+Timing and resource records for the aXe tasks.
+
+While a run ledger is active, every C-executable started through
+a TaskWrapper and every Python stage wrapped in ``stage()`` adds a
+record with its wall and CPU time, the maximum resident set size,
+the block I/O and, where known, the number of objects or beams to
+the ledger. The block I/O are the bytes of the blocks read from and
+written to the storage devices; reads served from the page cache
+and writes not yet flushed are not counted, so these are not the
+bytes the tasks read and write. The records are kept in memory
+and, if a file name is given, appended to a JSON-lines file:
+
+    from hstaxe.axesrc.axeledger import run_ledger
+
+    with run_ledger('axe_ledger.jsonl') as ledger:
+        axetasks.axecore('aXe.lis', 'G141.F140W.V4.31.conf', ...)
+        axetasks.axecrr('aXe.lis', 'G141.F140W.V4.31.conf', ...)
+
+Without an active ledger nothing is recorded.
+"""
+import json
+import logging
+import os
+import resource
+import subprocess
+import time
+from contextlib import contextmanager
+
+# make sure there is a logger
+_log = logging.getLogger(__name__)
+
+# the size of the blocks counted
+# in the block I/O of the resource usage
+BLOCK_SIZE = 512
+
+# the stack of active ledgers
+_ledgers = []
+
+
+class RunLedger:
+    """The records of the tasks in an aXe run"""
+    def __init__(self, filename=None):
+        """
+        Parameters
+        ----------
+        filename: str
+            name of the JSON-lines file the records are
+            appended to; None keeps the records in memory only
+        """
+        self.filename = filename
+        self.records = []
+
+        # the high level tasks
+        # currently running
+        self.context = []
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, record):
+        """Add a record to the ledger.
+
+        Parameters
+        ----------
+        record: dict
+            the record of one task invocation
+        """
+        record['context'] = '/'.join(self.context) or None
+        self.records.append(record)
+
+        if self.filename is not None:
+            with open(self.filename, 'a') as ledger_file:
+                ledger_file.write(json.dumps(record) + '\n')
+
+    def summary(self, first=0):
+        """Sum up the records per stage.
+
+        Parameters
+        ----------
+        first: int
+            index of the first record to include
+
+        Returns
+        -------
+        summary: dict
+            calls, wall and CPU time, maximum RSS and block
+            I/O per stage
+        """
+        summary = {}
+        for record in self.records[first:]:
+            entry = summary.setdefault(record['stage'],
+                                       {'calls': 0, 'failed': 0,
+                                        'wall': 0.0, 'cpu': 0.0,
+                                        'max_rss_kb': 0,
+                                        'block_read_bytes': 0,
+                                        'block_write_bytes': 0})
+            entry['calls'] += 1
+            entry['failed'] += record['retcode'] != 0
+            entry['wall'] += record['wall']
+            entry['cpu'] += record['cpu_user'] + record['cpu_sys']
+            entry['max_rss_kb'] = max(entry['max_rss_kb'],
+                                      record['max_rss_kb'])
+            entry['block_read_bytes'] += record['block_read_bytes']
+            entry['block_write_bytes'] += record['block_write_bytes']
+        return summary
+
+    def report(self, title, first=0):
+        """Log a summary table of the records.
+
+        Parameters
+        ----------
+        title: str
+            the title of the table
+        first: int
+            index of the first record to include
+        """
+        summary = self.summary(first)
+        lines = ["Resource summary of {0:s}:".format(title),
+                 "{0:<16s}{1:>6s}{2:>11s}{3:>11s}{4:>12s}{5:>12s}{6:>12s}"
+                 .format('stage', 'calls', 'wall [s]', 'cpu [s]',
+                         'maxrss [MB]', 'blk in [MB]', 'blk out [MB]')]
+        for stage, entry in summary.items():
+            lines.append("{0:<16s}{1:>6d}{2:>11.2f}{3:>11.2f}{4:>12.1f}"
+                         "{5:>12.1f}{6:>12.1f}"
+                         .format(stage, entry['calls'], entry['wall'],
+                                 entry['cpu'], entry['max_rss_kb'] / 1024.0,
+                                 entry['block_read_bytes'] / 1048576.0,
+                                 entry['block_write_bytes'] / 1048576.0))
+        _log.info('\n'.join(lines))
+
+
+def current_ledger():
+    """Return the active ledger or None."""
+    if _ledgers:
+        return _ledgers[-1]
+    return None
+
+
+@contextmanager
+def run_ledger(filename=None):
+    """Activate a run ledger for the enclosed aXe tasks.
+
+    Parameters
+    ----------
+    filename: str
+        name of the JSON-lines file for the records
+
+    Returns
+    -------
+    ledger: RunLedger
+        the active ledger
+    """
+    ledger = RunLedger(filename)
+    _ledgers.append(ledger)
+    try:
+        yield ledger
+    finally:
+        _ledgers.remove(ledger)
+
+
+@contextmanager
+def task_summary(taskname):
+    """Report the resources of all stages of a high level task.
+
+    The records added while the context is open are tagged
+    with the task name and summarized at the end. Without
+    an active ledger nothing is done.
+
+    Parameters
+    ----------
+    taskname: str
+        name of the task, e.g. 'axecore'
+    """
+    ledger = current_ledger()
+    if ledger is None:
+        yield
+        return
+
+    first = len(ledger)
+    ledger.context.append(taskname)
+    try:
+        yield
+    finally:
+        ledger.context.pop()
+        ledger.report(taskname, first)
+
+
+def _make_record(stage, task, kind, wall, usage, retcode, args, counts):
+    """Compose a ledger record."""
+    return {'stage': stage,
+            'task': task,
+            'kind': kind,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'wall': wall,
+            'cpu_user': usage['cpu_user'],
+            'cpu_sys': usage['cpu_sys'],
+            'max_rss_kb': usage['max_rss_kb'],
+            'block_read_bytes': usage['block_read_bytes'],
+            'block_write_bytes': usage['block_write_bytes'],
+            'retcode': retcode,
+            'args': args,
+            'counts': counts or {}}
+
+
+def _usage_to_dict(usage):
+    """Convert a resource usage into a dictionary."""
+    return {'cpu_user': usage.ru_utime,
+            'cpu_sys': usage.ru_stime,
+            'max_rss_kb': usage.ru_maxrss,
+            'block_read_bytes': usage.ru_inblock * BLOCK_SIZE,
+            'block_write_bytes': usage.ru_oublock * BLOCK_SIZE}
+
+
+def run_command(command_list, stdout=None, stderr=None):
+    """Execute a command and measure its resource usage.
+
+    The child is waited for with wait4(), which gives the
+    resource usage of exactly this process.
+
+    Parameters
+    ----------
+    command_list: list
+        the command and its arguments
+    stdout: file
+        file for stdout, None for the system one
+    stderr: file
+        file for stderr, None for the system one
+
+    Returns
+    -------
+    retcode, wall, usage: int, float, dict
+        the return code, the wall time and the resource usage
+    """
+    start = time.perf_counter()
+    proc = subprocess.Popen(command_list, stdout=stdout, stderr=stderr)
+    if hasattr(os, 'wait4'):
+        _, status, rusage = os.wait4(proc.pid, 0)
+        if os.WIFSIGNALED(status):
+            retcode = -os.WTERMSIG(status)
+        else:
+            retcode = os.WEXITSTATUS(status)
+
+        # the child is reaped
+        proc.returncode = retcode
+        usage = _usage_to_dict(rusage)
+    else:
+        before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        retcode = proc.wait()
+        after = _usage_to_dict(resource.getrusage(resource.RUSAGE_CHILDREN))
+        usage = {key: after[key] - value
+                 for key, value in _usage_to_dict(before).items()}
+        usage['max_rss_kb'] = after['max_rss_kb']
+    return retcode, time.perf_counter() - start, usage
+
+
+def record_command(stage, task, wall, usage, retcode, args, counts=None):
+    """Add the record of a C-executable to the active ledger.
+
+    Parameters
+    ----------
+    stage: str
+        short name of the task
+    task: str
+        name of the executable
+    wall: float
+        the wall time
+    usage: dict
+        the resource usage from run_command()
+    retcode: int
+        the return code
+    args: list
+        the command line arguments
+    counts: dict
+        numbers of objects, beams, ...
+    """
+    ledger = current_ledger()
+    if ledger is not None:
+        ledger.add(_make_record(stage, task, 'C', wall, usage, retcode,
+                                args, counts))
+
+
+@contextmanager
+def stage(name, **counts):
+    """Record the resources of a Python stage.
+
+    The CPU time and the block I/O are those of
+    the Python process during the stage, the RSS is the maximum
+    of the Python process so far. Without an active ledger nothing
+    is measured.
+
+    Parameters
+    ----------
+    name: str
+        the name of the stage
+    counts: dict
+        numbers of objects, beams, ...; the dictionary
+        may still be updated within the stage
+
+    Returns
+    -------
+    counts: dict
+        the counts of the record
+    """
+    ledger = current_ledger()
+    if ledger is None:
+        yield counts
+        return
+
+    before = _usage_to_dict(resource.getrusage(resource.RUSAGE_SELF))
+    start = time.perf_counter()
+    retcode = 1
+    try:
+        yield counts
+        retcode = 0
+    finally:
+        wall = time.perf_counter() - start
+        after = _usage_to_dict(resource.getrusage(resource.RUSAGE_SELF))
+        usage = {key: after[key] - value for key, value in before.items()}
+        usage['max_rss_kb'] = after['max_rss_kb']
+        ledger.add(_make_record(name, name, 'python', wall, usage, retcode,
+                                [], counts))
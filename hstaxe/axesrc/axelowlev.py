@@ -2,11 +2,14 @@
 See LICENSE.txt
 """
 import os
-import subprocess
 import logging
 # from hstaxe.config import __AXE_BINDIR as AXE_BINDIR
 from hstaxe.axeerror import aXeError
-from hstaxe.config import getOUTPUT
+from hstaxe.config import (getCONF, getDATA, getDRIZZLE, getOUTPUT,
+                           get_axe_names, get_ext_info)
+
+from . import axeledger
+from . import configfile
 
 # make sure there is a logger
 _log = logging.getLogger(__name__)
@@ -15,6 +18,57 @@ _log = logging.getLogger(__name__)
 # value for the binaries
 GOOD_RETURN_VALUE = 0
 
+# prefix for the stdout/stderr files of the tasks,
+# which keeps the files of worker processes apart
+_output_namespace = ''
+
+# the default aperture file names of the tasks, keyed on
+# the image, the configuration file and the aperture kind
+_aperture_names = {}
+
+
+def set_output_namespace(namespace=None):
+    """Set the namespace for the stdout/stderr files of the tasks
+
+    Parameters
+    ----------
+    namespace: str
+        the namespace, e.g. a worker name; None for the default
+    """
+    global _output_namespace
+    _output_namespace = namespace + '_' if namespace else ''
+
+
+def clear_aperture_cache():
+    """Forget the default aperture file names"""
+    _aperture_names.clear()
+
+
+def count_beams(aperture_file):
+    """Count the objects and beams in an aperture file
+
+    Parameters
+    ----------
+    aperture_file: str
+        name of the OAF or BAF
+
+    Returns
+    -------
+    counts: dict
+        the numbers of objects and beams
+    """
+    counts = {'objects': 0, 'beams': 0}
+    with open(aperture_file) as af_file:
+        for line in af_file:
+            words = line.split()
+            if not words:
+                continue
+            if words[0] == 'APERTURE':
+                counts['objects'] += 1
+            elif words[0] == 'BEAM':
+                counts['beams'] += 1
+    return counts
+
 
 class TaskWrapper(object):
     """General class to execute the C-tasks"""
@@ -34,19 +88,82 @@ class TaskWrapper(object):
         self.command_list = []
 
         # save a name for stdout
-        self.stdout = getOUTPUT(tshort+'.stdout')
+        self.stdout = getOUTPUT(_output_namespace+tshort+'.stdout')
 
         # save a name for stderr
-        self.stderr = getOUTPUT(tshort+'.stderr')
+        self.stderr = getOUTPUT(_output_namespace+tshort+'.stderr')
 
         # put the command into the list
         # self.command_list.append("/".join([AXE_BINDIR, taskname]))
         self.command_list.append(taskname)
 
-    def _cleanup(self):
+        # the aperture file of the task,
+        # counted for the run ledger
+        self._aperture = None
+
+    def _set_aperture_file(self, grism, config, aperture_file='',
+                           back=False, drzpath=False):
+        """Note the aperture file the task reads or writes
+
+        The objects and beams in the file are counted
+        for the run ledger.
+
+        Parameters
+        ----------
+        grism: str
+            name of the dispersed image
+        config: str
+            name of the aXe configuration file
+        aperture_file: str
+            name of the aperture file, empty for the default name
+        back: bool
+            the default is the BAF instead of the OAF
+        drzpath: bool
+            the image and the default aperture file
+            are in the drizzle path
+        """
+        self._aperture = (grism, config, aperture_file, back, drzpath)
+
+    def _get_counts(self):
+        """Count the objects and beams in the aperture file of the task
+
+        Returns
+        -------
+        counts: dict
+            the numbers of objects and beams, None if the
+            task has no aperture file or it does not exist
+        """
+        if self._aperture is None:
+            return None
+        grism, config, aperture_file, back, drzpath = self._aperture
+
+        try:
+            # derive the default name like the executables,
+            # once per image and configuration file
+            if not aperture_file:
+                getpath = getDRIZZLE if drzpath else getOUTPUT
+                imagepath = getDRIZZLE if drzpath else getDATA
+                key = (grism, imagepath(grism), getCONF(config), back)
+                if key not in _aperture_names:
+                    conf = configfile.ConfigFile(getCONF(config))
+                    ext_info = get_ext_info(imagepath(grism), conf)
+                    axe_names = get_axe_names(grism, ext_info)
+                    _aperture_names[key] = axe_names['BAF' if back else 'OAF']
+                aperture_file = getpath(_aperture_names[key])
+
+            if os.path.isfile(aperture_file):
+                return count_beams(aperture_file)
+        except (aXeError, OSError) as err:
+            _log.debug("No counts for {0:s}: {1!s}".format(self.taskname,
+                                                           err))
+        return None
+
+    def cleanup(self):
         """The method deletes the files created for stdout and stderr.
 
-        This is a usual cleaning procedure in case nothing bad happened.
+        This is a usual cleaning procedure in case nothing bad happened;
+        runall() does it after a good run, callers of run() do it
+        themselves.
         """
         # delete stdout/stderr
         if os.path.isfile(self.stdout):
@@ -110,9 +227,9 @@ class TaskWrapper(object):
             serr = open(self.stderr, 'w+')
 
             # execute the task
-            retcode = subprocess.call(self.command_list,
-                                      stdout=sout,
-                                      stderr=serr)
+            retcode, wall, usage = axeledger.run_command(self.command_list,
+                                                         stdout=sout,
+                                                         stderr=serr)
 
             # close stdout/stderr
             sout.close()
@@ -122,7 +239,18 @@ class TaskWrapper(object):
 
             # execute the task with the default stdout and
             # stderr, which is the system one
-            retcode = subprocess.call(self.command_list)
+            retcode, wall, usage = axeledger.run_command(self.command_list)
+
+        # store time, resources and, from the
+        # aperture file, the number of objects
+        # and beams in the run ledger
+        counts = None
+        if axeledger.current_ledger() is not None:
+            counts = self._get_counts()
+        axeledger.record_command(self.tshort, self.taskname, wall, usage,
+                                 retcode, self.command_list[1:], counts)
+
+        return retcode
 
 
     def runall(self, silent=True):
@@ -147,7 +275,7 @@ class TaskWrapper(object):
         # check whether the run was good
         if retcode == GOOD_RETURN_VALUE:
             # do the cleaning
-            self._cleanup()
+            self.cleanup()
         else:
             self._report_all(silent)
 
@@ -233,6 +361,9 @@ class aXe_AF2PET(TaskWrapper):
             self.command_list.append("-out_PET={0:s}"
                                      .format(params['out_pet']))
 
+        # the aperture file, for the run ledger
+        self._set_aperture_file(grism, config, params.get('in_af'))
+
 
 class aXe_GPS(TaskWrapper):
     """Wrapper around the aXe_GPS task"""
@@ -386,6 +517,15 @@ class aXe_BE(TaskWrapper):
         if (('mask' in params) and (params['mask'])):
             self.command_list.append('-msk')
 
+        # append the parameter 'nthreads'
+        if (('nthreads' in params) and (params['nthreads'] is not None)):
+            self.command_list.append('-nthreads={0:s}'
+                                     .format(str(params['nthreads'])))
+
+        # the aperture file, for the run ledger
+        self._set_aperture_file(grism, config, params['in_af'],
+                                back=not params.get('mask'))
+
 
 class aXe_DRZ2PET(TaskWrapper):
     """Wrapper around the aXe_DRZ2PET task"""
@@ -498,6 +638,11 @@ class aXe_DRZPREP(TaskWrapper):
             Also create extension for optimal extraction.
         back : bool
             Create also background DPP's?.
+        nthreads : int
+            Number of threads creating the DPP's of the
+            images in parallel (default: all cores). Several
+            threads need a cfitsio built reentrant, otherwise
+            one thread is used.
 
         Description
         -----------
@@ -603,6 +748,11 @@ class aXe_DRZPREP(TaskWrapper):
         if (('opt_extr' in params) and (params['opt_extr'])):
             self.command_list.append('-opt_extr')
 
+        # append the parameter 'nthreads'
+        if (('nthreads' in params) and (params['nthreads'] is not None)):
+            self.command_list.append('-nthreads={0:s}'
+                                     .format(str(params['nthreads'])))
+
 
     def runall(self, silent=True):
         """Run the wrapped task
@@ -797,14 +947,14 @@ class aXe_GOL2AF(TaskWrapper):
             self.command_list.append('-in_GOL={0:s}'.format(params['in_gol']))
 
         # append the flag 'slitless_geom'
-        if (('slitless_geom' in params) and (params['slitless_geom'])):
+        if slitless_geom:
             # put the slitless_Geom-flag to the list
             self.command_list.append('-slitless_geom=1')
         else:
             self.command_list.append('-slitless_geom=0')
 
         # append the flag 'orient'
-        if (('orient' in params) and (params['orient'])):
+        if orient:
             # put the orient-flag to the list
             self.command_list.append('-orient=1')
         else:
@@ -816,9 +966,13 @@ class aXe_GOL2AF(TaskWrapper):
             self.command_list.append('-exclude_faint')
 
         #  append the flag 'bck'
-        if (('back' in params) and (params['back'])):
+        if back:
             # put the bck-flag to the list
             self.command_list.append('-bck')
+
+        # the aperture file, for the run ledger
+        self._set_aperture_file(grism, config, params.get('out_af'),
+                                back=back)
         _log.info("Command list: {}".format(self.command_list))
 
 
@@ -1120,6 +1274,9 @@ class aXe_PET2SPC(TaskWrapper):
             # put the ip_corr-flag to the list
             self.command_list.append('-smooth_conv')
 
+        # the aperture file, for the run ledger
+        self._set_aperture_file(grism, config, in_af, drzpath=drzpath)
+
 
 class aXe_PETCONT(TaskWrapper):
     """Wrapper around the aXe_PETCONT task"""
@@ -1273,12 +1430,16 @@ class aXe_PETCONT(TaskWrapper):
             # append the no-PET flagg
             self.command_list.append('-noPET')
 
+        # the aperture file, for the run ledger
+        self._set_aperture_file(grism, config, in_af)
+
 
 class aXe_PETFF(TaskWrapper):
     """Wrapper around the aXe_PETFF task"""
     def __init__(self, grism, config,
                  back=False,
-                 ffname=""):
+                 ffname="",
+                 ffgrid=None):
         """Flat field the contents of a Pixel Extraction Table (PET).
 
         Parameters
@@ -1293,6 +1454,10 @@ class aXe_PETFF(TaskWrapper):
         ffname : str
             Name to use for the output flat field cube file instead of the
             default
+        ffgrid : int
+            Number of wavelengths in a cached grid from which the flat
+            field values are interpolated; by default the polynomial is
+            evaluated for every pixel
 
         Description
         -----------
@@ -1347,7 +1512,12 @@ class aXe_PETFF(TaskWrapper):
         # check for the 'FFNAME' name
         if ffname:
             # put the name to the list
-            self.command_list.append('-FFNAME={0:s}'.format(params['ffname']))
+            self.command_list.append('-FFNAME={0:s}'.format(ffname))
+
+        # check for the 'FFGRID' value
+        if ffgrid is not None:
+            # put the value to the list
+            self.command_list.append('-FFGRID={0:s}'.format(str(ffgrid)))
 
         # append the flag 'bck'
         if back:
@@ -1533,6 +1703,10 @@ class aXe_STAMPS(TaskWrapper):
         if (params['drzpath']):
             # put the according flag to the list
             self.command_list.append('-drz')
+
+        # the aperture file, for the run ledger
+        self._set_aperture_file(grism, config, params['in_af'],
+                                drzpath=params['drzpath'])
         _log.info(self.command_list)
 
 
@@ -1,5 +1,8 @@
 import os
 import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
 from astropy.io import fits
 import stsci.imagestats as imagestats
 
@@ -14,6 +17,89 @@ from . import axetasks
 # make sure there is a logger
 _log = logging.getLogger(__name__)
 
+# the number of image rows processed at once
+CHUNK_ROWS = 256
+
+
+def _sky_values(sci_data, bck_data, dq_data, msk_data, flag=-1.0e10):
+    """Collect the pixel values for the background scaling
+
+    The ratio of the grism and the master background image and
+    the master background itself are collected for all pixels
+    that are neither flagged in the DQ array nor masked as part
+    of a beam. The images are read in chunks of rows into
+    preallocated buffers.
+
+    Parameters
+    ----------
+    sci_data: numpy.ndarray
+        the grism image
+    bck_data: numpy.ndarray
+        the master background
+    dq_data: numpy.ndarray
+        the DQ array of the grism image
+    msk_data: numpy.ndarray
+        the mask image of the grism image
+    flag: float
+        values at or below are excluded
+
+    Returns
+    -------
+    ratio_values, bck_values: numpy.ndarray, numpy.ndarray
+        the ratio and background values
+    """
+    # count the good pixels to size the buffers
+    ngood = 0
+    for start in range(0, sci_data.shape[0], CHUNK_ROWS):
+        rows = slice(start, start + CHUNK_ROWS)
+        ngood += np.count_nonzero(~((dq_data[rows] > 0.5) |
+                                    (msk_data[rows] < -900000)))
+
+    ratio_values = np.empty(ngood, dtype=np.result_type(sci_data.dtype,
+                                                        bck_data.dtype,
+                                                        np.float32))
+    bck_values = np.empty(ngood, dtype=bck_data.dtype)
+
+    nratio = 0
+    nbck = 0
+    for start in range(0, sci_data.shape[0], CHUNK_ROWS):
+        rows = slice(start, start + CHUNK_ROWS)
+        good = ~((dq_data[rows] > 0.5) | (msk_data[rows] < -900000))
+
+        # the ratio values above the flag
+        bck = bck_data[rows][good]
+        ratio = sci_data[rows][good] / bck
+        ratio = ratio[ratio > flag]
+        ratio_values[nratio:nratio + ratio.size] = ratio
+        nratio += ratio.size
+
+        # the background values above the flag
+        bck = bck[bck > flag]
+        bck_values[nbck:nbck + bck.size] = bck
+        nbck += bck.size
+
+    return ratio_values[:nratio], bck_values[:nbck]
+
+
+def _subtract_image(sci_data, bck_data, scale=None):
+    """Subtract a background image in place, in chunks of rows
+
+    Parameters
+    ----------
+    sci_data: numpy.ndarray
+        the image to subtract from
+    bck_data: numpy.ndarray
+        the background image
+    scale: float
+        the scale of the background, None for no scaling
+    """
+    for start in range(0, sci_data.shape[0], CHUNK_ROWS):
+        rows = slice(start, start + CHUNK_ROWS)
+        if scale is None:
+            sci_data[rows] -= bck_data[rows]
+        else:
+            sci_data[rows] -= bck_data[rows] * scale
+
 
 class aXePrepArator:
     """This task prepares the science files for further processing within aXe.
@@ -170,68 +256,68 @@ class aXePrepArator:
                          out_bck=None)
 
     def _subtract_sky(self, ext_info, flag=-1.0e10):
-        """Perform a classical background subtraction."""
+        """Perform a classical background subtraction.
+
+        All images are opened once and memory mapped; the
+        statistics are computed from one pass over the unmasked
+        pixels and the scaled master background is subtracted
+        in place.
+        """
 
         # Derive the name of all aXe products for a given image
         axe_names = config_util.get_axe_names(self.grisim, ext_info)
-        msk_image_sc = axe_names['MSK'] + '[SCI]'
+        msk_image = config_util.getOUTPUT(axe_names['MSK'])
 
         # check for a previous background subtraction
-        with fits.open(self.grisim, mode='update') as grism_file:
+        with fits.open(self.grisim, mode='update', memmap=True) as grism_file, \
+                fits.open(self.master_bck, memmap=True) as bck_file, \
+                fits.open(msk_image, memmap=True) as msk_file:
             if 'AXEPRBCK' in grism_file[ext_info['fits_ext']].header:
                 # warn that this is the second time
-                _log.info("WARNING: Image %25s seems to be already background "
-                      "subtracted!".format(self.grisim))
-
-            # Compute the ratio of the grism SCI image to the background image
-            sci_data = grism_file['SCI', ext_info['ext_version']].data
-            sci_header = grism_file['SCI', ext_info['ext_version']].header
-            npix = int(sci_header["NAXIS1"]) * int(sci_header["NAXIS2"]) 
-
-            bck_data = fits.getdata(self.master_bck)
-            ratio_data = sci_data / bck_data
-
-            # Flag pixels in the ratio image based on the grism image DQ array
-            grism_dq_data = grism_file['DQ', ext_info['ext_version']].data
-            ratio_data[grism_dq_data > 0.5] = flag
-
-            # Flag pixels in the ratio image based on the grism image MSK file
-            msk_file = fits.open(config_util.getOUTPUT(msk_image_sc.split("[")[0]),  'readonly')
-            msk_data = msk_file['SCI'].data
-            msk_file.close()
-
-            ratio_data[msk_data < -900000] = flag
-
-            # Flag pixels in the background image based on the grism image DQ
-            # and MSK file
-            bck_data[grism_dq_data > 0.5] = flag
-            bck_data[msk_data < -900000] = flag
+                _log.info("WARNING: Image {0:s} seems to be already background "
+                          "subtracted!".format(self.grisim))
+
+            sci_hdu = grism_file['SCI', ext_info['ext_version']]
+            sci_header = sci_hdu.header
+            npix = int(sci_header["NAXIS1"]) * int(sci_header["NAXIS2"])
+
+            # the master background is in the primary
+            # or else in the first extension
+            bck_data = bck_file[0].data
+            if bck_data is None:
+                bck_data = bck_file[1].data
+
+            # Collect the values of the ratio of the grism SCI image
+            # to the background image and of the background image,
+            # excluding pixels flagged in the grism image DQ array
+            # and in the grism image MSK file
+            ratio_values, bck_values = _sky_values(
+                sci_hdu.data, bck_data,
+                grism_file['DQ', ext_info['ext_version']].data,
+                msk_file['SCI'].data, flag)
 
             # Compute stats for the ratio image
-            stats = imagestats.ImageStats(ratio_data[ratio_data > flag],
+            stats = imagestats.ImageStats(ratio_values,
                                           fields='midpt,stddev,npix', lower=None,
                                           upper=None, nclip=3, lsig=3.0, usig=3.0,
                                           binwidth=0.01)
 
             # Compute stats for the background image
-            bstats = imagestats.ImageStats(bck_data[bck_data > flag],
+            bstats = imagestats.ImageStats(bck_values,
                                           fields='midpt,stddev,npix', lower=None,
                                           upper=None, nclip=3, lsig=3.0, usig=3.0,
                                           binwidth=0.01)
+            del ratio_values, bck_values
 
             # Subtract the scaled background from the grism image
-            # Reload a clean version of background
-            bck_data = fits.getdata(self.master_bck)
-
-            grism_file['SCI', ext_info['ext_version']].data -= bck_data * stats.midpt 
-            grism_header = grism_file['SCI', ext_info['ext_version']].header
+            _subtract_image(sci_hdu.data, bck_data, stats.midpt)
 
             # write some header iformation
-            grism_header['SKY_SCAL'] = (float(stats.midpt),  'scaling value for the master background')
-            grism_header['SKY_MAST'] = (float(bstats.midpt),  'average value of the master background')
-            grism_header['SKY_IMG'] = (self.master_bck, 'name of the master background image')
-            grism_header['F_SKYPIX'] = (float(stats.npix)/float(npix), 'fraction of pixels used for scaling')
-            grism_header['AXEPRBCK'] = ('Done',          'flag that background subtraction was done')
+            sci_header['SKY_SCAL'] = (float(stats.midpt),  'scaling value for the master background')
+            sci_header['SKY_MAST'] = (float(bstats.midpt),  'average value of the master background')
+            sci_header['SKY_IMG'] = (self.master_bck, 'name of the master background image')
+            sci_header['F_SKYPIX'] = (float(stats.npix)/float(npix), 'fraction of pixels used for scaling')
+            sci_header['AXEPRBCK'] = ('Done',          'flag that background subtraction was done')
         return 0
 
     def _subtract_nicsky(self, ext_info):
@@ -240,18 +326,12 @@ class aXePrepArator:
         axe_names = config_util.get_axe_names(self.grisim, ext_info)
 
         # check for a previous background subtraction
-        fits_img = fits.open(self.grisim, 'readonly')
-        fits_head = fits_img[ext_info['fits_ext']].header
-        # npix = int(fits_head['NAXIS1']) * int(fits_head['NAXIS1'])
-
+        fits_head = fits.getheader(self.grisim, ext=ext_info['fits_ext'])
         if 'AXEPRBCK' in fits_head:
             # warn that this is the second time
             _log.info(f"WARNING: Image {self.grisim} seems to be already background "
                   "subtracted!")
 
-        # close the fits
-        fits_img.close()
-
         # do the special background fitting for NICMOS
         if self.params['backped'] is not None:
             nicback = axelowlev.aXe_NICBACK(self.grisim,
@@ -266,49 +346,39 @@ class aXePrepArator:
         del nicback
 
         # check whether the background image exists
-        if not os.path.isfile(config_util.getOUTPUT(axe_names['NBCK'])):
+        bckfilename = config_util.getOUTPUT(axe_names['NBCK'])
+        if not os.path.isfile(bckfilename):
             err_msg = ("The background image: {0:s} does NOT exist!"
-                       .format(config_util.getOUTPUT(axe_names['NBCK'])))
+                       .format(bckfilename))
             raise aXeError(err_msg)
 
-        # Subtract the scaled background image from the grism image
-        # copy the image to the output directory first
-        sci_file = fits.open(self.grisim, mode='update')
-        bck_file = fits.open(config_util.getOUTPUT(axe_names['NBCK']),'readonly')
-        sci_file['SCI', ext_info['ext_version']].data -= bck_file[1].data
-        sci_file.close()
-        bck_file.close()
-
-        # open the background image
-        fits_img = fits.open(config_util.getOUTPUT(axe_names['NBCK']),
-                                                'readonly')
-        fits_head = fits_img['BCK'].header
-
-        # open the grism image and isolate the correct extension header
-        grism_img = fits.open(self.grisim, mode='update')
-        grism_header = grism_img[ext_info['fits_ext']].header
-
-        if 'SKY_SCAL' in fits_head and 'F_SKYPIX' in fits_head:
-
-            # transfer important keywords
-            # to the grism image
-            grism_header['SKY_SCAL'] = (float(fits_head['SKY_SCAL']),
-                                        'scaling value of background')
-            grism_header['F_SKYPIX'] = (float(fits_head['F_SKYPIX']),
-                                        'fraction of pixels used for scaling')
-
-        # close the fits again
-        fits_img.close()
+        # open the grism and the background image once
+        with fits.open(self.grisim, mode='update', memmap=True) as grism_img, \
+                fits.open(bckfilename, memmap=True) as fits_img:
 
-        # write some keywords
-        grism_header['AXEPRBCK'] = ('Done', 'flag that background subtraction was done')
-        grism_header['SKY_IMG'] = (self.master_bck, 'name of the 1st master background image')
-        if self.params['backped'] is not None:
-            grism_header['SKY_IMG2'] = (self.params['backped'],
-                                        'name of the 2nd master background image')
+            # Subtract the scaled background image from the grism image
+            _subtract_image(grism_img['SCI', ext_info['ext_version']].data,
+                            fits_img[1].data)
+
+            # isolate the correct extension headers
+            fits_head = fits_img['BCK'].header
+            grism_header = grism_img[ext_info['fits_ext']].header
 
-        # close the image again
-        grism_img.close()
+            if 'SKY_SCAL' in fits_head and 'F_SKYPIX' in fits_head:
+
+                # transfer important keywords
+                # to the grism image
+                grism_header['SKY_SCAL'] = (float(fits_head['SKY_SCAL']),
+                                            'scaling value of background')
+                grism_header['F_SKYPIX'] = (float(fits_head['F_SKYPIX']),
+                                            'fraction of pixels used for scaling')
+
+            # write some keywords
+            grism_header['AXEPRBCK'] = ('Done', 'flag that background subtraction was done')
+            grism_header['SKY_IMG'] = (self.master_bck, 'name of the 1st master background image')
+            if self.params['backped'] is not None:
+                grism_header['SKY_IMG2'] = (self.params['backped'],
+                                            'name of the 2nd master background image')
 
         return True
 
@@ -567,3 +637,95 @@ class aXePrepArator:
 
         # return something
         return 1
+
+
+def _prep_image(rows, params):
+    """Run AXEPREP on all extensions of one grism image
+
+    Parameters
+    ----------
+    rows: list
+        the rows of the Input Image List for the image,
+        as dictionaries
+    params: dict
+        the parameters of the preparation
+
+    Returns
+    -------
+    failures: list
+        (grism image, configuration, message) for all
+        extensions that could not be prepared
+    """
+    failures = []
+    for row in rows:
+        try:
+            aXePrep = aXePrepArator(row['grisim'],
+                                    row['objcat'],
+                                    row['dirim'],
+                                    row['config'],
+                                    row['dmag'],
+                                    master_bck=row['fringe'],
+                                    **params)
+            aXePrep.run()
+            del aXePrep
+        except Exception as err:
+            _log.exception("AXEPREP: Image {0:s} failed!"
+                           .format(str(row['grisim'])))
+            failures.append((str(row['grisim']), str(row['config']),
+                             str(err)))
+    return failures
+
+
+def _init_worker():
+    """Give a worker process its own stdout/stderr files"""
+    axelowlev.set_output_namespace('axeprep{0:d}'.format(os.getpid()))
+
+
+def prep_images(images, nworkers=None, **params):
+    """Run AXEPREP on a list of grism images
+
+    The images are independent and can be prepared in
+    parallel worker processes. All extensions of an image
+    are prepared by the same worker, since they are updated
+    in the same file. Failing images are logged and
+    reported, but do not stop the other images.
+
+    Parameters
+    ----------
+    images: list
+        one list of Input Image List rows (as dictionaries)
+        per grism image
+    nworkers: int
+        number of worker processes; None or 1 works in the
+        current process, 0 uses all available cores
+    params: dict
+        the parameters for aXePrepArator
+
+    Returns
+    -------
+    failures: list
+        (grism image, configuration, message) for all
+        extensions that could not be prepared
+    """
+    if nworkers == 0:
+        nworkers = os.cpu_count()
+
+    failures = []
+    if nworkers is None or nworkers < 2 or len(images) < 2:
+        for rows in images:
+            failures.extend(_prep_image(rows, params))
+        return failures
+
+    with ProcessPoolExecutor(max_workers=min(nworkers, len(images)),
+                             initializer=_init_worker) as pool:
+        futures = {pool.submit(_prep_image, rows, params): rows
+                   for rows in images}
+        for future in as_completed(futures):
+            try:
+                failures.extend(future.result())
+            except Exception as err:
+                # the worker itself failed
+                for row in futures[future]:
+                    failures.append((str(row['grisim']), str(row['config']),
+                                     str(err)))
+    return failures
@@ -4,6 +4,7 @@ See LICENSE.txt
 import logging
 from hstaxe import config as config_util
 
+from . import axecache
 from . import axetasks
 from . import configfile
 from . import nlincoeffs
@@ -23,10 +24,68 @@ class aXeSpcExtr:
 
         self.params = params
 
+        # the input files of the extraction
+        # and the cache keys of the stages
+        self.input_files = []
+        self.keys = {}
+
+    def _find_input_files(self, conf):
+        """Collect the input files of the extraction
+
+        These are the grism, direct image and object catalog,
+        the configuration file and the files named in it.
+
+        Parameters
+        ----------
+        conf: ConfigFile
+            the configuration file
+        """
+        files = [config_util.getDATA(self.grisim),
+                 config_util.getCONF(self.config)]
+        if self.dirim:
+            files.append(config_util.getDATA(self.dirim))
+        if self.objcat:
+            files.extend(config_util.getDATA(catalog)
+                         for catalog in str(self.objcat).split(','))
+
+        # the flat field and the sensitivities
+        ff_name = conf['FFNAME']
+        if ff_name is not None and ff_name.upper() != 'NONE':
+            files.append(config_util.getCONF(ff_name))
+        for beam in conf.beams.values():
+            sens_file = beam['SENSITIVITY_']
+            if sens_file is not None and sens_file.upper() != 'NONE':
+                files.append(config_util.getCONF(sens_file))
+        return files
+
+    def _run_stage(self, name, task, parents=(), **params):
+        """Run one stage of the extraction
+
+        With an active stage cache the stage is skipped if its
+        outputs are in the cache.
+
+        Parameters
+        ----------
+        name: str
+            the name of the stage
+        task: callable
+            the aXe task
+        parents: list
+            names of the stages the stage depends on
+        params: dict
+            the parameters of the task
+        """
+        self.keys[name] = axecache.run_stage(
+            name, task,
+            parents=[self.keys.get(parent) for parent in parents],
+            files=self.input_files,
+            **params)
+
     def _make_bckPET(self):
         """Generate the object PET."""
         # run GOL2AF
-        axetasks.gol2af(grism=self.grisim,
+        self._run_stage('gol2af_back', axetasks.gol2af, ['sex2gol'],
+                        grism=self.grisim,
                         config=self.config,
                         mfwhm=self.params['backfwhm'],
                         back=True,
@@ -39,31 +98,35 @@ class aXeSpcExtr:
                         in_gol=None)
 
         #  run BACKEST
-        axetasks.backest(grism=self.grisim,
-                         config=self.config,
-                         np=self.params['np'],
-                         interp=self.params['interp'],
-                         niter_med=self.params['niter_med'],
-                         niter_fit=self.params['niter_fit'],
-                         kappa=self.params['kappa'],
-                         smooth_length=self.params['smooth_length'],
-                         smooth_fwhm=self.params['smooth_fwhm'],
-                         old_bck=False,
-                         mask=False,
-                         in_af="",
-                         out_bck=None)
+        self._run_stage('backest', axetasks.backest, ['gol2af_back'],
+                        grism=self.grisim,
+                        config=self.config,
+                        np=self.params['np'],
+                        interp=self.params['interp'],
+                        niter_med=self.params['niter_med'],
+                        niter_fit=self.params['niter_fit'],
+                        kappa=self.params['kappa'],
+                        smooth_length=self.params['smooth_length'],
+                        smooth_fwhm=self.params['smooth_fwhm'],
+                        old_bck=False,
+                        mask=False,
+                        in_af="",
+                        out_bck=None,
+                        nthreads=self.params.get('nthreads'))
 
         # run AF2PET
-        axetasks.af2pet(grism=self.grisim,
+        self._run_stage('af2pet_back', axetasks.af2pet, ['backest'],
+                        grism=self.grisim,
                         config=self.config,
                         back=True,
                         out_pet=None)
 
         # run PETFF
-        axetasks.petff(grism=self.grisim,
-                       config=self.config,
-                       back=True,
-                       ffname=None)
+        self._run_stage('petff_back', axetasks.petff, ['af2pet_back'],
+                        grism=self.grisim,
+                        config=self.config,
+                        back=True,
+                        ffname=None)
 
     def _make_objPET(self):
         """Generate the object PET."""
@@ -78,17 +141,19 @@ class aXeSpcExtr:
             use_direct = True
 
         # run SEX2GOL
-        axetasks.sex2gol(grism=self.grisim,
-                         config=config_util.getCONF(self.config),
-                         in_sex=config_util.getDATA(self.objcat),
-                         use_direct=use_direct,
-                         direct=config_util.getDATA(self.dirim),
-                         dir_hdu=None,
-                         spec_hdu=None,
-                         out_sex=None)
+        self._run_stage('sex2gol', axetasks.sex2gol,
+                        grism=self.grisim,
+                        config=config_util.getCONF(self.config),
+                        in_sex=config_util.getDATA(self.objcat),
+                        use_direct=use_direct,
+                        direct=config_util.getDATA(self.dirim),
+                        dir_hdu=None,
+                        spec_hdu=None,
+                        out_sex=None)
 
         # run GOL2AF
-        axetasks.gol2af(grism=self.grisim,
+        self._run_stage('gol2af', axetasks.gol2af, ['sex2gol'],
+                        grism=self.grisim,
                         config=self.config,
                         mfwhm=self.params['extrfwhm'],
                         back=False,
@@ -100,28 +165,31 @@ class aXeSpcExtr:
                         out_af=None, in_gol=None)
 
         # run AF2PET
-        axetasks.af2pet(grism=self.grisim,
+        self._run_stage('af2pet', axetasks.af2pet, ['gol2af'],
+                        grism=self.grisim,
                         config=self.config,
                         back=False,
                         out_pet=None)
 
         # run PETCONT
-        axetasks.petcont(grism=self.grisim,
-                         config=self.config,
-                         cont_model=self.params['cont_model'],
-                         model_scale=self.params['model_scale'],
-                         spec_models=None,
-                         object_models=None,
-                         inter_type=self.params['inter_type'],
-                         lambda_psf=self.params['lambda_psf'],
-                         cont_map=True,
-                         in_af="")
+        self._run_stage('petcont', axetasks.petcont, ['af2pet'],
+                        grism=self.grisim,
+                        config=self.config,
+                        cont_model=self.params['cont_model'],
+                        model_scale=self.params['model_scale'],
+                        spec_models=None,
+                        object_models=None,
+                        inter_type=self.params['inter_type'],
+                        lambda_psf=self.params['lambda_psf'],
+                        cont_map=True,
+                        in_af="")
 
         # run PETFF
-        axetasks.petff(grism=self.grisim,
-                       config=self.config,
-                       back=False,
-                       ffname=None)
+        self._run_stage('petff', axetasks.petff, ['petcont'],
+                        grism=self.grisim,
+                        config=self.config,
+                        back=False,
+                        ffname=None)
 
     def _make_spectra(self):
         """Extract the spectra."""
@@ -133,20 +201,23 @@ class aXeSpcExtr:
             use_bpet = False
 
         # run PET2SPC
-        axetasks.pet2spc(grism=self.grisim,
-                         config=self.config,
-                         use_bpet=use_bpet,
-                         adj_sens=self.params['adj_sens'],
-                         weights=self.params['weights'],
-                         do_flux=True,
-                         drzpath=False,
-                         in_af="",
-                         opet=None,
-                         bpet=None,
-                         out_spc=None)
+        self._run_stage('pet2spc', axetasks.pet2spc,
+                        ['petff', 'petff_back'] if use_bpet else ['petff'],
+                        grism=self.grisim,
+                        config=self.config,
+                        use_bpet=use_bpet,
+                        adj_sens=self.params['adj_sens'],
+                        weights=self.params['weights'],
+                        do_flux=True,
+                        drzpath=False,
+                        in_af="",
+                        opet=None,
+                        bpet=None,
+                        out_spc=None)
 
         # run STAMPS
-        axetasks.stamps(grism=self.grisim,
+        self._run_stage('stamps', axetasks.stamps, ['petff'],
+                        grism=self.grisim,
                         config=self.config,
                         sampling=self.params['sampling'],
                         drzpath=False,
@@ -163,7 +234,8 @@ class aXeSpcExtr:
 
         # run GOL2AF,
         # getting the special OAF as output
-        axetasks.gol2af(grism=self.grisim,
+        self._run_stage('gol2af_drz', axetasks.gol2af, ['sex2gol'],
+                        grism=self.grisim,
                         config=self.config,
                         mfwhm=self.params['drzfwhm'],
                         back=False,
@@ -176,21 +248,24 @@ class aXeSpcExtr:
 
         # run PETCONT,
         # using the special OAF as input
-        axetasks.petcont(grism=self.grisim,
-                         config=self.config,
-                         cont_model=self.params['cont_model'],
-                         model_scale=self.params['model_scale'],
-                         spec_models=None,
-                         object_models=None,
-                         inter_type=self.params['inter_type'],
-                         lambda_psf=self.params['lambda_psf'],
-                         cont_map=True, in_af=cont_oaf)
+        self._run_stage('petcont_drz', axetasks.petcont,
+                        ['gol2af_drz', 'petff'],
+                        grism=self.grisim,
+                        config=self.config,
+                        cont_model=self.params['cont_model'],
+                        model_scale=self.params['model_scale'],
+                        spec_models=None,
+                        object_models=None,
+                        inter_type=self.params['inter_type'],
+                        lambda_psf=self.params['lambda_psf'],
+                        cont_map=True, in_af=cont_oaf)
 
     def run(self):
         # load the configuration files;
         # get the extension info
         conf = configfile.ConfigFile(config_util.getCONF(self.config))
         ext_info = config_util.get_ext_info(config_util.getDATA(self.grisim), conf)
+        self.input_files = self._find_input_files(conf)
         del conf
 
         # Does this harm data that was astrodrizzled?
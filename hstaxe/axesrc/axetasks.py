@@ -3,20 +3,23 @@ See LICENSE.txt
 """
 import logging
 
-from . import axeinputs
+from . import axecache
+from . import axeledger
 from . import axelowlev
-from . import axepreptor
-from . import axesingextr
-from . import dppdumps
-from . import drizzleobjects
-from . import fcubeobjs
-from . import inputchecks
-from . import iolmaking
-from . import mefobjects
-from . import pysex2gol
 
 from hstaxe.config import axe_setup
 from hstaxe.axeerror import aXeError
+from hstaxe.utils import lazy_submodules
+
+# the modules with the heavy dependencies (drizzlepac,
+# stwcs, drizzle, stsci.tools) are imported by the tasks
+# which need them, and on attribute access
+__getattr__ = lazy_submodules(__name__,
+                              ['axeinputs', 'axepreptor', 'axesingextr',
+                               'dppdumps', 'drizzleobjects', 'fcubeobjs',
+                               'inputchecks', 'iolmaking', 'mefobjects',
+                               'pysex2gol'],
+                              package=__package__)
 
 # make sure there is a logger
 _log = logging.getLogger(__name__)
@@ -69,10 +72,16 @@ def iolprep(drizzle_image='',
     Drizzle.
 
     """
-    iol_maker = iolmaking.IOLMaker(drizzle_image,
-                                   input_cat,
-                                   dimension_in)
-    iol_maker.run()
+    from . import iolmaking
+
+    # set up the aXe directories
+    axe_setup()
+
+    with axeledger.stage('iolprep'):
+        iol_maker = iolmaking.IOLMaker(drizzle_image,
+                                       input_cat,
+                                       dimension_in)
+        iol_maker.run()
 
 
 def fcubeprep(grism_image='',
@@ -106,11 +115,16 @@ def fcubeprep(grism_image='',
     interpol:       the inpolation scheme used to compute flux values at
                     the interpolated wavelengths
     """
+    from . import fcubeobjs
+
+    # set up the aXe directories
+    axe_setup()
 
     # run the main command
-    fcmaker = fcubeobjs.FluxCubeMaker(grism_image, segm_image, filter_info,
-                                      AB_zero, dim_info, interpol)
-    fcmaker.run()
+    with axeledger.stage('fcubeprep'):
+        fcmaker = fcubeobjs.FluxCubeMaker(grism_image, segm_image, filter_info,
+                                          AB_zero, dim_info, interpol)
+        fcmaker.run()
 
 
 def axeprep(inlist='',
@@ -120,7 +134,8 @@ def axeprep(inlist='',
             backped=None,
             mfwhm=None,
             norm=True,
-            gcorr=False):
+            gcorr=False,
+            nworkers=None):
     """Convenience function for the aXe task AXEPREP.
 
     Inputs
@@ -165,6 +180,12 @@ def axeprep(inlist='',
     gcorr: boolean
       switch on/off the gain conversion
 
+    nworkers: int
+      number of worker processes preparing the grism images
+      in parallel; None or 1 prepares them one after the other,
+      0 uses all available cores. Images which fail are reported
+      at the end, the other images are prepared nevertheless.
+
     Notes
     -----
     AXEPREP changes the SCI (and potentially ERR) extensions
@@ -172,6 +193,12 @@ def axeprep(inlist='',
     on copies of the original files in order to be able to repeat
     the reduction with different parameters.
     """
+    from . import axeinputs
+    from . import axepreptor
+    from . import inputchecks
+
+    # set up the aXe directories
+    axe_setup()
 
     # do all the input checks
     inchecks = inputchecks.InputChecker('AXEPREP', inlist, configs, backims)
@@ -180,23 +207,31 @@ def axeprep(inlist='',
     # create a list with the basic aXe inputs
     axe_inputs = axeinputs.aXeInput(inlist, configs, backims)
 
-    # go over all the input
+    # collect the rows per grism image; all extensions
+    # of an image are updated in the same file
+    images = {}
     for row in axe_inputs:
-        # make a prepare-object; run the prepare
-        aXePrep = axepreptor.aXePrepArator(row['grisim'],
-                                           row['objcat'],
-                                           row['dirim'],
-                                           row['config'],
-                                           row['dmag'],
-                                           backgr=backgr,
-                                           master_bck=row['fringe'],
-                                           backped=backped,
-                                           mfwhm=mfwhm,
-                                           norm=norm,
-                                           gcorr=gcorr)
-
-        aXePrep.run()
-        del aXePrep
+        images.setdefault(row['grisim'], []).append(
+            {name: row[name] for name in row.colnames})
+
+    # prepare all images
+    failures = axepreptor.prep_images(list(images.values()),
+                                      nworkers=nworkers,
+                                      backgr=backgr,
+                                      backped=backped,
+                                      mfwhm=mfwhm,
+                                      norm=norm,
+                                      gcorr=gcorr)
+
+    # report the failed images
+    if failures:
+        err_msg = ("AXEPREP failed for {0:d} of {1:d} image extensions:\n"
+                   .format(len(failures),
+                           sum(len(rows) for rows in images.values())))
+        for grisim, config, message in failures:
+            err_msg += "{0:s} ({1:s}): {2:s}\n".format(grisim, config,
+                                                       message)
+        raise aXeError(err_msg)
 
 
 def axecore(inlist='',
@@ -224,7 +259,11 @@ def axecore(inlist='',
             spectr=True,
             adj_sens=True,
             weights=False,
-            sampling='drizzle'):
+            sampling='drizzle',
+            nthreads=None,
+            cache_dir=None,
+            cache_size=None,
+            force=False):
     """Convenience function for the aXe task AXECORE.
 
     Parameters
@@ -317,7 +356,27 @@ def axecore(inlist='',
     sampling: str
       the sampling mode for the stamp images
 
+    nthreads: int
+      number of threads for the background estimation
+      (default: all available cores)
+
+    cache_dir: str
+      directory of a stage cache; stages whose inputs and
+      parameters are unchanged since an earlier run are skipped,
+      their outputs are taken from the cache (default: no cache)
+
+    cache_size: float
+      maximum size of the stage cache in MB; the least recently
+      used stages are evicted first (default: 10 GB)
+
+    force: bool
+      run all stages even if their outputs are in the cache
+
     """
+    from . import axeinputs
+    from . import axesingextr
+    from . import inputchecks
+
     axe_setup()
 
     # do all the file checks
@@ -326,50 +385,60 @@ def axecore(inlist='',
                            slitless_geom, np, interp, cont_model, weights,
                            sampling)
 
-    # create a list with the basic aXe inputs
-    axe_inputs = axeinputs.aXeInput(inlist, configs, fconfterm)
-
-    # go over all the input
-    for row in axe_inputs:
-
-        # make an extraction object
-        _log.info("image is located: {0}".format(row['grisim']))
-        aXeNator = axesingextr.aXeSpcExtr(row['grisim'],
-                                          row['objcat'],
-                                          row['dirim'],
-                                          row['config'],
-                                          row['dmag'],
-                                          back=back,
-                                          extrfwhm=extrfwhm,
-                                          drzfwhm=drzfwhm,
-                                          backfwhm=backfwhm,
-                                          lambda_mark=lambda_mark,
-                                          slitless_geom=slitless_geom,
-                                          orient=orient,
-                                          exclude=exclude,
-                                          cont_model=cont_model,
-                                          model_scale=model_scale,
-                                          inter_type=inter_type,
-                                          lambda_psf=lambda_psf,
-                                          np=np,
-                                          interp=interp,
-                                          niter_med=niter_med,
-                                          niter_fit=niter_fit,
-                                          kappa=kappa,
-                                          smooth_length=smooth_length,
-                                          smooth_fwhm=smooth_fwhm,
-                                          spectr=spectr,
-                                          adj_sens=adj_sens,
-                                          weights=weights,
-                                          sampling=sampling)
-        aXeNator.run()
-        del aXeNator
+    # the maximum size of the stage cache
+    if cache_size is not None:
+        cache_size = int(cache_size * 1024**2)
+
+    # summarize the resources
+    # of all stages if requested
+    with axeledger.task_summary('axecore'), \
+            axecache.stage_cache(cache_dir, cache_size, force):
+        # create a list with the basic aXe inputs
+        axe_inputs = axeinputs.aXeInput(inlist, configs, fconfterm)
+
+        # go over all the input
+        for row in axe_inputs:
+
+            # make an extraction object
+            _log.info("image is located: {0}".format(row['grisim']))
+            aXeNator = axesingextr.aXeSpcExtr(row['grisim'],
+                                              row['objcat'],
+                                              row['dirim'],
+                                              row['config'],
+                                              row['dmag'],
+                                              back=back,
+                                              extrfwhm=extrfwhm,
+                                              drzfwhm=drzfwhm,
+                                              backfwhm=backfwhm,
+                                              lambda_mark=lambda_mark,
+                                              slitless_geom=slitless_geom,
+                                              orient=orient,
+                                              exclude=exclude,
+                                              cont_model=cont_model,
+                                              model_scale=model_scale,
+                                              inter_type=inter_type,
+                                              lambda_psf=lambda_psf,
+                                              np=np,
+                                              interp=interp,
+                                              niter_med=niter_med,
+                                              niter_fit=niter_fit,
+                                              kappa=kappa,
+                                              smooth_length=smooth_length,
+                                              smooth_fwhm=smooth_fwhm,
+                                              spectr=spectr,
+                                              adj_sens=adj_sens,
+                                              weights=weights,
+                                              sampling=sampling,
+                                              nthreads=nthreads)
+            aXeNator.run()
+            del aXeNator
 
 
 def drzprep(inlist='',
             configs='',
             back=False,
-            opt_extr=False):
+            opt_extr=False,
+            nthreads=None):
     """Convenience function for the aXe task DRZPREP.
 
     Parameters
@@ -392,6 +461,12 @@ def drzprep(inlist='',
       to switch on the creation of background DPPs made
       by processing background PETs.
 
+    nthreads: int
+      number of threads creating the DPPs of the grism
+      images in parallel (default: all available cores);
+      several threads need a cfitsio built reentrant,
+      otherwise one thread is used
+
     Output
     ------
     if back = False
@@ -410,7 +485,8 @@ def drzprep(inlist='',
     prepArator = axelowlev.aXe_DRZPREP(inlist,
                                        configs,
                                        back=back,
-                                       opt_extr=opt_extr)
+                                       opt_extr=opt_extr,
+                                       nthreads=nthreads)
     prepArator.run()
 
     del prepArator
@@ -425,7 +501,9 @@ def axecrr(inlist='',
            makespc=True,
            adj_sens=True,
            opt_extr=False,
-           driz_separate=False):
+           driz_separate=False,
+           debug=False,
+           nworkers=None):
 
     """Function for aXedrizzle with CosmicRay-rejection.
 
@@ -434,87 +512,105 @@ def axecrr(inlist='',
 
 
     """
-    axe_setup(tmpdir=True)
+    from . import dppdumps
+    from . import drizzleobjects
+    from . import inputchecks
+    from . import mefobjects
 
-    # do all the input checks
-    inchecks = inputchecks.InputChecker('AXEDRIZZLE', inlist, configs)
-    inchecks.check_axedrizzle(infwhm, outfwhm, back)
-
-    # unload the DPP's
-    dpps = dppdumps.DPPdumps(inlist, configs, False)
-    dpps.filet_dpp(opt_extr)
-
-    # get the contamination information
-    cont_info = dpps.is_quant_contam()
-
-    # delete the object
-    del dpps
-
-    # assemble the drizzle parameters
-    drizzle_params = drizzleobjects.DrizzleParams(configs)
-
-    # make a list of drizzle objects
-    dols = drizzleobjects.DrizzleObjectList(drizzle_params,
-                                            cont_info,
-                                            opt_extr, back=back)
-
-    _log.info(f"checking files {dols}")
-    dols.check_files()
-
-    # prepare and perform the drizzling
-    dols.prepare_drizzle()
-    dols.drizzle()
-
-    # if there are no background
-    # files, immediately extract the spectra
-    if not back and makespc:
-        # extract spectra from the deep 2D stamps
-        mefs = mefobjects.MEFExtractor(drizzle_params,
-                                       dols,
-                                       opt_extr=opt_extr)
-        mefs.extract(infwhm, outfwhm, adj_sens)
-        del mefs
-
-        # delete files
-        if clean:
-            dols.delete_files()
-
-        del dols
+    axe_setup(tmpdir=True)
 
-    if back:
+    # summarize the resources
+    # of all stages if requested
+    with axeledger.task_summary('axecrr'):
         # do all the input checks
         inchecks = inputchecks.InputChecker('AXEDRIZZLE', inlist, configs)
         inchecks.check_axedrizzle(infwhm, outfwhm, back)
 
         # unload the DPP's
-        dpps = dppdumps.DPPdumps(inlist, configs, back=back)
-        dpps.filet_dpp(opt_extr)
+        with axeledger.stage('dppunload'):
+            dpps = dppdumps.DPPdumps(inlist, configs, False)
+            dpps.filet_dpp(opt_extr)
 
         # get the contamination information
-        # cont_info = dpps.is_quant_contam()
+        cont_info = dpps.is_quant_contam()
 
+        # delete the object
         del dpps
 
-        # make a list of drizzle objects
-        back_dols = drizzleobjects.DrizzleObjectList(drizzle_params, None,
-                                                     opt_extr, back=back)
-
-        # check all files
-        back_dols.check_files()
-
-        # prepare and do the drizzling
-        back_dols.prepare_drizzle()
-        back_dols.drizzle()
-
-        # extract the spectra,
-        if makespc:
-            mefs = mefobjects.MEFExtractor(drizzle_params, dols, back_dols,
-                                           opt_extr=opt_extr)
-            mefs.extract(infwhm, outfwhm, adj_sens)
+        # assemble the drizzle parameters
+        drizzle_params = drizzleobjects.DrizzleParams(configs)
 
-        if clean:
-            dols.delete_files()
-            back_dols.delete_files()
+        # make a list of drizzle objects
+        dols = drizzleobjects.DrizzleObjectList(drizzle_params,
+                                                cont_info,
+                                                opt_extr, back=back,
+                                                debug=debug)
+
+        _log.info(f"checking files {dols}")
+        dols.check_files()
+
+        # prepare and perform the drizzling
+        with axeledger.stage('drizzle', objects=len(dols)):
+            dols.prepare_drizzle()
+            dols.drizzle()
+
+        # if there are no background
+        # files, immediately extract the spectra
+        if not back and makespc:
+            # extract spectra from the deep 2D stamps
+            with axeledger.stage('mefextract', objects=len(dols)):
+                mefs = mefobjects.MEFExtractor(drizzle_params,
+                                               dols,
+                                               opt_extr=opt_extr)
+                mefs.extract(infwhm, outfwhm, adj_sens, nworkers=nworkers)
+            del mefs
+
+            # delete files
+            if clean:
+                dols.delete_files()
+
+            del dols
+
+        if back:
+            # do all the input checks
+            inchecks = inputchecks.InputChecker('AXEDRIZZLE', inlist, configs)
+            inchecks.check_axedrizzle(infwhm, outfwhm, back)
+
+            # unload the DPP's
+            with axeledger.stage('dppunload'):
+                dpps = dppdumps.DPPdumps(inlist, configs, back=back)
+                dpps.filet_dpp(opt_extr)
+
+            # get the contamination information
+            # cont_info = dpps.is_quant_contam()
+
+            del dpps
+
+            # make a list of drizzle objects
+            back_dols = drizzleobjects.DrizzleObjectList(drizzle_params, None,
+                                                         opt_extr, back=back,
+                                                         debug=debug)
+
+            # check all files
+            back_dols.check_files()
+
+            # prepare and do the drizzling
+            with axeledger.stage('drizzle', objects=len(back_dols)):
+                back_dols.prepare_drizzle()
+                back_dols.drizzle()
+
+            # extract the spectra,
+            if makespc:
+                with axeledger.stage('mefextract', objects=len(dols)):
+                    mefs = mefobjects.MEFExtractor(drizzle_params, dols,
+                                                   back_dols, opt_extr=opt_extr,
+                                                   nworkers=nworkers)
+                    mefs.extract(infwhm, outfwhm, adj_sens,
+                                 nworkers=nworkers)
+
+            if clean:
+                dols.delete_files()
+                back_dols.delete_files()
 
 
 def axeddd(inlist='',
@@ -529,6 +625,11 @@ def axeddd(inlist='',
            opt_extr=True,
            driz_separate=False):
     """Function for aXedrizzle"""
+    from . import dppdumps
+    from . import drizzleobjects
+    from . import inputchecks
+    from . import mefobjects
+
     # make the general setup
     axe_setup(tmpdir=True)
 
@@ -613,15 +714,18 @@ def sex2gol(grism='',
       print messages
 
     """
+    from . import pysex2gol
+
     # make the general setup
     axe_setup()
-    sex2gol = pysex2gol.Sex2GolPy(grism, config,
-                                  in_sex=in_sex,
-                                  dirname=direct,
-                                  out_sex=out_sex,
-                                  spec_hdu=spec_hdu,
-                                  dir_hdu=dir_hdu)
-    sex2gol.runall(silent)
+    with axeledger.stage('sex2gol'):
+        sex2gol = pysex2gol.Sex2GolPy(grism, config,
+                                      in_sex=in_sex,
+                                      dirname=direct,
+                                      out_sex=out_sex,
+                                      spec_hdu=spec_hdu,
+                                      dir_hdu=dir_hdu)
+        sex2gol.runall(silent)
 
 
 def gol2af(grism='',
@@ -822,13 +926,15 @@ def petcont(grism='',
 def petff(grism='',
           config='',
           back=False,
-          ffname=None):
+          ffname=None,
+          ffgrid=None):
     """Function for the aXe task PETFF"""
     # check for required environment variables
     axe_setup()
 
     # run PETFF
-    petff = axelowlev.aXe_PETFF(grism, config, back=back, ffname=ffname)
+    petff = axelowlev.aXe_PETFF(grism, config, back=back, ffname=ffname,
+                                ffgrid=ffgrid)
     petff.run()
 
 
@@ -844,8 +950,13 @@ def backest(grism='',
             old_bck=False,
             mask=False,
             in_af="",
-            out_bck=None):
-    """Function for the aXe task BACKEST"""
+            out_bck=None,
+            nthreads=None):
+    """Function for the aXe task BACKEST
+
+    The beam backgrounds are computed in parallel on ``nthreads``
+    threads; by default all available cores are used.
+    """
     # check for required environment variables
     axe_setup()
 
@@ -861,7 +972,8 @@ def backest(grism='',
                                old_bck=old_bck,
                                mask=mask,
                                in_af=in_af,
-                               out_bck=out_bck)
+                               out_bck=out_bck,
+                               nthreads=nthreads)
     backest.run()
 
 
@@ -2,6 +2,7 @@
 See LICENSE.txt
 """
 import os
+import re
 import math
 import logging
 
@@ -11,6 +12,141 @@ from hstaxe.axeerror import aXeError
 # make sure there is a logger
 _log = logging.getLogger(__name__)
 
+# the parsed configuration files, keyed on the absolute
+# path; each entry holds the modification time and size
+# of the file, its keywords as (keyword, keyvalue, comment)
+# and its header lines
+_config_cache = {}
+
+
+def clear_config_cache():
+    """Forget all parsed configuration files"""
+    _config_cache.clear()
+
+
+def _build_index(keys):
+    """Map the keywords of a keyword list to their indices
+
+    Parameters
+    ----------
+    keys: list
+        list of ConfKey's
+
+    Returns
+    -------
+    first, last: dict, dict
+        the index of the first and of the last
+        occurrence of every keyword
+    """
+    first = {}
+    last = {}
+    for index, key in enumerate(keys):
+        first.setdefault(key.keyword, index)
+        last[key.keyword] = index
+    return first, last
+
+
+def _lookup_index(owner, keys, keyword, last=False):
+    """Find a keyword through the index of a keyword list
+
+    The index is stored in the owner of the keyword
+    list and is built again whenever the list changed
+    its length or an entry was replaced, such that an
+    indexed entry no longer matches or a keyword missing
+    in the index is in the list.
+
+    Parameters
+    ----------
+    owner: object
+        the object holding the list
+    keys: list
+        list of ConfKey's
+    keyword: str
+        name of the requested keyword
+    last: bool
+        return the last instead of the first occurrence
+
+    Returns
+    -------
+    index: int
+        the index of the keyword, -1 if not found
+    """
+    index_data = getattr(owner, '_kindex', None)
+    fresh = (index_data is None or index_data[0] is not keys or
+             index_data[1] != len(keys))
+    if fresh:
+        index_data = (keys, len(keys)) + _build_index(keys)
+        owner._kindex = index_data
+
+    index = index_data[3 if last else 2].get(keyword, -1)
+    if fresh:
+        return index
+
+    # an entry was replaced, index again
+    if index > -1 and keys[index].keyword != keyword or \
+            index < 0 and any(key.keyword == keyword for key in keys):
+        owner._kindex = None
+        return _lookup_index(owner, keys, keyword, last)
+    return index
+
+
+def _valid_twodkey_length(nvalues):
+    """Check the number of values of a field dependent keyword
+
+    The coefficients of a 2D polynomial must have
+    n = m^2/2 + m/2 values for an integer m.
+
+    Parameters
+    ----------
+    nvalues: int
+        the number of values
+
+    Returns
+    -------
+    valid: bool
+        True if the number is valid
+    """
+    # compute the 'order' of the xy-dependence
+    m = (-1.0 + math.sqrt(1.0+8.0*nvalues))/2.0
+
+    # chech whether the 'order' is integer
+    return math.fabs(m-int(m)) <= 1.0e-16
+
+
+def _check_twodkeys(order_prefix, prefix, ident, keys):
+    """Check the keywords of a 2D polynomial without parsing them
+
+    The keyword with the polynomial order and the
+    coefficient keywords of all orders must be present,
+    and the coefficients must have a valid number of
+    values. As in the parsing, the last occurrence of
+    a keyword counts.
+
+    Parameters
+    ----------
+    order_prefix: str
+        prefix of the order keyword, e.g. 'DYDX_'
+    prefix: str
+        prefix of the coefficient keywords, e.g. 'DYDX_'
+    ident: char
+        beam identification
+    keys: list
+        the trace or dispersion keywords of the beam
+    """
+    values = {key.keyword: key.keyvalue for key in keys}
+
+    order_key = order_prefix + 'ORDER_' + ident
+    if order_key not in values:
+        raise CKeyNotFound(order_key)
+
+    for ii in range(int(values[order_key])+1):
+        twodkey = prefix + ident + '_' + str(ii)
+        if twodkey not in values:
+            raise CKeyNotFound(twodkey)
+        if not _valid_twodkey_length(len(values[twodkey].split())):
+            raise CKeyLengthWrong(ident, twodkey)
+
+
 class ConfigList:
     """Configuration File Object"""
     def __init__(self, keylist, header=None):
@@ -112,17 +248,8 @@ class ConfigList:
 
     def _find_gkey(self, item):
 
-        # set the default return value
-        found = -1
-        # go over all items
-        for index in range(len(self.gkeys)):
-            # check whether it is the right item
-            if self.gkeys[index].keyword == item:
-                # set the return value to the index
-                found = index
-
-        # return the result
-        return found
+        # return the index of the last occurrence
+        return _lookup_index(self, self.gkeys, item, last=True)
 
     def _load_file(self):
         """Configuration file --> keyword list
@@ -131,32 +258,55 @@ class ConfigList:
         extract all valid keyword-keyvalue-comment information
         from it. The keyword-keyvalue pairs are
         organized and returned as a list of
-        configuration key objects.
+        configuration key objects, together with the
+        header lines of the file.
+
+        A file is read and parsed only once as long as its
+        modification time and size are unchanged; later
+        calls create the keywords from the cached values.
 
         Returns
         -------
-        keylist: list
-        list of ConfKey's
-
-        Notes
-        -----
-        Double check reading two files here
+        keylist, header: list, list
+        list of ConfKey's and list of header lines
         """
-        # initialize the list
-        keylist = []
-        # open the file and parse through it
-        with open(self.filename, 'r') as fopen:
-            for line in fopen:
-                # strip the line
-                str_line = line.strip()
-
-                # check whether the line contains a keyword
-                if len(str_line) and str_line[0] != '#':
-                    # create and append the keyword
-                    keylist.append(self._key_from_line(str_line))
+        # get the signature of the file
+        path = os.path.abspath(self.filename)
+        fstat = os.stat(path)
+        signature = (fstat.st_mtime_ns, fstat.st_size)
+
+        # check for a valid cache entry
+        cached = _config_cache.get(path)
+        if cached is None or cached[0] != signature:
+            keys = []
+            header = []
+            in_header = True
+
+            # open the file and parse through it
+            with open(path, 'r') as fopen:
+                for line in fopen:
+                    # strip the line
+                    str_line = line.strip()
 
-        # return the list
-        return keylist
+                    # the leading comment lines form the header
+                    if in_header:
+                        if len(str_line) > 0 and str_line[0] == '#':
+                            header.append(str_line + '\n')
+                        else:
+                            in_header = False
+
+                    # check whether the line contains a keyword
+                    if len(str_line) and str_line[0] != '#':
+                        # create and store the keyword
+                        key = self._key_from_line(str_line)
+                        keys.append((key.keyword, key.keyvalue, key.comment))
+
+            cached = (signature, keys, header)
+            _config_cache[path] = cached
+
+        # create the keyword list and return it with the header
+        keylist = [ConfKey(*key) for key in cached[1]]
+        return keylist, list(cached[2])
 
     def _get_gkey_index(self, keyword):
         """Retrieve the index of a global keyword
@@ -176,18 +326,8 @@ class ConfigList:
         index: int
             the index of the keyword
         """
-        # initialize the return value
-        kindex = -1
-
-        # go over all keys
-        for index in range(len(self.gkeys)):
-            # check whether the current key matches
-            if self.gkeys[index].keyword == keyword:
-                # return it if it matches
-                return index
-
-        # return the default
-        return kindex
+        # look up the keyword in the index
+        return _lookup_index(self, self.gkeys, keyword)
 
     def _key_from_line(self, line):
         """Creates a keyword from a line
@@ -498,6 +638,9 @@ class ConfigList:
         if os.path.isfile(filename):
             os.unlink(filename)
 
+        # forget a parsed version of the file
+        _config_cache.pop(os.path.abspath(filename), None)
+
         # open the new file
         ofile = open(filename, 'w')
 
@@ -560,11 +703,9 @@ class ConfigFile(ConfigList):
         else:
             # save the file name
             self.filename = filename  # list(filename.split(','))
-            # create a keyword list
-            keylist = self._load_file()
-
-            # load the header
-            header = ConfHeader(self.filename)
+            # create a keyword list and load the header
+            keylist, header_lines = self._load_file()
+            header = ConfHeader(lines=header_lines)
 
             super(ConfigFile, self).__init__(keylist, header)
 
@@ -689,11 +830,12 @@ class ConfigBeam:
                 # load the general beam keywords
                 self.beamkeys = self._find_beamkeys(ident, keylist)
 
-                # load the trace keywords
-                self.trace = ConfigTrace(ident, keylist)
-
-                # load the dispersion keywords
-                self.disp = ConfigDisp(ident, keylist)
+                # take the trace and dispersion keywords,
+                # which are parsed on first use only
+                self._trace = None
+                self._disp = None
+                self._tracekeys, self._dispkeys = \
+                    self._find_polykeys(ident, keylist)
 
             # catch a pure CKeyNotFound exception
             # which is raised if a beam is competely
@@ -725,6 +867,28 @@ class ConfigBeam:
         # return the total string
         return rstring
 
+    @property
+    def trace(self):
+        """The trace description of the beam"""
+        if self._trace is None:
+            self._trace = ConfigTrace(self.ident, list(self._tracekeys))
+        return self._trace
+
+    @trace.setter
+    def trace(self, value):
+        self._trace = value
+
+    @property
+    def disp(self):
+        """The dispersion solution of the beam"""
+        if self._disp is None:
+            self._disp = ConfigDisp(self.ident, list(self._dispkeys))
+        return self._disp
+
+    @disp.setter
+    def disp(self, value):
+        self._disp = value
+
     def __getitem__(self, item):
 
         full_item = item + self.ident
@@ -834,6 +998,77 @@ class ConfigBeam:
         # return the list of global keys
         return bkeys
 
+    def _find_polykeys(self, ident, keylist):
+        """Take the trace and dispersion keywords
+
+        The method moves the keywords of the trace
+        description and the dispersion solution of
+        a beam from a keyword list into two separate
+        lists. The keywords are not yet parsed, but
+        keywords with the polynomial orders and
+        coefficients are checked as in the parsing,
+        such that a missing or wrong coefficient
+        keyword is reported when the file is loaded.
+
+        Parameters
+        ----------
+        ident: char
+            beam identification
+        keylist: list
+            list of keywords
+
+        Returns
+        -------
+        tracekeys, dispkeys: list, list
+            the trace and dispersion keywords
+        """
+        trace_pattern = re.compile(r'DYDX_(ORDER_{0:s}|{0:s}_\d+)$'
+                                   .format(ident))
+        disp_pattern = re.compile(r'(DISP_ORDER_{0:s}|DLD1?P_{0:s}_\d+)$'
+                                  .format(ident))
+
+        # sort the keywords in one pass
+        tracekeys = []
+        dispkeys = []
+        restkeys = []
+        for key in keylist:
+            if trace_pattern.match(key.keyword):
+                tracekeys.append(key)
+            elif disp_pattern.match(key.keyword):
+                dispkeys.append(key)
+            else:
+                restkeys.append(key)
+
+        # check the trace keywords
+        # like ConfigTrace
+        try:
+            _check_twodkeys('DYDX_', 'DYDX_', ident, tracekeys)
+        except CKeyNotFound as e:
+            raise TraceNotFound(ident, e.keyword)
+        except CKeyLengthWrong as e:
+            _log.info('Field dependent keyword: ' + e.keyword)
+
+        # check the dispersion keywords
+        # like ConfigDisp
+        try:
+            try:
+                _check_twodkeys('DISP_', 'DLDP_', ident, dispkeys)
+            except CKeyNotFound as e:
+                if e.keyword == 'DISP_ORDER_' + ident:
+                    raise
+                _check_twodkeys('DISP_', 'DLD1P_', ident, dispkeys)
+        except CKeyNotFound as e:
+            raise DispNotFound(ident, e.keyword)
+        except CKeyLengthWrong as e:
+            _log.info('\nField dependent keyword: {0:s} has wrong length!'
+                      .format(e.keyword))
+            raise DispNotFound(ident, e.keyword)
+
+        # remove the keywords from the input list
+        keylist[:] = restkeys
+
+        return tracekeys, dispkeys
+
     def _get_bkey_index(self, keyword):
         """Retrieve the index of a beam keyword
 
@@ -852,18 +1087,8 @@ class ConfigBeam:
         index: int
             the index of the keyword
         """
-        # initialize the return value
-        bindex = -1
-
-        # go over all keys
-        for index in range(len(self.beamkeys)):
-            # check whether the current key matches
-            if self.beamkeys[index].keyword == keyword:
-                # return it if it matches
-                return index
-
-        # return the default
-        return bindex
+        # look up the keyword in the index
+        return _lookup_index(self, self.beamkeys, keyword)
 
     def get_bkey(self, keyword):
         """Retrieve a requested beam keyword
@@ -954,8 +1179,8 @@ class ConfigBeam:
 
                 # check whether the current keyword is right
                 # and whether the keyvalue is not 'None'
-                if ((bkey.keyword is full_keyword) and
-                     (bkey.keyvalue.upper() is not 'NONE')):
+                if ((bkey.keyword == full_keyword) and
+                     (bkey.keyvalue.upper() != 'NONE')):
                     # check for the file
                     if not os.path.isfile(config_util.getCONF(bkey.keyvalue)):
                         # report an error
@@ -1188,14 +1413,8 @@ class TwoDimPolyN:
         @rtype: int
         """
 
-        # determine the length of the list
-        n = float(len(inkey.kvallist))
-
-        # compute the 'order' of the xy-dependence
-        m = (-1.0 + math.sqrt(1.0+8.0*n))/2.0
-
-        # chech whether the 'order' is integer
-        if math.fabs(m-int(m)) > 1.0e-16:
+        # check the length of the list
+        if not _valid_twodkey_length(len(inkey.kvallist)):
             # no integer -> key length wrong
             return 0
 
@@ -1349,7 +1568,7 @@ class DefConfHeader:
 
 class ConfHeader(DefConfHeader):
     """Header class for the configuration file"""
-    def __init__(self, filename=None):
+    def __init__(self, filename=None, lines=None):
         """Initializes the configuration header class
 
         The method extracts the header from a configuration
@@ -1360,9 +1579,15 @@ class ConfHeader(DefConfHeader):
         ----------
         filename: str
             name of the configuration file
+        lines: list
+            the header lines, already extracted from the file
         """
+        # header lines given
+        if lines is not None:
+            self.header = lines
+
         # no filename -> default header
-        if filename is None:
+        elif filename is None:
             super(ConfHeader, self).__init__()
         else:
             # initialize the data list
@@ -28,6 +28,10 @@ from . import configfile
 # make sure there is a logger
 _log = logging.getLogger(__name__)
 
+# the drizzled layers written to
+# single images in debug mode
+DEBUG_LAYERS = ('FLT', 'ERR', 'CON', 'WHT', 'MOD', 'VAR')
+
 
 class DrizzleParams(dict):
     """Class to store the drizzle parameters"""
@@ -117,6 +121,49 @@ class DrizzleParams(dict):
         return drizzle_params
 
 
+class DrizzleResult:
+    """The drizzled layers of an object, kept in memory"""
+    def __init__(self, header, planes):
+        """
+        Parameters
+        ----------
+        header: astropy.io.fits.Header
+            the header of the FLT, ERR and CON layers
+        planes: dict
+            the drizzled layers 'FLT', 'ERR', 'CON', 'WHT' and,
+            for optimal extraction, 'MOD' and 'VAR'
+        """
+        self.header = header
+        self.planes = planes
+
+    def __contains__(self, layer):
+        return layer in self.planes
+
+    def __getitem__(self, layer):
+        return self.planes[layer]
+
+    def __setitem__(self, layer, data):
+        self.planes[layer] = data
+
+    def layer_header(self, layer):
+        """Return a copy of the header of a layer"""
+        if layer in ('FLT', 'ERR', 'CON'):
+            return self.header.copy()
+        return fits.Header()
+
+    def writeto(self, ext_names):
+        """Write the layers to single images.
+
+        Parameters
+        ----------
+        ext_names: dict
+            the file names of the layers
+        """
+        for layer, data in self.planes.items():
+            fits.PrimaryHDU(data=data, header=self.layer_header(layer)
+                            ).writeto(ext_names[layer], overwrite=True)
+
+
 class DrizzleObjectList:
     """List class for all objects to be drizzled"""
     def __init__(self,
@@ -125,7 +172,8 @@ class DrizzleObjectList:
                  opt_extr=False,
                  back=False,
                  drztmp_dir=None,
-                 drizzle_dir=None):
+                 drizzle_dir=None,
+                 debug=False):
 
         # load the drizzle parameters
         self.drizzle_params = drizzle_params.copy()
@@ -136,6 +184,9 @@ class DrizzleObjectList:
         # store the optimal extraction flag
         self.opt_extr = opt_extr
 
+        # store the debug flag
+        self.debug = debug
+
         # save the drizzle tmp-directory;
         # use the default if not explicitly given
         if drztmp_dir is not None:
@@ -283,7 +334,7 @@ class DrizzleObjectList:
             drzobjects.append(DrizzleObject(an_item[0], an_item[1],
                                             drizzle_params, cont_info,
                                             opt_extr, self.back, drztmp_dir,
-                                            drizzle_dir))
+                                            drizzle_dir, self.debug))
 
         # return the list
         return drzobjects
@@ -394,7 +445,7 @@ class DrizzleObjectList:
 class DrizzleObject:
     """List class for all objects to be drizzled"""
     def __init__(self, objID, file_list, drizzle_params, cont_info,
-                 opt_extr, back, drztmp_dir, drizzle_dir):
+                 opt_extr, back, drztmp_dir, drizzle_dir, debug=False):
 
         self.ID = int(objID[2:])
 
@@ -413,6 +464,14 @@ class DrizzleObject:
         # save the back flag
         self.back = back
 
+        # save the debug flag; in debug mode
+        # the drizzled layers are also written
+        # to single images
+        self.debug = debug
+
+        # the drizzled layers
+        self.result = None
+
         # save the drizzle directory
         # and the drizzle tmp-directory
         self.drztmp_dir = drztmp_dir
@@ -617,12 +676,11 @@ class DrizzleObject:
         """Adjust the variance image"""
 
         # Invert the variance image
-        file_a = fits.open(self.ext_names['VAR'], 'update')
-        ind0 = file_a[0].data < 1.0e-16
-        ind1 = file_a[0].data >= 1.0e-16
-        file_a[0].data[ind0] = 0.0
-        file_a[0].data[ind1] = 1.0 / file_a[0].data[ind1]
-        file_a.close()
+        var_data = self.result['VAR']
+        ind0 = var_data < 1.0e-16
+        ind1 = var_data >= 1.0e-16
+        var_data[ind0] = 0.0
+        var_data[ind1] = 1.0 / var_data[ind1]
 
     def _convert_error(self):
         """Treat the drizzled error image"""
@@ -634,39 +692,26 @@ class DrizzleObject:
         # has negative values. If yes, it is multiplied
         # by "-1.0". This is a fix to the drizzle-decennium
         # and will, artr some point, become obsolete
-        fits_data = fits.getdata(self.ext_names['WHT'])
-        img_ave = np.mean(fits_data)
-
+        img_ave = np.mean(self.result['WHT'])
 
         # decide whether something must be done
         if img_ave < 0.0:
-
-            # open the image
-            fits_img = fits.open(self.ext_names['WHT'], 'update')
-
             # invert the data
-            fits_img[0].data = -1.0 * fits_img[0].data
-
-            # close the image
-            fits_img.close()
+            self.result['WHT'] = -1.0 * self.result['WHT']
 
         # Compute sqrt(ERR)/WHT for exposure time weighting
-        file_a = fits.open(self.ext_names['ERR'], 'update')
-        file_b = fits.open(self.ext_names['WHT'])
-        ind0 = file_b[0].data < 1.0e-16
-        ind1 = file_b[0].data >= 1.0e-16
-        file_a[0].data[ind0] = 0.0
-        file_a[0].data[ind1] = ((file_a[0].data[ind1]**0.5) /
-                                file_b[0].data[ind1])
-        file_a.close()
-        file_b.close()
+        err_data = self.result['ERR']
+        wht_data = self.result['WHT']
+        ind0 = wht_data < 1.0e-16
+        ind1 = wht_data >= 1.0e-16
+        err_data[ind0] = 0.0
+        err_data[ind1] = ((err_data[ind1]**0.5) /
+                          wht_data[ind1])
 
     def _correct_contam(self):
         """Correct the contamination image (for geometric contamination)"""
         # Replace contamination values with nearest integer
-        file_a = fits.open(self.ext_names['CON'], 'update')
-        file_a[0].data = np.rint(file_a[0].data)
-        file_a.close()
+        self.result['CON'] = np.rint(self.result['CON'])
 
     def _fill_header(self, header):
         """Write some header keywords"""
@@ -684,63 +729,61 @@ class DrizzleObject:
             # store the image name
             header[f'IMG{idx}'] = (one_contrib.rootname, f'contributing image #{idx}')
 
-    def _make_wcs_header(self):
-        """Generate the WCS header"""
+    def _make_wcs_header(self, mex_hdu, flt_header):
+        """Generate the WCS header
+
+        Parameters
+        ----------
+        mex_hdu: astropy.io.fits.HDUList
+            the multi-extension image
+        flt_header: astropy.io.fits.Header
+            the header of the drizzled FLT image
+        """
 
         # make a dict for the WCS keys
         WCS_input = {}
 
-        # open one single layer image
-        fits_input = fits.open(self.ext_names['FLT'], mode='readonly')
-
         # extract the keywords from he header
-        WCS_input['CDSCALE'] = fits_input[0].header['CDSCALE']
-        WCS_input['REFPNTY'] = fits_input[0].header['REFPNTY']
-        WCS_input['DLAMBDA'] = fits_input[0].header['DLAMBDA']
-        WCS_input['LAMBDA0'] = fits_input[0].header['LAMBDA0']
-        WCS_input['XOFFS'] = fits_input[0].header['XOFFS']
+        WCS_input['CDSCALE'] = flt_header['CDSCALE']
+        WCS_input['REFPNTY'] = flt_header['REFPNTY']
+        WCS_input['DLAMBDA'] = flt_header['DLAMBDA']
+        WCS_input['LAMBDA0'] = flt_header['LAMBDA0']
+        WCS_input['XOFFS'] = flt_header['XOFFS']
 
         # use also internal data
         WCS_input['YOFFS'] = self.drzimg_info['OUTNY'] / 2 + 1.0
 
-        # close the image
-        fits_input.close()
-
-        # open the contributing object image
-        fits_output = fits.open(self.ext_names['MEF'], 'update')
-
         # go over all data layers
-        for index in range(1, len(fits_output)):
+        for index in range(1, len(mex_hdu)):
             # insert the new items in inverse order all after 'DATe'
             # this way they will appear in correct order at the beginning
-            fits_output[index].header['CDELT2'] = (WCS_input['CDSCALE'],
-                                                   "[arcsec/pixel] cross-dispersion scale")
-            fits_output[index].header['CRVAL2'] = (0.0,
-                                                   '[arcsec] reference value')
-            fits_output[index].header['CRPIX2'] = (WCS_input['YOFFS'],
-                                                   '[pix] reference pixel')
-            fits_output[index].header['CUNIT2'] = ('arcsec',
-                                                   'cross-dispersion units')
-            fits_output[index].header['CTYPE2'] = ('CRDIST',
-                                                   'cross-dispersion distance')
-            fits_output[index].header['CDELT1'] = (WCS_input['DLAMBDA'],
-                                                   '[Angstrom/pixel] dispersion')
-            fits_output[index].header['CRVAL1'] = (WCS_input['LAMBDA0'],
-                                                   '[Angstrom] reference value')
-            fits_output[index].header['CRPIX1'] = (WCS_input['XOFFS'],
-                                                   '[pixel] reference pixel')
-            fits_output[index].header['CUNIT1'] = ('Angstrom',
-                                                   'dispersion units')
-            fits_output[index].header['CTYPE1'] = ('WAVE',
-                                                   'grating dispersion function')
-
-        # save the modified image/header;
-        # and close the fits
-        fits_output.flush()
-        fits_output.close()
+            mex_hdu[index].header['CDELT2'] = (WCS_input['CDSCALE'],
+                                               "[arcsec/pixel] cross-dispersion scale")
+            mex_hdu[index].header['CRVAL2'] = (0.0,
+                                               '[arcsec] reference value')
+            mex_hdu[index].header['CRPIX2'] = (WCS_input['YOFFS'],
+                                               '[pix] reference pixel')
+            mex_hdu[index].header['CUNIT2'] = ('arcsec',
+                                               'cross-dispersion units')
+            mex_hdu[index].header['CTYPE2'] = ('CRDIST',
+                                               'cross-dispersion distance')
+            mex_hdu[index].header['CDELT1'] = (WCS_input['DLAMBDA'],
+                                               '[Angstrom/pixel] dispersion')
+            mex_hdu[index].header['CRVAL1'] = (WCS_input['LAMBDA0'],
+                                               '[Angstrom] reference value')
+            mex_hdu[index].header['CRPIX1'] = (WCS_input['XOFFS'],
+                                               '[pixel] reference pixel')
+            mex_hdu[index].header['CUNIT1'] = ('Angstrom',
+                                               'dispersion units')
+            mex_hdu[index].header['CTYPE1'] = ('WAVE',
+                                               'grating dispersion function')
 
     def _compose_mef_image(self):
-        """Compose the multi-extension fit image from the drizzled layers"""
+        """Compose the multi-extension fit image from the drizzled layers
+
+        The image is assembled in memory from the drizzle
+        result and written once.
+        """
         # create a fits list;
         # create aprimary header;
         # put header to fits list
@@ -751,71 +794,26 @@ class DrizzleObject:
         # fill header with some keywords
         self._fill_header(mex_hdu[0].header)
 
-        # save and close wfits
-        mex_hdu.writeto(self.ext_names['MEF'])
-        mex_hdu.close()
-
-        # Copy FLT image to MEF SCI extension
-        file = fits.open(self.ext_names['FLT'], mode='readonly')
-        file[0].header['extname']=('SCI')
-        file[0].header['extver']= 1
-        fits.append(self.ext_names['MEF'], file[0].data, file[0].header)
-        file.close()
-
-        # Copy ERR image to MEF ERR extension
-        file = fits.open(self.ext_names['ERR'], mode='readonly')
-        file[0].header['extname'] = 'ERR'
-        file[0].header['extver'] = 1
-        fits.append(self.ext_names['MEF'], file[0].data, file[0].header)
-        file.close()
-
-        # Copy WHT image to MEF EXPT extension
-        file = fits.open(self.ext_names['WHT'], mode='readonly')
-        file[0].header['extname'] = 'EXPT'
-        file[0].header['extver'] = 1
-        fits.append(self.ext_names['MEF'], file[0].data, file[0].header)
-        file.close()
-
-        # Copy CON image to MEF CON extension
-        file = fits.open(self.ext_names['CON'], mode='readonly')
-        file[0].header['extname'] = 'CON'
-        file[0].header['extver'] = 1
-        fits.append(self.ext_names['MEF'], file[0].data, file[0].header)
-        file.close()
-
+        # the layers and their extension names
+        layers = [('FLT', 'SCI'), ('ERR', 'ERR'), ('WHT', 'EXPT'),
+                  ('CON', 'CON')]
         if self.opt_extr:
-            # Copy MOD image to MEF MOD extension
-            file = fits.open(self.ext_names['MOD'], mode='readonly')
-            file[0].header['extname'] = 'MOD'
-            file[0].header['extver'] = 1
-            fits.append(self.ext_names['MEF'], file[0].data, file[0].header)
-            file.close()
-
-            # Copy VAR image to MEF VAR extension
-            file = fits.open(self.ext_names['VAR'], mode='readonly')
-            file[0].header['extname'] = 'VAR'
-            file[0].header['extver'] = 1
-            fits.append(self.ext_names['MEF'], file[0].data, file[0].header)
-            file.close()
+            layers.extend([('MOD', 'MOD'), ('VAR', 'VAR')])
 
-        # make the WCS header
-        self._make_wcs_header()
+        # Copy the layers to the MEF extensions
+        for layer, extname in layers:
+            header = self.result.layer_header(layer)
+            header['extname'] = extname
+            header['extver'] = 1
+            mex_hdu.append(fits.ImageHDU(data=self.result[layer],
+                                         header=header))
 
-        # delete the single images
-        os.unlink(self.ext_names['FLT'])
-        os.unlink(self.ext_names['ERR'])
-        os.unlink(self.ext_names['WHT'])
-        os.unlink(self.ext_names['CON'])
-
-        # delete also some temporary images
-        if os.path.isfile(self.ext_names['ERRWHT']):
-            os.unlink(self.ext_names['ERRWHT'])
-        if os.path.isfile(self.ext_names['CONWHT']):
-            os.unlink(self.ext_names['CONWHT'])
+        # make the WCS header
+        self._make_wcs_header(mex_hdu, self.result.header)
 
-        if self.opt_extr:
-            os.unlink(self.ext_names['MOD'])
-            os.unlink(self.ext_names['VAR'])
+        # save the image
+        mex_hdu.writeto(self.ext_names['MEF'])
+        mex_hdu.close()
 
     def make_sortIndex(self, sortList):
         """Generate the sort index"""
@@ -872,7 +870,10 @@ class DrizzleObject:
         self.ncontrib = self._get_ncontrib()
 
     def delete_files(self, keep_mef=True):
-        """Delete all files"""
+        """Delete all files
+
+        In debug mode the single layer images are kept.
+        """
         # make an empty list
         delete_keys = []
 
@@ -883,6 +884,10 @@ class DrizzleObject:
             if keep_mef and one_key == 'MEF':
                 continue
 
+            # keep the layers written for debugging
+            if self.debug and one_key in DEBUG_LAYERS:
+                continue
+
             # add the key to the list
             delete_keys.append(one_key)
 
@@ -1082,19 +1087,30 @@ class DrizzleObject:
         return filename
 
 
-    def run_drizzle(self,infile,whtfile,options):
-        """ drizzle contributors using cdrizzle in drizzle """
+    def _make_pixmap(self, header, xs, ys, options):
+        """Compute the pixel map of a contributor on the output grid.
+
+        Parameters
+        ----------
+        header: astropy.io.fits.Header
+            header with the drizzle coefficients
+        xs: int
+            number of pixels in x of the contributor
+        ys: int
+            number of pixels in y of the contributor
+        options: dict
+            the drizzle options
+
+        Returns
+        -------
+        pixmap: numpy.ndarray
+            the output coordinates of all input pixels
+        """
         img_nx = options['outnx']
         img_ny = options['outny']
 
         one = np.ones(2, dtype='float64')
 
-        img_data = fits.getdata(infile)
-        header = fits.getheader(infile)
-        exptime = header["EXPTIME"]
-        inwht = fits.getdata(whtfile) * exptime
-
-        ys,xs = np.shape(img_data)
         idxmap = np.indices((xs, ys), dtype='float64')
         idxmap = idxmap.T + one
         idxmap = idxmap.reshape(ys * xs, 2)
@@ -1144,26 +1160,151 @@ class DrizzleObject:
         pixmap = np.array([xc,yc]).T
         pixmap = pixmap.reshape(ys, xs, 2) - one
 
-        # Define input arrays now...
-        outsci = np.zeros((img_ny,img_nx),np.float32)
-        outwht = outsci.copy() * 0.0
-        outcon = outwht.astype(np.int32)
+        return pixmap
+
+    def drizzle_cube(self, data, weights, header, options):
+        """Drizzle a cube of planes of one contributor.
+
+        All planes share the geometry of the contributor, hence
+        the pixel map is computed once and every plane is
+        accumulated onto the output grid with it.
+
+        Parameters
+        ----------
+        data: numpy.ndarray
+            the planes, shape (nplanes, ny, nx)
+        weights: numpy.ndarray
+            the input weights, same shape as the data
+        header: astropy.io.fits.Header
+            header with the drizzle coefficients
+        options: dict
+            the drizzle options
+
+        Returns
+        -------
+        outsci, outwht: numpy.ndarray
+            the drizzled planes and their weights,
+            shape (nplanes, outny, outnx)
+        """
+        nplanes, ys, xs = data.shape
+        pixmap = self._make_pixmap(header, xs, ys, options)
+
+        # Define output arrays now...
+        outsci = np.zeros((nplanes, options['outny'], options['outnx']),
+                          np.float32)
+        outwht = np.zeros_like(outsci)
+        outcon = np.zeros((options['outny'], options['outnx']), np.int32)
 
         # Use pixmap with drizzle
         #
         # Call 'drizzle' to perform image combination
-        # This call to 'cdrizzle.tdriz' uses the new C syntax
+        # This call to 'cdrizzle.tdriz' uses the new C syntax,
+        # which takes one plane at a time
         #
-        _vers, nmiss, nskip = cdrizzle.tdriz(
-            img_data, inwht, pixmap, outsci, outwht, outcon,
-            uniqid=1, xmin=0, xmax=xs,
-            ymin=0, ymax=ys, scale=1.0, pixfrac=options['pixfrac'],
-            kernel=options['kernel'], in_units='cps', expscale=1.0,
-            wtscale=1.0, fillstr="0.0")
+        for index in range(nplanes):
+            outcon[:] = 0
+            _vers, nmiss, nskip = cdrizzle.tdriz(
+                data[index], weights[index], pixmap, outsci[index],
+                outwht[index], outcon,
+                uniqid=1, xmin=0, xmax=xs,
+                ymin=0, ymax=ys, scale=1.0, pixfrac=options['pixfrac'],
+                kernel=options['kernel'], in_units='cps', expscale=1.0,
+                wtscale=1.0, fillstr="0.0")
+
+        return outsci, outwht
+
+    def run_drizzle(self,infile,whtfile,options):
+        """ drizzle contributors using cdrizzle in drizzle """
+        img_data, header = fits.getdata(infile, header=True)
+        inwht = fits.getdata(whtfile) * header["EXPTIME"]
+
+        outsci, outwht = self.drizzle_cube(img_data[np.newaxis],
+                                           inwht[np.newaxis], header, options)
+        return outsci[0], outwht[0]
+
+    def _drizzle_contrib(self, one_contrib, planes, options):
+        """Drizzle several planes of a contributor at once.
+
+        Every plane and weight image is read once, the weight
+        images are scaled by the exposure time of the plane.
+
+        Parameters
+        ----------
+        one_contrib: DrizzleObjectContrib
+            the contributor
+        planes: list
+            the extension of each plane and of its weight image
+        options: dict
+            the drizzle options
+
+        Returns
+        -------
+        outsci, outwht: numpy.ndarray
+            the drizzled planes and their weights,
+            shape (nplanes, outny, outnx)
+        """
+        data = []
+        weights = []
+        wht_data = {}
+        header = None
+        for plane, wht_plane in planes:
+            img_data, img_header = fits.getdata(one_contrib.ext_names[plane],
+                                                header=True)
+            if wht_plane not in wht_data:
+                wht_data[wht_plane] = fits.getdata(one_contrib.ext_names[wht_plane])
+
+            data.append(img_data)
+            weights.append(wht_data[wht_plane] * img_header["EXPTIME"])
+
+            # the drizzle coefficients are taken from the first plane
+            if header is None:
+                header = img_header
+
+        return self.drizzle_cube(np.array(data), np.array(weights), header,
+                                 options)
+
+    @staticmethod
+    def _combine_contribs(tmps, wtmps):
+        """Combine the drizzled planes of all contributors.
+
+        Pixels without a finite value, a positive weight or with a value
+        of zero in the first plane are masked before the sigma clipping,
+        the weights of the masked and the clipped pixels are set to zero.
 
-        return outsci, outwht #, outcon
+        Parameters
+        ----------
+        tmps: numpy.ndarray
+            the drizzled planes, shape (ncontrib, nplanes, ny, nx)
+        wtmps: numpy.ndarray
+            the weights of the planes, shape (ncontrib, nplanes, ny, nx)
 
+        Returns
+        -------
+        combined: numpy.ndarray
+            the weighted mean of the planes, shape (nplanes, ny, nx)
+        whts: numpy.ndarray
+            the weights of the contributors, shape (ncontrib, ny, nx)
+        whts_sum: numpy.ndarray
+            the sum of the weights, shape (ny, nx)
+        """
+        # mask the pixels a contributor does not cover
+        outsci = tmps[:, 0]
+        whts = wtmps[:, 0].copy()
+        ok = (np.isfinite(outsci) & np.isfinite(whts) & (whts > 0) &
+              (outsci != 0.0))
+
+        # Store and Adjust the input weigths after sigma clipping of the data
+        # sigma needs to be set properly. N.P.
+        filtered_data = sigma_clip(np.ma.array(outsci, mask=~ok), sigma=3,
+                                   maxiters=5, axis=0, masked=True)
+        whts[filtered_data.mask] = 0.
+        whts_sum = np.nansum(whts, axis=0)
+        nonzero = whts_sum != 0
 
+        # Weighted combination of all planes
+        combined = np.nansum(tmps * whts[:, np.newaxis], axis=0)
+        combined[:, nonzero] = combined[:, nonzero] / whts_sum[nonzero]
+        return combined, whts, whts_sum
 
     def drizzle(self):
         """Drizzle all contributors together.
@@ -1191,100 +1332,54 @@ class DrizzleObject:
         options['outnx'] = img_nx
         options['outny'] = img_ny
 
-        # Store and Adjust the input weigths after sigma clipping of the data
-        tmps = []
-        whts = []
-        for one_contrib in self.contrib_list:
-            # print(f"drizzle input filename is: {one_contrib.ext_names['FLT']}")
-            outsci, outwht = self.run_drizzle(one_contrib.ext_names['FLT'],one_contrib.ext_names['WHT'],options)
-            ok = (np.isfinite(outsci)) & (np.isfinite(outwht)) & (outwht>0) & (outsci!=0.0)
-            tmp = np.ma.array(outsci, mask=~ok)
-            tmps.append(tmp)
-            # exptime = fits.open(one_contrib.ext_names['FLT'])[0].header["EXPTIME"]
-            whts.append(outwht) # *exptime)
-        tmps = np.array(tmps)
-        whts = np.array(whts)
-
-        # sigma needs to be set properly. N.P.
-        filtered_data = sigma_clip(tmps, sigma=3, maxiters=5,axis=0,masked=True)
-        masked = filtered_data.mask
-        whts[masked] = 0.
-        whts_sum = np.nansum(whts,axis=0)
+        # the planes to drizzle, each with its weight image;
+        # the model is weighted with the variance
+        planes = [('FLT', 'WHT'), ('ERR', 'WHT'), ('CON', 'WHT')]
+        if self.opt_extr:
+            planes.append(('MOD', 'VAR'))
 
-        # Weighted combination of FLT
+        # drizzle all planes of all contributors,
+        # shape (ncontrib, nplanes, outny, outnx)
         tmps = []
+        wtmps = []
         for one_contrib in self.contrib_list:
-            outsci, outwht = self.run_drizzle(one_contrib.ext_names['FLT'],one_contrib.ext_names['WHT'],options)
+            outsci, outwht = self._drizzle_contrib(one_contrib, planes, options)
             tmps.append(outsci)
+            wtmps.append(outwht)
         tmps = np.array(tmps)
-        tmps = tmps*whts
-        out_flt = np.nansum(tmps,axis=0)
-        out_flt[whts_sum!=0] = out_flt[whts_sum!=0]/whts_sum[whts_sum!=0]
+        wtmps = np.array(wtmps)
 
-        # Weighted combination of ERR
-        tmps = []
-        for one_contrib in self.contrib_list:
-            outsci, outwht = self.run_drizzle(one_contrib.ext_names['ERR'],one_contrib.ext_names['WHT'],options)
-            tmps.append(outsci)
-        tmps = np.array(tmps)
-        tmps = tmps*whts
-        out_err = np.nansum(tmps,axis=0)
-        out_err[whts_sum!=0] = out_err[whts_sum!=0]/whts_sum[whts_sum!=0]
-
-        # Weighted combination of CON
-        tmps = []
-        for one_contrib in self.contrib_list:
-            outsci, outwht = self.run_drizzle(one_contrib.ext_names['CON'],one_contrib.ext_names['WHT'],options)
-            tmps.append(outsci)
-        tmps = np.array(tmps)
-        tmps = tmps*whts
-        out_con = np.nansum(tmps,axis=0)
-        out_con[whts_sum!=0] = out_con[whts_sum!=0]/whts_sum[whts_sum!=0]
+        combined, whts, whts_sum = self._combine_contribs(tmps, wtmps)
+        out_flt, out_err, out_con = combined[:3]
 
         if self.opt_extr:
-            # Weighted combination of MOD
-            tmps = []
-            wtmps = []
-
-            for one_contrib in self.contrib_list:
-                outsci, outwht = self.run_drizzle(one_contrib.ext_names['MOD'],one_contrib.ext_names['VAR'],options)
-                tmps.append(outsci)
-                wtmps.append(outwht)
-
-            tmps = np.array(tmps)
-            tmps = tmps*whts
-            out_mod = np.nansum(tmps,axis=0)
-            out_mod[whts_sum!=0] = out_mod[whts_sum!=0]/whts_sum[whts_sum!=0]
-
-            wtmps = np.array(wtmps)
-            wtmps = wtmps*whts
-            wht_mod = np.nansum(wtmps,axis=0)
-            wht_mod[whts_sum!=0] = wht_mod[whts_sum!=0]/whts_sum[whts_sum!=0]
-
-        fits.PrimaryHDU(data=out_flt,header=header).writeto(self.ext_names['FLT'],overwrite=True)
-        fits.PrimaryHDU(data=out_con,header=header).writeto(self.ext_names['CON'],overwrite=True)
-        fits.PrimaryHDU(data=out_err,header=header).writeto(self.ext_names['ERR'],overwrite=True)
-
-
-        with fits.open(self.ext_names['FLT'], mode="update") as fin:
-            fin[0].header["CDSCALE"] = header["CDSCALE"]
-            fin[0].header["REFPNTY"] = header["REFPNTY"]
-            fin[0].header["REFPNTX"] = header["REFPNTX"]
-            fin[0].header["DLAMBDA"] = header["DLAMBDA"]
-            fin[0].header["LAMBDA0"] = header["LAMBDA0"]
-            fin[0].header["XOFFS"] = header["XOFFS"]
-
+            # the combined model and its weight
+            out_mod = combined[3]
+            wht_mod = np.nansum(wtmps[:, 3] * whts, axis=0)
+            nonzero = whts_sum != 0
+            wht_mod[nonzero] = wht_mod[nonzero] / whts_sum[nonzero]
+
+        # keep the layers in memory
+        planes = {'FLT': out_flt, 'ERR': out_err, 'CON': out_con,
+                  'WHT': whts_sum}
         if self.opt_extr:
-            fits.PrimaryHDU(data=out_mod).writeto(self.ext_names['MOD'], overwrite=True)
-            fits.PrimaryHDU(data=wht_mod).writeto(self.ext_names['VAR'], overwrite=True)
+            planes['MOD'] = out_mod
+            planes['VAR'] = wht_mod
+        self.result = DrizzleResult(header, planes)
 
-        fits.PrimaryHDU(data=whts_sum).writeto(self.ext_names['WHT'], overwrite=True)
+        # write the single layers for debugging
+        if self.debug:
+            self.result.writeto(self.ext_names)
 
         print('Done!')
 
 
     def make_mef(self):
-        """Generate a MultiExtension FITS image."""
+        """Generate a MultiExtension FITS image.
+
+        The layers of the drizzle result are converted
+        in memory and released after the MEF is written.
+        """
 
         # check for geometric contamination
         if ((self.cont_info is not None) and (not self.cont_info[1])):
@@ -1299,6 +1394,7 @@ class DrizzleObject:
 
         # compose the multi extension fits image
         self._compose_mef_image()
+        self.result = None
 
         # return the MEF name
         return os.path.basename(self.ext_names['MEF'])
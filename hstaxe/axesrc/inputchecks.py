@@ -4,7 +4,6 @@ See LICENSE.txt
 import os
 import math
 import logging
-from astropy.io import fits
 from astropy.table import Table
 from astropy.io.registry import IORegistryError
 
@@ -23,6 +22,11 @@ class InputChecker:
         # store the parameters
         self.taskname = taskname
 
+        # the configurations loaded and
+        # the information on the inputs
+        self._confs = {}
+        self._info = None
+
         # check whether an input image list exists
         if inlist is not None:
             # make sure the Input Image List does exist
@@ -34,36 +38,53 @@ class InputChecker:
             # create a table with the basic aXe inputs
             self.axe_inputs = axeinputs.aXeInput(inlist, configs, backims)
 
+    def _get_conf(self, config):
+        """Load a configuration file once per checker"""
+        if config not in self._confs:
+            self._confs[config] = configfile.ConfigFile(config_util.getCONF(config))
+        return self._confs[config]
+
+    def _input_info(self):
+        """Collect the headers and extension information of all inputs.
+
+        The headers of the grism images are read once, in parallel
+        threads, and the extension information of every row is
+        derived from them in the same pass.
+
+        Returns
+        -------
+        info: list
+            the grism image, its headers and the extension
+            information for every row of the inputs
+        """
+        if self._info is None:
+            grisims = [config_util.getDATA(row['grisim'])
+                       for row in self.axe_inputs]
+            config_util.read_headers(grisims)
+
+            self._info = []
+            for row, grisim in zip(self.axe_inputs, grisims):
+                conf = self._get_conf(row['config'])
+                self._info.append({'grisim': grisim,
+                                   'headers': config_util.get_headers(grisim),
+                                   'ext_info': config_util.get_ext_info(grisim, conf)})
+        return self._info
+
     def _is_prism_data(self):
         # define the default
         is_prism = False
 
         # make sure there are grism images
-        for row in self.axe_inputs:
-            one_grisim = config_util.getDATA(row['grisim'])
-            # open the fits
-            one_fits = fits.open(one_grisim, 'readonly')
-
-            # read the keyword 'FILTER1'
-            try:
-                filter1 = one_fits[0].header['FILTER1']
-            except KeyError:
-                filter1 = None
-
-            # read the keyword 'FILTER2'
-            try:
-                filter2 = one_fits[0].header['FILTER2']
-            except KeyError:
-                filter2 = None
+        for info in self._input_info():
+            # read the keywords 'FILTER1' and 'FILTER2'
+            filter1 = info['headers'].primary.get('FILTER1')
+            filter2 = info['headers'].primary.get('FILTER2')
 
             # check whether it is prism data
             if ((filter1 and 'PR' in filter1) or
                     (filter2 and 'PR' in filter2)):
                 is_prism = True
 
-            # close the fits
-            one_fits.close()
-
         # return the index
         return is_prism
 
@@ -82,14 +103,11 @@ class InputChecker:
 
     def _check_fluxcubes(self):
         # go over all inputs
-        for one_input in self.axe_inputs:
-
-            # load the config file and get the extension information
-            conf = configfile.ConfigFile(config_util.getCONF(one_input['config']))
-            ext_info = config_util.get_ext_info(config_util.getDATA(one_input['grisim']), conf)
+        for one_input, info in zip(self.axe_inputs, self._input_info()):
 
             # derive the aXe names
-            axe_names = config_util.get_axe_names(one_input['grisim'], ext_info)
+            axe_names = config_util.get_axe_names(one_input['grisim'],
+                                                  info['ext_info'])
 
             # check the fluxcube
             if not os.path.isfile(config_util.getDATA(axe_names['FLX'])):
@@ -102,43 +120,29 @@ class InputChecker:
     def _check_global_backsub(self):
         """Check for global background subtraction"""
         # go over all inputs
-        for one_input in self.axe_inputs:
-
-            # load the config file and get the extension information
-            conf = configfile.ConfigFile(config_util.getCONF(one_input['config']))
-            ext_info = config_util.get_ext_info(config_util.getDATA(one_input['grisim']), conf)
-
-            # open the fits image
-            gri_fits = fits.open(config_util.getDATA(one_input['grisim']), 'readonly')
+        for info in self._input_info():
+            ext_info = info['ext_info']
 
             # go to the correct header
-            act_header = gri_fits[ext_info['fits_ext']].header
+            act_header = info['headers'][ext_info['fits_ext']]
 
             # make sure a sky background value is set
-            if 'SKY_CPS' in act_header and act_header['SKY_CPS'] >= 0.0:
-                # close the fits
-                gri_fits.close()
-            else:
-                # close fits, complain and out
-                gri_fits.close()
+            if not ('SKY_CPS' in act_header and act_header['SKY_CPS'] >= 0.0):
+                # complain and out
                 err_msg = ("{0:s}: The grism image: \n{1:s}\nhas no keyword "
                            "SKY_CPS>=0.0 in the extension {2:d}. This means "
                            "it had NO global\nsky subtraction, which is "
                            "required for the CRR version of aXedrizzle!"
                            .format(self.taskname,
-                                   config_util.getDATA(one_input['grisim']),
-                                   ext_info['fits_ext']))
+                                   info['grisim'], ext_info['fits_ext']))
                 raise aXeError(err_msg)
 
     def _check_dpps(self, back=False):
         # go over all inputs
-        for one_input in self.axe_inputs:
-            # load the config file and get the extension information
-            conf = configfile.ConfigFile(config_util.getCONF(one_input['config']))
-            ext_info = config_util.get_ext_info(config_util.getDATA(one_input['grisim']), conf)
-
+        for one_input, info in zip(self.axe_inputs, self._input_info()):
             # derive the aXe names
-            axe_names = config_util.get_axe_names(one_input['grisim'], ext_info)
+            axe_names = config_util.get_axe_names(one_input['grisim'],
+                                                  info['ext_info'])
             # check the DPP file
             if not os.path.isfile(config_util.getOUTPUT(axe_names['DPP'])):
                 # error and out
@@ -2,16 +2,151 @@
 See LICENSE.txt
 """
 import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 from astropy.io import fits
 from hstaxe import config as config_utils
 from hstaxe.axeerror import aXeError
+from . import axelowlev
 from . import configfile
 
+# make sure there is a logger
+_log = logging.getLogger(__name__)
+
+# the minimum number of objects
+# in a shard of the extraction
+MIN_SHARD_SIZE = 20
+
+
+def shard_name(filename, index):
+    """Compose the name of a file for one shard.
+
+    The shard index is inserted before the first dot of
+    the file name, e.g. 'aXe_2.SPC.fits' -> 'aXe_2_s1.SPC.fits'.
+
+    Parameters
+    ----------
+    filename: str
+        the file name, possibly with path
+    index: int
+        the index of the shard
+
+    Returns
+    -------
+    shard_file: str
+        the file name for the shard
+    """
+    dirname, basename = os.path.split(filename)
+    pos = basename.find('.')
+    if pos < 0:
+        pos = len(basename)
+    return os.path.join(dirname, '{0:s}_s{1:d}{2:s}'
+                        .format(basename[:pos], index, basename[pos:]))
+
+
+def merge_fits(filenames, outname):
+    """Merge the extensions of several FITS files.
+
+    The primary header is taken from the first file, the
+    extensions of all files follow in the order of the files.
+
+    Parameters
+    ----------
+    filenames: list
+        the input files
+    outname: str
+        the name of the merged file
+    """
+    for filename in filenames:
+        if not os.path.isfile(filename):
+            raise aXeError("The file {0:s} to be merged into {1:s} does not "
+                           "exist!".format(filename, outname))
+
+    inputs = [fits.open(filename, 'readonly') for filename in filenames]
+    try:
+        merged = fits.HDUList([fits.PrimaryHDU(header=inputs[0][0].header)])
+        merged[0].header['EXTEND'] = True
+        for fits_input in inputs:
+            merged.extend(fits_input[1:])
+        merged.writeto(outname, overwrite=True)
+    finally:
+        for fits_input in inputs:
+            fits_input.close()
+
+
+
+def _task_namespace(chain, shard=None):
+    """The prefix of the stdout/stderr files of an extraction task"""
+    if shard is None:
+        return 'mefextract_{0:s}'.format(chain)
+    return 'mefextract_{0:s}_s{1:d}'.format(chain, shard)
+
+
+def _check_failed(failed):
+    """Raise an error naming the stderr files of failed tasks"""
+    if failed:
+        raise aXeError("{0:d} aXe task(s) of the extraction failed, see "
+                       "{1:s}".format(len(failed),
+                                      ', '.join(task.stderr
+                                                for task in failed)))
+
+
+def _subtract_stamp_background(obj_img, bck_img):
+    """Subtract the background stamp from an object MEF.
+
+    The science and error data of the object are changed in
+    place, the background and its error are appended as the
+    extensions SCIBCK and ERRBCK.
+
+    Parameters
+    ----------
+    obj_img: str
+        the MEF of the object
+    bck_img: str
+        the MEF of the background
+    """
+    with fits.open(bck_img, 'readonly') as bck_fits:
+        # compose an image HDU for the background
+        # and the background error
+        bck_sci = fits.ImageHDU(data=bck_fits['SCI'].data,
+                                header=bck_fits['SCI'].header,
+                                name='SCIBCK')
+        bck_err = fits.ImageHDU(data=bck_fits['ERR'].data,
+                                header=bck_fits['ERR'].header,
+                                name='ERRBCK')
+
+        # subtract the background and process
+        # the error in the mapped object data
+        with fits.open(obj_img, 'update') as obj_fits:
+            obj_sci = obj_fits['SCI'].data
+            np.subtract(obj_sci, bck_sci.data, out=obj_sci)
+            obj_err = obj_fits['ERR'].data
+            np.hypot(obj_err, bck_err.data, out=obj_err)
+
+            # manifest in header
+            hist_string1 = 'The extension SCIBCK and ERRBCK were used for '
+            hist_string2 = 'background and background error'
+            obj_fits['SCI'].header['SCIBCK'] = ('DONE', "subtraction of "
+                                                        "background stamp")
+            obj_fits['SCI'].header['ERRBCK'] = ('DONE', "processing of "
+                                                        "background stamp "
+                                                        "error")
+            obj_fits['SCI'].header.add_history(hist_string1)
+            obj_fits['SCI'].header.add_history(hist_string2)
+
+        # append the new background and the error to the
+        # object fits, without rewriting the existing data
+        with fits.open(obj_img, 'append') as obj_fits:
+            obj_fits.append(bck_sci)
+            obj_fits.append(bck_err)
+
 
 class MEFExtractor:
     """Multi-Extension FITS Extractor class"""
-    def __init__(self, drizzle_params, obj_dol=None, bck_dol=None, opt_extr=None):
+    def __init__(self, drizzle_params, obj_dol=None, bck_dol=None,
+                 opt_extr=None, nworkers=None):
         """
         Parameters
         ----------
@@ -26,6 +161,9 @@ class MEFExtractor:
         opt_extr : bool or None
         Perform optimal extraction
 
+        nworkers : int or None
+        Number of threads for the background subtraction
+
         """
         # determine and store the file extension names
         self.ext_names = self._get_ext_names(drizzle_params)
@@ -66,7 +204,7 @@ class MEFExtractor:
 
             # do the intrinsic background
             # subtraction on the stamp images
-            self._subtract_background()
+            self._subtract_background(nworkers)
 
         # create and save the configuration file for the
         # drizzled images
@@ -191,141 +329,264 @@ class MEFExtractor:
             obj_fits.close()
             bck_fits.close()
 
-    def _subtract_background(self):
+    def _subtract_background(self, nworkers=None):
         """
         Make the background subtraction
+
+        Parameters
+        ----------
+        nworkers: int
+            number of threads processing the objects; 0 uses
+            all CPUs, None processes one object after the other
         """
-        # go over the object drizzle list
+        # make sure the ID's of object and background match
+        pairs = []
         for index in range(len(self.obj_dol)):
-
-            # take and compose the filenames
-            obj_img = self.obj_dol[index].ext_names['MEF']
-            bck_img = self.bck_dol[index].ext_names['MEF']
-
-            # make sure the ID's of object and background match
-            if self.obj_dol[index].objID != self.bck_dol[index].objID:
+            obj = self.obj_dol[index]
+            bck = self.bck_dol[index]
+            if obj.objID != bck.objID:
                 err_msg = ("The object ID: {0:s} and background ID {1:s} are"
-                           " not identical!".format(self.obj_dol[index].objID,
-                                                    self.bck_dol[index].objID))
+                           " not identical!".format(obj.objID, bck.objID))
                 raise aXeError(err_msg)
+            pairs.append((obj.ext_names['MEF'], bck.ext_names['MEF']))
+
+        if nworkers == 0:
+            nworkers = os.cpu_count()
+
+        # the work is mostly I/O,
+        # hence threads are sufficient
+        if nworkers is None or nworkers < 2:
+            for obj_img, bck_img in pairs:
+                _subtract_stamp_background(obj_img, bck_img)
+        else:
+            with ThreadPoolExecutor(max_workers=nworkers) as executor:
+                for job in [executor.submit(_subtract_stamp_background,
+                                            obj_img, bck_img)
+                            for obj_img, bck_img in pairs]:
+                    job.result()
 
-            # open the fits file
-            obj_fits = fits.open(obj_img, 'update')
-            bck_fits = fits.open(bck_img, 'readonly')
-
-            # compose an image HDU for the background
-            # and the background error
-            bck_sci = fits.ImageHDU(data=bck_fits['SCI'].data,
-                                    header=bck_fits['SCI'].header,
-                                    name='SCIBCK')
-            bck_err = fits.ImageHDU(data=bck_fits['ERR'].data,
-                                    header=bck_fits['ERR'].header,
-                                    name='ERRBCK')
-
-            # subtract the background;
-            # process the error
-            obj_fits['SCI'].data = obj_fits['SCI'].data - bck_sci.data
-            obj_fits['ERR'].data = np.sqrt(obj_fits['ERR'].data *
-                                           obj_fits['ERR'].data +
-                                           bck_err.data * bck_err.data)
-
-            # manifest in header
-            hist_string1 = 'The extension SCIBCK and ERRBCK were used for '
-            hist_string2 = 'background and background error'
-            obj_fits['SCI'].header['SCIBCK'] = ('DONE', "subtraction of "
-                                                        "background stamp")
-            obj_fits['SCI'].header['ERRBCK'] = ('DONE', "processing of "
-                                                        "background stamp "
-                                                        "error")
-            obj_fits['SCI'].header.add_history(hist_string1)
-            obj_fits['SCI'].header.add_history(hist_string2)
+        # delete all background files
+        self.bck_dol.delete_files()
 
-            # append the new background
-            # and the error to the object fits
-            obj_fits.append(bck_sci)
-            obj_fits.append(bck_err)
+    def _chain_tasks(self, names, opt_extr, sampling, adj_sens, shard=None):
+        """Set up the aXe tasks of an extraction chain.
 
-            # store the images
-            # and delete the objects
-            obj_fits.flush()
-            obj_fits.close()
-            bck_fits.close()
-            del bck_sci
-            del bck_err
+        Parameters
+        ----------
+        names: dict
+            the file names of the chain
+        opt_extr: bool
+            compute optimal weights
+        sampling: str
+            the sampling of the stamp images
+        adj_sens: bool
+            adjust the sensitivity for extended objects
+        shard: int
+            index of the shard, None for all objects
+
+        Returns
+        -------
+        drz2pet, pet2spc, stamps: TaskWrapper
+            the tasks of the chain
+        """
+        inlist = names['OLIS']
+        in_af = names['DRZ_OAF']
+        out_pet = names['DRZ_OPET']
+        out_spc = names['DRZ_SPC']
+        out_stp = names['STP']
+        if shard is not None:
+            inlist, in_af, out_pet, out_spc, out_stp = (
+                shard_name(fname, shard) for fname in
+                (inlist, in_af, out_pet, out_spc, out_stp))
+
+        drz2pet = axelowlev.aXe_DRZ2PET(inlist=inlist,
+                                        config=names['CONF'],
+                                        opt_extr=opt_extr,
+                                        back=False,
+                                        in_af=in_af,
+                                        out_pet=out_pet)
+
+        pet2spc = axelowlev.aXe_PET2SPC(names['FITS'], names['CONF'],
+                                        use_bpet=False,
+                                        adj_sens=adj_sens,
+                                        weights=False,
+                                        do_flux=True,
+                                        drzpath=True,
+                                        in_af=in_af,
+                                        opet=out_pet,
+                                        bpet=None,
+                                        out_spc=out_spc)
+
+        stamps = axelowlev.aXe_STAMPS(names['FITS'], names['CONF'],
+                                      sampling=sampling,
+                                      drzpath=True,
+                                      in_af=in_af,
+                                      in_pet=out_pet,
+                                      out_stp=out_stp)
+
+        return drz2pet, pet2spc, stamps
+
+    def _make_shards(self, nshards, infwhm, outfwhm):
+        """Split the objects into shards.
+
+        For every shard an image list and an OAF with
+        its objects are written.
 
-        # delete all background files
-        self.bck_dol.delete_files()
+        Parameters
+        ----------
+        nshards: int
+            the number of shards
+        infwhm: float
+            mfwhm of the input PETs and DPPs
+        outfwhm: float
+            mfwhm for the extraction
+        """
+        mef_files = self.obj_dol.get_mef_files()
+        for shard, indices in enumerate(np.array_split(np.arange(len(mef_files)),
+                                                       nshards)):
+            with open(shard_name(self.ext_names['OLIS'], shard), 'w') as f:
+                for index in indices:
+                    f.write("%s\n" % mef_files[index])
+            with open(shard_name(self.ext_names['DRZ_OAF'], shard), 'w') as f:
+                for index in indices:
+                    f.write(self.obj_dol[index].make_oaf_entry(infwhm, outfwhm))
+
+    def _run_tasks(self, tasks, stop=False):
+        """Run aXe tasks one after the other.
+
+        Every task writes to its own stdout/stderr files,
+        which are deleted if the task succeeds.
 
-    def extract(self, infwhm, outfwhm, adj_sens):
+        Parameters
+        ----------
+        tasks: list
+            the tasks to run, each with the prefix
+            of its stdout/stderr files
+        stop: bool
+            do not run the tasks after a failed one
+
+        Returns
+        -------
+        failed: list
+            the tasks which failed
         """
-        Extract spectra from the MEF files
+        failed = []
+        for task, namespace in tasks:
+            task.stdout = config_utils.getOUTPUT('{0:s}_{1:s}.stdout'
+                                                 .format(namespace, task.tshort))
+            task.stderr = config_utils.getOUTPUT('{0:s}_{1:s}.stderr'
+                                                 .format(namespace, task.tshort))
+            if task.run() == axelowlev.GOOD_RETURN_VALUE:
+                task.cleanup()
+            else:
+                _log.error("The aXe task {0:s} failed, see {1:s}"
+                           .format(task.taskname, task.stderr))
+                failed.append(task)
+                if stop:
+                    break
+        return failed
+
+    def extract(self, infwhm, outfwhm, adj_sens, nworkers=None):
         """
-        from . import axetasks
+        Extract spectra from the MEF files
 
+        The object chain DRZ2PET -> PET2SPC -> STAMPS and, for optimal
+        extraction, the optimal chain are run on the MEF files. With
+        several workers the objects are split into shards which are
+        extracted in parallel, and the PETs, spectra and stamp images
+        of the shards are merged at the end. DRZ2PET stores the weights
+        in the MEF files, hence on every shard the object chain runs it
+        before the optimal chain; PET2SPC and STAMPS of all chains and
+        shards run at the same time.
+
+        Parameters
+        ----------
+        infwhm: float
+            mfwhm of the input PETs and DPPs
+        outfwhm: float
+            mfwhm for the extraction
+        adj_sens: bool
+            adjust the sensitivity for extended objects
+        nworkers: int
+            number of aXe tasks run at the same time; 0 uses all
+            CPUs, None runs the chains one after the other
+        """
         # make the OAF
         self.obj_dol.make_OAF_file(infwhm, outfwhm, self.ext_names['DRZ_OAF'])
 
-        # run DRZ2PET
-        axetasks.drz2pet(inlist=self.ext_names['OLIS'],
-                         config=self.ext_names['CONF'],
-                         opt_extr=False,
-                         back=False,
-                         in_af=self.ext_names['DRZ_OAF'],
-                         out_pet=self.ext_names['DRZ_OPET'])
-
-        # run PET2SPC
-        axetasks.pet2spc(grism=self.ext_names['FITS'],
-                         config=self.ext_names['CONF'],
-                         use_bpet=False,
-                         adj_sens=adj_sens,
-                         weights=False,
-                         do_flux=True,
-                         drzpath=True,
-                         in_af=self.ext_names['DRZ_OAF'],
-                         opet=self.ext_names['DRZ_OPET'],
-                         bpet=None,
-                         out_spc=self.ext_names['DRZ_SPC'])
-
-        # run STAMPS
-        axetasks.stamps(grism=self.ext_names['FITS'],
-                        config=self.ext_names['CONF'],
-                        sampling="trace",
-                        drzpath=True,
-                        in_af=self.ext_names['DRZ_OAF'],
-                        in_pet=self.ext_names['DRZ_OPET'],
-                        out_stp=self.ext_names['STP'])
-
+        # the chains with their names,
+        # weights and stamp sampling
+        chains = [('obj', self.ext_names, False, 'trace')]
         if self.opt_extr:
-            # run DRZ2PET
-            axetasks.drz2pet(inlist=self.opt_names['OLIS'],
-                             config=self.opt_names['CONF'],
-                             opt_extr=self.opt_extr,
-                             back=False,
-                             in_af=self.opt_names['DRZ_OAF'],
-                             out_pet=self.opt_names['DRZ_OPET'])
-
-            # run PET2SPC
-            axetasks.pet2spc(grism=self.opt_names['FITS'],
-                             config=self.opt_names['CONF'],
-                             use_bpet=False,
-                             adj_sens=adj_sens,
-                             weights=False,
-                             do_flux=True,
-                             drzpath=True,
-                             in_af=self.opt_names['DRZ_OAF'],
-                             opet=self.opt_names['DRZ_OPET'],
-                             bpet=None,
-                             out_spc=self.opt_names['DRZ_SPC'])
-
-            # run STAMPS
-            axetasks.stamps(grism=self.opt_names['FITS'],
-                            config=self.opt_names['CONF'],
-                            sampling="rectified",
-                            drzpath=True,
-                            in_af=self.opt_names['DRZ_OAF'],
-                            in_pet=self.opt_names['DRZ_OPET'],
-                            out_stp=self.opt_names['STP'])
-
+            chains.append(('opt', self.opt_names, self.opt_extr, 'rectified'))
+
+        if nworkers == 0:
+            nworkers = os.cpu_count()
+
+        # run the chains one after the other,
+        # a chain stops at its first failed task
+        if nworkers is None or nworkers < 2:
+            failed = []
+            for chain, names, opt_extr, sampling in chains:
+                failed.extend(self._run_tasks(
+                    [(task, _task_namespace(chain))
+                     for task in self._chain_tasks(names, opt_extr, sampling,
+                                                   adj_sens)], stop=True))
+            _check_failed(failed)
+            return
+
+        # split the objects
+        nshards = max(1, min(nworkers, len(self.obj_dol) // MIN_SHARD_SIZE))
+        if nshards > 1:
+            self._make_shards(nshards, infwhm, outfwhm)
+            shards = list(range(nshards))
+        else:
+            shards = [None]
+
+        tasks = {}
+        for chain, names, opt_extr, sampling in chains:
+            for shard in shards:
+                tasks[chain, shard] = self._chain_tasks(names, opt_extr,
+                                                        sampling, adj_sens,
+                                                        shard)
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=nworkers) as executor:
+            # DRZ2PET of all chains on each shard
+            jobs = [executor.submit(self._run_tasks,
+                                    [(tasks[chain[0], shard][0],
+                                      _task_namespace(chain[0], shard))
+                                     for chain in chains])
+                    for shard in shards]
+            for job in jobs:
+                failed.extend(job.result())
+
+            # PET2SPC and STAMPS of all chains and shards
+            jobs = [executor.submit(self._run_tasks,
+                                    [(task, _task_namespace(chain, shard))])
+                    for (chain, shard), chain_tasks in tasks.items()
+                    for task in chain_tasks[1:]]
+            for job in jobs:
+                failed.extend(job.result())
+
+        # do not merge incomplete shards
+        _check_failed(failed)
+
+        if nshards < 2:
+            return
+
+        # merge the PETs, spectra and stamp
+        # images of the shards, delete the shards
+        for _, names, _, _ in chains:
+            for outname in (names['DRZ_OPET'], names['DRZ_SPC'],
+                            names['DRZ_STP']):
+                shard_files = [shard_name(outname, shard) for shard in shards]
+                merge_fits(shard_files, outname)
+                for shard_file in shard_files:
+                    os.unlink(shard_file)
+        for shard in shards:
+            os.unlink(shard_name(self.ext_names['OLIS'], shard))
+            os.unlink(shard_name(self.ext_names['DRZ_OAF'], shard))
 
 
 class DrizzleConf(configfile.ConfigList):
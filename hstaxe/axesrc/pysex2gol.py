@@ -352,7 +352,7 @@ class Sex2GolPy:
             of = open(outfile, 'w')
             for num, name in zip(range(len(self.gol.colnames)), self.gol.colnames):
                 of.write("# {0:d} {1:s}\t\t{2:s}\t\t[{3:s}]\n".format(num+1, name,
-                                                     self.gol[name].description,
+                                                     self.gol[name].description or '',
                                                      str(self.gol[name].unit)))
             self.gol.write(of, format='ascii.no_header', overwrite=False)
             of.close()
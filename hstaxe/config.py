@@ -1,15 +1,24 @@
 """A Place to store global variables and constants required to
 configure axe modules.
+
+The aXe directories and the log file are set up
+by ``axe_setup()`` when the first task is run.
 See LICENSE.txt
 """
 import os
 import shutil
+import threading
+import time
+from collections import OrderedDict
 
-from astropy.io import fits
 from hstaxe.axeerror import aXeError
 from hstaxe.utils import set_logging
 
-_log = set_logging(filename='axe_output.log')  # defaults to INFO
+# the logger, set up with the directories
+_log = None
+
+# whether the directories and the logger are set up
+_setup_done = False
 
 # defaults
 __user_paths = {"AXE_IMAGE_PATH": 'DATA',
@@ -28,9 +37,29 @@ __user_paths['AXE_DRZTMP_LOC'] = __AXE_DRZTMP_LOC
 
 # notification of python + C only axe
 welcome_string="* Welcome to hstaxe!\nThis version is independent of IRAF and PyRAF. *"
-print(f"\n{len(welcome_string)*'*'}")
-print(welcome_string)
-print(f"{len(welcome_string)*'*'}\n")
+
+
+def _setup_once():
+    """Set up the logging and the aXe directories, once per session"""
+    global _log
+    global _setup_done
+
+    if _setup_done:
+        return
+    _setup_done = True
+
+    _log = set_logging(filename='axe_output.log')  # defaults to INFO
+
+    print(f"\n{len(welcome_string)*'*'}")
+    print(welcome_string)
+    print(f"{len(welcome_string)*'*'}\n")
+
+    set_defaults()
+
+
+def _user_path(name):
+    """The aXe directory, also before the setup"""
+    return os.environ.get(name, __user_paths[name])
 
 
 def set_defaults():
@@ -65,14 +94,11 @@ def check_axe_dirs():
 
 
 def check_axesim_dirs():
-    """Check for existence of all directories"""
-    global __user_paths
-    __user_paths["AXE_SIMDATA_PATH"] = './SIMDATA'
-    __user_paths["AXE_OUTSIM_PATH"] = './OUTSIM'
-
-    for location in __user_paths:
+    """Check for usability of all axesim directories"""
+    for name in __user_paths:
+        location = _user_path(name)
         if not os.access(location, os.W_OK):
-            raise IOError(f"{location} not writable")
+            raise IOError(f"{name} -> {location} not writable")
 
 
 def handle_drztmp_dir():
@@ -91,6 +117,9 @@ def handle_drztmp_dir():
 # TODO: Update or verify this for axesim
 def axe_setup(tmpdir=False, axesim=False):
     """Setup the aXe file and pathnames"""
+    # create the directories and the
+    # logger when the first task runs
+    _setup_once()
 
     # check whether we are
     # in axesim
@@ -124,7 +153,7 @@ def axe_setup(tmpdir=False, axesim=False):
 
 
 def getCONF(name=None):
-    fullpath = __user_paths['AXE_CONFIG_PATH']
+    fullpath = _user_path('AXE_CONFIG_PATH')
     if fullpath in name:
         return name
     if name is None:
@@ -134,7 +163,7 @@ def getCONF(name=None):
         newstring = [os.path.join(i,j) for i,j in zip([fullpath]*len(namesplit), namesplit) if fullpath not in j]
         return ','.join(newstring)
     else:
-        return  os.path.join(__user_paths['AXE_CONFIG_PATH'], name)
+        return  os.path.join(fullpath, name)
 
 
 def getDATA(name=None):
@@ -142,12 +171,12 @@ def getDATA(name=None):
     # the pathname to the input file
     # in AXE_IMAGE_PATH
     if name is None:
-        return __user_paths['AXE_IMAGE_PATH']
+        return _user_path('AXE_IMAGE_PATH')
     elif len(os.path.split(name)) > 1:
-        return os.path.join(__user_paths['AXE_IMAGE_PATH'],
+        return os.path.join(_user_path('AXE_IMAGE_PATH'),
                             os.path.split(name)[-1])
     else:
-        return os.path.join(__user_paths['AXE_IMAGE_PATH'], name)
+        return os.path.join(_user_path('AXE_IMAGE_PATH'), name)
 
 
 def getOUTPUT(name=None):
@@ -155,13 +184,13 @@ def getOUTPUT(name=None):
     # the pathname to the output file
     # in AXE_OUTPUT_PATH
     if name is None:
-        return __user_paths['AXE_OUTPUT_PATH']
+        return _user_path('AXE_OUTPUT_PATH')
     elif len(os.path.split(name)) > 1:
-        return os.path.join(__user_paths['AXE_OUTPUT_PATH'],
+        return os.path.join(_user_path('AXE_OUTPUT_PATH'),
                             os.path.split(name)[-1])
     else:
         print("adding output path to name")
-        return os.path.join(__user_paths['AXE_OUTPUT_PATH'], name)
+        return os.path.join(_user_path('AXE_OUTPUT_PATH'), name)
 
 
 def getOUTSIM(name=None):
@@ -169,9 +198,9 @@ def getOUTSIM(name=None):
     # the pathname to the output file
     # in AXE_OUTSIM_PATH
     if name is None:
-        return AXE_OUTSIM_PATH
+        return _user_path('AXE_OUTSIM_PATH')
     else:
-        return os.path.join(AXE_OUTSIM_PATH, name)
+        return os.path.join(_user_path('AXE_OUTSIM_PATH'), name)
 
 
 def getSIMDATA(name=None):
@@ -179,9 +208,9 @@ def getSIMDATA(name=None):
     # the pathname to the input file
     # in AXE_SIMDATA_PATH
     if name is None:
-        return AXE_SIMDATA_PATH
+        return _user_path('AXE_SIMDATA_PATH')
     else:
-        return os.path.join(AXE_SIMDATA_PATH, name)
+        return os.path.join(_user_path('AXE_SIMDATA_PATH'), name)
 
 
 def getDRIZZLE(name=None):
@@ -189,9 +218,9 @@ def getDRIZZLE(name=None):
     # the pathname to the input file
     # in AXE_DRIZZLE_PATH
     if name is None:
-        return __user_paths['AXE_DRIZZLE_PATH']
+        return _user_path('AXE_DRIZZLE_PATH')
     else:
-        return os.path.join(__user_paths['AXE_DRIZZLE_PATH'], name)
+        return os.path.join(_user_path('AXE_DRIZZLE_PATH'), name)
 
 
 def getDRZTMP(name=None):
@@ -204,9 +233,151 @@ def getDRZTMP(name=None):
     else:
         return os.path.join(__AXE_DRZTMP_LOC, name)
 
+class FitsHeaders:
+    """The headers of all extensions of a FITS file"""
+    def __init__(self, filename):
+        """
+        Parameters
+        ----------
+        filename: str
+            name of the FITS file
+        """
+        from astropy.io import fits
+
+        # read all headers, but no data
+        with fits.open(filename, 'readonly') as fits_image:
+            self.headers = [hdu.header for hdu in fits_image]
+
+        # map the extension names to
+        # the indices of the extensions
+        self.extmap = {}
+        for index, header in enumerate(self.headers):
+            if 'EXTNAME' in header:
+                self.extmap.setdefault(header['EXTNAME'], []).append(index)
+
+    def __len__(self):
+        return len(self.headers)
+
+    def __getitem__(self, index):
+        return self.headers[index]
+
+    @property
+    def primary(self):
+        """The primary header"""
+        return self.headers[0]
+
+
+# the headers of the FITS files read in this session, the
+# least recently used first, and the lock for the threads
+_header_cache = OrderedDict()
+_header_lock = threading.Lock()
+
+# the maximum number of files in the header cache
+HEADER_CACHE_SIZE = 256
+
+# files modified less than this before their headers were
+# read may change again within the same timestamp, their
+# headers are read again [ns]
+RACY_INTERVAL = 2 * 10**9
+
+
+def clear_header_cache():
+    """Forget all FITS headers read"""
+    with _header_lock:
+        _header_cache.clear()
+
+
+def get_headers(image):
+    """Return the headers of a FITS file.
+
+    The headers are read once per session and are read again
+    when the modification time, the change time, the inode or
+    the size of the file change. Headers read within two seconds
+    of the last change of the file are not reused, since a
+    rewrite with the same size may keep a coarse timestamp.
+    At most HEADER_CACHE_SIZE files are kept, the least recently
+    used are dropped. The headers returned must not be changed.
+
+    Parameters
+    ----------
+    image: str
+        name of the FITS file
+
+    Returns
+    -------
+    headers: FitsHeaders
+        the headers of all extensions
+    """
+    path = os.path.abspath(image)
+    fstat = os.stat(path)
+    signature = (fstat.st_mtime_ns, fstat.st_ctime_ns, fstat.st_ino,
+                 fstat.st_size)
+
+    with _header_lock:
+        cached = _header_cache.get(path)
+        if cached is not None:
+            _header_cache.move_to_end(path)
+    if (cached is not None and cached[0] == signature and
+            cached[1] - max(fstat.st_mtime_ns, fstat.st_ctime_ns)
+            >= RACY_INTERVAL):
+        return cached[2]
+
+    read_time = time.time_ns()
+    headers = FitsHeaders(path)
+    with _header_lock:
+        _header_cache[path] = (signature, read_time, headers)
+        _header_cache.move_to_end(path)
+        while len(_header_cache) > HEADER_CACHE_SIZE:
+            _header_cache.popitem(last=False)
+    return headers
+
+
+def read_headers(images, nworkers=None):
+    """Read the headers of several FITS files in parallel threads.
+
+    All files are read; if any of them does not exist or
+    can not be read, an error naming all of them is raised.
+
+    Parameters
+    ----------
+    images: list
+        names of the FITS files
+    nworkers: int
+        number of threads, None for a default
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    # each file is read only once
+    paths = sorted({os.path.abspath(image) for image in images})
+    if nworkers is None:
+        nworkers = min(8, os.cpu_count() or 1)
+
+    def _read(path):
+        try:
+            get_headers(path)
+        except (OSError, ValueError) as err:
+            return path, err
+        return None
+
+    if nworkers < 2 or len(paths) < 2:
+        failed = [_read(path) for path in paths]
+    else:
+        with ThreadPoolExecutor(max_workers=nworkers) as executor:
+            failed = list(executor.map(_read, paths))
+
+    failed = [one for one in failed if one is not None]
+    if failed:
+        err_msg = ("Can not read the FITS file(s): {0:s}"
+                   .format('; '.join('{0:s} ({1!s})'.format(path, err)
+                                     for path, err in failed)))
+        raise aXeError(err_msg) from failed[0][1]
+
+
 def get_ext_info(image, conf):
     """Determines the extension information on an image.
 
+    The headers are taken from ``get_headers()``.
+
     Parameters
     ----------
     conf: configfile.ConfigFile
@@ -226,63 +397,57 @@ def get_ext_info(image, conf):
     ext_info['fits_ext'] = None
     ext_info['ext_version'] = None
 
-    # open the image
-    with fits.open(image, 'readonly') as fits_image:
-
-        # check the keyword for string-like
-        if isinstance(conf.get_gvalue('SCIENCE_EXT'), str):
-            # set the extension name
-            ext_info['ext_name'] = conf.get_gvalue('SCIENCE_EXT')
+    # the headers of the image
+    headers = get_headers(image)
 
-            # check whether OPTKEY1 and OPTVAL1 are set
-            if ((conf.get_gvalue('OPTKEY1') is not None) and
-                    (conf.get_gvalue('OPTVAL1') is not None)):
+    # check the keyword for string-like
+    if isinstance(conf.get_gvalue('SCIENCE_EXT'), str):
+        # set the extension name
+        ext_info['ext_name'] = conf.get_gvalue('SCIENCE_EXT')
 
-                # store the key
-                optkey = conf.get_gvalue('OPTKEY1')
+        # check whether OPTKEY1 and OPTVAL1 are set
+        if ((conf.get_gvalue('OPTKEY1') is not None) and
+                (conf.get_gvalue('OPTVAL1') is not None)):
 
-                # store the value, convert
-                # CCDCHIP value to integer type
-                if optkey == 'CCDCHIP':
-                    optval = int(conf.get_gvalue('OPTVAL1'))
-                else:
-                    optval = conf.get_gvalue('OPTVAL1')
+            # store the key
+            optkey = conf.get_gvalue('OPTKEY1')
 
-                # go over all fits extensions
-                for index in range(len(fits_image)):
-                    # check whether the extension name fits
-                    if (('EXTNAME' in fits_image[index].header) and
-                        (fits_image[index].header['EXTNAME'] == ext_info['ext_name'])):
+            # store the value, convert
+            # CCDCHIP value to integer type
+            if optkey == 'CCDCHIP':
+                optval = int(conf.get_gvalue('OPTVAL1'))
+            else:
+                optval = conf.get_gvalue('OPTVAL1')
 
-                        # check whether OPTKEY1 and OPTKEYVAL1 fits
-                        if optkey in fits_image[index].header and fits_image[index].header[optkey] == optval:
+            # go over all fits extensions with the name
+            for index in headers.extmap.get(ext_info['ext_name'], []):
+                # check whether OPTKEY1 and OPTKEYVAL1 fits
+                if optkey in headers[index] and headers[index][optkey] == optval:
 
-                            # set the extension numbers
-                            ext_info['fits_ext'] = index
-                            ext_info['axe_ext'] = index + 1
-            else:
-                for index in range(len(fits_image)):
-                    if (('EXTNAME' in fits_image[index].header) and
-                        (fits_image[index].header['EXTNAME'] == ext_info['ext_name'])):
-                        ext_info['fits_ext'] = index
-                        ext_info['axe_ext']  = index + 1
+                    # set the extension numbers
+                    ext_info['fits_ext'] = index
+                    ext_info['axe_ext'] = index + 1
         else:
-            # set the axe extension number an axe extension number
-            ext_info['axe_ext'] = int(conf.get_gvalue('SCIENCE_EXT'))
-            ext_info['fits_ext'] = int(conf.get_gvalue('SCIENCE_EXT')) - 1
-
-            # get extension name, if possible
-            if 'EXTNAME' in fits_image[ext_info['fits_ext']].header:
-                ext_info['ext_name'] = fits_image[ext_info['fits_ext']].header['EXTNAME']
-
-        # check for success, complain and out if not
-        if ext_info['axe_ext'] is None:
-            err_msg = 'Unable to find the specified extensions in image %s!' % image
-            raise aXeError(err_msg)
-
-        # get extension version, if possible
-        if 'EXTVER' in fits_image[ext_info['fits_ext']].header:
-            ext_info['ext_version'] = fits_image[ext_info['fits_ext']].header['EXTVER']
+            for index in headers.extmap.get(ext_info['ext_name'], []):
+                ext_info['fits_ext'] = index
+                ext_info['axe_ext']  = index + 1
+    else:
+        # set the axe extension number an axe extension number
+        ext_info['axe_ext'] = int(conf.get_gvalue('SCIENCE_EXT'))
+        ext_info['fits_ext'] = int(conf.get_gvalue('SCIENCE_EXT')) - 1
+
+        # get extension name, if possible
+        if 'EXTNAME' in headers[ext_info['fits_ext']]:
+            ext_info['ext_name'] = headers[ext_info['fits_ext']]['EXTNAME']
+
+    # check for success, complain and out if not
+    if ext_info['axe_ext'] is None:
+        err_msg = 'Unable to find the specified extensions in image %s!' % image
+        raise aXeError(err_msg)
+
+    # get extension version, if possible
+    if 'EXTVER' in headers[ext_info['fits_ext']]:
+        ext_info['ext_version'] = headers[ext_info['fits_ext']]['EXTVER']
 
     # return the dictionary
     return ext_info
@@ -0,0 +1,151 @@
+"""
+LICENSE.txt
+
+"""
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# the sources of the aXe executables
+CEXTERN_SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           os.pardir, os.pardir, 'cextern', 'src')
+
+# the C test programs
+CSRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'csrc')
+
+# the defines of a configured build
+CEXTERN_DEFINES = ('HAVE_SYS_MMAN_H',)
+
+# a program which needs all headers and libraries
+PROBE = """#include "fitsio.h"
+#include "wcs.h"
+#include <gsl/gsl_vector.h>
+int main(void)
+{
+  gsl_vector *vec = gsl_vector_alloc(1);
+  gsl_vector_free(vec);
+  return 0;
+}
+"""
+
+
+def cextern_sources():
+    """the library sources of the aXe executables,
+    as listed in the 'suppl' variable of the Makefile"""
+    with open(os.path.join(CEXTERN_SRC, 'Makefile.am')) as makefile:
+        suppl = re.search(r'^suppl\s*=(.*?)^\s*$', makefile.read(),
+                          re.MULTILINE | re.DOTALL).group(1)
+    return [os.path.join(CEXTERN_SRC, name)
+            for name in re.findall(r'[\w.]+\.c', suppl)]
+
+
+class CExtern:
+    """Builds C test programs with the aXe library sources.
+
+    As in the installation, cfitsio, gsl and wcstools are taken
+    from the Python environment; further compiler and linker
+    flags are added from the CFLAGS and LDFLAGS variables.
+    """
+    def __init__(self, builddir):
+        self.builddir = builddir
+        self.cc = os.environ.get('CC', 'cc')
+        self.cflags = (['-O2', '-w', '-fopenmp',
+                        '-I' + os.path.join(sys.prefix, 'include'),
+                        '-I' + CEXTERN_SRC] +
+                       shlex.split(os.environ.get('CFLAGS', '')))
+        libdir = os.path.join(sys.prefix, 'lib')
+        self.ldflags = (['-fopenmp', '-L' + libdir,
+                         '-Wl,-rpath,' + libdir] +
+                        shlex.split(os.environ.get('LDFLAGS', '')) +
+                        ['-lwcs', '-lcfitsio', '-lgsl', '-lgslcblas',
+                         '-lpthread', '-lm'])
+        self.objects = {}
+
+    def _run(self, command):
+        """run the compiler and return its error output on failure"""
+        proc = subprocess.run(command, stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT,
+                              universal_newlines=True)
+        return proc.stdout if proc.returncode else None
+
+    def check(self):
+        """the reason why programs cannot be built, or None"""
+        if shutil.which(self.cc) is None:
+            return 'no C compiler {0:s}'.format(self.cc)
+        source = os.path.join(self.builddir, 'probe.c')
+        with open(source, 'w') as probe:
+            probe.write(PROBE)
+        error = self._run([self.cc] + self.cflags +
+                          [source, '-o', source[:-2]] + self.ldflags)
+        if error:
+            return ('cfitsio, gsl or wcstools are not available: ' +
+                    error.splitlines()[0])
+        return None
+
+    def compile(self, source, defines):
+        """compile a source file with a set of defines once"""
+        key = (source, defines)
+        if key not in self.objects:
+            name = os.path.splitext(os.path.basename(source))[0]
+            obj = os.path.join(self.builddir, '{0:s}_{1:s}.o'.format(
+                name, '_'.join(defines) or 'NONE'))
+            error = self._run([self.cc, '-c'] + self.cflags +
+                              ['-D' + define for define in defines] +
+                              [source, '-o', obj])
+            if error:
+                raise RuntimeError(error)
+            self.objects[key] = obj
+        return self.objects[key]
+
+    def build(self, program, defines=CEXTERN_DEFINES):
+        """build a test program from 'csrc' with the aXe library
+
+        Parameters
+        ----------
+        program: str
+            name of the test program, without '.c'
+        defines: tuple
+            the preprocessor symbols of the library build
+
+        Returns
+        -------
+        executable: str
+            the path of the program
+        """
+        sources = [os.path.join(CSRC, program + '.c')] + cextern_sources()
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            objects = list(executor.map(
+                lambda source: self.compile(source, tuple(defines)),
+                sources))
+        executable = os.path.join(self.builddir, '{0:s}_{1:s}'.format(
+            program, '_'.join(defines) or 'NONE'))
+        error = self._run([self.cc] + objects + ['-o', executable] +
+                          self.ldflags)
+        if error:
+            raise RuntimeError(error)
+        return executable
+
+    @staticmethod
+    def run(executable, *args):
+        """run a test program, returning the
+        completed process with its output"""
+        return subprocess.run([executable] + [str(arg) for arg in args],
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              universal_newlines=True)
+
+
+@pytest.fixture(scope='session')
+def cextern(tmp_path_factory):
+    """a builder for C test programs, skips
+    without compiler or C libraries"""
+    builder = CExtern(str(tmp_path_factory.mktemp('cextern')))
+    reason = builder.check()
+    if reason:
+        pytest.skip(reason)
+    return builder
@@ -0,0 +1,248 @@
+/*
+ * See LICENSE.txt
+ *
+ * Test program for the fringe model of aXe_FRIGEN. The fringe
+ * image of a synthetic CCD is computed row-wise with
+ * 'compute_fringe_amplitude()' on one and on several threads and
+ * compared with the former evaluation, pixel by pixel and wavelength
+ * by wavelength with 'fill_optprops_all()' and 'fringe_contrib_single()'.
+ * The maximal differences are printed; the return value is 1 if
+ * they exceed the tolerance.
+ */
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <math.h>
+#include "aXe_grism.h"
+#include "aXe_utils.h"
+#include "aXe_errors.h"
+#include <gsl/gsl_matrix.h>
+#include <gsl/gsl_vector.h>
+#include <gsl/gsl_complex.h>
+#include <gsl/gsl_complex_math.h>
+#include <gsl/gsl_interp.h>
+#include "fringe_conf.h"
+#include "fringe_model.h"
+
+#define MAX(x,y) (((x)>(y))?(x):(y))
+#define SQR(x) ((x)*(x))
+
+#define NROWS     13
+#define NCOLS     17
+#define NLAYERS   3
+#define NTHREADS  4
+#define TOLERANCE 1.0e-10
+
+/*
+ * Function: make_table
+ * Creates an interpolator for a smooth function, which goes
+ * from 'y0' at 'xmin' to 'y1' at 'xmax', with a ripple
+ * of the amplitude 'ripple' on top.
+ */
+static interpolator *
+make_table(const int nvals, const double xmin, const double xmax,
+	   const double y0, const double y1, const double ripple)
+{
+  double *xvals;
+  double *yvals;
+  double frac;
+  int index;
+
+  xvals = (double *)malloc(nvals * sizeof(double));
+  yvals = (double *)malloc(nvals * sizeof(double));
+  for (index=0; index < nvals; index++)
+    {
+      frac = (double)index / (double)(nvals-1);
+      xvals[index] = xmin + frac*(xmax - xmin);
+      yvals[index] = y0 + frac*(y1 - y0) + ripple*sin(7.0*frac);
+    }
+
+  return create_interp(nvals, gsl_interp_linear, xvals, yvals);
+}
+
+/*
+ * Function: make_layer
+ * Creates a CCD layer with the given refraction index at the
+ * short and long wavelength end; a mean thickness 'thick' with
+ * a 'ripple' > 0 gives a thickness image.
+ */
+static ccd_layer *
+make_layer(const double re0, const double re1, const double im0,
+	   const double im1, const double thick, const double ripple)
+{
+  ccd_layer *opt_layer;
+  int ii, jj;
+
+  opt_layer = (ccd_layer *)malloc(sizeof(ccd_layer));
+  opt_layer->re_refraction = make_table(50, 0.3, 1.3, re0, re1, 0.01);
+  opt_layer->im_refraction = make_table(50, 0.3, 1.3, im0, im1, 0.0);
+  opt_layer->thickness     = thick;
+  opt_layer->thickness2D   = NULL;
+
+  if (ripple > 0.0)
+    {
+      opt_layer->thickness2D = gsl_matrix_alloc(NROWS, NCOLS);
+      for (ii=0; ii < NROWS; ii++)
+	for (jj=0; jj < NCOLS; jj++)
+	  gsl_matrix_set(opt_layer->thickness2D, ii, jj,
+			 thick + ripple*sin(0.31*ii + 0.17*jj*jj/NCOLS));
+    }
+
+  return opt_layer;
+}
+
+/*
+ * Function: make_fringe_conf
+ * Creates the fringe configuration of a synthetic CCD
+ * with three layers.
+ */
+static fringe_conf *
+make_fringe_conf(void)
+{
+  fringe_conf *fconf;
+  interpolator *filter;
+  int index;
+  double frac;
+
+  fconf = (fringe_conf *)malloc(sizeof(fringe_conf));
+  fconf->fringe_amp     = 0.2;
+  fconf->fringe_phase   = 30.0;
+  fconf->fringe_step    = 5.0;
+  fconf->num_steps      = DEFAULT_NUM_STEPS;
+  fconf->max_dispersion = DEFAULT_MAX_DISPERSION;
+
+  fconf->fringe_range = gsl_vector_alloc(2);
+  gsl_vector_set(fconf->fringe_range, 0, 6000.0);
+  gsl_vector_set(fconf->fringe_range, 1, 10500.0);
+
+  // a filter curve vanishing at both ends
+  filter = make_table(61, 5000.0, 11000.0, 0.0, 0.0, 0.0);
+  for (index=0; index < filter->nvals; index++)
+    {
+      frac = (double)index / (double)(filter->nvals-1);
+      filter->yvals[index] = SQR(sin(M_PI*frac)) * (1.0 + 0.3*frac);
+    }
+  gsl_interp_init(filter->interp, filter->xvals, filter->yvals,
+		  filter->nvals);
+  fconf->filter_through = filter;
+
+  // the layers, with the lowest one of constant thickness
+  fconf->opt_layers = (ccd_layers *)malloc(sizeof(ccd_layers));
+  fconf->opt_layers->num_layers = NLAYERS;
+  fconf->opt_layers->opt_layer =
+    (ccd_layer **)malloc(NLAYERS * sizeof(ccd_layer *));
+  fconf->opt_layers->opt_layer[0] = make_layer(1.46, 1.45, 0.0, 0.0,
+					       0.8, 0.05);
+  fconf->opt_layers->opt_layer[1] = make_layer(2.05, 1.95, 1.0e-03, 5.0e-04,
+					       2.5, 0.3);
+  fconf->opt_layers->opt_layer[2] = make_layer(3.95, 3.60, 2.0e-02, 1.0e-03,
+					       12.0, 0.0);
+  fconf->opt_layers->substrate = make_table(50, 0.3, 1.3, 0.7, 0.4, 0.02);
+
+  return fconf;
+}
+
+/*
+ * Function: compute_fringe_single
+ * The former computation of the fringe image, pixel by
+ * pixel and wavelength by wavelength.
+ */
+static gsl_matrix *
+compute_fringe_single(fringe_conf *fconf)
+{
+  gsl_matrix *fringe_image;
+  gsl_vector **filter_vectors;
+  optical_property *optprops;
+  double lambda_mean;
+  double pixel_ampl;
+  int index, ii, jj;
+
+  fringe_image = alloc_fringe_image(fconf->opt_layers);
+  optprops = alloc_optprops_list(fconf);
+  filter_vectors = evaluate_wavelength_steps(fconf);
+
+  lambda_mean = gsl_vector_get(filter_vectors[0],filter_vectors[0]->size-1)/2.0
+    + gsl_vector_get(filter_vectors[0],0)/2.0;
+  init_optprops_list(fconf, lambda_mean, optprops);
+
+  for (ii=0; ii < (int)fringe_image->size1; ii++)
+    for (jj=0; jj < (int)fringe_image->size2; jj++)
+      {
+	fill_optprops_thickness(fconf->opt_layers, ii, jj, optprops);
+
+	pixel_ampl = 0.0;
+	for (index=0; index < (int)filter_vectors[0]->size; index++)
+	  {
+	    fill_optprops_all(fconf->opt_layers,
+			      gsl_vector_get(filter_vectors[0],index),
+			      optprops);
+	    pixel_ampl += gsl_vector_get(filter_vectors[1],index)*
+	      fringe_contrib_single(optprops, fconf);
+	  }
+	gsl_matrix_set(fringe_image, ii, jj,
+		       fconf->fringe_amp * pixel_ampl + 1.0);
+      }
+
+  gsl_vector_free(filter_vectors[0]);
+  gsl_vector_free(filter_vectors[1]);
+  free(filter_vectors);
+  free_optprops_list(optprops);
+
+  return fringe_image;
+}
+
+/*
+ * Function: max_difference
+ * The maximal absolute difference of two images.
+ */
+static double
+max_difference(const gsl_matrix *image1, const gsl_matrix *image2)
+{
+  double diff=0.0;
+  size_t ii, jj;
+
+  for (ii=0; ii < image1->size1; ii++)
+    for (jj=0; jj < image1->size2; jj++)
+      diff = MAX(diff, fabs(gsl_matrix_get(image1, ii, jj)
+			    - gsl_matrix_get(image2, ii, jj)));
+  return diff;
+}
+
+int
+main(void)
+{
+  fringe_conf *fconf;
+  gsl_matrix *single;
+  gsl_matrix *rows;
+  gsl_matrix *threads;
+  double diff_single;
+  double diff_threads;
+  double ampl=0.0;
+  size_t ii, jj;
+
+  fconf = make_fringe_conf();
+
+  single  = compute_fringe_single(fconf);
+  rows    = compute_fringe_amplitude(fconf, 1);
+  threads = compute_fringe_amplitude(fconf, NTHREADS);
+
+  // make sure there is a fringe pattern
+  for (ii=0; ii < single->size1; ii++)
+    for (jj=0; jj < single->size2; jj++)
+      ampl = MAX(ampl, fabs(gsl_matrix_get(single, ii, jj) - 1.0));
+
+  diff_single  = max_difference(single, rows);
+  diff_threads = max_difference(rows, threads);
+
+  fprintf(stdout, "size %zu %zu\n", single->size1, single->size2);
+  fprintf(stdout, "amplitude %.6e\n", ampl);
+  fprintf(stdout, "diff_single %.6e\n", diff_single);
+  fprintf(stdout, "diff_threads %.6e\n", diff_threads);
+
+  gsl_matrix_free(single);
+  gsl_matrix_free(rows);
+  gsl_matrix_free(threads);
+  free_fringe_conf(fconf);
+
+  return !(ampl > 0.0 && diff_single < TOLERANCE && diff_threads == 0.0);
+}
@@ -0,0 +1,133 @@
+/*
+ * See LICENSE.txt
+ *
+ * Test program for the Gaussian emission model. For random beams,
+ * orientations, pixel scales and pixels, the values of the emission
+ * model set up once per beam with 'init_gauss_emodel()' and evaluated
+ * with 'get_gauss_emodel_value()' are compared with the former
+ * 'get_sub_emodel_value()', which summed 'get_emodel_value()' over
+ * the sub-grid of every pixel, and with the present
+ * 'get_sub_emodel_value()'. The number of beams and of differing
+ * values is printed; the return value is 1 if any value differs.
+ */
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <math.h>
+#include <gsl/gsl_matrix.h>
+#include <gsl/gsl_vector.h>
+#include "aXe_grism.h"
+#include "model_utils.h"
+
+#define NBEAMS   200000
+#define NPIXELS  4
+
+/*
+ * Function: former_sub_emodel_value
+ * The emission value on the sub-grid of a pixel,
+ * as computed before the emission model was set up
+ * once per beam.
+ */
+static double
+former_sub_emodel_value(const d_point dpixel, const beam actbeam,
+                        const d_point drzscale)
+{
+  d_point dtmp;
+
+  double sval   = 0.0;
+  double step   = 0.0;
+  double offset = 0.0;
+
+  int irange = 0;
+  int kk=0, ll=0;
+
+  irange = (int)NSUB;
+  step = 1.0/(2.0*(double)NSUB);
+  offset = step/2.0;
+
+  for (kk=-irange; kk < irange; kk++)
+    {
+      for (ll=-irange; ll < irange; ll++)
+        {
+          dtmp.x = dpixel.x + (double)kk * step + offset;
+          dtmp.y = dpixel.y + (double)ll * step + offset;
+          sval = sval + get_emodel_value(dtmp, actbeam, drzscale);
+        }
+    }
+  sval = sval *step * step;
+
+  return sval;
+}
+
+/*
+ * Function: uniform
+ * A random number between 'low' and 'high'.
+ */
+static double
+uniform(const double low, const double high)
+{
+  return low + (high - low) * drand48();
+}
+
+int
+main(int argc, char *argv[])
+{
+  gauss_emodel emodel;
+  beam actbeam;
+  d_point drzscale;
+  d_point dpixel;
+
+  double value;
+  double former;
+  double present;
+  double max_value=0.0;
+
+  long nbeams=NBEAMS;
+  long ndiff=0;
+  long ibeam;
+  int ipix;
+
+  if (argc > 1)
+    nbeams = atol(argv[1]);
+  srand48(4711);
+
+  memset(&actbeam, 0, sizeof(beam));
+  for (ibeam=0; ibeam < nbeams; ibeam++)
+    {
+      // a random beam at a random scale
+      actbeam.refpoint.x = uniform(0.0, 1000.0);
+      actbeam.refpoint.y = uniform(0.0, 1000.0);
+      actbeam.awidth     = uniform(0.1, 10.0);
+      actbeam.bwidth     = uniform(0.1, 10.0);
+      actbeam.aorient    = uniform(-M_PI, M_PI);
+      drzscale.x         = uniform(0.5, 2.0);
+      drzscale.y         = uniform(0.5, 2.0);
+
+      init_gauss_emodel(actbeam, drzscale, &emodel);
+
+      for (ipix=0; ipix < NPIXELS; ipix++)
+        {
+          // a pixel around the reference point
+          dpixel.x = floor(actbeam.refpoint.x + uniform(-12.0, 12.0));
+          dpixel.y = floor(actbeam.refpoint.y + uniform(-12.0, 12.0));
+
+          value   = get_gauss_emodel_value(&emodel, dpixel);
+          former  = former_sub_emodel_value(dpixel, actbeam, drzscale);
+          present = get_sub_emodel_value(dpixel, actbeam, drzscale);
+
+          // the values must be bit-identical
+          if (memcmp(&value, &former, sizeof(double))
+              || memcmp(&value, &present, sizeof(double)))
+            ndiff++;
+          if (value > max_value)
+            max_value = value;
+        }
+    }
+
+  fprintf(stdout, "beams %li\n", nbeams);
+  fprintf(stdout, "values %li\n", nbeams * NPIXELS);
+  fprintf(stdout, "differences %li\n", ndiff);
+  fprintf(stdout, "max_value %.6e\n", max_value);
+
+  return ndiff > 0;
+}
@@ -0,0 +1,66 @@
+/*
+ * See LICENSE.txt
+ *
+ * Test program for the SExtractor catalog reader. The catalog given
+ * as first argument is opened with 'open_sex_catalog()', counted with
+ * 'size_of_sextractor_catalog()' and read with
+ * 'get_SexObject_from_catalog()' for the wavelength given as second
+ * argument. The column names, the number of rows and all objects
+ * are printed with full precision, one object per line.
+ */
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include "aXe_grism.h"
+#include "aXe_utils.h"
+#include "spc_sex.h"
+#include "spc_utils.h"
+#include "spc_CD.h"
+
+int
+main (int argc, char *argv[])
+{
+  sex_catalog *cat;
+  SexObject **sobjs;
+  int i, j;
+
+  if (argc < 3)
+    {
+      fprintf (stderr, "Usage: sex_catalog_check catalog lambda_mark\n");
+      return 1;
+    }
+
+  // the column description
+  cat = open_sex_catalog (argv[1]);
+  fprintf (stdout, "columns");
+  for (i=0; i < cat->actinfo->numcols; i++)
+    fprintf (stdout, " %i:%s", cat->actinfo->columns[i].number,
+             cat->actinfo->columns[i].name);
+  fprintf (stdout, "\n");
+  close_sex_catalog (cat);
+
+  fprintf (stdout, "rows %i\n", size_of_sextractor_catalog (argv[1]));
+
+  // the objects
+  sobjs = get_SexObject_from_catalog (argv[1], atof (argv[2]));
+  for (i=0; sobjs[i]; i++)
+    {
+      fprintf (stdout, "object %i %.17g %.17g %.17g %.17g %.17g %.17g %.17g"
+               " %.17g %.17g %.17g %.17g", sobjs[i]->number,
+               sobjs[i]->xy_image.x, sobjs[i]->xy_image.y,
+               sobjs[i]->xy_world.ra, sobjs[i]->xy_world.dec,
+               sobjs[i]->el_image.a, sobjs[i]->el_image.b,
+               sobjs[i]->el_image.theta, sobjs[i]->el_world.a,
+               sobjs[i]->el_world.b, sobjs[i]->el_world.theta,
+               sobjs[i]->mag_auto);
+      if (sobjs[i]->magnitudes)
+        for (j=0; j < (int)sobjs[i]->magnitudes->size; j++)
+          fprintf (stdout, " %.17g:%.17g",
+                   gsl_vector_get (sobjs[i]->lambdas, j),
+                   gsl_vector_get (sobjs[i]->magnitudes, j));
+      fprintf (stdout, "\n");
+    }
+  free_SexObjects (sobjs);
+
+  return 0;
+}
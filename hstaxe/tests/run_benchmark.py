@@ -0,0 +1,644 @@
+"""
+Benchmark the aXe extraction chain on synthetic data
+
+The script generates a self-contained data set of synthetic grism and
+direct frames, an aXe configuration file, a sensitivity table and
+SExtractor catalogs, at a scale given by the number of objects per
+frame, the frame size and the number of exposures. Then it runs the
+stages of the extraction chain one by one, times each of them and
+writes the results in JSON format, for example:
+
+    python run_benchmark.py --objects 200 --exposures 4 -o bench.json
+
+No real data is needed; the data set is made in a scratch directory
+which is deleted afterwards unless '--keep' is given. The frames are
+made directly with numpy rather than with the axesim tasks, which run
+aXe executables for every frame themselves.
+See LICENSE.txt
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import resource
+
+import numpy as np
+from astropy.io import fits
+from astropy.wcs import WCS
+
+
+# the stages which are timed, in the
+# order of the extraction chain
+STAGES = ['sex2gol', 'gol2af', 'af2pet', 'petcont', 'petff',
+          'pet2spc', 'stamps', 'drzprep', 'axecrr']
+
+# the stages which work on the whole
+# list instead of a single exposure
+LIST_STAGES = ['drzprep', 'axecrr']
+
+# the directories of an aXe run
+AXE_DIRS = {'AXE_IMAGE_PATH': 'DATA',
+            'AXE_OUTPUT_PATH': 'OUTPUT',
+            'AXE_CONFIG_PATH': 'CONF',
+            'AXE_DRIZZLE_PATH': 'DRIZZLE',
+            'AXE_SIMDATA_PATH': 'SIMDATA',
+            'AXE_OUTSIM_PATH': 'OUTSIM'}
+
+CONFIG_NAME = 'BENCH.G141.conf'
+SENS_NAME = 'BENCH.G141.sens.fits'
+
+CONFIG_TEMPLATE = """INSTRUMENT WFC3
+CAMERA IR
+TELAREA 45238.93
+SCIENCE_EXT SCI
+ERRORS_EXT ERR
+DQ_EXT DQ
+DQMASK 11775
+EXPTIME EXPTIME
+RDNOISE 20.0
+POBJSIZE 1.0
+SMFACTOR 1.0
+FFNAME None
+DRZRESOLA 46.5
+DRZSCALE 0.128254
+DRZLAMB0 7655.0
+DRZXINI 15.0
+DRZROOT aXeWFC3
+
+BEAMA {xstart:d} {xend:d}
+MMAG_EXTRACT_A 30
+MMAG_MARK_A 30
+DYDX_ORDER_A 1
+DYDX_A_0 {dydx0:.4f}
+DYDX_A_1 {dydx1:.6f}
+XOFF_A 0.0
+YOFF_A 0.0
+DISP_ORDER_A 1
+DLDP_A_0 {dldp0:.2f}
+DLDP_A_1 {dldp1:.4f}
+SENSITIVITY_A {sens:s}
+"""
+
+# the trace and dispersion of the synthetic grism
+TRACE = {'xstart': 15, 'xend': 196,
+         'dydx0': 1.5, 'dydx1': 0.01,
+         'dldp0': 8950.0, 'dldp1': 46.5}
+
+# pixel scale [deg] and pointing of the synthetic frames
+PIXSCALE = 0.128254 / 3600.0
+POINTING = (53.16, -27.78)
+
+# zero point, sky and exposure time of the frames
+MAG_ZERO = 26.0
+SKY_LEVEL = 1.0
+EXPTIME = 500.0
+
+# dither offsets in pixels of the exposures
+DITHERS = [(0.0, 0.0), (8.3, 3.7), (-4.1, 9.2), (5.6, -7.4)]
+
+
+def set_axe_dirs(workdir):
+    """Create the aXe directories and point the environment to them.
+
+    Parameters
+    ----------
+    workdir: str
+        the scratch directory of the benchmark
+    """
+    for name, subdir in AXE_DIRS.items():
+        path = os.path.join(workdir, subdir)
+        if not os.path.isdir(path):
+            os.mkdir(path)
+        os.environ[name] = path
+
+
+def write_sensitivity(filename):
+    """Write a smooth sensitivity table.
+
+    Parameters
+    ----------
+    filename: str
+        name of the sensitivity file
+    """
+    wave = np.arange(9500.0, 18500.0, 10.0)
+    sens = 1.0e17 * np.exp(-0.5 * ((wave - 14000.0) / 2200.0)**2)
+    cols = [fits.Column(name='WAVELENGTH', format='E', unit='ANGSTROM',
+                        array=wave),
+            fits.Column(name='SENSITIVITY', format='E',
+                        unit='e-/s per erg/cm^2/s/A', array=sens),
+            fits.Column(name='ERROR', format='E',
+                        unit='e-/s per erg/cm^2/s/A', array=0.01 * sens)]
+    hdul = fits.HDUList([fits.PrimaryHDU(),
+                         fits.BinTableHDU.from_columns(cols)])
+    hdul.writeto(filename, overwrite=True)
+
+
+def write_config(confdir):
+    """Write the aXe configuration file and its sensitivity table.
+
+    Parameters
+    ----------
+    confdir: str
+        the configuration directory
+
+    Returns
+    -------
+    conf_name: str
+        name of the configuration file
+    """
+    write_sensitivity(os.path.join(confdir, SENS_NAME))
+    with open(os.path.join(confdir, CONFIG_NAME), 'w') as conf:
+        conf.write(CONFIG_TEMPLATE.format(sens=SENS_NAME, **TRACE))
+    return CONFIG_NAME
+
+
+def make_scene(nobjects, nx, ny, rng):
+    """Draw the objects of the synthetic field.
+
+    The objects are placed such that their first order
+    spectra fall mostly onto the frame.
+
+    Parameters
+    ----------
+    nobjects: int
+        number of objects
+    nx: int
+        frame size in x
+    ny: int
+        frame size in y
+    rng: numpy.random.Generator
+        the random generator
+
+    Returns
+    -------
+    scene: dict
+        pixel positions, shapes and magnitudes of the objects
+    """
+    xmax = max(nx - TRACE['xend'], 20)
+    return {'x': rng.uniform(10.0, xmax, nobjects),
+            'y': rng.uniform(10.0, ny - 10.0, nobjects),
+            'a': rng.uniform(1.2, 3.0, nobjects),
+            'b': rng.uniform(0.8, 1.2, nobjects),
+            'theta': rng.uniform(-90.0, 90.0, nobjects),
+            'mag': rng.uniform(18.0, 23.5, nobjects)}
+
+
+def make_wcs(nx, ny, dither):
+    """Make the WCS of an exposure.
+
+    Parameters
+    ----------
+    nx: int
+        frame size in x
+    ny: int
+        frame size in y
+    dither: tuple
+        offset of the exposure in pixels
+
+    Returns
+    -------
+    wcs: astropy.wcs.WCS
+        the world coordinate system
+    """
+    wcs = WCS(naxis=2)
+    wcs.wcs.ctype = ['RA---TAN', 'DEC--TAN']
+    wcs.wcs.crval = list(POINTING)
+    wcs.wcs.crpix = [nx / 2.0 + dither[0], ny / 2.0 + dither[1]]
+    wcs.wcs.cd = [[-PIXSCALE, 0.0], [0.0, PIXSCALE]]
+    return wcs
+
+
+def add_objects(data, scene, offset, grism):
+    """Add the objects of a scene to an image.
+
+    In a direct image the objects are elliptical Gaussians;
+    in a grism image they are dispersed along the trace
+    of the synthetic configuration.
+
+    Parameters
+    ----------
+    data: numpy.ndarray
+        the image in counts/s
+    scene: dict
+        the objects
+    offset: tuple
+        pixel offset of the exposure
+    grism: bool
+        make a dispersed image
+    """
+    ny, nx = data.shape
+    for i in range(len(scene['x'])):
+        xc = scene['x'][i] + offset[0]
+        yc = scene['y'][i] + offset[1]
+        rate = 10.0**(-0.4 * (scene['mag'][i] - MAG_ZERO))
+        sigma = scene['a'][i] / 2.0
+        half = int(np.ceil(4.0 * sigma))
+
+        if grism:
+            # columns along the trace, with a Gaussian
+            # cross-dispersion profile in each of them
+            xpix = np.arange(int(xc) + TRACE['xstart'],
+                             int(xc) + TRACE['xend'] + 1)
+            xpix = xpix[(xpix >= 0) & (xpix < nx)]
+            if not len(xpix):
+                continue
+            ytrace = (yc + TRACE['dydx0']
+                      + TRACE['dydx1'] * (xpix - xc))
+            ypix = np.arange(-half, half + 1)[:, None] + np.rint(ytrace)
+            inside = (ypix >= 0) & (ypix < ny)
+            profile = np.exp(-0.5 * ((ypix - ytrace) / sigma)**2)
+            profile *= rate / profile.sum()
+            cols = np.broadcast_to(xpix, ypix.shape)
+            np.add.at(data, (ypix[inside].astype(int), cols[inside]),
+                      profile[inside])
+        else:
+            x0, x1 = max(int(xc) - half, 0), min(int(xc) + half + 1, nx)
+            y0, y1 = max(int(yc) - half, 0), min(int(yc) + half + 1, ny)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            yy, xx = np.mgrid[y0:y1, x0:x1]
+            stamp = np.exp(-0.5 * (((xx - xc) / sigma)**2
+                                   + ((yy - yc) / (sigma * scene['b'][i]))**2))
+            data[y0:y1, x0:x1] += rate * stamp / stamp.sum()
+
+
+def write_frame(filename, data, wcs, filtername, rng):
+    """Write a frame in the format of a WFC3 flt file.
+
+    Parameters
+    ----------
+    filename: str
+        name of the frame
+    data: numpy.ndarray
+        the noiseless image in counts/s
+    wcs: astropy.wcs.WCS
+        the world coordinate system
+    filtername: str
+        the filter name
+    rng: numpy.random.Generator
+        the random generator
+    """
+    counts = rng.poisson(np.clip(data, 0.0, None) * EXPTIME)
+    sci = (counts / EXPTIME).astype(np.float32)
+    err = (np.sqrt(counts + 20.0**2) / EXPTIME).astype(np.float32)
+
+    phdr = fits.Header()
+    phdr['INSTRUME'] = 'WFC3'
+    phdr['DETECTOR'] = 'IR'
+    phdr['FILTER'] = filtername
+    phdr['EXPTIME'] = EXPTIME
+    phdr['SUBARRAY'] = False
+
+    # the WCS with the CD matrix, which astropy writes as
+    # PC matrix and CDELT but the sex2gol WCS requires
+    hdr = wcs.to_header()
+    for (row, col), value in np.ndenumerate(wcs.wcs.cd):
+        hdr.remove('PC{0:d}_{1:d}'.format(row+1, col+1), ignore_missing=True)
+        hdr['CD{0:d}_{1:d}'.format(row+1, col+1)] = value
+    del hdr['CDELT1'], hdr['CDELT2']
+    hdr['EXPTIME'] = EXPTIME
+    hdul = fits.HDUList([fits.PrimaryHDU(header=phdr),
+                         fits.ImageHDU(sci, header=hdr, name='SCI', ver=1),
+                         fits.ImageHDU(err, header=hdr, name='ERR', ver=1),
+                         fits.ImageHDU(np.zeros(sci.shape, dtype=np.int16),
+                                       header=hdr, name='DQ', ver=1)])
+    hdul.writeto(filename, overwrite=True)
+
+
+def write_catalog(filename, scene, offset, wcs):
+    """Write the SExtractor catalog of a direct image.
+
+    Parameters
+    ----------
+    filename: str
+        name of the catalog
+    scene: dict
+        the objects
+    offset: tuple
+        pixel offset of the exposure
+    wcs: astropy.wcs.WCS
+        the world coordinate system of the direct image
+    """
+    columns = ['NUMBER', 'X_IMAGE', 'Y_IMAGE', 'X_WORLD', 'Y_WORLD',
+               'A_IMAGE', 'B_IMAGE', 'THETA_IMAGE', 'A_WORLD', 'B_WORLD',
+               'THETA_WORLD', 'MAG_F1400']
+
+    # SExtractor pixel coordinates start at 1
+    ximg = scene['x'] + offset[0] + 1.0
+    yimg = scene['y'] + offset[1] + 1.0
+    world = wcs.all_pix2world(ximg, yimg, 1)
+
+    with open(filename, 'w') as cat:
+        for index, name in enumerate(columns):
+            cat.write('# {0:3d} {1:s}\n'.format(index + 1, name))
+        for i in range(len(ximg)):
+            bimg = scene['a'][i] * scene['b'][i]
+            cat.write('{0:d} {1:.3f} {2:.3f} {3:.7f} {4:.7f} {5:.3f} {6:.3f} '
+                      '{7:.2f} {8:.4e} {9:.4e} {10:.2f} {11:.3f}\n'
+                      .format(i + 1, ximg[i], yimg[i], world[0][i],
+                              world[1][i], scene['a'][i], bimg,
+                              scene['theta'][i], scene['a'][i] * PIXSCALE,
+                              bimg * PIXSCALE, scene['theta'][i],
+                              scene['mag'][i]))
+
+
+def make_dataset(workdir, nobjects, nx, ny, nexposures, seed):
+    """Generate the synthetic data set.
+
+    Parameters
+    ----------
+    workdir: str
+        the scratch directory
+    nobjects: int
+        number of objects per frame
+    nx: int
+        frame size in x
+    ny: int
+        frame size in y
+    nexposures: int
+        number of exposures
+    seed: int
+        seed for the random generator
+
+    Returns
+    -------
+    dataset: dict
+        names of the configuration file, the input list and
+        the grism image, catalog and direct image of all exposures
+    """
+    rng = np.random.default_rng(seed)
+    set_axe_dirs(workdir)
+    datadir = os.environ['AXE_IMAGE_PATH']
+
+    conf_name = write_config(os.environ['AXE_CONFIG_PATH'])
+    scene = make_scene(nobjects, nx, ny, rng)
+
+    exposures = []
+    for index in range(nexposures):
+        dither = DITHERS[index % len(DITHERS)]
+        offset = (dither[0] + 2.0 * (index // len(DITHERS)),
+                  dither[1] + 2.0 * (index // len(DITHERS)))
+        wcs = make_wcs(nx, ny, offset)
+
+        grisim = 'bnch{0:03d}g_flt.fits'.format(index)
+        dirim = 'bnch{0:03d}d_flt.fits'.format(index)
+        objcat = 'bnch{0:03d}d_flt_1.cat'.format(index)
+
+        # the dispersed image
+        data = np.full((ny, nx), SKY_LEVEL)
+        add_objects(data, scene, offset, True)
+        write_frame(os.path.join(datadir, grisim), data, wcs, 'G141', rng)
+
+        # the direct image
+        data = np.full((ny, nx), SKY_LEVEL)
+        add_objects(data, scene, offset, False)
+        write_frame(os.path.join(datadir, dirim), data, wcs, 'F140W', rng)
+
+        write_catalog(os.path.join(datadir, objcat), scene, offset, wcs)
+        exposures.append({'grisim': grisim, 'objcat': objcat,
+                          'dirim': dirim})
+
+    inlist = os.path.join(workdir, 'aXe.lis')
+    with open(inlist, 'w') as lis:
+        for expo in exposures:
+            lis.write('{grisim:s} {objcat:s} {dirim:s}\n'.format(**expo))
+
+    return {'config': conf_name, 'inlist': inlist, 'exposures': exposures}
+
+
+def _cpu_times():
+    """Return the user+system time of the process and its children."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (own.ru_utime + own.ru_stime,
+            children.ru_utime + children.ru_stime)
+
+
+def time_stage(stage, exposure, func, **kwargs):
+    """Run a stage and time it.
+
+    Parameters
+    ----------
+    stage: str
+        name of the stage
+    exposure: str
+        name of the grism image or None for the list stages
+    func: callable
+        the task to run
+    kwargs: dict
+        the task parameters
+
+    Returns
+    -------
+    record: dict
+        timing and status of the stage
+    """
+    cpu0, child0 = _cpu_times()
+    start = time.perf_counter()
+    try:
+        func(**kwargs)
+        status, error = 'ok', None
+    except Exception as err:
+        status, error = 'error', '{0:s}: {1:s}'.format(type(err).__name__,
+                                                     str(err))
+    wall = time.perf_counter() - start
+    cpu1, child1 = _cpu_times()
+
+    return {'stage': stage,
+            'exposure': exposure,
+            'wall': wall,
+            'cpu': cpu1 - cpu0,
+            'cpu_children': child1 - child0,
+            'max_rss_children_kb': resource.getrusage(
+                resource.RUSAGE_CHILDREN).ru_maxrss,
+            'status': status,
+            'error': error}
+
+
+def run_chain(dataset, stages, repeat=0):
+    """Run and time the extraction chain on a data set.
+
+    Parameters
+    ----------
+    dataset: dict
+        the data set from make_dataset()
+    stages: list
+        the stages to run
+    repeat: int
+        index of the run, stored with the records
+
+    Returns
+    -------
+    records: list
+        the timing records of all stages
+    """
+    from hstaxe import config as config_util
+    from hstaxe import axetasks
+
+    # set up the aXe directories and the log before
+    # the first stage, such that it is not timed
+    config_util.axe_setup()
+
+    conf = dataset['config']
+    exposure_tasks = {
+        'sex2gol': lambda row: dict(
+            func=axetasks.sex2gol, grism=row['grisim'], config=conf,
+            in_sex=config_util.getDATA(row['objcat']), use_direct=True,
+            direct=config_util.getDATA(row['dirim']), silent=True),
+        'gol2af': lambda row: dict(
+            func=axetasks.gol2af, grism=row['grisim'], config=conf,
+            mfwhm=3.0, back=False, orient=True, slitless_geom=True),
+        'af2pet': lambda row: dict(
+            func=axetasks.af2pet, grism=row['grisim'], config=conf,
+            back=False),
+        'petcont': lambda row: dict(
+            func=axetasks.petcont, grism=row['grisim'], config=conf,
+            cont_model='gauss', cont_map=True),
+        'petff': lambda row: dict(
+            func=axetasks.petff, grism=row['grisim'], config=conf,
+            back=False),
+        'pet2spc': lambda row: dict(
+            func=axetasks.pet2spc, grism=row['grisim'], config=conf,
+            use_bpet=False, adj_sens=True, weights=False, do_flux=True),
+        'stamps': lambda row: dict(
+            func=axetasks.stamps, grism=row['grisim'], config=conf,
+            sampling='trace'),
+    }
+    list_tasks = {
+        'drzprep': dict(func=axetasks.drzprep, inlist=dataset['inlist'],
+                        configs=conf, back=False),
+        'axecrr': dict(func=axetasks.axecrr, inlist=dataset['inlist'],
+                       configs=conf, infwhm=3.0, outfwhm=2.0, back=False),
+    }
+
+    records = []
+    for stage in [one for one in STAGES if one in stages]:
+        if stage in LIST_STAGES:
+            records.append(time_stage(stage, None, **list_tasks[stage]))
+        else:
+            for row in dataset['exposures']:
+                records.append(time_stage(stage, row['grisim'],
+                                          **exposure_tasks[stage](row)))
+    for record in records:
+        record['run'] = repeat
+    return records
+
+
+def summarize(records):
+    """Sum up the timing records per stage.
+
+    Parameters
+    ----------
+    records: list
+        the timing records
+
+    Returns
+    -------
+    summary: dict
+        total wall and cpu time and the number of failures per stage
+    """
+    summary = {}
+    for record in records:
+        entry = summary.setdefault(record['stage'],
+                                   {'wall': 0.0, 'cpu': 0.0, 'calls': 0,
+                                    'errors': 0})
+        entry['wall'] += record['wall']
+        entry['cpu'] += record['cpu'] + record['cpu_children']
+        entry['calls'] += 1
+        entry['errors'] += record['status'] != 'ok'
+    return summary
+
+
+def main(argv=None):
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        description='Time the aXe extraction chain on synthetic data.')
+    parser.add_argument('--objects', type=int, default=50,
+                        help='number of objects per frame')
+    parser.add_argument('--nx', type=int, default=1014,
+                        help='frame size in x')
+    parser.add_argument('--ny', type=int, default=1014,
+                        help='frame size in y')
+    parser.add_argument('--exposures', type=int, default=2,
+                        help='number of exposures')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='number of runs of the chain')
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help='comma separated list of stages to time')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='seed of the random generator')
+    parser.add_argument('--workdir', default=None,
+                        help='scratch directory (default: a new temporary '
+                        'directory)')
+    parser.add_argument('--keep', action='store_true',
+                        help='keep the scratch directory')
+    parser.add_argument('-o', '--output', default='axebench.json',
+                        help='JSON file for the results')
+    args = parser.parse_args(argv)
+
+    stages = [stage.strip() for stage in args.stages.split(',')]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error('unknown stages: {0:s}'.format(', '.join(unknown)))
+
+    output = os.path.abspath(args.output)
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix='axebench'))
+    if not os.path.isdir(workdir):
+        os.makedirs(workdir)
+    cwd = os.getcwd()
+
+    try:
+        start = time.perf_counter()
+        dataset = make_dataset(workdir, args.objects, args.nx, args.ny,
+                               args.exposures, args.seed)
+        generation = time.perf_counter() - start
+
+        # the tasks write some files to
+        # the current directory
+        os.chdir(workdir)
+        records = []
+        for repeat in range(args.repeat):
+            records.extend(run_chain(dataset, stages, repeat))
+    finally:
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {'meta': {'objects': args.objects,
+                        'nx': args.nx,
+                        'ny': args.ny,
+                        'exposures': args.exposures,
+                        'repeat': args.repeat,
+                        'seed': args.seed,
+                        'generation': generation,
+                        'python': platform.python_version(),
+                        'numpy': np.__version__,
+                        'machine': platform.machine(),
+                        'node': platform.node(),
+                        'cpus': os.cpu_count(),
+                        'date': time.strftime('%Y-%m-%dT%H:%M:%S')},
+               'summary': summarize(records),
+               'records': records}
+
+    with open(output, 'w') as ofile:
+        json.dump(results, ofile, indent=1)
+
+    # give a short overview
+    print('\n{0:<10s}{1:>6s}{2:>12s}{3:>12s}{4:>8s}'
+          .format('stage', 'calls', 'wall [s]', 'cpu [s]', 'errors'))
+    for stage, entry in results['summary'].items():
+        print('{0:<10s}{1:>6d}{2:>12.3f}{3:>12.3f}{4:>8d}'
+              .format(stage, entry['calls'], entry['wall'], entry['cpu'],
+                      entry['errors']))
+    print('Results written to: {0:s}'.format(output))
+
+    # a failing stage makes the run fail
+    return int(any(record['status'] != 'ok' for record in records))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
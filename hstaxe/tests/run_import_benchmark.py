@@ -0,0 +1,205 @@
+"""
+Benchmark the import of the hstaxe package
+
+The script imports the package, and optionally the task module and
+single tasks, in fresh Python interpreters, as the short-lived worker
+processes of a reduction do. It times every import, collects the
+slowest modules from ``python -X importtime`` and checks that the
+import does not create any files, for example:
+
+    python run_import_benchmark.py --repeat 20 -o import.json
+
+The interpreters run in a scratch directory which is deleted
+afterwards.
+See LICENSE.txt
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+# the statements which are timed
+STATEMENTS = {'package': 'import hstaxe',
+              'axetasks': 'from hstaxe import axetasks',
+              'sex2gol': 'from hstaxe import axetasks; axetasks.pysex2gol',
+              'axecore': 'from hstaxe import axetasks; axetasks.axesingextr'}
+
+# the number of modules listed
+# in the import time profile
+NTOP = 15
+
+
+def time_statement(statement, workdir):
+    """Run a statement in a fresh interpreter and time it.
+
+    Parameters
+    ----------
+    statement: str
+        the Python statement
+    workdir: str
+        the directory to run the interpreter in
+
+    Returns
+    -------
+    record: dict
+        wall time, status, whether anything was printed
+        and the files created
+    """
+    before = set(os.listdir(workdir))
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-c', statement], cwd=workdir,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True)
+    wall = time.perf_counter() - start
+    created = sorted(set(os.listdir(workdir)) - before)
+
+    # clean up for the next run
+    for name in created:
+        path = os.path.join(workdir, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.unlink(path)
+
+    return {'wall': wall,
+            'status': 'ok' if proc.returncode == 0 else 'error',
+            'error': proc.stderr.strip().splitlines()[-1:] or None,
+            'printed': bool(proc.stdout.strip()),
+            'created': created}
+
+
+def import_profile(statement, workdir, ntop=NTOP):
+    """Return the slowest modules of a statement.
+
+    Parameters
+    ----------
+    statement: str
+        the Python statement
+    workdir: str
+        the directory to run the interpreter in
+    ntop: int
+        the number of modules to list
+
+    Returns
+    -------
+    profile: list
+        module name and cumulative import time in seconds
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                           statement], cwd=workdir, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, universal_newlines=True)
+
+    # lines are 'import time: self [us] | cumulative | imported package'
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        modules.append((fields[2].strip(), int(fields[1]) * 1.0e-6))
+
+    modules.sort(key=lambda module: module[1], reverse=True)
+    return [[name, cumulative] for name, cumulative in modules[:ntop]]
+
+
+def summarize(records):
+    """Sum up the timing records per statement.
+
+    Parameters
+    ----------
+    records: dict
+        the timing records per statement
+
+    Returns
+    -------
+    summary: dict
+        median, minimum and maximum wall time, the number of
+        failures and the files created per statement
+    """
+    summary = {}
+    for name, runs in records.items():
+        walls = [run['wall'] for run in runs]
+        summary[name] = {'median': statistics.median(walls),
+                         'min': min(walls),
+                         'max': max(walls),
+                         'errors': sum(run['status'] != 'ok' for run in runs),
+                         'created': sorted({fname for run in runs
+                                            for fname in run['created']})}
+    return summary
+
+
+def main(argv=None):
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        description='Time the import of hstaxe in fresh interpreters.')
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='number of interpreters per statement')
+    parser.add_argument('--statements', default=','.join(STATEMENTS),
+                        help='comma separated list of statements to time')
+    parser.add_argument('--no-profile', action='store_true',
+                        help='skip the import time profile')
+    parser.add_argument('-o', '--output', default='axeimport.json',
+                        help='JSON file for the results')
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.statements.split(',')]
+    unknown = [name for name in names if name not in STATEMENTS]
+    if unknown:
+        parser.error('unknown statements: {0:s}'.format(', '.join(unknown)))
+
+    output = os.path.abspath(args.output)
+    workdir = tempfile.mkdtemp(prefix='axeimport')
+
+    try:
+        # one warm-up run fills the
+        # bytecode and file system caches
+        records = {}
+        for name in names:
+            time_statement(STATEMENTS[name], workdir)
+            records[name] = [time_statement(STATEMENTS[name], workdir)
+                             for _ in range(args.repeat)]
+
+        profiles = {}
+        if not args.no_profile:
+            for name in names:
+                profiles[name] = import_profile(STATEMENTS[name], workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = summarize(records)
+    results = {'meta': {'repeat': args.repeat,
+                        'statements': {name: STATEMENTS[name]
+                                       for name in names},
+                        'python': platform.python_version(),
+                        'machine': platform.machine(),
+                        'node': platform.node(),
+                        'cpus': os.cpu_count(),
+                        'date': time.strftime('%Y-%m-%dT%H:%M:%S')},
+               'summary': summary,
+               'profiles': profiles,
+               'records': records}
+
+    with open(output, 'w') as ofile:
+        json.dump(results, ofile, indent=1)
+
+    # give a short overview
+    print('{0:<12s}{1:>11s}{2:>11s}{3:>11s}{4:>8s}  {5:s}'
+          .format('statement', 'median [s]', 'min [s]', 'max [s]', 'errors',
+                  'files created'))
+    for name, entry in summary.items():
+        print('{0:<12s}{1:>11.3f}{2:>11.3f}{3:>11.3f}{4:>8d}  {5:s}'
+              .format(name, entry['median'], entry['min'], entry['max'],
+                      entry['errors'], ', '.join(entry['created']) or '-'))
+    print('Results written to {0:s}'.format(output))
+
+
+if __name__ == '__main__':
+    main()
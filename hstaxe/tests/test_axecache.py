@@ -0,0 +1,123 @@
+"""
+LICENSE.txt
+
+"""
+import itertools
+import os
+import pytest
+
+from hstaxe.axesrc import axecache
+from hstaxe.axesrc import configfile
+
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    """an output directory with an input file of the stages"""
+    outdir = tmp_path / 'OUTPUT'
+    outdir.mkdir()
+    monkeypatch.setenv('AXE_OUTPUT_PATH', str(outdir))
+
+    # a clock for the LRU order
+    clock = itertools.count()
+    monkeypatch.setattr(axecache.time, 'time', lambda: float(next(clock)))
+
+    infile = tmp_path / 'input.txt'
+    infile.write_text('input')
+    yield outdir, infile
+
+
+class Stage:
+    """a stage writing its input and parameter to an output file"""
+    def __init__(self, outdir, infile):
+        self.outdir = outdir
+        self.infile = infile
+        self.calls = 0
+
+    def __call__(self, value=0, size=10):
+        self.calls += 1
+        outfile = self.outdir / 'out_{0:d}.txt'.format(value)
+        outfile.write_text(self.infile.read_text() + str(value) * size)
+
+    def run(self, cache_dir, max_size=None, **params):
+        with axecache.stage_cache(str(cache_dir), max_size) as cache:
+            axecache.run_stage('stage', self, files=[str(self.infile)],
+                               **params)
+        return cache
+
+
+def test_cache_hit(output_dir, tmp_path):
+    """test a stage with unchanged input is skipped"""
+    stage = Stage(*output_dir)
+    cache = stage.run(tmp_path / 'cache')
+    assert (cache.hits, cache.misses, stage.calls) == (0, 1, 1)
+
+    # the ignored parameters do not matter
+    cache = stage.run(tmp_path / 'cache', nthreads=4)
+    assert (cache.hits, cache.misses, stage.calls) == (1, 0, 1)
+
+
+def test_cache_miss_changed_input(output_dir, tmp_path):
+    """test a stage with a changed input file is run again"""
+    outdir, infile = output_dir
+    stage = Stage(outdir, infile)
+    stage.run(tmp_path / 'cache')
+
+    infile.write_text('changed input')
+    cache = stage.run(tmp_path / 'cache')
+    assert (cache.hits, cache.misses, stage.calls) == (0, 1, 2)
+    assert (outdir / 'out_0.txt').read_text().startswith('changed input')
+
+
+def test_cache_restore_output(output_dir, tmp_path):
+    """test a deleted output is restored from the store"""
+    outdir, infile = output_dir
+    stage = Stage(outdir, infile)
+    stage.run(tmp_path / 'cache')
+    content = (outdir / 'out_0.txt').read_text()
+
+    (outdir / 'out_0.txt').unlink()
+    cache = stage.run(tmp_path / 'cache')
+    assert (cache.hits, stage.calls) == (1, 1)
+    assert (outdir / 'out_0.txt').read_text() == content
+
+
+def test_cache_lru_eviction(output_dir, tmp_path):
+    """test the least recently used stage is evicted"""
+    stage = Stage(*output_dir)
+
+    # room for the outputs of two stages
+    max_size = 2 * len('input') + 2 * 100 + 10
+    for value in (1, 2, 1, 3):
+        stage.run(tmp_path / 'cache', max_size, value=value, size=100)
+    assert stage.calls == 3
+
+    # the second stage was evicted
+    cache = stage.run(tmp_path / 'cache', max_size, value=1, size=100)
+    assert (cache.hits, stage.calls) == (1, 3)
+    cache = stage.run(tmp_path / 'cache', max_size, value=2, size=100)
+    assert (cache.misses, stage.calls) == (1, 4)
+
+    # only the objects of two stages are stored
+    assert len(os.listdir(tmp_path / 'cache' / 'objects')) == 2
+
+
+@pytest.mark.parametrize('ffname, nfiles', [('None', 2), ('flat.fits', 3)])
+def test_input_files_flat_field(tmp_path, monkeypatch, ffname, nfiles):
+    """test a flat field is an input file only if one is given"""
+    pytest.importorskip('stwcs')
+    from hstaxe.axesrc import axesingextr
+
+    monkeypatch.setenv('AXE_CONFIG_PATH', str(tmp_path))
+    monkeypatch.setenv('AXE_IMAGE_PATH', str(tmp_path))
+    config = tmp_path / 'test.conf'
+    config.write_text("""SCIENCE_EXT SCI
+FFNAME {0:s}
+""".format(ffname))
+    configfile.clear_config_cache()
+
+    extractor = axesingextr.aXeSpcExtr('grism.fits', None, None,
+                                       'test.conf', None)
+    files = extractor._find_input_files(configfile.ConfigFile(str(config)))
+    assert len(files) == nfiles
+    assert (str(tmp_path / ffname) in files) == (ffname != 'None')
+    configfile.clear_config_cache()
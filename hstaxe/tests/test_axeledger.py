@@ -0,0 +1,149 @@
+"""
+LICENSE.txt
+
+"""
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from hstaxe.axeerror import aXeError
+from hstaxe.axesrc import axeledger
+from hstaxe.axesrc import axelowlev
+from hstaxe.axesrc import configfile
+
+CONFIG = """INSTRUMENT WFC3
+CAMERA IR
+SCIENCE_EXT SCI
+ERRORS_EXT ERR
+DQ_EXT DQ
+FFNAME None
+
+BEAMA 15 196
+MMAG_EXTRACT_A 30
+MMAG_MARK_A 30
+DYDX_ORDER_A 1
+DYDX_A_0 1.5
+DYDX_A_1 0.01
+XOFF_A 0.0
+YOFF_A 0.0
+DISP_ORDER_A 1
+DLDP_A_0 8950.0
+DLDP_A_1 46.5
+SENSITIVITY_A None
+"""
+
+# two objects, the first with two beams
+APERTURES = """APERTURE 1
+  BEAM A
+     REFPIXEL1A 10.000 10.000 \t;Aperture 1, BEAM A Reference Pixel.
+  BEAM B
+     REFPIXEL1B 10.000 10.000 \t;Aperture 1, BEAM B Reference Pixel.
+APERTURE 2
+  BEAM A
+     REFPIXEL2A 20.000 20.000 \t;Aperture 2, BEAM A Reference Pixel.
+"""
+
+
+@pytest.fixture
+def axe_dirs(tmp_path, monkeypatch):
+    """aXe directories with a configuration and a grism image"""
+    for name, subdir in (('AXE_IMAGE_PATH', 'DATA'),
+                         ('AXE_OUTPUT_PATH', 'OUTPUT'),
+                         ('AXE_CONFIG_PATH', 'CONF'),
+                         ('AXE_DRIZZLE_PATH', 'DRIZZLE')):
+        (tmp_path / subdir).mkdir()
+        monkeypatch.setenv(name, str(tmp_path / subdir))
+
+    (tmp_path / 'CONF' / 'test.conf').write_text(CONFIG)
+    fits.HDUList([fits.PrimaryHDU(),
+                  fits.ImageHDU(np.zeros((10, 10)), name='SCI')]
+                 ).writeto(tmp_path / 'DATA' / 'grism.fits')
+    configfile.clear_config_cache()
+    axelowlev.clear_aperture_cache()
+    yield tmp_path
+    configfile.clear_config_cache()
+    axelowlev.clear_aperture_cache()
+
+
+def run_recorded(task):
+    """Run a wrapper with a dummy executable in a ledger"""
+    task.command_list[0] = 'true'
+    with axeledger.run_ledger() as ledger:
+        assert task.run() == axelowlev.GOOD_RETURN_VALUE
+    return ledger.records[0]
+
+
+def test_count_beams(tmp_path):
+    """test counting the objects and beams of an aperture file"""
+    aperture_file = tmp_path / 'grism_2.OAF'
+    aperture_file.write_text(APERTURES)
+
+    assert axelowlev.count_beams(str(aperture_file)) == {'objects': 2,
+                                                         'beams': 3}
+
+
+def test_counts_default_oaf(axe_dirs):
+    """test the counts of a task reading the default OAF"""
+    (axe_dirs / 'OUTPUT' / 'grism_2.OAF').write_text(APERTURES)
+
+    record = run_recorded(axelowlev.aXe_AF2PET('grism.fits', 'test.conf'))
+    assert record['stage'] == 'af2pet'
+    assert record['counts'] == {'objects': 2, 'beams': 3}
+
+
+def test_counts_given_af(axe_dirs):
+    """test the counts of a task with an explicit aperture file"""
+    aperture_file = axe_dirs / 'OUTPUT' / 'special.OAF'
+    aperture_file.write_text(APERTURES)
+
+    record = run_recorded(axelowlev.aXe_PET2SPC('grism.fits', 'test.conf',
+                                                in_af=str(aperture_file)))
+    assert record['counts'] == {'objects': 2, 'beams': 3}
+
+
+def test_counts_missing_af(axe_dirs):
+    """test a task without aperture file records no counts"""
+    record = run_recorded(axelowlev.aXe_AF2PET('grism.fits', 'test.conf'))
+    assert record['counts'] == {}
+
+
+def test_counts_parse_once(axe_dirs, monkeypatch):
+    """test the default aperture file is derived once per image"""
+    (axe_dirs / 'OUTPUT' / 'grism_2.OAF').write_text(APERTURES)
+    run_recorded(axelowlev.aXe_AF2PET('grism.fits', 'test.conf'))
+
+    # the counts follow the file, without parsing the configuration
+    (axe_dirs / 'OUTPUT' / 'grism_2.OAF').write_text(APERTURES.split(
+        'APERTURE 2')[0])
+    monkeypatch.setattr(configfile, 'ConfigFile', None)
+    record = run_recorded(axelowlev.aXe_AF2PET('grism.fits', 'test.conf'))
+    assert record['counts'] == {'objects': 1, 'beams': 2}
+
+
+def test_block_io(axe_dirs):
+    """test the block I/O fields of the records and the summary"""
+    record = run_recorded(axelowlev.aXe_AF2PET('grism.fits', 'test.conf'))
+    assert record['block_read_bytes'] >= 0
+    assert record['block_write_bytes'] >= 0
+    assert record['block_read_bytes'] % axeledger.BLOCK_SIZE == 0
+
+
+@pytest.mark.parametrize('command, retcode', [('true', 0), ('false', 1)])
+def test_run_retcode(axe_dirs, command, retcode):
+    """test run returns the return code of the executable"""
+    task = axelowlev.aXe_AF2PET('grism.fits', 'test.conf')
+    task.command_list[0] = command
+    assert task.run() == retcode
+
+
+def test_runall(axe_dirs):
+    """test runall cleans up after a good run and raises after a bad one"""
+    task = axelowlev.aXe_AF2PET('grism.fits', 'test.conf')
+    task.command_list[0] = 'true'
+    task.runall()
+    assert not (axe_dirs / 'OUTPUT' / 'af2pet.stdout').exists()
+
+    task.command_list[0] = 'false'
+    with pytest.raises(aXeError, match='aXe_AF2PET'):
+        task.runall()
+    assert (axe_dirs / 'OUTPUT' / 'af2pet.stderr').exists()
@@ -0,0 +1,108 @@
+"""
+LICENSE.txt
+
+"""
+import os
+
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from hstaxe import config
+from hstaxe.axeerror import aXeError
+
+
+@pytest.fixture(autouse=True)
+def header_cache():
+    """an empty header cache"""
+    config.clear_header_cache()
+    yield
+    config.clear_header_cache()
+
+
+def make_image(filename, value):
+    """an image with a keyword value in the primary header"""
+    hdu = fits.PrimaryHDU(np.zeros((4, 4), dtype=np.float32))
+    hdu.header['VALUE'] = value
+    hdu.writeto(filename, overwrite=True)
+    return str(filename)
+
+
+def test_headers_cached(tmp_path, monkeypatch):
+    """test the headers of an unchanged file are read once"""
+    monkeypatch.setattr(config, 'RACY_INTERVAL', 0)
+    image = make_image(tmp_path / 'a.fits', 1)
+    headers = config.get_headers(image)
+    assert headers.primary['VALUE'] == 1
+    assert config.get_headers(image) is headers
+
+
+def test_headers_changed(tmp_path, monkeypatch):
+    """test the headers are read again after a change of the file"""
+    monkeypatch.setattr(config, 'RACY_INTERVAL', 0)
+    image = make_image(tmp_path / 'a.fits', 1)
+    fstat = os.stat(image)
+    assert config.get_headers(image).primary['VALUE'] == 1
+
+    # a rewrite with the same size and modification time
+    make_image(image, 2)
+    os.utime(image, ns=(fstat.st_atime_ns, fstat.st_mtime_ns))
+    assert os.stat(image).st_size == fstat.st_size
+    assert config.get_headers(image).primary['VALUE'] == 2
+
+    # a file of a different size
+    fits.append(image, np.zeros((2, 2), dtype=np.float32))
+    assert len(config.get_headers(image)) == 2
+
+
+def test_headers_racy(tmp_path, monkeypatch):
+    """test the headers of a just changed file are not reused"""
+    image = make_image(tmp_path / 'a.fits', 1)
+    headers = config.get_headers(image)
+    assert config.get_headers(image) is not headers
+
+    # the same headers as soon as the change is old enough
+    monkeypatch.setattr(config, 'RACY_INTERVAL', 0)
+    headers = config.get_headers(image)
+    assert config.get_headers(image) is headers
+
+
+def test_headers_lru(tmp_path, monkeypatch):
+    """test the least recently used headers are dropped"""
+    monkeypatch.setattr(config, 'RACY_INTERVAL', 0)
+    monkeypatch.setattr(config, 'HEADER_CACHE_SIZE', 2)
+    images = [make_image(tmp_path / '{0:d}.fits'.format(index), index)
+              for index in range(3)]
+    first = config.get_headers(images[0])
+    second = config.get_headers(images[1])
+    assert config.get_headers(images[0]) is first
+    config.get_headers(images[2])
+    assert config.get_headers(images[0]) is first
+    assert config.get_headers(images[1]) is not second
+
+
+@pytest.mark.parametrize('nworkers', [1, 4])
+def test_read_headers(tmp_path, monkeypatch, nworkers):
+    """test the headers of several files are read and cached"""
+    monkeypatch.setattr(config, 'RACY_INTERVAL', 0)
+    images = [make_image(tmp_path / '{0:d}.fits'.format(index), index)
+              for index in range(5)]
+    config.read_headers(images + images[:2], nworkers=nworkers)
+    cached = [config.get_headers(image) for image in images]
+    assert [headers.primary['VALUE'] for headers in cached] == list(range(5))
+    assert all(config.get_headers(image) is headers
+               for image, headers in zip(images, cached))
+
+
+@pytest.mark.parametrize('nworkers', [1, 4])
+def test_read_headers_errors(tmp_path, nworkers):
+    """test missing and corrupt files are reported at once"""
+    images = [make_image(tmp_path / 'good.fits', 1),
+              str(tmp_path / 'missing.fits'),
+              str(tmp_path / 'corrupt.fits')]
+    (tmp_path / 'corrupt.fits').write_bytes(b'no FITS file')
+    with pytest.raises(aXeError) as error:
+        config.read_headers(images, nworkers=nworkers)
+    assert 'missing.fits' in str(error.value)
+    assert 'corrupt.fits' in str(error.value)
+    assert 'good.fits' not in str(error.value)
@@ -0,0 +1,162 @@
+"""
+LICENSE.txt
+
+"""
+import os
+import pytest
+
+from hstaxe.axesrc import configfile
+
+CONFIG = """# test configuration
+INSTRUMENT WFC3
+CAMERA IR
+SCIENCE_EXT SCI
+ERRORS_EXT ERR
+DQ_EXT DQ
+FFNAME None
+
+BEAMA 15 196
+MMAG_EXTRACT_A 30
+MMAG_MARK_A 30
+DYDX_ORDER_A 1
+DYDX_A_0 1.5
+DYDX_A_1 0.01
+XOFF_A 0.0
+YOFF_A 0.0
+DISP_ORDER_A 1
+DLDP_A_0 8950.0
+DLDP_A_1 46.5
+SENSITIVITY_A None
+"""
+
+
+@pytest.fixture
+def config_name(tmp_path):
+    """a configuration file and an empty config cache"""
+    configfile.clear_config_cache()
+    filename = tmp_path / 'test.conf'
+    filename.write_text(CONFIG)
+    yield str(filename)
+    configfile.clear_config_cache()
+
+
+def keylist(*keywords):
+    """a keyword list with dummy values"""
+    return [configfile.ConfKey(keyword, str(index))
+            for index, keyword in enumerate(keywords)]
+
+
+class Owner:
+    """holder of a keyword list and its index"""
+    pass
+
+
+def test_lookup_index():
+    """test the first and last occurrence of a keyword"""
+    owner = Owner()
+    keys = keylist('A', 'B', 'A', 'C')
+
+    assert configfile._lookup_index(owner, keys, 'A') == 0
+    assert configfile._lookup_index(owner, keys, 'A', last=True) == 2
+    assert configfile._lookup_index(owner, keys, 'C') == 3
+    assert configfile._lookup_index(owner, keys, 'D') == -1
+
+
+def test_lookup_index_changed_list():
+    """test the index follows changes of the keyword list"""
+    owner = Owner()
+    keys = keylist('A', 'B', 'C')
+    assert configfile._lookup_index(owner, keys, 'C') == 2
+
+    # a removed keyword
+    del keys[0]
+    assert configfile._lookup_index(owner, keys, 'C') == 1
+    assert configfile._lookup_index(owner, keys, 'A') == -1
+
+    # an added keyword
+    keys.append(configfile.ConfKey('D', '1'))
+    assert configfile._lookup_index(owner, keys, 'D') == 2
+
+    # a replaced entry of the same length
+    keys[0] = configfile.ConfKey('E', '1')
+    assert configfile._lookup_index(owner, keys, 'E') == 0
+    assert configfile._lookup_index(owner, keys, 'B') == -1
+
+    # a different list
+    assert configfile._lookup_index(owner, keylist('C', 'B'), 'B') == 1
+
+
+def test_config_cache_hit(config_name):
+    """test a file is parsed once"""
+    conf = configfile.ConfigFile(config_name)
+    entry = configfile._config_cache[os.path.abspath(config_name)]
+
+    other = configfile.ConfigFile(config_name)
+    assert configfile._config_cache[os.path.abspath(config_name)] is entry
+    assert other['INSTRUMENT'] == 'WFC3'
+    assert str(other) == str(conf)
+
+    # the instances do not share their keywords
+    other.gkeys[other._find_gkey('INSTRUMENT')].keyvalue = 'ACS'
+    assert conf['INSTRUMENT'] == 'WFC3'
+    assert configfile.ConfigFile(config_name)['INSTRUMENT'] == 'WFC3'
+
+
+def test_config_cache_changed_file(config_name):
+    """test a changed file is parsed again"""
+    assert configfile.ConfigFile(config_name)['CAMERA'] == 'IR'
+
+    # a new size
+    with open(config_name, 'w') as conf_file:
+        conf_file.write(CONFIG.replace('CAMERA IR', 'CAMERA UVIS'))
+    assert configfile.ConfigFile(config_name)['CAMERA'] == 'UVIS'
+
+    # the same size and a new modification time
+    with open(config_name, 'w') as conf_file:
+        conf_file.write(CONFIG.replace('CAMERA IR', 'CAMERA XX'))
+    stat = os.stat(config_name)
+    os.utime(config_name, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert configfile.ConfigFile(config_name)['CAMERA'] == 'XX'
+
+
+def test_config_cache_writeto(config_name):
+    """test writing a configuration file drops its cache entry"""
+    conf = configfile.ConfigFile(config_name)
+    conf.gkeys[conf._find_gkey('CAMERA')].keyvalue = 'UVIS'
+    conf.writeto(config_name)
+
+    assert os.path.abspath(config_name) not in configfile._config_cache
+    assert configfile.ConfigFile(config_name)['CAMERA'] == 'UVIS'
+
+
+def test_polynomials_parsed_on_use(config_name):
+    """test the trace and dispersion of a beam"""
+    beam = configfile.ConfigFile(config_name).beams['A']
+
+    assert beam._trace is None and beam._disp is None
+    assert beam.trace[1].kvallist == [0.01]
+    assert beam.disp[0].kvallist == [8950.0]
+
+
+@pytest.mark.parametrize('old, new, error', [
+    ('DYDX_A_1 0.01\n', '', configfile.TraceNotFound),
+    ('DYDX_ORDER_A 1\n', '', configfile.TraceNotFound),
+    ('DLDP_A_1 46.5\n', '', configfile.DispNotFound),
+    ('DLDP_A_1 46.5\n', 'DLDP_A_1 46.5 0.1\n', configfile.DispNotFound),
+])
+def test_polynomials_checked_on_load(config_name, old, new, error):
+    """test a missing or wrong coefficient fails when loading"""
+    with open(config_name, 'w') as conf_file:
+        conf_file.write(CONFIG.replace(old, new))
+
+    with pytest.raises(error):
+        configfile.ConfigFile(config_name)
+
+
+def test_dld1p_dispersion(config_name):
+    """test the dispersion given with DLD1P keywords"""
+    with open(config_name, 'w') as conf_file:
+        conf_file.write(CONFIG.replace('DLDP_', 'DLD1P_'))
+
+    beam = configfile.ConfigFile(config_name).beams['A']
+    assert beam.disp[1].kvallist == [46.5]
@@ -0,0 +1,160 @@
+"""
+LICENSE.txt
+
+"""
+import os
+import numpy as np
+import pytest
+from astropy.io import fits
+
+pytest.importorskip('drizzle')
+from hstaxe.axesrc.drizzleobjects import DrizzleObject, DrizzleResult
+
+
+def test_combine_partial_coverage():
+    """test pixels a contributor does not cover are not clipped"""
+    # one contributor covers the first pixel,
+    # eleven contributors cover only the second one
+    ncontrib = 12
+    tmps = np.zeros((ncontrib, 3, 1, 2), np.float32)
+    wtmps = np.zeros_like(tmps)
+    tmps[0, :, 0, 0] = [10.0, 1.0, 0.5]
+    wtmps[0, :, 0, 0] = 1.0
+    tmps[1:, :, 0, 1] = [4.0, 2.0, 0.0]
+    wtmps[1:, :, 0, 1] = 1.0
+
+    combined, whts, whts_sum = DrizzleObject._combine_contribs(tmps, wtmps)
+    assert whts[0, 0, 0] == 1.0
+    assert whts_sum.tolist() == [[1.0, 11.0]]
+    np.testing.assert_allclose(combined[:, 0, 0], [10.0, 1.0, 0.5])
+    np.testing.assert_allclose(combined[:, 0, 1], [4.0, 2.0, 0.0])
+
+
+def test_combine_outlier():
+    """test an outlier is clipped and the empty pixels stay zero"""
+    ncontrib = 12
+    tmps = np.ones((ncontrib, 3, 1, 2), np.float32)
+    wtmps = np.ones_like(tmps)
+    tmps[:, 0, 0, 0] += np.linspace(-0.01, 0.01, ncontrib)
+    tmps[5, 0, 0, 0] = 100.0
+    tmps[:, :, 0, 1] = 0.0
+    wtmps[:, :, 0, 1] = 0.0
+
+    combined, whts, whts_sum = DrizzleObject._combine_contribs(tmps, wtmps)
+    assert whts[5, 0, 0] == 0.0
+    assert whts_sum.tolist() == [[11.0, 0.0]]
+    assert combined[0, 0, 0] == pytest.approx(1.0, abs=0.01)
+    assert combined[:, 0, 1].tolist() == [0.0, 0.0, 0.0]
+
+
+def make_result(opt_extr=False):
+    """a drizzle result of a 3x4 object"""
+    header = fits.Header()
+    for keyword, value in (('CDSCALE', 0.13), ('REFPNTY', 5.0),
+                           ('DLAMBDA', 46.5), ('LAMBDA0', 8950.0),
+                           ('XOFFS', 10.0)):
+        header[keyword] = value
+    shape = (3, 4)
+    planes = {'FLT': np.arange(12, dtype=np.float32).reshape(shape),
+              'ERR': np.full(shape, 4.0, np.float32),
+              'CON': np.full(shape, 1.4, np.float32),
+              'WHT': np.full(shape, 2.0, np.float32)}
+    planes['WHT'][0, 0] = 0.0
+    if opt_extr:
+        planes['MOD'] = np.full(shape, 3.0, np.float32)
+        planes['VAR'] = np.full(shape, 0.5, np.float32)
+        planes['VAR'][1, 1] = 0.0
+    return DrizzleResult(header, planes)
+
+
+def make_object(tmp_path, opt_extr=False, debug=False):
+    """a drizzle object with a drizzle result"""
+    drz_object = DrizzleObject.__new__(DrizzleObject)
+    drz_object.objID = 'ID7'
+    drz_object.opt_extr = opt_extr
+    drz_object.debug = debug
+    drz_object.cont_info = ('GEOMETRIC', False)
+    drz_object.ncontrib = 0
+    drz_object.contrib_list = []
+    drz_object.drzimg_info = {'OUTNY': 3}
+    drz_object.objID_dir = str(tmp_path / 'ID7')
+    drz_object.ext_names = {layer: str(tmp_path / 'aXe_ID7.{0:s}.fits'
+                                       .format(layer))
+                            for layer in ('FLT', 'ERR', 'CON', 'WHT', 'MOD',
+                                          'VAR', 'MEF', 'MED')}
+    drz_object.result = make_result(opt_extr)
+    return drz_object
+
+
+def test_result_layer_header():
+    """test only the FLT, ERR and CON layers get the header"""
+    result = make_result()
+    for layer in ('FLT', 'ERR', 'CON'):
+        header = result.layer_header(layer)
+        assert header['LAMBDA0'] == 8950.0
+        header['LAMBDA0'] = 0.0
+        assert result.header['LAMBDA0'] == 8950.0
+    assert len(result.layer_header('WHT')) == 0
+
+
+def test_result_writeto(tmp_path):
+    """test the layers are written to single images"""
+    result = make_result(opt_extr=True)
+    ext_names = {layer: str(tmp_path / '{0:s}.fits'.format(layer))
+                 for layer in result.planes}
+    result.writeto(ext_names)
+
+    for layer, data in result.planes.items():
+        image_data, header = fits.getdata(ext_names[layer], header=True)
+        assert np.array_equal(image_data, data)
+        assert ('LAMBDA0' in header) == (layer in ('FLT', 'ERR', 'CON'))
+
+
+@pytest.mark.parametrize('opt_extr', [False, True])
+def test_make_mef(tmp_path, opt_extr):
+    """test the MEF is composed from the converted layers"""
+    drz_object = make_object(tmp_path, opt_extr)
+    result = drz_object.result
+    flt, wht = result['FLT'].copy(), result['WHT'].copy()
+    assert drz_object.make_mef() == 'aXe_ID7.MEF.fits'
+    assert drz_object.result is None
+
+    with fits.open(drz_object.ext_names['MEF']) as mef:
+        assert [hdu.name for hdu in mef[1:]] == \
+            ['SCI', 'ERR', 'EXPT', 'CON'] + (['MOD', 'VAR'] if opt_extr
+                                             else [])
+        assert mef[0].header['NUM_DRIZ'] == 0
+        assert mef[0].header['CONTAM'] == 'GEOMETRIC'
+        assert np.array_equal(mef['SCI'].data, flt)
+        assert np.array_equal(mef['EXPT'].data, wht)
+
+        # sqrt(ERR)/WHT, zero without weight
+        expected = np.full((3, 4), 1.0, np.float32)
+        expected[0, 0] = 0.0
+        assert np.array_equal(mef['ERR'].data, expected)
+        assert (mef['CON'].data == 1.0).all()
+        if opt_extr:
+            expected = np.full((3, 4), 2.0, np.float32)
+            expected[1, 1] = 0.0
+            assert np.array_equal(mef['VAR'].data, expected)
+
+        # the WCS of the spectra
+        for hdu in mef[1:]:
+            assert hdu.header['CRVAL1'] == 8950.0
+            assert hdu.header['CDELT2'] == 0.13
+            assert hdu.header['CRPIX2'] == 2.5
+        assert mef['SCI'].header['REFPNTY'] == 5.0
+        assert 'REFPNTY' not in mef['EXPT'].header
+
+
+@pytest.mark.parametrize('debug', [False, True])
+def test_delete_files_debug(tmp_path, debug):
+    """test the single layers are kept in debug mode"""
+    drz_object = make_object(tmp_path, debug=debug)
+    drz_object.result.writeto(drz_object.ext_names)
+    drz_object.make_mef()
+    drz_object.delete_files()
+
+    assert os.path.isfile(drz_object.ext_names['MEF'])
+    for layer in ('FLT', 'ERR', 'CON', 'WHT'):
+        assert os.path.isfile(drz_object.ext_names[layer]) == debug
@@ -0,0 +1,101 @@
+"""
+LICENSE.txt
+
+"""
+import os
+import shutil
+
+import numpy as np
+import pytest
+from astropy.io import fits
+
+import run_benchmark
+
+# the aXe executables of the chain up to the DPPs
+EXECUTABLES = ('aXe_SEX2GOL', 'aXe_GOL2AF', 'aXe_AF2PET', 'aXe_DRZPREP')
+
+# the header keywords which differ between runs
+VOLATILE_KEYS = ('DATE', 'CHECKSUM', 'DATASUM')
+
+# the drizzle coefficients of a mild distortion,
+# for the terms 1, x, y, x^2, xy and y^2
+DRZ_XCOEFFS = (0.5, 1.0, 2.0e-3, 1.0e-5, -2.0e-6, 3.0e-6)
+DRZ_YCOEFFS = (-0.3, -1.5e-3, 1.0, 2.0e-6, 4.0e-6, -1.0e-5)
+
+pytestmark = pytest.mark.skipif(
+    not all(shutil.which(name) for name in EXECUTABLES),
+    reason='the aXe executables are not installed')
+
+
+def add_drizzle_keywords(filename):
+    """store the drizzle coefficients in the primary header,
+    as aXe does for images with a distortion solution"""
+    with fits.open(filename, mode='update') as hdus:
+        header = hdus[0].header
+        header['DRZCNUM'] = len(DRZ_XCOEFFS)
+        for index, (xcoeff, ycoeff) in enumerate(zip(DRZ_XCOEFFS,
+                                                     DRZ_YCOEFFS)):
+            header['DRZ1X{0:02d}'.format(index + 1)] = xcoeff
+            header['DRZ1Y{0:02d}'.format(index + 1)] = ycoeff
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    """the PETs of a synthetic data set with three exposures"""
+    for name, subdir in run_benchmark.AXE_DIRS.items():
+        monkeypatch.setenv(name, str(tmp_path / subdir))
+    monkeypatch.chdir(tmp_path)
+
+    dataset = run_benchmark.make_dataset(str(tmp_path), 20, 200, 200, 3, 1)
+    # the relative default of the temporary drizzle directory,
+    # which is checked if the session set up aXe without it
+    (tmp_path / 'DRIZZLE' / 'tmp').mkdir()
+    records = run_benchmark.run_chain(dataset,
+                                      ['sex2gol', 'gol2af', 'af2pet'])
+    assert [record['status'] for record in records] == ['ok'] * 9, records
+
+    for expo in dataset['exposures']:
+        add_drizzle_keywords(os.path.join(os.environ['AXE_IMAGE_PATH'],
+                                          expo['grisim']))
+    return dataset
+
+
+def run_drzprep(dataset, nthreads, savedir):
+    """run drzprep and move the DPPs aside"""
+    from hstaxe import axetasks
+
+    axetasks.drzprep(dataset['inlist'], configs=dataset['config'],
+                     back=False, nthreads=nthreads)
+
+    os.mkdir(savedir)
+    dpps = []
+    for expo in dataset['exposures']:
+        name = expo['grisim'].replace('.fits', '_2.DPP.fits')
+        shutil.move(os.path.join(os.environ['AXE_OUTPUT_PATH'], name),
+                    os.path.join(savedir, name))
+        dpps.append(os.path.join(savedir, name))
+    return dpps
+
+
+def test_drzprep_threads(tmp_path, dataset):
+    """test the DPPs on one and on several threads are identical"""
+    single = run_drzprep(dataset, 1, str(tmp_path / 'single'))
+    threads = run_drzprep(dataset, 3, str(tmp_path / 'threads'))
+
+    for one, other in zip(single, threads):
+        with fits.open(one) as hdus1, fits.open(other) as hdus2:
+            assert len(hdus1) > 1
+            assert ([hdu.name for hdu in hdus1] ==
+                    [hdu.name for hdu in hdus2])
+            for hdu1, hdu2 in zip(hdus1, hdus2):
+                # compare the card images, some
+                # values are not valid FITS numbers
+                assert ([card.image for card in hdu1.header.cards
+                         if card.keyword not in VOLATILE_KEYS] ==
+                        [card.image for card in hdu2.header.cards
+                         if card.keyword not in VOLATILE_KEYS])
+                if hdu1.data is None:
+                    assert hdu2.data is None
+                else:
+                    assert np.array_equal(hdu1.data, hdu2.data,
+                                          equal_nan=True)
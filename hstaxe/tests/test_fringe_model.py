@@ -0,0 +1,16 @@
+"""
+LICENSE.txt
+
+"""
+
+
+def test_fringe_rows(cextern):
+    """test the fringe amplitudes computed row-wise on one and on
+    several threads agree with the pixel-wise fringe_contrib_single"""
+    proc = cextern.run(cextern.build('fringe_model_check'))
+    values = dict(line.split(None, 1) for line in proc.stdout.splitlines())
+    assert values['size'] == '13 17'
+    assert float(values['amplitude']) > 0.0
+    assert float(values['diff_single']) < 1.0e-10
+    assert float(values['diff_threads']) == 0.0
+    assert proc.returncode == 0, proc.stderr
@@ -0,0 +1,16 @@
+"""
+LICENSE.txt
+
+"""
+
+
+def test_gauss_emodel(cextern):
+    """test the emission model set up once per beam gives the values
+    of the former sub-grid sum for 200000 random beams"""
+    proc = cextern.run(cextern.build('gauss_emodel_check'), 200000)
+    values = dict(line.split(None, 1) for line in proc.stdout.splitlines())
+    assert values['beams'] == '200000'
+    assert values['values'] == '800000'
+    assert values['differences'] == '0'
+    assert float(values['max_value']) > 0.0
+    assert proc.returncode == 0, proc.stderr
@@ -0,0 +1,180 @@
+"""
+LICENSE.txt
+
+"""
+import numpy as np
+import pytest
+
+from hstaxe.axeerror import aXeSIMError
+from hstaxe.axesim.interpolator import Interpolator
+
+
+class ScalarInterpolator:
+    """the scalar implementation of the interpolator before NumPy"""
+    def __init__(self, indep, depen):
+        self._indep_data = [float(value) for value in indep]
+        self._depen_data = [float(value) for value in depen]
+        self.ind_min = self._indep_data[0]
+        self.ind_max = self._indep_data[-1]
+        self.accelerator = 0
+
+    def __len__(self):
+        return len(self._depen_data)
+
+    def __getitem__(self, value):
+        index = self._get_indep_index(value)
+        factor = ((value - self._indep_data[index-1]) /
+                  (self._indep_data[index] - self._indep_data[index-1]))
+        return (self._depen_data[index-1] + factor *
+                (self._depen_data[index] - self._depen_data[index-1]))
+
+    def _get_indep_index(self, value):
+        if value > self._indep_data[self.accelerator]:
+            self.accelerator += 1
+            while value > self._indep_data[self.accelerator]:
+                self.accelerator += 1
+        else:
+            while value < self._indep_data[self.accelerator-1]:
+                self.accelerator -= 1
+        return self.accelerator
+
+    def _common_indep(self, in_object):
+        ind_min = max(self.ind_min, in_object.ind_min)
+        ind_max = min(self.ind_max, in_object.ind_max)
+        indep = sorted(set(self._indep_data + in_object._indep_data))
+        return [value for value in indep if ind_min <= value <= ind_max]
+
+    def __mul__(self, in_object):
+        indep = self._common_indep(in_object)
+        depen = [self[item] * in_object[item] for item in indep]
+        return ScalarInterpolator(indep, depen)
+
+    def __truediv__(self, in_object):
+        indep = self._common_indep(in_object)
+        depen = [self[item] / in_object[item] for item in indep]
+        return ScalarInterpolator(indep, depen)
+
+    def integrate(self):
+        integral = 0.0
+        for index in range(1, len(self)-1):
+            integral += self._depen_data[index] * (self._indep_data[index+1] -
+                                                   self._indep_data[index-1])
+        integral += self._depen_data[0] * (self._indep_data[1] -
+                                           self._indep_data[0])
+        integral += self._depen_data[-1] * (self._indep_data[-1] -
+                                            self._indep_data[-2])
+        return integral / 2.0
+
+
+# a throughput and a spectrum on different grids
+INDEP_1 = [3000.0, 3150.0, 3420.0, 3700.0, 4010.0, 4500.0, 5100.0]
+DEPEN_1 = [0.013, 0.21, 0.337, 0.41, 0.29, 0.105, 0.007]
+INDEP_2 = [2900.0, 3250.0, 3420.0, 3810.0, 4300.0, 4700.0]
+DEPEN_2 = [1.7e-17, 2.3e-17, 2.05e-17, 3.1e-17, 2.6e-17, 1.1e-17]
+
+
+@pytest.fixture
+def interpolators():
+    """the new and the scalar version of both curves"""
+    return (Interpolator(indep=INDEP_1, depen=DEPEN_1),
+            Interpolator(indep=INDEP_2, depen=DEPEN_2),
+            ScalarInterpolator(INDEP_1, DEPEN_1),
+            ScalarInterpolator(INDEP_2, DEPEN_2))
+
+
+def test_getitem_between_grid_points(interpolators):
+    """test values between the grid points are unchanged to rounding"""
+    new, _, old, _ = interpolators
+    values = np.random.default_rng(1).uniform(INDEP_1[0], INDEP_1[-1], 200)
+    values = values[~np.isin(values, INDEP_1)]
+
+    expected = [old[value] for value in values]
+    np.testing.assert_allclose([new[value] for value in values], expected,
+                               rtol=1e-14, atol=0.0)
+    assert new[values].tolist() == [new[value] for value in values]
+
+
+def test_getitem_at_grid_points(interpolators):
+    """test the values at the grid points
+
+    The scalar search took the interval above or below a grid point
+    depending on the previous lookups, the binary search always takes
+    the interval below, so the values agree to rounding only.
+    """
+    new, _, old, _ = interpolators
+
+    # lookups from below and from above
+    for values in (INDEP_1, INDEP_1[::-1]):
+        expected = [old[value] for value in values]
+        np.testing.assert_allclose(new[np.array(values)], expected,
+                                   rtol=1e-15, atol=0.0)
+    np.testing.assert_allclose(new[np.array(INDEP_1)], DEPEN_1,
+                               rtol=1e-15, atol=0.0)
+
+
+def test_getitem_outside(interpolators):
+    """test values outside the covered range"""
+    new = interpolators[0]
+    with pytest.raises(aXeSIMError):
+        new[INDEP_1[0] - 1.0]
+    with pytest.raises(aXeSIMError):
+        new[np.array([INDEP_1[0], INDEP_1[-1] + 1.0])]
+    with pytest.raises(aXeSIMError):
+        new[np.nan]
+
+
+@pytest.mark.parametrize('operation', ['__mul__', '__truediv__'])
+def test_product_and_ratio(interpolators, operation):
+    """test products and ratios of two interpolators"""
+    new_1, new_2, old_1, old_2 = interpolators
+    new = getattr(new_1, operation)(new_2)
+    old = getattr(old_1, operation)(old_2)
+
+    assert new._indep_data.tolist() == old._indep_data
+    np.testing.assert_allclose(new._depen_data, old._depen_data,
+                               rtol=1e-14, atol=0.0)
+    assert (new.ind_min, new.ind_max) == (3000.0, 4700.0)
+
+
+def test_ratio_zero_divisor(interpolators):
+    """test a zero in the divisor"""
+    new_1 = interpolators[0]
+    zero = Interpolator(indep=INDEP_2, depen=[1.0, 1.0, 0.0, 1.0, 1.0, 1.0])
+    with pytest.raises(aXeSIMError):
+        new_1 / zero
+
+
+def test_integrate(interpolators):
+    """test the integral over the grid points"""
+    new_1, new_2, old_1, old_2 = interpolators
+    for new, old in ((new_1, old_1), (new_2, old_2),
+                     (new_1 * new_2, old_1 * old_2)):
+        assert new.integrate() == pytest.approx(old.integrate(), rel=1e-14)
+
+
+def test_ascii_file(interpolators, tmp_path):
+    """test writing and reading an ASCII file"""
+    filename = str(tmp_path / 'curve.dat')
+    interpolators[0].writeto(filename)
+
+    new = Interpolator(input_file=filename)
+    assert new._indep_data.tolist() == INDEP_1
+    assert new._depen_data.tolist() == DEPEN_1
+
+
+def test_ascii_file_check(tmp_path):
+    """test the checks of an ASCII file"""
+    filename = tmp_path / 'curve.dat'
+
+    # integer columns and comments are fine
+    filename.write_text('# wavelength throughput\n3000 1\n4000 2\n')
+    new = Interpolator(input_file=str(filename))
+    assert new[3500.0] == 1.5
+
+    filename.write_text('3000 1\n2000 2\n')
+    with pytest.raises(aXeSIMError):
+        Interpolator(input_file=str(filename))
+
+    filename.write_text('3000 a\n4000 b\n')
+    with pytest.raises(aXeSIMError):
+        Interpolator(input_file=str(filename))
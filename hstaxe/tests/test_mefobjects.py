@@ -0,0 +1,241 @@
+"""
+LICENSE.txt
+
+"""
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from hstaxe.axeerror import aXeError
+from hstaxe.axesrc import axelowlev
+from hstaxe.axesrc import mefobjects
+
+
+@pytest.mark.parametrize('filename, index, expected', [
+    ('aXe_2.SPC.fits', 1, 'aXe_2_s1.SPC.fits'),
+    ('/data/out/aXe_2.SPC.fits', 0, '/data/out/aXe_2_s0.SPC.fits'),
+    ('/data.dir/olist', 3, '/data.dir/olist_s3'),
+])
+def test_shard_name(filename, index, expected):
+    """test the shard index goes before the first dot of the name"""
+    assert mefobjects.shard_name(filename, index) == expected
+
+
+def make_fits(filename, values):
+    """a FITS file with one extension per value"""
+    hdus = fits.HDUList([fits.PrimaryHDU()])
+    hdus[0].header['ORIGIN'] = filename.name
+    for value in values:
+        hdus.append(fits.ImageHDU(np.full((2, 3), value, np.float32),
+                                  name='BEAM_{0:d}A'.format(value)))
+    hdus.writeto(filename)
+    return str(filename)
+
+
+def test_merge_fits(tmp_path):
+    """test the extensions of the shards are concatenated"""
+    filenames = [make_fits(tmp_path / 'a_s0.fits', [1, 2]),
+                 make_fits(tmp_path / 'a_s1.fits', [3]),
+                 make_fits(tmp_path / 'a_s2.fits', [])]
+    outname = str(tmp_path / 'a.fits')
+    mefobjects.merge_fits(filenames, outname)
+
+    with fits.open(outname) as merged:
+        assert merged[0].header['ORIGIN'] == 'a_s0.fits'
+        assert merged[0].header['EXTEND']
+        assert [hdu.name for hdu in merged[1:]] == \
+            ['BEAM_1A', 'BEAM_2A', 'BEAM_3A']
+        assert [hdu.data[0, 0] for hdu in merged[1:]] == [1.0, 2.0, 3.0]
+
+
+def test_merge_fits_missing(tmp_path):
+    """test a missing shard raises an error"""
+    filenames = [make_fits(tmp_path / 'a_s0.fits', [1]),
+                 str(tmp_path / 'a_s1.fits')]
+    outname = str(tmp_path / 'a.fits')
+    with pytest.raises(aXeError, match='a_s1.fits'):
+        mefobjects.merge_fits(filenames, outname)
+    assert not (tmp_path / 'a.fits').exists()
+
+
+class Task:
+    """an aXe task with a given return value"""
+    def __init__(self, tshort, retval):
+        self.tshort = tshort
+        self.taskname = 'aXe_' + tshort
+        self.retval = retval
+
+    def run(self):
+        return self.retval
+
+    def cleanup(self):
+        pass
+
+
+class ObjectList(list):
+    """a drizzle object list without objects"""
+    def make_OAF_file(self, infwhm, outfwhm, filename):
+        pass
+
+
+def test_extract_failed_task(tmp_path, monkeypatch):
+    """test a failed task raises an error naming its stderr file"""
+    monkeypatch.setenv('AXE_OUTPUT_PATH', str(tmp_path))
+    extractor = mefobjects.MEFExtractor.__new__(mefobjects.MEFExtractor)
+    extractor.obj_dol = ObjectList()
+    extractor.ext_names = {'DRZ_OAF': str(tmp_path / 'aXe.OAF')}
+    extractor.opt_extr = False
+
+    def chain_tasks(names, opt_extr, sampling, adj_sens, shard=None):
+        return (Task('DRZ2PET', axelowlev.GOOD_RETURN_VALUE),
+                Task('PET2SPC', 1),
+                Task('STAMPS', axelowlev.GOOD_RETURN_VALUE))
+    monkeypatch.setattr(extractor, '_chain_tasks', chain_tasks)
+
+    with pytest.raises(aXeError) as error:
+        extractor.extract(1.0, 1.0, False, nworkers=2)
+    assert str(tmp_path / 'mefextract_obj_PET2SPC.stderr') in str(error.value)
+    assert 'STAMPS' not in str(error.value)
+
+
+@pytest.mark.parametrize('nworkers', [None, 2])
+def test_extract_failed_task_serial(tmp_path, monkeypatch, nworkers):
+    """test a failed task raises the same error with and without workers"""
+    monkeypatch.setenv('AXE_OUTPUT_PATH', str(tmp_path))
+    extractor = mefobjects.MEFExtractor.__new__(mefobjects.MEFExtractor)
+    extractor.obj_dol = ObjectList()
+    extractor.ext_names = {'DRZ_OAF': str(tmp_path / 'aXe.OAF')}
+    extractor.opt_extr = False
+
+    tasks = (Task('DRZ2PET', 1),
+             Task('PET2SPC', axelowlev.GOOD_RETURN_VALUE),
+             Task('STAMPS', axelowlev.GOOD_RETURN_VALUE))
+    monkeypatch.setattr(extractor, '_chain_tasks',
+                        lambda *args, **kwargs: tasks)
+
+    with pytest.raises(aXeError, match='1 aXe task') as error:
+        extractor.extract(1.0, 1.0, False, nworkers=nworkers)
+    assert str(tmp_path / 'mefextract_obj_DRZ2PET.stderr') in str(error.value)
+
+
+def make_stamp(filename, seed):
+    """a drizzled MEF of an object or its background"""
+    rng = np.random.default_rng(seed)
+    hdus = fits.HDUList([fits.PrimaryHDU()])
+    for extname in ['SCI', 'WHT', 'ERR', 'CON']:
+        data = rng.normal(10.0, 5.0, (15, 40)).astype(np.float32)
+        hdus.append(fits.ImageHDU(data, name=extname))
+    hdus['ERR'].data = np.abs(hdus['ERR'].data) * 1.0e-3
+    hdus.writeto(filename)
+    return str(filename)
+
+
+def subtract_copied(obj_img, bck_img):
+    """the background subtraction on copies of the data"""
+    with fits.open(bck_img) as bck_fits, \
+            fits.open(obj_img, 'update') as obj_fits:
+        bck_sci = fits.ImageHDU(data=bck_fits['SCI'].data,
+                                header=bck_fits['SCI'].header,
+                                name='SCIBCK')
+        bck_err = fits.ImageHDU(data=bck_fits['ERR'].data,
+                                header=bck_fits['ERR'].header,
+                                name='ERRBCK')
+        obj_fits['SCI'].data = obj_fits['SCI'].data - bck_sci.data
+        obj_fits['ERR'].data = np.sqrt(obj_fits['ERR'].data *
+                                       obj_fits['ERR'].data +
+                                       bck_err.data * bck_err.data)
+        obj_fits['SCI'].header['SCIBCK'] = 'DONE'
+        obj_fits['SCI'].header['ERRBCK'] = 'DONE'
+        obj_fits.append(bck_sci)
+        obj_fits.append(bck_err)
+
+
+def copied_data(filename, extname):
+    """the data of an extension"""
+    with fits.open(filename) as image:
+        return image[extname].data.copy()
+
+
+def test_subtract_stamp_background(tmp_path):
+    """test the in place subtraction gives the results of the copies"""
+    bck_img = make_stamp(tmp_path / 'bck.fits', 2)
+    expected = make_stamp(tmp_path / 'copied.fits', 1)
+    subtract_copied(expected, bck_img)
+    obj_img = make_stamp(tmp_path / 'obj.fits', 1)
+    mefobjects._subtract_stamp_background(obj_img, bck_img)
+
+    with fits.open(obj_img) as result, fits.open(expected) as copied:
+        assert [hdu.name for hdu in result] == [hdu.name for hdu in copied]
+        for extname in ['SCI', 'WHT', 'CON', 'SCIBCK', 'ERRBCK']:
+            assert result[extname].data.dtype.type is np.float32
+            assert np.array_equal(result[extname].data,
+                                  copied[extname].data)
+        assert result['ERR'].data.dtype.type is np.float32
+        np.testing.assert_array_max_ulp(result['ERR'].data,
+                                        copied['ERR'].data, maxulp=1)
+        assert result['SCI'].header['SCIBCK'] == 'DONE'
+        assert result['SCI'].header['ERRBCK'] == 'DONE'
+        assert 'background and background error' in \
+            str(result['SCI'].header['HISTORY'])
+
+    # the background is not changed
+    with fits.open(bck_img) as bck_fits:
+        assert [hdu.name for hdu in bck_fits] == \
+            ['PRIMARY', 'SCI', 'WHT', 'ERR', 'CON']
+        assert np.array_equal(bck_fits['SCI'].data,
+                              copied_data(expected, 'SCIBCK'))
+
+
+class DrizzleObject:
+    """a drizzled object with its MEF"""
+    def __init__(self, objID, mef):
+        self.objID = objID
+        self.ext_names = {'MEF': mef}
+
+
+class DrizzleList(list):
+    """a drizzle object list which keeps its files"""
+    def delete_files(self):
+        pass
+
+
+@pytest.mark.parametrize('nworkers', [None, 3])
+def test_subtract_background(tmp_path, nworkers):
+    """test the stamps of all objects are processed alike with threads"""
+    extractor = mefobjects.MEFExtractor.__new__(mefobjects.MEFExtractor)
+    extractor.obj_dol = DrizzleList()
+    extractor.bck_dol = DrizzleList()
+    expected = []
+    for index in range(5):
+        obj_img = make_stamp(tmp_path / 'obj_{0:d}.fits'.format(index), index)
+        bck_img = make_stamp(tmp_path / 'bck_{0:d}.fits'.format(index),
+                             index + 10)
+        extractor.obj_dol.append(DrizzleObject(str(index), obj_img))
+        extractor.bck_dol.append(DrizzleObject(str(index), bck_img))
+        expected.append(make_stamp(tmp_path / 'exp_{0:d}.fits'.format(index),
+                                   index))
+        subtract_copied(expected[-1], bck_img)
+    extractor._subtract_background(nworkers)
+
+    for obj, filename in zip(extractor.obj_dol, expected):
+        assert np.array_equal(copied_data(obj.ext_names['MEF'], 'SCI'),
+                              copied_data(filename, 'SCI'))
+        np.testing.assert_array_max_ulp(
+            copied_data(obj.ext_names['MEF'], 'ERR'),
+            copied_data(filename, 'ERR'), maxulp=1)
+
+
+def test_subtract_background_ids(tmp_path):
+    """test no stamp is changed if the IDs do not match"""
+    extractor = mefobjects.MEFExtractor.__new__(mefobjects.MEFExtractor)
+    extractor.obj_dol = DrizzleList([
+        DrizzleObject('1', make_stamp(tmp_path / 'obj_1.fits', 1)),
+        DrizzleObject('2', make_stamp(tmp_path / 'obj_2.fits', 2))])
+    extractor.bck_dol = DrizzleList([
+        DrizzleObject('1', make_stamp(tmp_path / 'bck_1.fits', 3)),
+        DrizzleObject('3', make_stamp(tmp_path / 'bck_3.fits', 4))])
+    with pytest.raises(aXeError, match='not identical'):
+        extractor._subtract_background(2)
+    with fits.open(str(tmp_path / 'obj_1.fits')) as image:
+        assert len(image) == 5
+        assert 'SCIBCK' not in image['SCI'].header
@@ -0,0 +1,71 @@
+"""
+LICENSE.txt
+
+"""
+import numpy as np
+from astropy.io import fits
+from astropy.wcs import WCS
+
+from hstaxe.axesim import imagemaker
+from hstaxe.axesim import modspeclist
+from hstaxe.axesrc import axeiol
+
+CONFIG = """INSTRUMENT WFC3
+CAMERA IR
+SCIENCE_EXT SCI
+FFNAME None
+"""
+
+CATALOG = """# 1 NUMBER
+# 2 X_IMAGE
+# 3 Y_IMAGE
+# 4 A_IMAGE
+# 5 B_IMAGE
+# 6 THETA_IMAGE
+# 7 MAG_F1400W
+1 100.0 120.0 2.0 1.5 30.0 20.0
+2 150.0 60.0 3.0 2.0 -20.0 21.0
+"""
+
+
+def test_dummy_images(tmp_path):
+    """test the dummy images with the WCS of the configuration"""
+    (tmp_path / 'test.conf').write_text(CONFIG)
+    i_maker = imagemaker.DummyImages(str(tmp_path / 'test.conf'),
+                                     griname=str(tmp_path / 'grism.fits'),
+                                     nx=40, ny=50)
+    i_maker.makeImages()
+    with fits.open(str(tmp_path / 'grism.fits')) as image:
+        assert image[0].header['EXPTIME'] == 1.0
+        assert image['SCI'].data.shape == (50, 40)
+        assert not image['SCI'].data.any()
+        assert WCS(image['SCI'].header).has_celestial
+
+    i_maker.deleteImages()
+    assert not (tmp_path / 'grism.fits').exists()
+
+
+def test_fill_columns(tmp_path):
+    """test the world coordinates of a model object table"""
+    (tmp_path / 'test.conf').write_text(CONFIG)
+    (tmp_path / 'objects.cat').write_text(CATALOG)
+    i_maker = imagemaker.DummyImages(str(tmp_path / 'test.conf'),
+                                     griname=str(tmp_path / 'grism.fits'),
+                                     nx=200, ny=200)
+    i_maker.makeImages()
+
+    inobjects = modspeclist.ModelObjectTable(str(tmp_path / 'objects.cat'))
+    assert (inobjects.nrows, inobjects.ncols) == (2, 7)
+    assert inobjects.magwave == 1400.0
+    assert inobjects.reqColIndex['MAGNITUDE'] == 6
+    inobjects.fill_columns(i_maker.WCSimage, i_maker.WCSext)
+
+    # the filled catalog is a valid input object list
+    iol = axeiol.InputObjectList(str(tmp_path / 'objects.cat'))
+    wcs = WCS(fits.getheader(str(tmp_path / 'grism.fits'), 'SCI'))
+    ra, dec = wcs.all_pix2world(iol.catalog['X_IMAGE'],
+                                iol.catalog['Y_IMAGE'], 1)
+    assert np.allclose(iol.catalog['X_WORLD'], ra)
+    assert np.allclose(iol.catalog['Y_WORLD'], dec)
+    assert list(iol.catalog['A_WORLD']) == [2.0, 3.0]
+    assert list(iol.catalog['THETA_WORLD']) == [30.0, -20.0]
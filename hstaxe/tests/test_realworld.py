@@ -0,0 +1,85 @@
+"""
+LICENSE.txt
+
+"""
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from hstaxe.axesim.realworld import RealWorld
+
+EXPTIME = 100.0
+RDNOISE = 5.0
+
+
+def make_image(filename):
+    """a simulated image in [e/s] with faint and bright pixels"""
+    data = np.linspace(0.0, 3.0, 400, dtype=np.float32).reshape(20, 20)
+    data[5, 5] = -0.5
+    fits.PrimaryHDU(data).writeto(filename)
+    return str(filename)
+
+
+def make_real(tmp_path, name, seed, **params):
+    """the SCI and ERR layers of a noisy image"""
+    image_name = make_image(tmp_path / name)
+    RealWorld(image_name, exptime=EXPTIME, bck_flux=0.1, rdnoise=RDNOISE,
+              seed=seed, **params).make_real()
+    with fits.open(image_name) as image:
+        assert image[0].header['EXPTIME'] == EXPTIME
+        assert not image['DQ'].data.any()
+        return image['SCI'].data, image['ERR'].data
+
+
+@pytest.mark.parametrize('poisson', [False, True])
+def test_same_seed(tmp_path, poisson):
+    """test the same seed gives the same image"""
+    sci_1, err_1 = make_real(tmp_path, 'a.fits', 42, poisson=poisson)
+    sci_2, err_2 = make_real(tmp_path, 'b.fits', 42, poisson=poisson)
+    assert np.array_equal(sci_1, sci_2)
+    assert np.array_equal(err_1, err_2)
+
+
+@pytest.mark.parametrize('poisson', [False, True])
+def test_different_seeds(tmp_path, poisson):
+    """test different seeds give different images"""
+    sci_1, _ = make_real(tmp_path, 'a.fits', 42, poisson=poisson)
+    sci_2, _ = make_real(tmp_path, 'b.fits', 43, poisson=poisson)
+    assert not np.array_equal(sci_1, sci_2)
+
+
+@pytest.mark.parametrize('poisson', [False, True])
+def test_error_noise_model(tmp_path, poisson):
+    """test the error is the shot and readout noise of the noisy image"""
+    sci, err = make_real(tmp_path, 'a.fits', 42, poisson=poisson)
+
+    # the noisy image in [e]
+    sci_e = sci.astype(np.float64) * EXPTIME
+    expected = np.sqrt(np.maximum(sci_e, 0.0) + RDNOISE**2) / EXPTIME
+    np.testing.assert_allclose(err, expected, rtol=1e-6)
+    assert (err >= RDNOISE / EXPTIME * (1 - 1e-6)).all()
+
+
+def test_noise_statistics(tmp_path):
+    """test the noise of a flat image follows the noise model"""
+    image_name = str(tmp_path / 'flat.fits')
+    fits.PrimaryHDU(np.full((200, 200), 1.0, np.float32)).writeto(image_name)
+    RealWorld(image_name, exptime=EXPTIME, rdnoise=RDNOISE,
+              seed=7).make_real()
+
+    sci = fits.getdata(image_name, 'SCI').astype(np.float64) * EXPTIME
+    assert sci.mean() == pytest.approx(EXPTIME, rel=0.01)
+    assert sci.std() == pytest.approx(np.sqrt(EXPTIME + RDNOISE**2),
+                                      rel=0.02)
+
+
+def test_no_exptime(tmp_path):
+    """test an image without exposure time gets no noise"""
+    image_name = make_image(tmp_path / 'a.fits')
+    RealWorld(image_name, exptime=None, bck_flux=0.1,
+              rdnoise=RDNOISE).make_real()
+    with fits.open(image_name) as image:
+        np.testing.assert_allclose(image['SCI'].data, image[0].data + 0.1,
+                                   rtol=1e-6)
+        assert (image['ERR'].data == RDNOISE).all()
+        assert image[0].header['EXPTIME'] == 1.0
@@ -0,0 +1,117 @@
+"""
+LICENSE.txt
+
+"""
+import numpy as np
+import pytest
+from astropy.table import Table
+
+# the catalog columns with the range of their values
+COLUMNS = [('X_IMAGE', 1.0, 1014.0), ('Y_IMAGE', 1.0, 1014.0),
+           ('X_WORLD', 53.0, 53.2), ('Y_WORLD', -27.9, -27.7),
+           ('A_IMAGE', 0.5, 10.0), ('B_IMAGE', 0.5, 10.0),
+           ('THETA_IMAGE', -90.0, 90.0), ('A_WORLD', 1.0e-4, 1.0e-3),
+           ('B_WORLD', 1.0e-4, 1.0e-3), ('THETA_WORLD', -90.0, 90.0),
+           ('MAG_F1400W', 18.0, 26.0), ('MAG_F814W', 18.0, 26.0)]
+
+# more rows than the initial size of the object array
+NROWS = 2500
+
+
+def make_catalog(nrows, seed=0):
+    """a catalog with random values"""
+    rng = np.random.default_rng(seed)
+    table = Table()
+    table['NUMBER'] = np.arange(1, nrows + 1)
+    for name, low, high in COLUMNS:
+        table[name] = rng.uniform(low, high, nrows)
+    return table
+
+
+def write_ascii(table, filename):
+    """write a catalog in the SExtractor ASCII format, with comment
+    and invalid lines among the rows and no final newline"""
+    lines = ['# {0:d} {1:s}  description of {1:s}'.format(index + 1, name)
+             for index, name in enumerate(table.colnames)]
+    for index, row in enumerate(table):
+        if index == 3:
+            lines.append('; a comment line')
+            lines.append('')
+        if index == 1500:
+            lines.append('# a late comment')
+            lines.append(' '.join(repr(float(value)) for value in row)[:40])
+        lines.append(' '.join([str(row['NUMBER'])] +
+                              [repr(float(row[name]))
+                               for name in table.colnames[1:]]))
+    with open(filename, 'w') as cat:
+        cat.write('\n'.join(lines))
+
+
+def expected_objects(table):
+    """the printed values of the objects of a catalog"""
+    names = [name for name, low, high in COLUMNS[:10]]
+    objects = []
+    for row in table:
+        objects.append([float(row['NUMBER'])] +
+                       [row[name] for name in names] +
+                       [row['MAG_F1400W'], 814.0, row['MAG_F814W'],
+                        1400.0, row['MAG_F1400W']])
+    return np.array(objects).reshape(len(table), 16)
+
+
+def read_objects(output):
+    """the values of the objects printed by the test program"""
+    values = [line.split()[1:] for line in output.splitlines()
+              if line.startswith('object ')]
+    return np.array([[float(value) for entry in row
+                      for value in entry.split(':')]
+                     for row in values]).reshape(len(values), 16)
+
+
+@pytest.fixture(scope='module')
+def readers(cextern):
+    """the catalog reader with and without memory mapping"""
+    return {'mmap': cextern.build('sex_catalog_check'),
+            'stdio': cextern.build('sex_catalog_check', defines=())}
+
+
+@pytest.mark.parametrize('reader, fmt', [('mmap', 'ascii'),
+                                         ('stdio', 'ascii'),
+                                         ('mmap', 'fits')])
+def test_sex_catalog(tmp_path, cextern, readers, reader, fmt):
+    """test the mapped and streamed ASCII catalogs and the
+    FITS tables give the same objects"""
+    table = make_catalog(NROWS)
+    filename = str(tmp_path / 'objects.{0:s}'.format(fmt))
+    if fmt == 'ascii':
+        write_ascii(table, filename)
+    else:
+        table.write(filename, format='fits')
+
+    proc = cextern.run(readers[reader], filename, 1400.0)
+    assert proc.returncode == 0, proc.stderr
+    lines = proc.stdout.splitlines()
+    assert 'columns ' + ' '.join(
+        '{0:d}:{1:s}'.format(index + 1, name)
+        for index, name in enumerate(table.colnames)) in lines
+    assert 'rows {0:d}'.format(NROWS) in lines
+    assert np.array_equal(read_objects(proc.stdout),
+                          expected_objects(table))
+
+
+@pytest.mark.parametrize('reader, fmt', [('mmap', 'ascii'),
+                                         ('stdio', 'ascii'),
+                                         ('mmap', 'fits')])
+def test_sex_catalog_empty(tmp_path, cextern, readers, reader, fmt):
+    """test a catalog without rows gives no objects"""
+    table = make_catalog(0)
+    filename = str(tmp_path / 'objects.{0:s}'.format(fmt))
+    if fmt == 'ascii':
+        write_ascii(table, filename)
+    else:
+        table.write(filename, format='fits')
+
+    proc = cextern.run(readers[reader], filename, 1400.0)
+    assert proc.returncode == 0, proc.stderr
+    assert 'rows 0' in proc.stdout.splitlines()
+    assert read_objects(proc.stdout).size == 0
@@ -0,0 +1,219 @@
+"""
+LICENSE.txt
+
+"""
+import multiprocessing
+import os
+import shutil
+import pytest
+
+import numpy as np
+from astropy.io import fits
+from astropy.table import Table
+
+from hstaxe.axeerror import aXeSIMError
+from hstaxe.axesim import axesimtasks
+from hstaxe.axesim import simbatch
+from hstaxe.config import getDATA, getOUTSIM
+
+# the check replaced for the stand-in simulations
+check_executables = simbatch.check_executables
+
+CONFIG = """INSTRUMENT WFC3
+CAMERA IR
+SCIENCE_EXT SCI
+FFNAME None
+
+BEAMA 15 196
+MMAG_EXTRACT_A 30
+MMAG_MARK_A 30
+DYDX_ORDER_A 1
+DYDX_A_0 1.5
+DYDX_A_1 0.01
+XOFF_A 0.0
+YOFF_A 0.0
+DISP_ORDER_A 1
+DLDP_A_0 8950.0
+DLDP_A_1 46.5
+SENSITIVITY_A None
+"""
+
+# the additions for running the aXe executables
+SIMUL_CONFIG = CONFIG.replace('SENSITIVITY_A None', 'SENSITIVITY_A sens.fits') \
+    + """RDNOISE 20.0
+POBJSIZE 1.0
+SMFACTOR 1.0
+DRZRESOLA 46.5
+DRZSCALE 0.128
+DRZLAMB0 10000.0
+DRZXINI 15.0
+"""
+
+CATALOG = """# 1 NUMBER
+# 2 X_IMAGE
+# 3 Y_IMAGE
+# 4 A_IMAGE
+# 5 B_IMAGE
+# 6 THETA_IMAGE
+# 7 MAG_F1400W
+1 100.0 120.0 2.0 1.5 30.0 20.0
+2 150.0 60.0 3.0 2.0 -20.0 21.0
+"""
+
+CASES = """task incat config exptime
+simdispim objects.cat test.conf 100.0
+simdispim objects.cat test.conf 13.0
+"""
+
+
+def simdispim(incat=None, config=None, dispim_name=None, exptime=None,
+              seed=None, **params):
+    """a simulation writing its parameters to the output image"""
+    batch = simbatch.current_batch()
+    config_simul = batch.get_simul_config(config)
+
+    # the catalog is a copy per case
+    with open(getDATA(incat), 'a') as catalog:
+        catalog.write('# filled\n')
+    with open(getDATA(incat)) as catalog:
+        assert catalog.read().count('filled') == 1
+
+    if exptime == 13.0:
+        print('SIMDISPIM: bad exposure time')
+        raise ValueError('bad exposure time')
+
+    with open(getOUTSIM(dispim_name), 'w') as image:
+        image.write('{0:s} {1:d} {2:g}'.format(config_simul, seed, exptime))
+    return 0
+
+
+@pytest.fixture
+def sim_dirs(tmp_path, monkeypatch):
+    """aXeSIM directories with a catalog and a configuration"""
+    for name, subdir in (('AXE_IMAGE_PATH', 'DATA'),
+                         ('AXE_CONFIG_PATH', 'CONF'),
+                         ('AXE_OUTPUT_PATH', 'OUTPUT'),
+                         ('AXE_OUTSIM_PATH', 'OUTSIM')):
+        (tmp_path / subdir).mkdir()
+        monkeypatch.setenv(name, str(tmp_path / subdir))
+    (tmp_path / 'DATA' / 'objects.cat').write_text('# NUMBER\n1\n')
+    (tmp_path / 'CONF' / 'test.conf').write_text(CONFIG)
+    (tmp_path / 'cases.dat').write_text(CASES)
+    monkeypatch.setattr(axesimtasks, 'simdispim', simdispim)
+    monkeypatch.setattr(simbatch, 'check_executables', lambda cases: None)
+    yield tmp_path
+
+
+def check_results(tmp_path, results, nworkers):
+    """check the records and outputs of the two cases"""
+    summary = results['summary']
+    assert (summary['cases'], summary['done'], summary['failed'],
+            summary['nworkers']) == (2, 1, 1, nworkers)
+
+    good, bad = results['records']
+    assert (good['index'], good['status']) == (0, 'ok')
+    assert (bad['index'], bad['status']) == (1, 'error')
+    assert bad['error'] == 'bad exposure time'
+    assert bad['log'] == ['SIMDISPIM: bad exposure time']
+
+    # the output of the good case with its
+    # simulation configuration and seed
+    seed = simbatch.read_cases(str(tmp_path / 'cases.dat'),
+                               seed=3)[0]['params']['seed']
+    output = (tmp_path / 'OUTSIM' / 'objects_00000_slitless.fits').read_text()
+    assert output == 'test.conf.simul {0:d} 100'.format(seed)
+    assert os.listdir(tmp_path / 'OUTSIM') == ['objects_00000_slitless.fits']
+
+    # the inputs are untouched, the scratch directories removed
+    assert (tmp_path / 'DATA' / 'objects.cat').read_text() == '# NUMBER\n1\n'
+    assert not [name for name in os.listdir(tmp_path)
+                if name.startswith('axesimbatch')]
+
+
+def test_read_cases(sim_dirs):
+    """test the case table with the derived names and seeds"""
+    cases = simbatch.read_cases(str(sim_dirs / 'cases.dat'), seed=3)
+    assert [case['name'] for case in cases] == \
+        ['objects_00000_slitless.fits', 'objects_00001_slitless.fits']
+    seeds = [case['params']['seed'] for case in cases]
+    assert seeds[0] != seeds[1]
+    assert seeds == [case['params']['seed'] for case in
+                     simbatch.read_cases(str(sim_dirs / 'cases.dat'), seed=3)]
+
+
+def test_run_batch_serial(sim_dirs):
+    """test a grid run in the current process"""
+    results = simbatch.run_batch(str(sim_dirs / 'cases.dat'), seed=3,
+                                 scratch_dir=str(sim_dirs))
+    check_results(sim_dirs, results, 1)
+    assert os.environ['AXE_IMAGE_PATH'] == str(sim_dirs / 'DATA')
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason='the test task reaches only forked workers')
+def test_run_batch_pool(sim_dirs):
+    """test a grid run in worker processes"""
+    results = simbatch.run_batch(str(sim_dirs / 'cases.dat'), nworkers=2,
+                                 seed=3, scratch_dir=str(sim_dirs))
+    check_results(sim_dirs, results, 2)
+
+
+def test_read_cases_directory(sim_dirs):
+    """test that input files with a directory are rejected"""
+    (sim_dirs / 'cases.dat').write_text('task incat config\n'
+                                        'simdispim sub/objects.cat test.conf\n')
+    with pytest.raises(aXeSIMError, match='without a directory'):
+        simbatch.read_cases(str(sim_dirs / 'cases.dat'))
+
+
+def test_run_batch_executables(sim_dirs, monkeypatch):
+    """test that a batch without the aXe executables fails at once"""
+    monkeypatch.setattr(simbatch, 'check_executables', check_executables)
+    monkeypatch.setenv('PATH', str(sim_dirs))
+    with pytest.raises(aXeSIMError, match='aXe_AF2PET, aXe_GOL2AF'):
+        simbatch.run_batch(str(sim_dirs / 'cases.dat'),
+                           scratch_dir=str(sim_dirs))
+
+
+@pytest.mark.skipif(not all(shutil.which(name) for name in
+                            simbatch.TASK_EXECUTABLES['simdispim']
+                            + simbatch.TASK_EXECUTABLES['simdirim']
+                            + simbatch.EXTRACTION_EXECUTABLES),
+                    reason='the aXe executables are not installed')
+def test_run_batch_end_to_end(tmp_path, monkeypatch):
+    """test a grid of real simulations and extractions"""
+    pytest.importorskip('stsci.tools')
+    for name, subdir in (('AXE_IMAGE_PATH', 'DATA'),
+                         ('AXE_CONFIG_PATH', 'CONF'),
+                         ('AXE_OUTPUT_PATH', 'OUTPUT'),
+                         ('AXE_OUTSIM_PATH', 'OUTSIM'),
+                         ('AXE_SIMDATA_PATH', 'SIMDATA')):
+        (tmp_path / subdir).mkdir()
+        monkeypatch.setenv(name, str(tmp_path / subdir))
+    (tmp_path / 'CONF' / 'test.conf').write_text(SIMUL_CONFIG)
+    wavelength = np.linspace(8000.0, 17000.0, 50)
+    Table({'WAVELENGTH': wavelength,
+           'SENSITIVITY': np.full(50, 1.0e+17),
+           'ERROR': np.ones(50)}).write(str(tmp_path / 'CONF' / 'sens.fits'))
+    (tmp_path / 'SIMDATA' / 'tpass.dat').write_text(
+        ''.join('{0:.1f} 0.5\n'.format(wave) for wave in wavelength))
+    (tmp_path / 'DATA' / 'objects.cat').write_text(CATALOG)
+    (tmp_path / 'cases.dat').write_text(
+        'task incat config tpass_direct exptime nx ny bck_flux\n'
+        'simdispim objects.cat test.conf "" 100.0 200 200 0.5\n'
+        'simdirim objects.cat test.conf tpass.dat 100.0 200 200 0.5\n')
+
+    results = simbatch.run_batch(str(tmp_path / 'cases.dat'), nworkers=2,
+                                 seed=3, scratch_dir=str(tmp_path))
+    assert results['summary']['done'] == 2, results['records']
+
+    # the simulated images and the extraction of the dispersed image
+    outsim = tmp_path / 'OUTSIM'
+    assert sorted(os.listdir(outsim)) == \
+        ['objects_00000_slitless.fits', 'objects_00000_slitless_2.SPC.fits',
+         'objects_00000_slitless_2.STP.fits', 'objects_00001_direct.fits']
+    for name in ('objects_00000_slitless.fits', 'objects_00001_direct.fits'):
+        with fits.open(str(outsim / name)) as image:
+            assert image['SCI'].data.shape == (200, 200)
+            assert np.isfinite(image['SCI'].data).all()
+            assert image['ERR'].data.shape == (200, 200)
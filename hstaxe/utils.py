@@ -3,9 +3,38 @@ See LICENSE.txt
 """
 import sys
 import logging
+import importlib
 
 # To guide any import *
-__all__ = ["set_logging"]
+__all__ = ["set_logging", "lazy_submodules"]
+
+
+def lazy_submodules(module, names, package=None):
+    """Make a module ``__getattr__`` which imports submodules on first use.
+
+    Parameters
+    ----------
+    module: str
+        the name of the module
+    names: list
+        the names of the submodules
+    package: str
+        the package of the submodules, by default the module
+
+    Returns
+    -------
+    __getattr__: function
+        the function to assign to ``__getattr__`` of a module
+    """
+    names = frozenset(names)
+    package = package or module
+
+    def __getattr__(name):
+        if name in names:
+            return importlib.import_module('.' + name, package)
+        raise AttributeError("module {0!r} has no attribute {1!r}"
+                             .format(module, name))
+    return __getattr__
 
 
 # Set up logging ability for the user